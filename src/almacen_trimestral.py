@@ -0,0 +1,142 @@
+"""
+Almacén acumulado de los registros exportados de un trimestre (SQLite).
+
+Cada ejecución de `procesar` solo ve los PDFs de su lote. El almacén guarda los
+registros (facturas, duplicados y facturas con error) y los errores de
+extracción de todas las ejecuciones del trimestre, de modo que el informe
+FACTURAS_{AÑO}_{TRIMESTRE}.xlsx se genera con el trimestre completo sin volver a
+procesar los PDFs de semanas anteriores.
+
+Estructura (documentos/reportes/YYYY/XT/REGISTROS_YYYY_XT.db):
+- registros: clave única del registro, archivo PDF y el registro completo en JSON
+- errores:   ídem para las entradas del log de errores de extracción
+
+Claves de los registros:
+- factura:   CIF + NumFactura + FechaFactura (una factura reprocesada sustituye a la anterior)
+- duplicado: archivo + CIF + NumFactura + FechaFactura
+- error:     archivo + página + NumFactura + FechaFactura (un PDF con varias
+             facturas rechazadas conserva todas)
+
+Cuando un lote trae un PDF que ya estaba en el almacén, sus errores anteriores
+se descartan: cuenta el resultado del último procesamiento de ese archivo.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from src.registro_factura import a_diccionario
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave TEXT NOT NULL UNIQUE,
+    archivo TEXT NOT NULL,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_registros_archivo ON registros (archivo);
+CREATE TABLE IF NOT EXISTS errores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave TEXT NOT NULL UNIQUE,
+    archivo TEXT NOT NULL,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_errores_archivo ON errores (archivo);
+"""
+
+# Un registro que vuelve a llegar conserva su posición y actualiza sus datos
+SQL_UPSERT = ("INSERT INTO {tabla} (clave, archivo, datos) VALUES (?, ?, ?) "
+              "ON CONFLICT (clave) DO UPDATE SET archivo = excluded.archivo, datos = excluded.datos")
+
+
+class AlmacenTrimestral:
+    """
+    Registros acumulados de un trimestre en un archivo SQLite.
+    """
+
+    def __init__(self, ruta_db: str):
+        """
+        Args:
+            ruta_db: Ruta del archivo SQLite (se crea al primer uso)
+        """
+        self.ruta_db = Path(ruta_db)
+        self._conexion: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def nombre_archivo(año: str, trimestre: str) -> str:
+        """Nombre del almacén de un trimestre: REGISTROS_{AÑO}_{TRIMESTRE}.db"""
+        return f"REGISTROS_{año}_{trimestre}.db"
+
+    @property
+    def conexion(self) -> sqlite3.Connection:
+        """Conexión abierta la primera vez que se usa."""
+        if self._conexion is None:
+            self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+            self._conexion = sqlite3.connect(str(self.ruta_db))
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+        return self._conexion
+
+    @staticmethod
+    def clave_registro(registro: Dict[str, Any]) -> str:
+        """
+        Clave única de un registro de factura (ver docstring del módulo).
+        """
+        archivo = registro.get('_Archivo', '')
+        if '_Error' in registro:
+            return (f"error|{archivo}|{registro.get('_Pagina', '')}|"
+                    f"{registro.get('NumFactura', '')}|{registro.get('FechaFactura', '')}")
+        clave_factura = f"{registro.get('CIF', '')}|{registro.get('NumFactura', '')}|{registro.get('FechaFactura', '')}"
+        if registro.get('_Duplicado', False):
+            return f"duplicado|{archivo}|{clave_factura}"
+        return f"factura|{clave_factura}"
+
+    @staticmethod
+    def clave_error(error: Dict[str, Any]) -> str:
+        """Clave única de una entrada del log de errores: archivo, página y mensaje."""
+        return f"{error.get('Archivo', '')}|{error.get('Pagina', '')}|{error.get('Error', '')}"
+
+    def añadir(self, registros: Iterable[Dict[str, Any]], errores: Iterable[Dict[str, Any]] = ()) -> int:
+        """
+        Añade el lote de una ejecución en una única transacción.
+
+        Args:
+            registros: Registros de facturas (diccionarios o RegistroFactura, con metadatos
+                       _Archivo, _Error, _Duplicado...)
+            errores: Entradas del log de errores de extracción
+
+        Returns:
+            int: Registros del lote añadidos o actualizados
+        """
+        filas_registros = [(self.clave_registro(registro), registro.get('_Archivo', '') or '',
+                            json.dumps(registro, ensure_ascii=False, default=str))
+                           for registro in map(a_diccionario, registros)]
+        filas_errores = [(self.clave_error(error), error.get('Archivo', '') or '',
+                          json.dumps(error, ensure_ascii=False, default=str))
+                         for error in errores]
+        archivos = {(archivo,) for _, archivo, _ in filas_registros + filas_errores if archivo}
+
+        with self.conexion:
+            # Los errores de ejecuciones anteriores de los PDFs del lote dejan de valer
+            self.conexion.executemany("DELETE FROM registros WHERE archivo = ? AND clave LIKE 'error|%'", archivos)
+            self.conexion.executemany("DELETE FROM errores WHERE archivo = ?", archivos)
+            self.conexion.executemany(SQL_UPSERT.format(tabla="registros"), filas_registros)
+            self.conexion.executemany(SQL_UPSERT.format(tabla="errores"), filas_errores)
+        return len(filas_registros)
+
+    def registros(self) -> List[Dict[str, Any]]:
+        """Devuelve todos los registros del trimestre en orden de alta."""
+        return [json.loads(datos) for (datos,) in
+                self.conexion.execute("SELECT datos FROM registros ORDER BY id")]
+
+    def errores(self) -> List[Dict[str, Any]]:
+        """Devuelve todas las entradas del log de errores del trimestre en orden de alta."""
+        return [json.loads(datos) for (datos,) in
+                self.conexion.execute("SELECT datos FROM errores ORDER BY id")]
+
+    def cerrar(self):
+        """Cierra la conexión."""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
@@ -0,0 +1,158 @@
+"""
+Caché en disco de resultados de extracción, direccionada por contenido.
+
+Los mismos PDFs vuelven a llegar a por_procesar (correos reenviados, ejecuciones
+fallidas que se repiten...). La caché guarda las facturas extraídas de cada PDF
+con clave (hash del PDF, versión de la plantilla, trimestre/año de la ejecución),
+de modo que reprocesar un archivo sin cambios no vuelve a parsearlo.
+
+Estructura (documentos/procesados/cache_extraccion/<hash_pdf>.json):
+{
+    "hash_pdf": "<md5 del PDF>",
+    "proveedor_id": "proveedor_x",
+    "version_plantilla": "<md5 del JSON de la plantilla>",
+    "contexto": "1T|2025",
+    "facturas": [{...}, ...]
+}
+
+El tamaño total está acotado: al superar el límite se eliminan las entradas usadas
+hace más tiempo (LRU por fecha de modificación, que se actualiza en cada acierto).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class CacheExtraccion:
+    """
+    Caché de facturas extraídas por PDF, con límite de tamaño y expulsión LRU.
+
+    Cada entrada es un archivo independiente escrito de forma atómica, por lo que
+    varios procesos pueden leer y escribir entradas a la vez.
+    """
+
+    # Límite por defecto del tamaño total de la caché en disco
+    MAX_BYTES = 50 * 1024 * 1024
+
+    def __init__(self, directorio: str, max_bytes: int = MAX_BYTES):
+        """
+        Args:
+            directorio: Carpeta donde se guardan las entradas
+            max_bytes: Tamaño máximo total de la caché en bytes
+        """
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+
+    def _ruta_entrada(self, hash_pdf: str) -> Path:
+        return self.directorio / f"{hash_pdf}.json"
+
+    def obtener(self, hash_pdf: str, versiones_plantillas: Dict[str, str],
+                contexto: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca el resultado de extracción de un PDF.
+
+        La entrada solo es válida si la plantilla con la que se extrajo no ha
+        cambiado y la ejecución tiene el mismo trimestre/año (la asignación de
+        trimestre del Excel depende de ellos).
+
+        Args:
+            hash_pdf: Hash MD5 del contenido del PDF
+            versiones_plantillas: proveedor_id -> versión actual de su plantilla
+            contexto: Trimestre y año de la ejecución
+
+        Returns:
+            Optional[Dict[str, Any]]: {'proveedor_id', 'facturas'} o None si no hay entrada válida
+        """
+        ruta = self._ruta_entrada(hash_pdf)
+        if not ruta.exists():
+            return None
+
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"⚠️ ADVERTENCIA: Entrada de caché ilegible {ruta.name}: {e}")
+            return None
+
+        version_actual = versiones_plantillas.get(entrada.get('proveedor_id'))
+        if (entrada.get('hash_pdf') != hash_pdf or version_actual is None or
+                version_actual != entrada.get('version_plantilla') or entrada.get('contexto') != contexto):
+            return None
+
+        # Marcar como usada recientemente (orden LRU)
+        try:
+            os.utime(ruta, None)
+        except OSError:
+            pass
+
+        return {'proveedor_id': entrada['proveedor_id'], 'facturas': entrada['facturas']}
+
+    def guardar(self, hash_pdf: str, proveedor_id: str, version_plantilla: Optional[str],
+                contexto: str, facturas: List[Dict[str, Any]]):
+        """
+        Guarda el resultado de extracción de un PDF (archivo temporal + renombrado).
+
+        Args:
+            hash_pdf: Hash MD5 del contenido del PDF
+            proveedor_id: Proveedor con cuya plantilla se extrajo
+            version_plantilla: Versión de la plantilla (sin versión no se guarda)
+            contexto: Trimestre y año de la ejecución
+            facturas: Facturas extraídas
+        """
+        if not version_plantilla:
+            return
+
+        entrada = {
+            'hash_pdf': hash_pdf,
+            'proveedor_id': proveedor_id,
+            'version_plantilla': version_plantilla,
+            'contexto': contexto,
+            'facturas': facturas
+        }
+
+        ruta = self._ruta_entrada(hash_pdf)
+        temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(entrada, f, ensure_ascii=False)
+            os.replace(temporal, ruta)
+        except (IOError, TypeError, ValueError) as e:
+            print(f"⚠️ ADVERTENCIA: No se pudo guardar en caché {ruta.name}: {e}")
+            if temporal.exists():
+                temporal.unlink()
+
+    def aplicar_limite(self) -> int:
+        """
+        Elimina las entradas menos usadas hasta respetar el tamaño máximo.
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        if not self.directorio.exists():
+            return 0
+
+        entradas = []
+        for ruta in self.directorio.glob('*.json'):
+            try:
+                stat = ruta.stat()
+                entradas.append((stat.st_mtime, stat.st_size, ruta))
+            except OSError:
+                continue
+
+        total = sum(tamaño for _, tamaño, _ in entradas)
+        eliminadas = 0
+
+        for _, tamaño, ruta in sorted(entradas, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                ruta.unlink()
+                total -= tamaño
+                eliminadas += 1
+            except OSError:
+                continue
+
+        return eliminadas
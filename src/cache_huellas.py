@@ -0,0 +1,234 @@
+"""
+Caché persistente de huellas de maquetación (layout) para identificar proveedores.
+
+Las facturas de un mismo proveedor comparten una maquetación muy estable: tamaño
+de página, fuentes y posición de las palabras fijas de la cabecera ("FACTURA",
+"Fecha", "CIF"...). La huella resume esos rasgos de la primera página y la caché
+guarda huella → proveedor_id, de modo que un documento ya visto se identifica sin
+probar ninguna plantilla.
+
+Estructura del archivo (documentos/procesados/indices/cache_huellas.json):
+{
+    "huellas": {
+        "<huella>": {"proveedor_id": "...", "version_plantilla": "<md5 del JSON>", "aciertos": 3}
+    },
+    "estadisticas": {"aciertos": 10, "fallos": 4}
+}
+
+Cada entrada guarda la versión (hash) de la plantilla con la que se identificó.
+Si la plantilla cambia en disco, la entrada deja de ser válida y se descarta.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pdfplumber.page import Page
+from pdfplumber.utils import extract_words
+
+from src.utils.indice_espacial import indice_de_pagina
+
+
+# Fracción superior de la página considerada cabecera
+PROPORCION_CABECERA = 0.3
+
+# Rejilla (en puntos) a la que se redondean las posiciones de las palabras
+PASO_POSICION = 5
+
+# Palabras fijas de cabecera necesarias para que la huella distinga proveedores:
+# con menos (cabecera en imagen, solo números) quedaría en tamaño y fuentes
+MIN_PALABRAS_CABECERA = 3
+
+
+def calcular_huella_layout(pagina: Any) -> Optional[str]:
+    """
+    Calcula la huella de maquetación de una página.
+
+    Rasgos usados:
+    - Tamaño de la página
+    - Fuentes presentes en la cabecera
+    - Palabras fijas de la cabecera (sin dígitos, para ignorar números, fechas
+      e importes) con su posición redondeada
+
+    Solo se leen los caracteres de la cabecera, a través del índice espacial de
+    la página (el mismo que usan después la identificación y la extracción por
+    regiones): no se extraen las palabras de la página completa.
+
+    Args:
+        pagina: Primera página del PDF (pdfplumber)
+
+    Returns:
+        Optional[str]: Huella en hexadecimal, o None si la página no es de pdfplumber
+                       o su cabecera tiene menos de MIN_PALABRAS_CABECERA palabras fijas
+    """
+    if not isinstance(pagina, Page):
+        return None
+
+    x0, top, x1, _ = pagina.bbox
+    cabecera = (x0, top, x1, top + pagina.height * PROPORCION_CABECERA)
+    chars = indice_de_pagina(pagina).chars_en_region(cabecera)
+    if not chars:
+        return None
+
+    palabras = sorted(
+        (palabra['text'], round(palabra['x0'] / PASO_POSICION), round(palabra['top'] / PASO_POSICION))
+        for palabra in extract_words(chars)
+        if not any(c.isdigit() for c in palabra['text'])
+    )
+    if len(palabras) < MIN_PALABRAS_CABECERA:
+        return None
+
+    rasgos = {
+        'tamaño': [round(pagina.width), round(pagina.height)],
+        'fuentes': sorted({c.get('fontname', '') for c in chars}),
+        'cabecera': palabras,
+    }
+    return hashlib.sha1(json.dumps(rasgos, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class CacheHuellas:
+    """
+    Caché huella → proveedor_id con contadores de aciertos y fallos.
+
+    Se carga del disco la primera vez que se consulta y solo se escribe al llamar
+    a guardar(). En modo multiproceso cada proceso hijo trabaja con una copia y
+    devuelve sus cambios (exportar_cambios) para que el proceso principal los
+    incorpore (incorporar_cambios) y los persista.
+    """
+
+    def __init__(self, ruta_archivo: str):
+        """
+        Args:
+            ruta_archivo: Ruta del archivo JSON de la caché
+        """
+        self.ruta_archivo = Path(ruta_archivo)
+        self._datos: Optional[Dict] = None
+        self._cambios = self._cambios_vacios()
+
+    @staticmethod
+    def _cambios_vacios() -> Dict[str, Any]:
+        return {'nuevas': {}, 'descartadas': [], 'aciertos_por_huella': {}, 'aciertos': 0, 'fallos': 0}
+
+    @property
+    def datos(self) -> Dict:
+        """Contenido de la caché, cargado del disco la primera vez."""
+        if self._datos is None:
+            self._datos = self._cargar()
+        return self._datos
+
+    def _cargar(self) -> Dict:
+        if self.ruta_archivo.exists():
+            try:
+                with open(self.ruta_archivo, 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+                datos.setdefault('huellas', {})
+                datos.setdefault('estadisticas', {'aciertos': 0, 'fallos': 0})
+                return datos
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"⚠️ ADVERTENCIA: Error al cargar caché de huellas {self.ruta_archivo}: {e}")
+        return {'huellas': {}, 'estadisticas': {'aciertos': 0, 'fallos': 0}}
+
+    @property
+    def aciertos(self) -> int:
+        return self.datos['estadisticas']['aciertos']
+
+    @property
+    def fallos(self) -> int:
+        return self.datos['estadisticas']['fallos']
+
+    def buscar(self, huella: Optional[str], versiones_plantillas: Dict[str, str]) -> Optional[str]:
+        """
+        Busca el proveedor asociado a una huella y actualiza los contadores.
+
+        Args:
+            huella: Huella de la primera página (None cuenta como fallo)
+            versiones_plantillas: proveedor_id -> versión actual de su plantilla
+
+        Returns:
+            Optional[str]: proveedor_id si la huella es conocida y su plantilla no ha cambiado
+        """
+        entrada = self.datos['huellas'].get(huella) if huella else None
+
+        if entrada is not None:
+            version_actual = versiones_plantillas.get(entrada['proveedor_id'])
+            if version_actual is not None and version_actual == entrada.get('version_plantilla'):
+                entrada['aciertos'] = entrada.get('aciertos', 0) + 1
+                self.datos['estadisticas']['aciertos'] += 1
+                self._cambios['aciertos'] += 1
+                por_huella = self._cambios['aciertos_por_huella']
+                por_huella[huella] = por_huella.get(huella, 0) + 1
+                return entrada['proveedor_id']
+
+            # Plantilla modificada o eliminada: la huella ya no es fiable
+            self.descartar(huella)
+
+        self.datos['estadisticas']['fallos'] += 1
+        self._cambios['fallos'] += 1
+        return None
+
+    def registrar(self, huella: Optional[str], proveedor_id: str, version_plantilla: Optional[str]):
+        """
+        Asocia una huella al proveedor identificado por la vía lenta.
+
+        Args:
+            huella: Huella de la primera página
+            proveedor_id: Proveedor identificado
+            version_plantilla: Versión actual de la plantilla (sin versión no se registra)
+        """
+        if not huella or not version_plantilla:
+            return
+
+        entrada = {'proveedor_id': proveedor_id, 'version_plantilla': version_plantilla, 'aciertos': 0}
+        self.datos['huellas'][huella] = entrada
+        self._cambios['nuevas'][huella] = dict(entrada)
+
+    def descartar(self, huella: str):
+        """Elimina una huella que ya no identifica a su proveedor."""
+        self.datos['huellas'].pop(huella, None)
+        self._cambios['nuevas'].pop(huella, None)
+        self._cambios['descartadas'].append(huella)
+
+    def exportar_cambios(self) -> Dict[str, Any]:
+        """
+        Devuelve (y olvida) los cambios acumulados desde la última exportación.
+
+        Returns:
+            Dict[str, Any]: Huellas nuevas y descartadas, y contadores de aciertos/fallos
+        """
+        cambios = self._cambios
+        self._cambios = self._cambios_vacios()
+        return cambios
+
+    def incorporar_cambios(self, cambios: Dict[str, Any]):
+        """
+        Aplica los cambios exportados por otra copia de la caché (proceso hijo).
+
+        Args:
+            cambios: Resultado de exportar_cambios()
+        """
+        huellas = self.datos['huellas']
+        for huella in cambios['descartadas']:
+            huellas.pop(huella, None)
+        for huella, entrada in cambios['nuevas'].items():
+            huellas[huella] = entrada
+        for huella, aciertos in cambios['aciertos_por_huella'].items():
+            if huella in huellas:
+                huellas[huella]['aciertos'] = huellas[huella].get('aciertos', 0) + aciertos
+        self.datos['estadisticas']['aciertos'] += cambios['aciertos']
+        self.datos['estadisticas']['fallos'] += cambios['fallos']
+
+    def guardar(self):
+        """Escribe la caché en disco (archivo temporal + renombrado)."""
+        if self._datos is None:
+            return
+
+        try:
+            self.ruta_archivo.parent.mkdir(parents=True, exist_ok=True)
+            temporal = self.ruta_archivo.with_suffix('.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._datos, f, indent=2, ensure_ascii=False)
+            os.replace(temporal, self.ruta_archivo)
+        except IOError as e:
+            print(f"❌ ERROR: No se pudo guardar caché de huellas {self.ruta_archivo}: {e}")
@@ -0,0 +1,177 @@
+"""
+Contexto compartido de un documento PDF durante su procesamiento.
+
+Cada PDF se lee y se parsea una sola vez por ejecución: la identificación del
+proveedor, la extracción de datos, la clasificación de errores y el cálculo del
+hash reutilizan el mismo objeto en lugar de volver a abrir el archivo.
+"""
+
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import pdfplumber
+
+
+class DocumentoPDF:
+    """
+    Documento PDF abierto una única vez y compartido entre las fases del procesamiento.
+
+    Todo se calcula de forma perezosa y se cachea:
+    - contenido: bytes del archivo (una sola lectura de disco)
+    - pdf: objeto pdfplumber (un solo parseo, desde `contenido`)
+    - hash_md5: hash del contenido
+    - num_paginas: número de páginas
+    - texto_pagina(i): texto completo de cada página
+
+    cerrar() libera el archivo (necesario en Windows antes de moverlo) pero conserva
+    las cachés de hash y texto, que siguen disponibles para las fases posteriores.
+
+    Examples:
+        >>> with DocumentoPDF("factura.pdf") as documento:
+        ...     pagina = documento.paginas[0]
+        ...     documento.hash_md5
+    """
+
+    def __init__(self, ruta: str):
+        """
+        Crea el contexto del documento (no lee ni parsea nada todavía).
+
+        Args:
+            ruta: Ruta al archivo PDF
+        """
+        self.ruta = str(ruta)
+        self.nombre = os.path.basename(self.ruta)
+        self._contenido: Optional[bytes] = None
+        self._hash_md5: Optional[str] = None
+        self._gestor = None
+        self._pdf = None
+        self._textos_pagina: Dict[int, Optional[str]] = {}
+        self._num_paginas: Optional[int] = None
+
+    @property
+    def contenido(self) -> bytes:
+        """Bytes del archivo, leídos de disco una sola vez."""
+        if self._contenido is None:
+            with open(self.ruta, 'rb') as f:
+                self._contenido = f.read()
+        return self._contenido
+
+    @property
+    def hash_md5(self) -> str:
+        """Hash MD5 del contenido en formato hexadecimal."""
+        if self._hash_md5 is None:
+            self._hash_md5 = hashlib.md5(self.contenido).hexdigest()
+        return self._hash_md5
+
+    @property
+    def pdf(self) -> Any:
+        """
+        Objeto PDF de pdfplumber, abierto la primera vez que se necesita.
+
+        Se parsea desde `contenido`, de modo que el archivo se lee de disco una
+        sola vez aunque también se calcule el hash.
+        """
+        if self._pdf is None:
+            flujo = io.BytesIO(self.contenido)
+            flujo.name = self.ruta
+            gestor = pdfplumber.open(flujo)
+            self._pdf = gestor.__enter__()
+            self._gestor = gestor
+        return self._pdf
+
+    @property
+    def paginas(self) -> List[Any]:
+        """Páginas del PDF."""
+        return self.pdf.pages
+
+    @property
+    def num_paginas(self) -> int:
+        """Número de páginas (sin parsear el PDF si se conoce por otro proceso)."""
+        if self._num_paginas is None:
+            self._num_paginas = len(self.paginas)
+        return self._num_paginas
+
+    def texto_pagina(self, indice: int) -> Optional[str]:
+        """
+        Devuelve el texto completo de una página, extrayéndolo solo la primera vez.
+
+        Args:
+            indice: Índice de la página (0-based)
+
+        Returns:
+            Texto de la página (puede ser None si la página no tiene texto)
+
+        Raises:
+            IndexError: Si la página no existe
+        """
+        if self._num_paginas is not None and not 0 <= indice < self._num_paginas:
+            raise IndexError(f"El PDF tiene {self._num_paginas} página(s)")
+        if indice not in self._textos_pagina:
+            self._textos_pagina[indice] = self.paginas[indice].extract_text()
+        return self._textos_pagina[indice]
+
+    def textos_extraidos(self) -> Dict[int, Optional[str]]:
+        """Textos de página ya extraídos (índice de página -> texto)."""
+        return dict(self._textos_pagina)
+
+    def incorporar_textos(self, textos: Dict[int, Optional[str]], num_paginas: Optional[int] = None):
+        """
+        Añade textos de página extraídos en otro proceso para no volver a extraerlos.
+
+        Args:
+            textos: Índice de página -> texto (resultado de textos_extraidos)
+            num_paginas: Número de páginas del PDF, si se conoce (pedir una página que
+                         no existe ya no obliga a parsearlo)
+        """
+        for indice, texto in textos.items():
+            self._textos_pagina.setdefault(indice, texto)
+        if num_paginas is not None and self._num_paginas is None:
+            self._num_paginas = num_paginas
+
+    def cerrar(self):
+        """Cierra el PDF si estaba abierto. Las cachés de hash y texto se conservan."""
+        if self._gestor is not None:
+            try:
+                self._gestor.__exit__(None, None, None)
+            finally:
+                self._gestor = None
+                self._pdf = None
+
+    def __enter__(self) -> "DocumentoPDF":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cerrar()
+        return False
+
+    def __repr__(self) -> str:
+        return f"DocumentoPDF('{self.ruta}')"
+
+
+@contextmanager
+def abrir_documento(ruta: str, documento: Optional[DocumentoPDF] = None) -> Iterator[DocumentoPDF]:
+    """
+    Reutiliza el documento recibido o abre uno nuevo para la ruta indicada.
+
+    Solo cierra el documento al salir si lo ha creado esta función; un documento
+    compartido sigue abierto para las siguientes fases del procesamiento.
+
+    Args:
+        ruta: Ruta al archivo PDF (se usa solo si no se recibe documento)
+        documento: Documento ya abierto a reutilizar (opcional)
+
+    Yields:
+        DocumentoPDF listo para usar
+    """
+    if documento is not None:
+        yield documento
+        return
+
+    documento_propio = DocumentoPDF(ruta)
+    try:
+        yield documento_propio
+    finally:
+        documento_propio.cerrar()
@@ -0,0 +1,173 @@
+"""
+Estadísticas de los registros de facturas.
+
+- Reportes (ExcelExporter): resumen, estadísticas por proveedor y por campo
+  calculadas sobre los DataFrames con una agregación por columna/grupo, sin
+  recorrer los registros en Python ni filtrar el DataFrame una vez por proveedor.
+- Extracción (PDFExtractor): contadores que se actualizan según llega cada
+  registro, de modo que obtener el resumen no recorre todos los resultados.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+
+def _mascara_errores(df: pd.DataFrame) -> pd.Series:
+    """True en los registros con _Error."""
+    if '_Error' not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df['_Error'].notna()
+
+
+def _mascara_duplicados(df: pd.DataFrame) -> pd.Series:
+    """True en los registros marcados como _Duplicado."""
+    if '_Duplicado' not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df['_Duplicado'].fillna(False).astype(bool)
+
+
+def resumen_registros(df_completo: pd.DataFrame) -> Dict[str, int]:
+    """
+    Recuento de registros por estado.
+
+    Args:
+        df_completo: Todos los registros con sus metadatos (_Error, _Duplicado)
+
+    Returns:
+        Dict[str, int]: total, exitosas (sin error ni duplicado), duplicadas y con_errores
+    """
+    errores = _mascara_errores(df_completo)
+    duplicados = _mascara_duplicados(df_completo)
+    return {
+        'total': len(df_completo),
+        'exitosas': int((~errores & ~duplicados).sum()),
+        'duplicadas': int(duplicados.sum()),
+        'con_errores': int(errores.sum()),
+    }
+
+
+def estadisticas_proveedores(df_completo: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Facturas, exitosas y errores por proveedor en una sola agregación.
+
+    Args:
+        df_completo: Todos los registros con sus metadatos (_Proveedor_ID, _Proveedor_Nombre, _Error)
+
+    Returns:
+        List[Dict[str, Any]]: Una entrada por proveedor, de más a menos facturas
+    """
+    if '_Proveedor_ID' not in df_completo.columns:
+        return []
+
+    datos = pd.DataFrame({
+        'proveedor_id': df_completo['_Proveedor_ID'],
+        'nombre_proveedor': df_completo['_Proveedor_Nombre'] if '_Proveedor_Nombre' in df_completo.columns else 'N/A',
+        'exitosa': ~_mascara_errores(df_completo),
+    })
+    agregado = datos.groupby('proveedor_id', sort=False).agg(
+        nombre_proveedor=('nombre_proveedor', 'first'),
+        total=('exitosa', 'size'),
+        exitosas=('exitosa', 'sum'),
+    )
+    agregado['errores'] = agregado['total'] - agregado['exitosas']
+    agregado['porcentaje'] = (agregado['exitosas'] / agregado['total'] * 100).round(1)
+    agregado = agregado.sort_values('total', ascending=False, kind='stable')
+
+    return [
+        {
+            'proveedor_id': proveedor_id,
+            'nombre_proveedor': fila.nombre_proveedor,
+            'total': int(fila.total),
+            'exitosas': int(fila.exitosas),
+            'errores': int(fila.errores),
+            'porcentaje': f"{fila.porcentaje}%",
+        }
+        for proveedor_id, fila in zip(agregado.index, agregado.itertuples(index=False))
+    ]
+
+
+def estadisticas_campos(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Tasa de éxito de cada campo: valores presentes que no empiezan por 'ERROR'.
+
+    Args:
+        df: Registros exportables (solo columnas estándar)
+
+    Returns:
+        Dict[str, Dict[str, Any]]: campo -> total, exitosos y porcentaje, de mayor a menor porcentaje
+    """
+    total = len(df)
+    if not len(df.columns):
+        return {}
+
+    con_error = df.apply(lambda columna: columna.astype(str).str.startswith('ERROR'))
+    exitosos = (df.notna() & ~con_error).sum()
+    porcentajes = (exitosos / total * 100).round(1) if total else exitosos * 0
+    orden = porcentajes.sort_values(ascending=False, kind='stable').index
+
+    return {
+        campo: {'total': total, 'exitosos': int(exitosos[campo]), 'porcentaje': float(porcentajes[campo])}
+        for campo in orden
+    }
+
+
+class EstadisticasExtraccion:
+    """
+    Contadores de una ejecución del extractor, actualizados registro a registro.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.con_error = 0
+        self.duplicadas = 0
+        self.proveedores: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def desde_registros(cls, registros: Iterable[Dict[str, Any]]) -> "EstadisticasExtraccion":
+        """Estadísticas de una lista de registros ya completa."""
+        estadisticas = cls()
+        for registro in registros:
+            estadisticas.añadir(registro)
+        return estadisticas
+
+    def añadir(self, registro: Dict[str, Any]):
+        """
+        Cuenta un registro de factura.
+
+        Args:
+            registro: Registro con metadatos (_Proveedor_ID, _Error, _Duplicado)
+        """
+        con_error = '_Error' in registro
+        self.total += 1
+        self.con_error += con_error
+        self.duplicadas += bool(registro.get('_Duplicado', False))
+
+        proveedor = self.proveedores.setdefault(registro.get('_Proveedor_ID', 'DESCONOCIDO'),
+                                                {'total': 0, 'exitosos': 0, 'errores': 0})
+        proveedor['total'] += 1
+        proveedor['errores' if con_error else 'exitosos'] += 1
+
+    def como_diccionario(self, plantillas_disponibles: int) -> Dict[str, Any]:
+        """
+        Estadísticas en el formato de PDFExtractor.obtener_estadisticas.
+
+        Args:
+            plantillas_disponibles: Número de plantillas cargadas
+
+        Returns:
+            Dict[str, Any]: Totales, tasa de éxito y desglose por proveedor ({} sin registros)
+        """
+        if not self.total:
+            return {}
+
+        exitosas = self.total - self.con_error - self.duplicadas
+        return {
+            'total_facturas': self.total,
+            'facturas_exitosas': exitosas,
+            'facturas_duplicadas': self.duplicadas,
+            'facturas_con_error': self.con_error,
+            'tasa_exito': round((exitosas / self.total) * 100, 2),
+            'proveedores': {proveedor: dict(contadores) for proveedor, contadores in self.proveedores.items()},
+            'plantillas_disponibles': plantillas_disponibles,
+        }
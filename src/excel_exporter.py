@@ -4,16 +4,315 @@ Incluye funcionalidades de formateo, validación y generación de reportes.
 """
 
 import pandas as pd
+import csv
 import json
 import os
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Iterable, Tuple
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
+from src.almacen_trimestral import AlmacenTrimestral
+from src.estadisticas import estadisticas_campos, estadisticas_proveedores, resumen_registros
+from src.registro_factura import a_diccionario
+
+
+def _registrar_estilos(wb: Workbook):
+    """
+    Registra en el libro los estilos con nombre del Excel formateado.
+
+    Cada celda referencia un estilo compartido en lugar de llevar sus propios
+    objetos Font/Border/PatternFill.
+    """
+    borde = Border(left=Side(style='thin'), right=Side(style='thin'),
+                   top=Side(style='thin'), bottom=Side(style='thin'))
+    estilos = [
+        NamedStyle(name="titulo", font=Font(size=16, bold=True), alignment=Alignment(horizontal='center')),
+        NamedStyle(name="titulo_izquierda", font=Font(size=16, bold=True)),
+        NamedStyle(name="subtitulo", font=Font(size=14, bold=True)),
+        NamedStyle(name="seccion", font=Font(size=12, bold=True)),
+        NamedStyle(name="etiqueta", font=Font(bold=True)),
+        NamedStyle(name="encabezado", font=Font(bold=True, color="FFFFFF"),
+                   fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+                   alignment=Alignment(horizontal='center'), border=borde),
+        NamedStyle(name="celda", border=borde),
+        NamedStyle(name="celda_error", border=borde,
+                   fill=PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")),
+    ]
+    for estilo in estilos:
+        wb.add_named_style(estilo)
+
+
+def _celda(ws, valor: Any, estilo: Optional[str]) -> Any:
+    """Celda para una hoja write_only con un estilo con nombre (o el valor tal cual si no lleva estilo)."""
+    if estilo is None:
+        return valor
+    celda = WriteOnlyCell(ws, value=valor)
+    celda.style = estilo
+    return celda
+
+
+def _anchos_columnas(filas: List[List[Tuple[Any, Optional[str]]]], num_columnas: int,
+                     minimo: int = 10, maximo: int = 50) -> List[int]:
+    """
+    Ancho de cada columna según el texto más largo que contiene.
+
+    Args:
+        filas: Filas de la hoja como listas de (valor, estilo)
+        num_columnas: Columnas a calcular (desde la A)
+        minimo: Ancho mínimo
+        maximo: Ancho máximo
+
+    Returns:
+        List[int]: Anchos de las columnas 1..num_columnas
+    """
+    longitudes = [minimo] * num_columnas
+    for fila in filas:
+        for col_idx, (valor, _) in enumerate(fila[:num_columnas]):
+            if valor:
+                longitudes[col_idx] = max(longitudes[col_idx], len(str(valor)))
+    return [min(longitud + 2, maximo) for longitud in longitudes]
+
+
+def _a_decimal(valor: Any) -> Optional[Decimal]:
+    """Importe como Decimal con 2 decimales, o None si está vacío o no es numérico (p.ej. 'ERROR...')."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return None
+    texto = str(valor).strip()
+    if not texto:
+        return None
+    try:
+        importe = Decimal(texto)
+    except InvalidOperation:
+        return None
+    if not importe.is_finite():
+        return None
+    return importe.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _escribir_excel_basico(df: pd.DataFrame, ruta_completa: str) -> str:
+    """Escribe el Excel básico (una hoja con las columnas estándar)."""
+    with pd.ExcelWriter(ruta_completa, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Facturas', index=False)
+
+    print(f"OK Excel basico exportado: {ruta_completa}")
+    return ruta_completa
+
+
+def _escribir_excel_completo(df_completo: pd.DataFrame, ruta_completa: str) -> str:
+    """Escribe el Excel de debug con todos los registros y sus metadatos."""
+    with pd.ExcelWriter(ruta_completa, engine='openpyxl') as writer:
+        df_completo.to_excel(writer, sheet_name='Datos_Completos', index=False)
+
+    print(f"OK Excel completo (debug) exportado: {ruta_completa}")
+    return ruta_completa
+
+
+def _escribir_excel_errores(errores: List[Dict[str, Any]], ruta_completa: str) -> str:
+    """Escribe el Excel con el log de errores de extracción."""
+    # Crear DataFrame con los errores
+    df_errores = pd.DataFrame(errores)
+
+    # Crear workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Errores"
+
+    # Título
+    ws['A1'] = "LOG DE ERRORES DE EXTRACCIÓN"
+    ws['A1'].font = Font(size=16, bold=True, color="FF0000")
+    ws['A1'].alignment = Alignment(horizontal='center')
+    ws.merge_cells('A1:E1')
+
+    # Información general
+    ws['A3'] = "Total de errores:"
+    ws['A3'].font = Font(bold=True)
+    ws['B3'] = len(errores)
+
+    ws['A4'] = "Fecha de generación:"
+    ws['A4'].font = Font(bold=True)
+    ws['B4'] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+    # Agregar datos del DataFrame
+    row_start = 6
+    for row_idx, row in enumerate(dataframe_to_rows(df_errores, index=False, header=True), start=row_start):
+        ws.append(row)
+
+    # Formatear encabezados
+    for cell in ws[row_start]:
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+
+    # Formatear datos
+    for row in ws.iter_rows(min_row=row_start+1):
+        for cell in row:
+            cell.border = Border(
+                left=Side(style='thin'),
+                right=Side(style='thin'),
+                top=Side(style='thin'),
+                bottom=Side(style='thin')
+            )
+            # Resaltar errores en rojo claro
+            cell.fill = PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid")
+
+    # Autoajustar columnas
+    from openpyxl.utils import get_column_letter
+    for col_idx in range(1, ws.max_column + 1):
+        max_length = 10  # Ancho mínimo
+        for row_idx in range(1, ws.max_row + 1):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            if hasattr(cell, 'value') and cell.value:
+                max_length = max(max_length, len(str(cell.value)))
+        column_letter = get_column_letter(col_idx)
+        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
+
+    # Guardar workbook
+    wb.save(ruta_completa)
+    print(f"OK Excel de errores (debug) exportado: {ruta_completa}")
+    return ruta_completa
+
+
+def _escribir_excel_formateado(df: pd.DataFrame, df_completo: pd.DataFrame, ruta_completa: str) -> str:
+    """
+    Escribe el Excel formateado: hojas Resumen, Facturas_Exitosas y Estadísticas.
+
+    El libro se escribe en modo streaming (write_only): cada fila se vuelca
+    al archivo según se añade, los formatos son estilos con nombre compartidos
+    por todas las celdas y los anchos de columna se calculan antes a partir
+    de los datos. La memoria no crece con el número de filas del libro.
+    """
+    # Crear workbook en modo streaming; las hojas se escriben en orden
+    wb = Workbook(write_only=True)
+    _registrar_estilos(wb)
+
+    _crear_hoja_resumen(wb, df, df_completo)
+    _crear_hoja_datos(wb, df, "Facturas_Exitosas")
+    _crear_hoja_estadisticas(wb, df, df_completo)
+
+    # Guardar workbook
+    wb.save(ruta_completa)
+    print(f"OK Excel formateado exportado: {ruta_completa}")
+    return ruta_completa
+
+
+def _crear_hoja_resumen(wb: Workbook, df: pd.DataFrame, df_completo: pd.DataFrame):
+    """Crea la hoja de resumen con información general."""
+    ws = wb.create_sheet(title="Resumen")
+
+    # Facturas exitosas, con errores y duplicadas desde datos originales
+    resumen = resumen_registros(df_completo)
+
+    info_general = [
+        ("Fecha de procesamiento:", datetime.now().strftime("%d/%m/%Y %H:%M:%S")),
+        ("Total de facturas procesadas:", resumen['total']),
+        ("Facturas únicas exportadas:", len(df)),
+        ("Facturas exitosas:", resumen['exitosas']),
+        ("Facturas duplicadas (excluidas):", resumen['duplicadas']),
+        ("Facturas con errores:", resumen['con_errores']),
+    ]
+
+    # Filas de la hoja como (valor, estilo); la hoja es pequeña y se monta antes para calcular anchos
+    filas = [[("RESUMEN DE EXTRACCIÓN DE FACTURAS", "titulo")], []]
+    for etiqueta, valor in info_general:
+        filas.append([(etiqueta, "etiqueta"), (valor, None)])
+
+    # Estadísticas por proveedor
+    filas += [[], [], [("ESTADÍSTICAS POR PROVEEDOR", "subtitulo")]]
+    cabeceras = ["Proveedor ID", "Nombre Proveedor", "Facturas", "Exitosas", "Errores", "% Éxito"]
+    filas.append([(cabecera, "etiqueta") for cabecera in cabeceras])
+    for stats in estadisticas_proveedores(df_completo):
+        filas.append([(valor, None) for valor in stats.values()])
+
+    # Autoajustar columnas A hasta E (antes de escribir filas, requisito del modo streaming)
+    for col_idx, ancho in enumerate(_anchos_columnas(filas, 5, maximo=50), 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = ancho
+
+    ws.merged_cells.add('A1:E1')
+    for fila in filas:
+        ws.append([_celda(ws, valor, estilo) for valor, estilo in fila])
+
+
+def _crear_hoja_datos(wb: Workbook, df: pd.DataFrame, nombre_hoja: str):
+    """Crea una hoja con datos de facturas."""
+    if df.empty:
+        return
+
+    ws = wb.create_sheet(title=nombre_hoja)
+
+    # Autoajustar columnas con las longitudes de los datos, calculadas por columna
+    for col_idx, columna in enumerate(df.columns, 1):
+        valores = df[columna].dropna()
+        valores = valores[valores.astype(bool)]
+        max_length = max(10, len(str(columna)),
+                         int(valores.astype(str).str.len().max()) if len(valores) else 0)
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, 30)
+
+    # Encabezados
+    ws.append([_celda(ws, columna, "encabezado") for columna in df.columns])
+
+    # Datos (NaN -> celda vacía); los errores se resaltan en rojo
+    for fila in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        ws.append([
+            _celda(ws, valor, "celda_error" if isinstance(valor, str) and valor.startswith("ERROR") else "celda")
+            for valor in fila
+        ])
+
+
+def _crear_hoja_estadisticas(wb: Workbook, df: pd.DataFrame, df_completo: pd.DataFrame):
+    """Crea una hoja con estadísticas detalladas."""
+    ws = wb.create_sheet(title="Estadísticas")
+
+    # Título
+    ws.append([_celda(ws, "ESTADÍSTICAS DETALLADAS", "titulo_izquierda")])
+    ws.append([])
+    ws.append([])
+
+    # Campos más extraídos exitosamente
+    ws.append([_celda(ws, "Campos con mayor tasa de éxito:", "seccion")])
+
+    campos_stats = estadisticas_campos(df)
+    for campo, stats in campos_stats.items():
+        ws.append([campo, f"{stats['exitosos']}/{stats['total']} ({stats['porcentaje']}%)"])
+
+    ws.append([])
+    ws.append([])
+
+    # Archivos con errores - usar datos originales
+    if '_Error' in df_completo.columns:
+        df_errores = df_completo.loc[df_completo['_Error'].notna()]
+        if not df_errores.empty:
+            ws.append([_celda(ws, "Archivos con errores:", "seccion")])
+
+            archivos = df_errores['_Archivo'] if '_Archivo' in df_errores.columns else ['N/A'] * len(df_errores)
+            for archivo, error in zip(archivos, df_errores['_Error']):
+                ws.append([archivo, error])
 
 
 class ExcelExporter:
+    # Exportaciones que generan un libro openpyxl: ocupan la CPU sin soltar el GIL,
+    # así que en exportar_formatos se escriben en procesos aparte
+    EXPORTACIONES_LIBRO = frozenset({"exportar_excel_basico", "exportar_excel_formateado",
+                                     "exportar_excel_completo", "exportar_excel_errores"})
+
+    # Columnas estándar con tipo propio en Parquet (el resto se exportan como texto)
+    COLUMNAS_FECHA = ('FechaFactura', 'FechaVto', 'FechaPago')
+    COLUMNAS_IMPORTE = ('Base', 'ComPaypal')
+    # Partición del dataset Parquet: una carpeta por año y trimestre
+    COLUMNAS_PARTICION = ('Año', 'Trimestre')
+
     def __init__(self, datos: List[Dict[str, Any]], errores: List[Dict[str, Any]] = None,
                  directorio_salida: str = None, trimestre: str = "", año: str = ""):
         """
@@ -24,13 +323,18 @@ class ExcelExporter:
         - Nombres de archivo: FACTURAS_{AÑO}_{TRIMESTRE}.xlsx
 
         Args:
-            datos (List[Dict[str, Any]]): Lista de datos extraídos de facturas
+            datos (List[Dict[str, Any]]): Datos extraídos de facturas (diccionarios o RegistroFactura;
+                                          un iterador solo si se va a llamar a acumular_en_almacen)
             errores (List[Dict[str, Any]]): Lista de errores de extracción
             directorio_salida (str, optional): Directorio personalizado. Si None, usa estructura nueva.
             trimestre (str): Trimestre procesado (1T, 2T, 3T, 4T) - para organización
             año (str): Año procesado - para organización
         """
-        self.datos = datos
+        # Los RegistroFactura del extractor pasan aquí al diccionario de exportación
+        if isinstance(datos, list):
+            self.datos = [a_diccionario(registro) for registro in datos]
+        else:
+            self.datos = map(a_diccionario, datos)
         self.errores = errores or []
         self.trimestre = trimestre
         self.año = año
@@ -47,9 +351,74 @@ class ExcelExporter:
         else:
             self.directorio_salida = directorio_salida
 
+        # Raíz del dataset Parquet, común a todos los trimestres
+        if directorio_salida is None:
+            self.directorio_parquet = os.path.join("documentos", "reportes", "parquet")
+        else:
+            self.directorio_parquet = os.path.join(directorio_salida, "parquet")
+
         # Crear directorio de salida si no existe
         os.makedirs(self.directorio_salida, exist_ok=True)
 
+        # Vistas de self.datos compartidas por todos los formatos (se calculan al primer uso)
+        self._datos_estandar: Optional[List[Dict[str, Any]]] = None
+        self._df_estandar: Optional[pd.DataFrame] = None
+        self._df_completo: Optional[pd.DataFrame] = None
+
+        # Formatos que fallaron en la última llamada a exportar_formatos: clave -> mensaje
+        self.fallos_exportacion: Dict[str, str] = {}
+
+    def acumular_en_almacen(self, almacen: Optional[AlmacenTrimestral] = None) -> AlmacenTrimestral:
+        """
+        Añade los datos y errores de esta ejecución al almacén del trimestre y pasa
+        a exportar el trimestre completo.
+
+        Después de llamarlo, self.datos y self.errores son todos los registros
+        acumulados del trimestre, de modo que cualquier exportación posterior
+        incluye también las facturas de ejecuciones anteriores.
+
+        Args:
+            almacen (AlmacenTrimestral, optional): Almacén a usar. Si None, el
+                REGISTROS_{AÑO}_{TRIMESTRE}.db del directorio de salida.
+
+        Returns:
+            AlmacenTrimestral: Almacén utilizado
+        """
+        if almacen is None:
+            if not (self.trimestre and self.año):
+                raise ValueError("Se necesitan trimestre y año para acumular en el almacén")
+            almacen = AlmacenTrimestral(os.path.join(self.directorio_salida,
+                                                     AlmacenTrimestral.nombre_archivo(self.año, self.trimestre)))
+
+        nuevos = almacen.añadir(self.datos, self.errores)
+        self.datos = almacen.registros()
+        self.errores = almacen.errores()
+        self._datos_estandar = self._df_estandar = self._df_completo = None
+        print(f"OK Almacén del trimestre: {nuevos} registro(s) de esta ejecución, {len(self.datos)} en total")
+        return almacen
+
+    @property
+    def datos_estandar(self) -> List[Dict[str, Any]]:
+        """Registros exportables: solo columnas estándar, sin duplicados ni errores (se filtra una vez)."""
+        if self._datos_estandar is None:
+            self._datos_estandar = self._filtrar_columnas_estandar(self.datos, excluir_duplicados=True,
+                                                                   excluir_errores=True)
+        return self._datos_estandar
+
+    @property
+    def df_estandar(self) -> pd.DataFrame:
+        """DataFrame de datos_estandar, común a Excel, CSV y estadísticas."""
+        if self._df_estandar is None:
+            self._df_estandar = pd.DataFrame(self.datos_estandar)
+        return self._df_estandar
+
+    @property
+    def df_completo(self) -> pd.DataFrame:
+        """DataFrame de todos los registros con sus metadatos (_Error, _Duplicado, _Proveedor_ID...)."""
+        if self._df_completo is None:
+            self._df_completo = pd.DataFrame(self.datos)
+        return self._df_completo
+
     def _filtrar_columnas_estandar(self, datos: List[Dict[str, Any]], excluir_duplicados: bool = True, excluir_errores: bool = True) -> List[Dict[str, Any]]:
         """
         Filtra solo las columnas estándar (excluye las que empiezan con _).
@@ -65,49 +434,102 @@ class ExcelExporter:
         """
         datos_filtrados = []
         for registro in datos:
-            # Excluir duplicados si está activado
-            if excluir_duplicados and registro.get('_Duplicado', False):
-                continue
+            registro_filtrado = self._filtrar_registro(registro, excluir_duplicados, excluir_errores)
+            if registro_filtrado is not None:
+                datos_filtrados.append(registro_filtrado)
+        return datos_filtrados
 
-            # Excluir registros con errores si está activado
-            if excluir_errores and '_Error' in registro:
-                continue
+    @staticmethod
+    def _filtrar_registro(registro: Dict[str, Any], excluir_duplicados: bool = True,
+                          excluir_errores: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Filtra un único registro (ver _filtrar_columnas_estandar).
 
-            registro_filtrado = {k: v for k, v in registro.items() if not k.startswith('_')}
-            datos_filtrados.append(registro_filtrado)
-        return datos_filtrados
+        Returns:
+            Optional[Dict[str, Any]]: Registro con solo columnas estándar, o None si se excluye
+        """
+        # Excluir duplicados si está activado
+        if excluir_duplicados and registro.get('_Duplicado', False):
+            return None
 
-    def exportar_excel_basico(self, nombre_archivo: Optional[str] = None) -> str:
+        # Excluir registros con errores si está activado
+        if excluir_errores and '_Error' in registro:
+            return None
+
+        return {k: v for k, v in registro.items() if not k.startswith('_')}
+
+    def _preparar_libro(self, metodo: str,
+                        nombre_archivo: Optional[str]) -> Optional[Tuple[Callable[..., str], Tuple[Any, ...]]]:
         """
-        Exporta los datos a un archivo Excel básico usando pandas.
+        Comprueba los datos de un libro de Excel y resuelve su ruta.
+
+        Separa lo que necesita el libro (DataFrames o registros y la ruta) del
+        exportador: exportar_formatos envía solo eso a los procesos.
 
         Args:
+            metodo (str): Método exportar_excel_* (ver EXPORTACIONES_LIBRO)
             nombre_archivo (str, optional): Nombre del archivo. Si None, se genera automáticamente.
 
         Returns:
-            str: Ruta del archivo generado
+            Optional[Tuple]: (función que escribe el libro, sus argumentos), o None si
+                no hay nada que exportar (libro de errores sin errores)
+
+        Raises:
+            ValueError: Si el libro necesita facturas y no hay datos
         """
-        if not self.datos:
+        if metodo == "exportar_excel_errores":
+            if not self.errores:
+                print("No hay errores para exportar")
+                return None
+        elif not self.datos:
             raise ValueError("No hay datos para exportar")
 
         if nombre_archivo is None:
-            nombre_archivo = f"facturas_extraidas_{self.timestamp}.xlsx"
+            con_trimestre = bool(self.trimestre and self.año)
+            if metodo == "exportar_excel_basico":
+                nombre_archivo = f"facturas_extraidas_{self.timestamp}.xlsx"
+            elif metodo == "exportar_excel_completo":
+                nombre_archivo = (f"FACTURAS_DEBUG_{self.año}_{self.trimestre}.xlsx" if con_trimestre
+                                  else f"facturas_completo_debug_{self.timestamp}.xlsx")
+            elif metodo == "exportar_excel_errores":
+                nombre_archivo = (f"ERRORES_{self.año}_{self.trimestre}.xlsx" if con_trimestre
+                                  else f"errores_extraccion_{self.timestamp}.xlsx")
+            else:
+                nombre_archivo = (f"FACTURAS_{self.año}_{self.trimestre}.xlsx" if con_trimestre
+                                  else f"facturas_formateadas_{self.timestamp}.xlsx")
 
         ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
 
-        # Filtrar solo columnas estándar (sin metadatos que empiezan con _)
-        # Y excluir duplicados y errores
-        datos_estandar = self._filtrar_columnas_estandar(self.datos, excluir_duplicados=True, excluir_errores=True)
+        if metodo == "exportar_excel_basico":
+            # Solo columnas estándar (sin metadatos que empiezan con _), sin duplicados ni errores
+            return _escribir_excel_basico, (self.df_estandar, ruta_completa)
+        if metodo == "exportar_excel_completo":
+            # DataFrame con TODOS los datos (sin filtrar)
+            return _escribir_excel_completo, (self.df_completo, ruta_completa)
+        if metodo == "exportar_excel_errores":
+            return _escribir_excel_errores, (self.errores, ruta_completa)
+        # Formateado: registros exitosos sin duplicados; el resumen usa todos los registros
+        return _escribir_excel_formateado, (self.df_estandar, self.df_completo, ruta_completa)
+
+    def _exportar_libro(self, metodo: str, nombre_archivo: Optional[str]) -> Optional[str]:
+        """Prepara y escribe un libro de Excel en este proceso (ver _preparar_libro)."""
+        libro = self._preparar_libro(metodo, nombre_archivo)
+        if libro is None:
+            return None
+        escritor, argumentos = libro
+        return escritor(*argumentos)
 
-        # Crear DataFrame
-        df = pd.DataFrame(datos_estandar)
+    def exportar_excel_basico(self, nombre_archivo: Optional[str] = None) -> str:
+        """
+        Exporta los datos a un archivo Excel básico usando pandas.
 
-        # Exportar a Excel
-        with pd.ExcelWriter(ruta_completa, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Facturas', index=False)
+        Args:
+            nombre_archivo (str, optional): Nombre del archivo. Si None, se genera automáticamente.
 
-        print(f"OK Excel basico exportado: {ruta_completa}")
-        return ruta_completa
+        Returns:
+            str: Ruta del archivo generado
+        """
+        return self._exportar_libro("exportar_excel_basico", nombre_archivo)
 
     def exportar_excel_completo(self, nombre_archivo: Optional[str] = None) -> str:
         """
@@ -121,26 +543,7 @@ class ExcelExporter:
         Returns:
             str: Ruta del archivo generado
         """
-        if not self.datos:
-            raise ValueError("No hay datos para exportar")
-
-        if nombre_archivo is None:
-            if self.trimestre and self.año:
-                nombre_archivo = f"FACTURAS_DEBUG_{self.año}_{self.trimestre}.xlsx"
-            else:
-                nombre_archivo = f"facturas_completo_debug_{self.timestamp}.xlsx"
-
-        ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
-
-        # Crear DataFrame con TODOS los datos (sin filtrar)
-        df = pd.DataFrame(self.datos)
-
-        # Exportar a Excel
-        with pd.ExcelWriter(ruta_completa, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Datos_Completos', index=False)
-
-        print(f"OK Excel completo (debug) exportado: {ruta_completa}")
-        return ruta_completa
+        return self._exportar_libro("exportar_excel_completo", nombre_archivo)
 
     def exportar_excel_errores(self, nombre_archivo: Optional[str] = None) -> Optional[str]:
         """
@@ -154,85 +557,7 @@ class ExcelExporter:
         Returns:
             Optional[str]: Ruta del archivo generado o None si no hay errores
         """
-        if not self.errores:
-            print("No hay errores para exportar")
-            return None
-
-        if nombre_archivo is None:
-            if self.trimestre and self.año:
-                nombre_archivo = f"ERRORES_{self.año}_{self.trimestre}.xlsx"
-            else:
-                nombre_archivo = f"errores_extraccion_{self.timestamp}.xlsx"
-
-        ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
-
-        # Crear DataFrame con los errores
-        df_errores = pd.DataFrame(self.errores)
-
-        # Crear workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Errores"
-
-        # Título
-        ws['A1'] = "LOG DE ERRORES DE EXTRACCIÓN"
-        ws['A1'].font = Font(size=16, bold=True, color="FF0000")
-        ws['A1'].alignment = Alignment(horizontal='center')
-        ws.merge_cells('A1:E1')
-
-        # Información general
-        ws['A3'] = "Total de errores:"
-        ws['A3'].font = Font(bold=True)
-        ws['B3'] = len(self.errores)
-
-        ws['A4'] = "Fecha de generación:"
-        ws['A4'].font = Font(bold=True)
-        ws['B4'] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # Agregar datos del DataFrame
-        row_start = 6
-        for row_idx, row in enumerate(dataframe_to_rows(df_errores, index=False, header=True), start=row_start):
-            ws.append(row)
-
-        # Formatear encabezados
-        for cell in ws[row_start]:
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-        # Formatear datos
-        for row in ws.iter_rows(min_row=row_start+1):
-            for cell in row:
-                cell.border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-                # Resaltar errores en rojo claro
-                cell.fill = PatternFill(start_color="FFE6E6", end_color="FFE6E6", fill_type="solid")
-
-        # Autoajustar columnas
-        from openpyxl.utils import get_column_letter
-        for col_idx in range(1, ws.max_column + 1):
-            max_length = 10  # Ancho mínimo
-            for row_idx in range(1, ws.max_row + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if hasattr(cell, 'value') and cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            column_letter = get_column_letter(col_idx)
-            ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-
-        # Guardar workbook
-        wb.save(ruta_completa)
-        print(f"OK Excel de errores (debug) exportado: {ruta_completa}")
-        return ruta_completa
+        return self._exportar_libro("exportar_excel_errores", nombre_archivo)
 
     def exportar_excel_formateado(self, nombre_archivo: Optional[str] = None) -> str:
         """
@@ -240,268 +565,16 @@ class ExcelExporter:
 
         Nueva nomenclatura: FACTURAS_{AÑO}_{TRIMESTRE}.xlsx
 
+        Los errores no se exportan en el Excel formateado; el libro se escribe en
+        modo streaming (ver _escribir_excel_formateado).
+
         Args:
             nombre_archivo (str, optional): Nombre del archivo. Si None, se genera automáticamente.
 
         Returns:
             str: Ruta del archivo generado
         """
-        if not self.datos:
-            raise ValueError("No hay datos para exportar")
-
-        if nombre_archivo is None:
-            if self.trimestre and self.año:
-                nombre_archivo = f"FACTURAS_{self.año}_{self.trimestre}.xlsx"
-            else:
-                nombre_archivo = f"facturas_formateadas_{self.timestamp}.xlsx"
-
-        ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
-
-        # Filtrar solo columnas estándar (sin metadatos que empiezan con _)
-        # Y excluir duplicados y errores
-        datos_estandar = self._filtrar_columnas_estandar(self.datos, excluir_duplicados=True, excluir_errores=True)
-
-        # Crear DataFrame - este ya contiene solo registros exitosos sin duplicados
-        df = pd.DataFrame(datos_estandar)
-
-        # df ya está filtrado, representa solo facturas exitosas
-        df_exitosos = df.copy()
-        df_errores = pd.DataFrame()  # No exportamos errores en el Excel formateado
-
-        # Crear workbook
-        wb = Workbook()
-
-        # Crear hojas
-        self._crear_hoja_resumen(wb, df)
-        self._crear_hoja_datos(wb, df_exitosos, "Facturas_Exitosas")
-
-        if not df_errores.empty:
-            self._crear_hoja_datos(wb, df_errores, "Facturas_Con_Errores")
-
-        self._crear_hoja_estadisticas(wb, df)
-
-        # Remover hoja por defecto
-        if "Sheet" in wb.sheetnames:
-            wb.remove(wb["Sheet"])
-
-        # Guardar workbook
-        wb.save(ruta_completa)
-        print(f"OK Excel formateado exportado: {ruta_completa}")
-        return ruta_completa
-
-    def _crear_hoja_resumen(self, wb: Workbook, df: pd.DataFrame):
-        """Crea la hoja de resumen con información general."""
-        ws = wb.active
-        ws.title = "Resumen"
-
-        # Título
-        ws['A1'] = "RESUMEN DE EXTRACCIÓN DE FACTURAS"
-        ws['A1'].font = Font(size=16, bold=True)
-        ws['A1'].alignment = Alignment(horizontal='center')
-        ws.merge_cells('A1:E1')
-
-        # Información general
-        row = 3
-        # Calcular facturas exitosas, con errores y duplicadas desde datos originales
-        df_original = pd.DataFrame(self.datos)
-
-        facturas_duplicadas = len(df_original[df_original.get('_Duplicado', pd.Series([False] * len(df_original))) == True]) if '_Duplicado' in df_original.columns else 0
-
-        if '_Error' in df_original.columns:
-            facturas_exitosas = len(df_original[(df_original['_Error'].isna()) & (df_original.get('_Duplicado', False) == False)])
-            facturas_con_errores = len(df_original[df_original['_Error'].notna()])
-        else:
-            facturas_exitosas = len(df)
-            facturas_con_errores = 0
-
-        info_general = [
-            ("Fecha de procesamiento:", datetime.now().strftime("%d/%m/%Y %H:%M:%S")),
-            ("Total de facturas procesadas:", len(df_original)),
-            ("Facturas únicas exportadas:", len(df)),
-            ("Facturas exitosas:", facturas_exitosas),
-            ("Facturas duplicadas (excluidas):", facturas_duplicadas),
-            ("Facturas con errores:", facturas_con_errores),
-        ]
-
-        for etiqueta, valor in info_general:
-            ws[f'A{row}'] = etiqueta
-            ws[f'A{row}'].font = Font(bold=True)
-            ws[f'B{row}'] = valor
-            row += 1
-
-        # Estadísticas por proveedor
-        row += 2
-        ws[f'A{row}'] = "ESTADÍSTICAS POR PROVEEDOR"
-        ws[f'A{row}'].font = Font(size=14, bold=True)
-        row += 1
-
-        # Cabeceras
-        cabeceras = ["Proveedor ID", "Nombre Proveedor", "Facturas", "Exitosas", "Errores", "% Éxito"]
-        for col, cabecera in enumerate(cabeceras, 1):
-            ws.cell(row=row, column=col, value=cabecera).font = Font(bold=True)
-
-        # Datos por proveedor
-        proveedores_stats = self._calcular_estadisticas_proveedores(df)
-        for stats in proveedores_stats:
-            row += 1
-            for col, valor in enumerate(stats.values(), 1):
-                ws.cell(row=row, column=col, value=valor)
-
-        # Autoajustar columnas
-        from openpyxl.utils import get_column_letter
-        for col_idx in range(1, 6):  # A hasta E
-            max_length = 10  # Ancho mínimo
-            for row_idx in range(1, ws.max_row + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if hasattr(cell, 'value') and cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            column_letter = get_column_letter(col_idx)
-            ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-
-    def _crear_hoja_datos(self, wb: Workbook, df: pd.DataFrame, nombre_hoja: str):
-        """Crea una hoja con datos de facturas."""
-        if df.empty:
-            return
-
-        ws = wb.create_sheet(title=nombre_hoja)
-
-        # Agregar datos del DataFrame
-        for row in dataframe_to_rows(df, index=False, header=True):
-            ws.append(row)
-
-        # Formatear encabezados
-        for cell in ws[1]:
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-
-        # Formatear datos
-        for row in ws.iter_rows(min_row=2):
-            for cell in row:
-                cell.border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-
-                # Resaltar errores en rojo
-                if cell.value and str(cell.value).startswith("ERROR"):
-                    cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-
-        # Autoajustar columnas
-        from openpyxl.utils import get_column_letter
-        for col_idx in range(1, ws.max_column + 1):
-            max_length = 10  # Ancho mínimo
-            for row_idx in range(1, ws.max_row + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if hasattr(cell, 'value') and cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            column_letter = get_column_letter(col_idx)
-            ws.column_dimensions[column_letter].width = min(max_length + 2, 30)
-
-    def _crear_hoja_estadisticas(self, wb: Workbook, df: pd.DataFrame):
-        """Crea una hoja con estadísticas detalladas."""
-        ws = wb.create_sheet(title="Estadísticas")
-
-        row = 1
-
-        # Título
-        ws[f'A{row}'] = "ESTADÍSTICAS DETALLADAS"
-        ws[f'A{row}'].font = Font(size=16, bold=True)
-        row += 3
-
-        # Campos más extraídos exitosamente
-        ws[f'A{row}'] = "Campos con mayor tasa de éxito:"
-        ws[f'A{row}'].font = Font(size=12, bold=True)
-        row += 1
-
-        campos_stats = self._calcular_estadisticas_campos(df)
-        for campo, stats in campos_stats.items():
-            ws[f'A{row}'] = campo
-            ws[f'B{row}'] = f"{stats['exitosos']}/{stats['total']} ({stats['porcentaje']}%)"
-            row += 1
-
-        row += 2
-
-        # Archivos con errores - usar datos originales
-        df_original = pd.DataFrame(self.datos)
-        if '_Error' in df_original.columns:
-            df_errores = df_original[df_original['_Error'].notna()]
-        else:
-            df_errores = pd.DataFrame()
-
-        if not df_errores.empty:
-            ws[f'A{row}'] = "Archivos con errores:"
-            ws[f'A{row}'].font = Font(size=12, bold=True)
-            row += 1
-
-            for _, factura in df_errores.iterrows():
-                ws[f'A{row}'] = factura.get('_Archivo', 'N/A')
-                ws[f'B{row}'] = factura.get('_Error', 'Error desconocido')
-                row += 1
-
-    def _calcular_estadisticas_proveedores(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """Calcula estadísticas por proveedor."""
-        stats = []
-        # Usar datos originales para obtener metadatos
-        df_original = pd.DataFrame(self.datos)
-        if '_Proveedor_ID' not in df_original.columns:
-            return stats
-
-        proveedores = df_original['_Proveedor_ID'].value_counts()
-
-        for proveedor_id, total in proveedores.items():
-            df_proveedor = df_original[df_original['_Proveedor_ID'] == proveedor_id]
-
-            # Contar exitosas: las que no tienen columna '_Error' o la tienen pero es NaN
-            if '_Error' in df_proveedor.columns:
-                exitosas = len(df_proveedor[df_proveedor['_Error'].isna()])
-            else:
-                exitosas = total
-
-            errores = total - exitosas
-            porcentaje = round((exitosas / total) * 100, 1) if total > 0 else 0
-
-            nombre_proveedor = df_proveedor['_Proveedor_Nombre'].iloc[0] if '_Proveedor_Nombre' in df_proveedor.columns else 'N/A'
-
-            stats.append({
-                'proveedor_id': proveedor_id,
-                'nombre_proveedor': nombre_proveedor,
-                'total': total,
-                'exitosas': exitosas,
-                'errores': errores,
-                'porcentaje': f"{porcentaje}%"
-            })
-
-        return sorted(stats, key=lambda x: x['total'], reverse=True)
-
-    def _calcular_estadisticas_campos(self, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-        """Calcula estadísticas de éxito por campo."""
-        stats = {}
-
-        # df ya está filtrado (solo columnas estándar), no necesitamos excluir nada
-        campos = [col for col in df.columns]
-
-        for campo in campos:
-            if campo in df.columns:
-                total = len(df)
-                exitosos = len(df[(df[campo].notna()) & (~df[campo].astype(str).str.startswith('ERROR'))])
-                porcentaje = round((exitosos / total) * 100, 1) if total > 0 else 0
-
-                stats[campo] = {
-                    'total': total,
-                    'exitosos': exitosos,
-                    'porcentaje': porcentaje
-                }
-
-        return dict(sorted(stats.items(), key=lambda x: x[1]['porcentaje'], reverse=True))
+        return self._exportar_libro("exportar_excel_formateado", nombre_archivo)
 
     def exportar_csv(self, nombre_archivo: Optional[str] = None) -> str:
         """
@@ -521,13 +594,8 @@ class ExcelExporter:
 
         ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
 
-        # Filtrar solo columnas estándar (sin metadatos que empiezan con _)
-        # Y excluir duplicados y errores
-        datos_estandar = self._filtrar_columnas_estandar(self.datos, excluir_duplicados=True, excluir_errores=True)
-
-        # Crear DataFrame y exportar
-        df = pd.DataFrame(datos_estandar)
-        df.to_csv(ruta_completa, index=False, encoding='utf-8-sig', sep=';')
+        # Solo columnas estándar (sin metadatos que empiezan con _), sin duplicados ni errores
+        self.df_estandar.to_csv(ruta_completa, index=False, encoding='utf-8-sig', sep=';')
 
         print(f"OK CSV exportado: {ruta_completa}")
         return ruta_completa
@@ -550,9 +618,8 @@ class ExcelExporter:
 
         ruta_completa = os.path.join(self.directorio_salida, nombre_archivo)
 
-        # Filtrar solo columnas estándar (sin metadatos que empiezan con _)
-        # Y excluir duplicados y errores
-        datos_estandar = self._filtrar_columnas_estandar(self.datos, excluir_duplicados=True, excluir_errores=True)
+        # Solo columnas estándar (sin metadatos que empiezan con _), sin duplicados ni errores
+        datos_estandar = self.datos_estandar
 
         # Agregar metadatos
         exportacion = {
@@ -570,50 +637,305 @@ class ExcelExporter:
         print(f"OK JSON exportado: {ruta_completa}")
         return ruta_completa
 
-    def exportar_todo(self, prefijo: Optional[str] = None) -> Dict[str, str]:
+    def df_tipado(self) -> pd.DataFrame:
+        """
+        Copia de df_estandar con tipos: fechas (DD/MM/YYYY) como datetime, importes
+        como Decimal con 2 decimales y Año como entero. Los valores que no se
+        pueden convertir (vacíos, 'ERROR...') quedan nulos.
+
+        Returns:
+            pd.DataFrame: Datos exportables con columnas tipadas
+        """
+        df = self.df_estandar.copy()
+        for columna in df.columns:
+            if columna in self.COLUMNAS_FECHA:
+                df[columna] = pd.to_datetime(df[columna], format='%d/%m/%Y', errors='coerce')
+            elif columna in self.COLUMNAS_IMPORTE:
+                df[columna] = df[columna].map(_a_decimal).astype(object)
+            elif columna == 'Año':
+                df[columna] = pd.to_numeric(df[columna], errors='coerce').astype('Int32')
+            else:
+                df[columna] = df[columna].astype('string')
+
+        # Sin año o trimestre en el registro, se usa el de la exportación
+        if 'Año' not in df.columns:
+            df['Año'] = pd.Series(pd.NA, index=df.index, dtype='Int32')
+        if 'Trimestre' not in df.columns:
+            df['Trimestre'] = pd.Series(pd.NA, index=df.index, dtype='string')
+        if str(self.año).isdigit():
+            df['Año'] = df['Año'].fillna(int(self.año))
+        if self.trimestre:
+            df['Trimestre'] = df['Trimestre'].fillna(self.trimestre)
+        return df
+
+    def exportar_parquet(self, directorio: Optional[str] = None) -> str:
         """
-        Exporta los datos en todos los formatos disponibles.
+        Exporta los datos a un dataset Parquet con columnas tipadas, particionado
+        por año y trimestre (Año=2025/Trimestre=1T/).
+
+        Fechas como date32, importes como decimal128(18, 2) y Año como int32 (ver
+        df_tipado). Requiere pyarrow (opcional).
+
+        Una exportación del 1T puede traer facturas que las reglas de negocio
+        asignan a otro trimestre, así que no se sustituyen particiones enteras:
+        los archivos llevan el trimestre exportado en el nombre
+        (facturas-2025_1T-{fecha y hora}-0.parquet) y volver a exportarlo sustituye
+        solo sus archivos, en todas las particiones. Lo exportado desde otros
+        trimestres no se toca. Por eso debe exportarse el trimestre completo
+        (almacén), no un lote suelto.
 
         Args:
+            directorio (str, optional): Raíz del dataset. Si None, self.directorio_parquet.
+
+        Returns:
+            str: Ruta de la raíz del dataset
+        """
+        if not self.datos:
+            raise ValueError("No hay datos para exportar")
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow)")
+
+        directorio = directorio or self.directorio_parquet
+        df = self.df_tipado()
+
+        campos = []
+        for columna in df.columns:
+            if columna in self.COLUMNAS_FECHA:
+                tipo = pa.date32()
+            elif columna in self.COLUMNAS_IMPORTE:
+                tipo = pa.decimal128(18, 2)
+            elif columna == 'Año':
+                tipo = pa.int32()
+            else:
+                tipo = pa.string()
+            campos.append(pa.field(columna, tipo))
+        # Sin metadatos de pandas: las columnas de partición se leen como categorías
+        tabla = pa.Table.from_pandas(df, schema=pa.schema(campos), preserve_index=False).replace_schema_metadata()
+
+        origen = f"{self.año}_{self.trimestre}" if self.trimestre and self.año else "sin_clasificar"
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        anteriores = list(Path(directorio).glob(f"*/*/facturas-{origen}-*.parquet"))
+
+        os.makedirs(directorio, exist_ok=True)
+        pq.write_to_dataset(tabla, root_path=directorio, partition_cols=list(self.COLUMNAS_PARTICION),
+                            existing_data_behavior='overwrite_or_ignore',
+                            basename_template=f"facturas-{origen}-{marca}-{{i}}.parquet")
+
+        # Los archivos nuevos ya están escritos: los de la exportación anterior sobran
+        for ruta in anteriores:
+            ruta.unlink()
+
+        print(f"OK Parquet exportado: {directorio} ({len(df)} facturas)")
+        return directorio
+
+    def exportar_streaming(self, registros: Iterable[Tuple[str, Dict[str, Any]]],
+                           formatos: Tuple[str, ...] = ("csv", "json"),
+                           prefijo: Optional[str] = None) -> Dict[str, str]:
+        """
+        Exporta a CSV y/o JSON consumiendo un iterador, sin acumular los registros.
+
+        Pensado para PDFExtractor.iter_facturas(): cada factura se escribe en
+        cuanto llega y los errores van a un CSV aparte, por lo que la memoria no
+        crece con el número de facturas. No usa self.datos ni self.errores.
+
+        El CSV tiene el mismo formato que exportar_csv (columnas estándar, ';',
+        utf-8-sig); las columnas son las de la primera factura exportada. El JSON
+        tiene la misma estructura que exportar_json, con "metadata" al final
+        porque el total solo se conoce al terminar.
+
+        Args:
+            registros (Iterable[Tuple[str, Dict[str, Any]]]): Tuplas ('factura' | 'error', registro)
+            formatos (Tuple[str, ...]): Formatos a generar ("csv", "json")
             prefijo (str, optional): Prefijo para los nombres de archivo
 
         Returns:
-            Dict[str, str]: Diccionario con las rutas de todos los archivos generados
+            Dict[str, str]: Rutas de los archivos generados ('csv', 'json', 'errores')
         """
-        resultados = {}
+        prefijo = prefijo or f"facturas_extraidas_{self.timestamp}"
+        rutas = {formato: os.path.join(self.directorio_salida, f"{prefijo}.{formato}")
+                 for formato in formatos if formato in ("csv", "json")}
+        ruta_errores = os.path.join(self.directorio_salida, f"{prefijo}_ERRORES.csv")
 
-        prefijo = prefijo or f"facturas_{self.timestamp}"
+        archivo_csv = escritor_csv = archivo_json = None
+        archivo_errores = escritor_errores = None
+        total_facturas = 0
+        total_errores = 0
 
         try:
-            resultados['excel_basico'] = self.exportar_excel_basico(f"{prefijo}_basico.xlsx")
-        except Exception as e:
-            print(f"Error exportando Excel básico: {e}")
+            if 'csv' in rutas:
+                archivo_csv = open(rutas['csv'], 'w', encoding='utf-8-sig', newline='')
+            if 'json' in rutas:
+                archivo_json = open(rutas['json'], 'w', encoding='utf-8')
+                archivo_json.write('{\n  "facturas": [')
+
+            for tipo, registro in registros:
+                if tipo == 'error':
+                    if escritor_errores is None:
+                        archivo_errores = open(ruta_errores, 'w', encoding='utf-8-sig', newline='')
+                        escritor_errores = csv.DictWriter(archivo_errores, fieldnames=list(registro.keys()),
+                                                          delimiter=';', extrasaction='ignore')
+                        escritor_errores.writeheader()
+                    escritor_errores.writerow(registro)
+                    total_errores += 1
+                    continue
+
+                registro_filtrado = self._filtrar_registro(a_diccionario(registro))
+                if registro_filtrado is None:
+                    continue
+
+                if archivo_csv is not None:
+                    if escritor_csv is None:
+                        escritor_csv = csv.DictWriter(archivo_csv, fieldnames=list(registro_filtrado.keys()),
+                                                      delimiter=';', extrasaction='ignore')
+                        escritor_csv.writeheader()
+                    escritor_csv.writerow(registro_filtrado)
+
+                if archivo_json is not None:
+                    separador = ',' if total_facturas else ''
+                    archivo_json.write(separador + '\n    ' +
+                                       json.dumps(registro_filtrado, ensure_ascii=False))
+
+                total_facturas += 1
+
+            if archivo_json is not None:
+                metadata = {
+                    "fecha_exportacion": datetime.now().isoformat(),
+                    "total_facturas": total_facturas,
+                    "version": "1.0"
+                }
+                archivo_json.write('\n  ],\n  "metadata": ' + json.dumps(metadata, ensure_ascii=False) + '\n}\n')
+        finally:
+            for archivo in (archivo_csv, archivo_json, archivo_errores):
+                if archivo is not None:
+                    archivo.close()
 
-        try:
-            resultados['excel_formateado'] = self.exportar_excel_formateado(f"{prefijo}_formateado.xlsx")
-        except Exception as e:
-            print(f"Error exportando Excel formateado: {e}")
+        if total_facturas == 0:
+            print("No hay datos para exportar")
+            for ruta in rutas.values():
+                os.remove(ruta)
+            rutas = {}
 
-        try:
-            resultados['csv'] = self.exportar_csv(f"{prefijo}.csv")
-        except Exception as e:
-            print(f"Error exportando CSV: {e}")
+        for formato, ruta in rutas.items():
+            print(f"OK {formato.upper()} exportado: {ruta} ({total_facturas} facturas)")
 
-        try:
-            resultados['json'] = self.exportar_json(f"{prefijo}.json")
-        except Exception as e:
-            print(f"Error exportando JSON: {e}")
+        if total_errores:
+            rutas['errores'] = ruta_errores
+            print(f"OK Errores exportados: {ruta_errores} ({total_errores} errores)")
+
+        return rutas
+
+    def exportar_formatos(self, tareas: Dict[str, Tuple[str, Optional[str]]],
+                          concurrente: bool = True) -> Dict[str, str]:
+        """
+        Exporta varios formatos a la vez.
+
+        CSV y JSON se escriben en hilos; cada libro de Excel, en un proceso. Si un
+        formato falla se informa y se anota en self.fallos_exportacion, y el resto
+        se exporta igualmente.
+
+        Args:
+            tareas (Dict[str, Tuple[str, Optional[str]]]): clave -> (método exportar_*, nombre de
+                archivo o None para el nombre por defecto)
+            concurrente (bool): Si False, se exportan uno detrás de otro en este proceso
 
-        # Exportar errores si existen
+        Returns:
+            Dict[str, str]: clave -> ruta de cada archivo generado, en el orden de las tareas
+        """
+        self.fallos_exportacion = {}
+        metodos = {metodo for metodo, _ in tareas.values()}
+
+        # Las vistas se calculan antes de repartir el trabajo: los hilos las comparten
+        # y los procesos las reciben ya hechas
+        if self.datos:
+            if metodos - {"exportar_excel_completo", "exportar_excel_errores"}:
+                self.df_estandar
+            if metodos & {"exportar_excel_formateado", "exportar_excel_completo"}:
+                self.df_completo
+
+        libros = [clave for clave, (metodo, _) in tareas.items() if metodo in self.EXPORTACIONES_LIBRO]
+        hilos = ThreadPoolExecutor(max_workers=len(tareas)) if concurrente and tareas else None
+        procesos = None
+        if hilos is not None and libros:
+            try:
+                procesos = ProcessPoolExecutor(max_workers=min(len(libros), os.cpu_count() or 1))
+            except (OSError, NotImplementedError, ImportError) as e:
+                # Sin soporte de multiprocessing: los libros también van a hilos
+                print(f"⚠️ ADVERTENCIA: Exportando libros de Excel sin procesos aparte: {e}")
+
+        futuros = {}
         try:
-            ruta_errores = self.exportar_excel_errores(f"{prefijo}_ERRORES.xlsx")
-            if ruta_errores:
-                resultados['excel_errores'] = ruta_errores
-        except Exception as e:
-            print(f"Error exportando Excel de errores: {e}")
+            # Primero los procesos: se crean antes de que arranquen los hilos de escritura.
+            # Cada proceso recibe solo los DataFrames (o errores) de su libro y la ruta,
+            # no el exportador con todos los registros
+            if procesos is not None:
+                for clave in libros:
+                    futuro = Future()
+                    try:
+                        libro = self._preparar_libro(*tareas[clave])
+                    except ValueError as e:
+                        futuro.set_exception(e)
+                    else:
+                        if libro is None:
+                            futuro.set_result(None)
+                        else:
+                            escritor, argumentos = libro
+                            futuro = procesos.submit(escritor, *argumentos)
+                    futuros[clave] = futuro
+            if hilos is not None:
+                for clave, (metodo, nombre_archivo) in tareas.items():
+                    if clave not in futuros:
+                        futuros[clave] = hilos.submit(getattr(self, metodo), nombre_archivo)
+
+            resultados = {}
+            for clave, (metodo, nombre_archivo) in tareas.items():
+                try:
+                    if clave not in futuros:
+                        ruta = getattr(self, metodo)(nombre_archivo)
+                    else:
+                        try:
+                            ruta = futuros[clave].result()
+                        except BrokenProcessPool:
+                            # El proceso murió (p.ej. sin memoria): se reintenta aquí
+                            ruta = getattr(self, metodo)(nombre_archivo)
+                except Exception as e:
+                    self.fallos_exportacion[clave] = str(e)
+                    print(f"❌ ERROR: No se pudo exportar {clave}: {e}")
+                    continue
+                if ruta:
+                    resultados[clave] = ruta
+        finally:
+            for pool in (hilos, procesos):
+                if pool is not None:
+                    pool.shutdown()
 
         return resultados
 
+    def exportar_todo(self, prefijo: Optional[str] = None, concurrente: bool = True) -> Dict[str, str]:
+        """
+        Exporta los datos en todos los formatos disponibles, a la vez (ver exportar_formatos).
+
+        Args:
+            prefijo (str, optional): Prefijo para los nombres de archivo
+            concurrente (bool): Si False, se exportan uno detrás de otro
+
+        Returns:
+            Dict[str, str]: Diccionario con las rutas de todos los archivos generados
+        """
+        prefijo = prefijo or f"facturas_{self.timestamp}"
+
+        return self.exportar_formatos({
+            'excel_basico': ("exportar_excel_basico", f"{prefijo}_basico.xlsx"),
+            'excel_formateado': ("exportar_excel_formateado", f"{prefijo}_formateado.xlsx"),
+            'csv': ("exportar_csv", f"{prefijo}.csv"),
+            'json': ("exportar_json", f"{prefijo}.json"),
+            # Solo genera archivo si hay errores
+            'excel_errores': ("exportar_excel_errores", f"{prefijo}_ERRORES.xlsx"),
+        }, concurrente=concurrente)
+
 
 def main():
     """Función principal para testing del exportador."""
@@ -6,13 +6,19 @@ Módulo para organizar archivos PDF procesados según su estado:
 """
 
 import os
+import errno
 import json
 import hashlib
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-import pdfplumber
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from src.documento_pdf import DocumentoPDF, abrir_documento
+from src.filtro_bloom import FiltroBloom
+from src.indice_facturas import IndiceSQLite, PATRON_INDICE_JSON
+from src.registro_factura import RegistroFactura
+from src.registro_operaciones import RegistroOperaciones
+from src.utils.buscador_palabras import BuscadorPalabras
 
 
 # Palabras clave para detectar si un PDF sin plantilla podría ser una factura
@@ -28,6 +34,44 @@ PALABRAS_FACTURA = [
 # Umbral de palabras clave para considerar que es una factura
 UMBRAL_PALABRAS_FACTURA = 3
 
+# Páginas que se analizan como máximo para clasificar un PDF sin plantilla
+PAGINAS_ANALIZADAS = 5
+
+# Palabras clave ya normalizadas a minúsculas
+BUSCADOR_PALABRAS_FACTURA = BuscadorPalabras(palabra.lower() for palabra in PALABRAS_FACTURA)
+
+# Tamaño de bloque para leer/copiar PDFs (hash y movimiento entre discos)
+TAMAÑO_BLOQUE = 1024 * 1024
+
+
+def contar_palabras_factura(documento: DocumentoPDF) -> int:
+    """
+    Cuenta las palabras clave de factura de las primeras páginas de un documento.
+
+    Analiza como máximo PAGINAS_ANALIZADAS páginas y no sigue con la siguiente
+    una vez alcanzado el umbral. Los errores de lectura del PDF se propagan.
+
+    Args:
+        documento: Documento a analizar
+
+    Returns:
+        int: Palabras clave encontradas (suma de las de cada página analizada)
+    """
+    palabras_encontradas = 0
+    for i in range(PAGINAS_ANALIZADAS):
+        try:
+            texto = documento.texto_pagina(i)
+        except IndexError:
+            break
+        if texto:
+            # Palabras clave de la página (todas: el recuento aparece en el log)
+            palabras_encontradas += BUSCADOR_PALABRAS_FACTURA.contar(texto.lower())
+
+            # Si ya encontramos suficientes palabras, no seguir con más páginas
+            if palabras_encontradas >= UMBRAL_PALABRAS_FACTURA:
+                break
+    return palabras_encontradas
+
 
 class PDFOrganizer:
     """
@@ -35,7 +79,17 @@ class PDFOrganizer:
     Mantiene un índice de facturas procesadas por trimestre para detectar duplicados.
     """
 
-    def __init__(self, directorio_base: str = "documentos"):
+    # Altas en índices JSON entre volcados a disco
+    VOLCADO_CADA = 50
+
+    # Filtro global (CIF, NumFactura) de todas las facturas indexadas
+    ARCHIVO_FILTRO_GLOBAL = "filtro_duplicados.bin"
+    CAPACIDAD_MINIMA_FILTRO = 100_000
+
+    def __init__(self, directorio_base: str = "documentos", backend_indice: str = "json",
+                 volcado_cada: int = VOLCADO_CADA, duplicados_entre_trimestres: bool = True,
+                 hash_adicional: Optional[str] = None, registro_operaciones: str = "texto",
+                 directorio_logs: Optional[str] = None):
         """
         Inicializa el organizador de PDFs.
 
@@ -46,9 +100,34 @@ class PDFOrganizer:
         - documentos/procesados/duplicados/  ← Duplicados
         - documentos/procesados/errores/     ← Errores
         - documentos/reportes/               ← Excel (gestionado por ExcelExporter)
+        - documentos/logs/                   ← Log de operaciones
+
+        Índices de facturas (backend_indice):
+        - "json":   un indice_YYYY_XT.json por trimestre; se mantienen en memoria durante
+                    la ejecución y los modificados se vuelcan cada `volcado_cada` altas
+                    y en finalizar()
+        - "sqlite": procesados/indices/indices.db con clave única por factura; los
+                    JSON por trimestre se regeneran en finalizar() por compatibilidad
+
+        Duplicados entre trimestres: procesados/indices/filtro_duplicados.bin es un
+        filtro de Bloom con el (CIF, NumFactura) de todas las facturas indexadas. Una
+        factura que no es duplicada en su trimestre se comprueba contra el filtro con
+        una sola consulta; solo si da positivo se buscan sus coincidencias en los
+        índices completos (ver es_duplicado_global).
 
         Args:
             directorio_base: Directorio raíz (default: "documentos")
+            backend_indice: "json" o "sqlite"
+            volcado_cada: Altas en índices JSON tras las que se vuelcan a disco
+            duplicados_entre_trimestres: Buscar también duplicados indexados en otros trimestres
+            hash_adicional: Algoritmo de hashlib (p.ej. "blake2b") a guardar en el índice junto
+                            al MD5 como "hash_<algoritmo>"; se calcula en la misma lectura
+            registro_operaciones: Log de operaciones en directorio_logs:
+                                  - "texto": file_operations_YYYYMMDD.log, una línea por operación
+                                  - "jsonl": file_operations_YYYYMMDD.jsonl escrito en segundo plano
+                                             (ver RegistroOperaciones)
+                                  - "no": sin log de operaciones
+            directorio_logs: Carpeta del log de operaciones (default: <directorio_base>/logs)
         """
         self.directorio_base = Path(directorio_base)
 
@@ -59,11 +138,46 @@ class PDFOrganizer:
         self.directorio_indices = directorio_procesados / "indices"  # ← Ahora fuera de facturas/
         self.directorio_duplicados = directorio_procesados / "duplicados"
         self.directorio_errores = directorio_procesados / "errores"
-        self.directorio_logs = Path("logs")
+        self.directorio_logs = (Path(directorio_logs) if directorio_logs is not None
+                                else self.directorio_base / "logs")
 
         # Crear estructura de carpetas si no existe
         self._crear_estructura_carpetas()
 
+        if backend_indice not in ("json", "sqlite"):
+            raise ValueError(f"Backend de índice no válido: {backend_indice}")
+        if registro_operaciones not in ("texto", "jsonl", "no"):
+            raise ValueError(f"Registro de operaciones no válido: {registro_operaciones}")
+        self.registro_operaciones = registro_operaciones
+        self._registro_jsonl = (RegistroOperaciones(self.directorio_logs)
+                                if registro_operaciones == "jsonl" else None)
+        if hash_adicional is not None:
+            hashlib.new(hash_adicional)  # ValueError si el algoritmo no existe
+        self.hash_adicional = hash_adicional
+        self.backend_indice = backend_indice
+        self.indice_sqlite = None
+
+        # Índices JSON cargados: (año, trimestre) -> índice, y los modificados sin volcar
+        self.volcado_cada = volcado_cada
+        self._indices_json: Dict[Tuple[int, str], Dict] = {}
+        self._indices_sin_volcar: set = set()
+        self._altas_sin_volcar = 0
+        # Tablas de búsqueda de duplicados por trimestre (ver _claves_indice)
+        self._claves_json: Dict[Tuple[int, str], Dict] = {}
+
+        # Filtro global de duplicados: se carga (o reconstruye) la primera vez que se usa
+        self.duplicados_entre_trimestres = duplicados_entre_trimestres
+        self._filtro_global: Optional[FiltroBloom] = None
+        self._filtro_global_modificado = False
+        # Tabla hash_md5 -> entrada de los índices JSON (se construye la primera vez que se consulta)
+        self._hashes_json: Optional[Dict[str, Dict]] = None
+
+        if backend_indice == "sqlite":
+            # Al crearse por primera vez importa los indice_YYYY_XT.json existentes
+            self.indice_sqlite = IndiceSQLite(self.directorio_indices / "indices.db",
+                                              directorio_json=self.directorio_indices,
+                                              normalizar_fecha=self._normalizar_fecha)
+
     def _crear_estructura_carpetas(self):
         """Crea la estructura de carpetas necesaria para organizar los PDFs"""
         # Carpetas principales
@@ -88,6 +202,18 @@ class PDFOrganizer:
         Returns:
             Diccionario con el índice de facturas del trimestre
         """
+        if self.indice_sqlite is not None:
+            return {"trimestre": trimestre, "año": año,
+                    "facturas": self.indice_sqlite.facturas_trimestre(año, trimestre)}
+
+        # Cada trimestre se lee del disco una sola vez por ejecución
+        clave = (año, trimestre)
+        if clave not in self._indices_json:
+            self._indices_json[clave] = self._leer_indice_json(año, trimestre)
+        return self._indices_json[clave]
+
+    def _leer_indice_json(self, año: int, trimestre: str) -> Dict:
+        """Lee indice_YYYY_XT.json del disco (índice vacío si no existe o está dañado)."""
         archivo_indice = self.directorio_indices / f"indice_{año}_{trimestre}.json"
 
         if archivo_indice.exists():
@@ -110,20 +236,38 @@ class PDFOrganizer:
 
     def guardar_indice(self, año: int, trimestre: str, datos: Dict):
         """
-        Guarda el índice de facturas de un trimestre.
+        Guarda el índice de facturas de un trimestre (archivo temporal + renombrado,
+        para no dejar nunca un índice a medio escribir).
 
         Args:
             año: Año del trimestre
             trimestre: Trimestre (1T, 2T, 3T, 4T)
             datos: Diccionario con los datos del índice
         """
+        if self.indice_sqlite is not None:
+            self.indice_sqlite.reemplazar_trimestre(año, trimestre, datos.get("facturas", []))
+            self._añadir_al_filtro_global(datos.get("facturas", []))
+            return
+
+        clave = (año, trimestre)
+        if datos is not self._indices_json.get(clave):
+            # Índice sustituido desde fuera (no es un volcado): sus facturas entran en el filtro
+            self._añadir_al_filtro_global(datos.get("facturas", []))
+            self._hashes_json = None
+        self._indices_json[clave] = datos
+        self._indices_sin_volcar.discard(clave)
+
         archivo_indice = self.directorio_indices / f"indice_{año}_{trimestre}.json"
+        temporal = archivo_indice.with_suffix('.tmp')
 
         try:
-            with open(archivo_indice, 'w', encoding='utf-8') as f:
+            with open(temporal, 'w', encoding='utf-8') as f:
                 json.dump(datos, f, indent=2, ensure_ascii=False)
+            os.replace(temporal, archivo_indice)
         except IOError as e:
             print(f"❌ ERROR: No se pudo guardar índice {archivo_indice}: {e}")
+            # Sigue pendiente: se reintentará en el siguiente volcado
+            self._indices_sin_volcar.add(clave)
 
     def es_duplicado(self, cif_proveedor: str, fecha_factura: str,
                     num_factura: str, año: int, trimestre: str) -> Optional[Dict]:
@@ -140,18 +284,70 @@ class PDFOrganizer:
         Returns:
             Diccionario con info de la factura existente si es duplicado, None si no existe
         """
+        if self.indice_sqlite is not None:
+            return self.indice_sqlite.buscar(cif_proveedor, fecha_factura, num_factura, año, trimestre)
+
         indice = self.cargar_indice(año, trimestre)
+        claves = self._claves_indice(año, trimestre, indice)
 
-        # Normalizar fecha para comparación
-        fecha_normalizada = self._normalizar_fecha(fecha_factura)
+        # Búsqueda directa por clave, con la fecha normalizada igual que las guardadas
+        return claves.get((cif_proveedor, self._normalizar_fecha(fecha_factura), num_factura))
+
+    def _claves_indice(self, año: int, trimestre: str, indice: Dict) -> Dict[Tuple, Dict]:
+        """
+        Tabla (cif_proveedor, fecha normalizada, num_factura) -> entrada del índice.
 
-        for factura in indice.get("facturas", []):
-            if (factura.get("cif_proveedor") == cif_proveedor and
-                self._normalizar_fecha(factura.get("fecha_factura", "")) == fecha_normalizada and
-                factura.get("num_factura") == num_factura):
-                return factura
+        Se construye una vez por trimestre y después solo se indexan las entradas
+        añadidas al final de la lista; si el índice se sustituye, se reconstruye.
+        Ante claves repetidas se conserva la primera entrada, como el recorrido lineal.
 
-        return None
+        Args:
+            año: Año del trimestre
+            trimestre: Trimestre (1T, 2T, 3T, 4T)
+            indice: Índice del trimestre (resultado de cargar_indice)
+
+        Returns:
+            Dict[Tuple, Dict]: Entradas del índice por clave de duplicado
+        """
+        facturas = indice.get("facturas", [])
+        tabla = self._claves_json.get((año, trimestre))
+
+        if tabla is None or tabla['facturas'] is not facturas or tabla['indexadas'] > len(facturas):
+            tabla = {'facturas': facturas, 'indexadas': 0, 'claves': {}}
+            self._claves_json[(año, trimestre)] = tabla
+
+        claves = tabla['claves']
+        for factura in facturas[tabla['indexadas']:]:
+            clave = (factura.get("cif_proveedor"),
+                     self._normalizar_fecha(factura.get("fecha_factura", "")),
+                     factura.get("num_factura"))
+            claves.setdefault(clave, factura)
+        tabla['indexadas'] = len(facturas)
+
+        return claves
+
+    def buscar_por_hash(self, hash_md5: str) -> Optional[Dict]:
+        """
+        Busca en todos los índices una factura con el mismo contenido (hash MD5 del PDF).
+
+        Args:
+            hash_md5: Hash MD5 del archivo
+
+        Returns:
+            Diccionario con info de la factura existente, None si no hay ninguna
+        """
+        if not hash_md5:
+            return None
+
+        if self.indice_sqlite is not None:
+            return self.indice_sqlite.buscar_por_hash(hash_md5)
+
+        if self._hashes_json is None:
+            self._hashes_json = {}
+            for _, _, entrada in self._iterar_facturas_indexadas():
+                if entrada.get("hash_md5"):
+                    self._hashes_json.setdefault(entrada["hash_md5"], entrada)
+        return self._hashes_json.get(hash_md5)
 
     def _normalizar_fecha(self, fecha: str) -> str:
         """
@@ -235,7 +431,7 @@ class PDFOrganizer:
             print(f"⚠️ ADVERTENCIA: Error al calcular trimestre desde fecha {fecha_factura}: {e}")
             return ("", "")
 
-    def agregar_al_indice(self, año: int, trimestre: str, info_factura: Dict):
+    def agregar_al_indice(self, año: int, trimestre: str, info_factura: Dict) -> bool:
         """
         Agrega una nueva factura al índice del trimestre.
 
@@ -243,18 +439,222 @@ class PDFOrganizer:
             año: Año del trimestre
             trimestre: Trimestre (1T, 2T, 3T, 4T)
             info_factura: Diccionario con información de la factura
+
+        Returns:
+            bool: False si el índice SQLite ya tenía una factura con la misma clave
+                  (CIF, NumFactura, FechaFactura) y no se ha añadido
         """
+        if self.indice_sqlite is not None:
+            # Alta dentro de la transacción en curso (se confirma por lotes)
+            if not self.indice_sqlite.agregar(año, trimestre, info_factura):
+                return False
+            self._añadir_al_filtro_global([info_factura])
+            return True
+
+        # El índice queda en memoria y se vuelca cada `volcado_cada` altas o en finalizar()
+        clave = (año, trimestre)
         indice = self.cargar_indice(año, trimestre)
         indice["facturas"].append(info_factura)
-        self.guardar_indice(año, trimestre, indice)
+        self._indices_json[clave] = indice
+        self._indices_sin_volcar.add(clave)
+        self._altas_sin_volcar += 1
+        self._añadir_al_filtro_global([info_factura])
+        if self._hashes_json is not None and info_factura.get("hash_md5"):
+            self._hashes_json.setdefault(info_factura["hash_md5"], info_factura)
+
+        if self._altas_sin_volcar >= self.volcado_cada:
+            self.volcar_indices()
+        return True
+
+    def volcar_indices(self):
+        """Escribe en disco los índices JSON modificados desde el último volcado."""
+        for año, trimestre in sorted(self._indices_sin_volcar):
+            self.guardar_indice(año, trimestre, self._indices_json[(año, trimestre)])
+        self._altas_sin_volcar = 0
+        self._guardar_filtro_global()
+
+    def finalizar(self):
+        """
+        Cierra la ejecución: vuelca o confirma las altas pendientes del índice
+        y termina de escribir el log de operaciones.
+
+        Con backend SQLite regenera además los indice_YYYY_XT.json de los
+        trimestres modificados, para quien siga leyendo los JSON.
+        """
+        if self._registro_jsonl is not None:
+            # El hilo escritor se vuelve a crear si el organizador se reutiliza
+            self._registro_jsonl.cerrar()
+
+        if self.indice_sqlite is None:
+            self.volcar_indices()
+            return
+
+        self.indice_sqlite.confirmar()
+        for año, trimestre in sorted(self.indice_sqlite.trimestres_modificados):
+            self.indice_sqlite.exportar_json(año, trimestre,
+                                             self.directorio_indices / f"indice_{año}_{trimestre}.json")
+        self.indice_sqlite.trimestres_modificados.clear()
+        self._guardar_filtro_global()
+
+    @staticmethod
+    def _clave_global(cif_proveedor: str, num_factura: str) -> Optional[str]:
+        """Clave del filtro global (None si falta el CIF o el número)."""
+        cif = (cif_proveedor or "").strip()
+        num = (num_factura or "").strip()
+        return f"{cif}|{num}" if cif and num else None
+
+    def _firma_indices(self) -> str:
+        """
+        Resumen del estado de los índices en disco. Si no coincide con el guardado
+        en el filtro, los índices cambiaron sin pasar por este organizador y el
+        filtro se reconstruye.
+        """
+        if self.indice_sqlite is not None:
+            total, ultimo = self.indice_sqlite.conexion.execute(
+                "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM facturas"
+            ).fetchone()
+            return f"sqlite:{total}:{ultimo}"
+
+        partes = []
+        for ruta in sorted(self.directorio_indices.glob("indice_*.json")):
+            try:
+                stat = ruta.stat()
+            except OSError:
+                continue
+            partes.append(f"{ruta.name}:{stat.st_size}:{stat.st_mtime_ns}")
+        return "json:" + hashlib.md5("|".join(partes).encode('utf-8')).hexdigest()
+
+    def _iterar_facturas_indexadas(self):
+        """
+        Recorre todas las entradas de todos los trimestres (incluidas las altas
+        aún no volcadas).
 
-    def analizar_contenido_pdf(self, pdf_path: str) -> Tuple[bool, int]:
+        Yields:
+            Tuple[int, str, Dict]: (año, trimestre, entrada del índice)
+        """
+        if self.indice_sqlite is not None:
+            filas = self.indice_sqlite.conexion.execute(
+                "SELECT año, trimestre, datos FROM facturas ORDER BY id"
+            )
+            for año, trimestre, datos in filas:
+                yield año, trimestre, json.loads(datos)
+            return
+
+        trimestres = set(self._indices_json)
+        for ruta in self.directorio_indices.glob("indice_*.json"):
+            coincidencia = PATRON_INDICE_JSON.match(ruta.name)
+            if coincidencia:
+                trimestres.add((int(coincidencia.group(1)), coincidencia.group(2)))
+
+        for año, trimestre in sorted(trimestres):
+            # Los trimestres ya cargados se leen de memoria; el resto, del disco sin cachearlos
+            indice = self._indices_json.get((año, trimestre)) or self._leer_indice_json(año, trimestre)
+            for entrada in indice.get("facturas", []):
+                yield año, trimestre, entrada
+
+    def _obtener_filtro_global(self) -> FiltroBloom:
+        """Filtro global cargado de disco, o reconstruido si falta, está desfasado o lleno."""
+        if self._filtro_global is None:
+            filtro = FiltroBloom.cargar(self.directorio_indices / self.ARCHIVO_FILTRO_GLOBAL)
+            if filtro is None or filtro.saturado or filtro.firma != self._firma_indices():
+                filtro = self._reconstruir_filtro_global()
+            self._filtro_global = filtro
+        return self._filtro_global
+
+    def _reconstruir_filtro_global(self) -> FiltroBloom:
+        """Construye el filtro global recorriendo todos los índices."""
+        claves = [clave for _, _, entrada in self._iterar_facturas_indexadas()
+                  if (clave := self._clave_global(entrada.get("cif_proveedor"), entrada.get("num_factura")))]
+
+        filtro = FiltroBloom(capacidad=max(self.CAPACIDAD_MINIMA_FILTRO, 2 * len(claves)))
+        for clave in claves:
+            filtro.añadir(clave)
+        self._filtro_global_modificado = True
+        return filtro
+
+    def _añadir_al_filtro_global(self, entradas: List[Dict]):
+        """Añade al filtro global las claves de nuevas entradas del índice."""
+        if not self.duplicados_entre_trimestres:
+            return
+        claves = [clave for entrada in entradas
+                  if (clave := self._clave_global(entrada.get("cif_proveedor"), entrada.get("num_factura")))]
+        if not claves:
+            return
+        filtro = self._obtener_filtro_global()
+        for clave in claves:
+            filtro.añadir(clave)
+        self._filtro_global_modificado = True
+
+    def _guardar_filtro_global(self):
+        """Persiste el filtro global con la firma de los índices ya volcados."""
+        if self._filtro_global is None or not self._filtro_global_modificado:
+            return
+        self._filtro_global.firma = self._firma_indices()
+        self._filtro_global.guardar(self.directorio_indices / self.ARCHIVO_FILTRO_GLOBAL)
+        self._filtro_global_modificado = False
+
+    def es_duplicado_global(self, cif_proveedor: str, fecha_factura: str, num_factura: str,
+                            año: int, trimestre: str, ruta_pdf: Optional[str] = None,
+                            documento: Optional[DocumentoPDF] = None) -> Optional[Dict]:
+        """
+        Busca la factura en los índices de los demás trimestres.
+
+        Primero consulta el filtro global: si el (CIF, NumFactura) no está, no
+        hay nada más que leer. Si está, se localizan sus entradas en los índices
+        completos y se da por duplicada si alguna es del mismo año de factura
+        (p.ej. la misma factura con la fecha mal leída) o tiene el mismo hash que
+        el PDF. Un mismo número en otro año con otro contenido no es duplicado:
+        hay proveedores que reinician la numeración cada año.
+
+        Args:
+            cif_proveedor: CIF del proveedor
+            fecha_factura: Fecha de la factura (formato YYYY-MM-DD o DD/MM/YYYY)
+            num_factura: Número de factura
+            año: Año del trimestre de la factura (ese trimestre ya lo cubre es_duplicado)
+            trimestre: Trimestre de la factura
+            ruta_pdf: PDF de la factura, para comparar hashes si hace falta
+            documento: Documento ya abierto (reutiliza su hash)
+
+        Returns:
+            Diccionario con info de la factura existente si es duplicado, None si no existe
+        """
+        clave = self._clave_global(cif_proveedor, num_factura)
+        if clave is None or clave not in self._obtener_filtro_global():
+            return None
+
+        if self.indice_sqlite is not None:
+            candidatas = self.indice_sqlite.buscar_por_cif_num(cif_proveedor, num_factura)
+        else:
+            candidatas = [(a, t, entrada) for a, t, entrada in self._iterar_facturas_indexadas()
+                          if self._clave_global(entrada.get("cif_proveedor"), entrada.get("num_factura")) == clave]
+        candidatas = [entrada for a, t, entrada in candidatas if (a, t) != (año, trimestre)]
+        if not candidatas:
+            return None
+
+        año_factura = self._normalizar_fecha(fecha_factura)[:4]
+        for entrada in candidatas:
+            if año_factura and self._normalizar_fecha(entrada.get("fecha_factura", ""))[:4] == año_factura:
+                return entrada
+
+        hash_md5 = None
+        if documento is not None:
+            hash_md5 = documento.hash_md5
+        elif ruta_pdf:
+            hash_md5 = self.calcular_hash_md5(ruta_pdf)
+        if hash_md5:
+            for entrada in candidatas:
+                if entrada.get("hash_md5") == hash_md5:
+                    return entrada
+        return None
+
+    def analizar_contenido_pdf(self, pdf_path: str, documento: Optional[DocumentoPDF] = None) -> Tuple[bool, int]:
         """
         Analiza el contenido de un PDF para determinar si parece una factura.
         Busca palabras clave relacionadas con facturas.
 
         Args:
             pdf_path: Ruta al archivo PDF
+            documento: Documento ya abierto a reutilizar (evita volver a parsear el PDF)
 
         Returns:
             Tupla (es_probable_factura, num_palabras_encontradas)
@@ -262,21 +662,10 @@ class PDFOrganizer:
         palabras_encontradas = 0
 
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Analizar todas las páginas (máximo 5 para no ser muy lento)
-                for i, pagina in enumerate(pdf.pages[:5]):
-                    texto = pagina.extract_text()
-                    if texto:
-                        texto_lower = texto.lower()
-
-                        # Contar palabras clave encontradas
-                        for palabra in PALABRAS_FACTURA:
-                            if palabra.lower() in texto_lower:
-                                palabras_encontradas += 1
-
-                        # Si ya encontramos suficientes palabras, no seguir buscando
-                        if palabras_encontradas >= UMBRAL_PALABRAS_FACTURA:
-                            break
+            with abrir_documento(pdf_path, documento) as doc:
+                # El texto ya extraído (al identificar el proveedor o en un proceso hijo)
+                # se reutiliza sin abrir el PDF
+                palabras_encontradas = contar_palabras_factura(doc)
         except Exception as e:
             print(f"⚠️ ADVERTENCIA: Error al analizar contenido de {pdf_path}: {e}")
 
@@ -296,15 +685,22 @@ class PDFOrganizer:
         md5_hash = hashlib.md5()
         try:
             with open(archivo_path, "rb") as f:
-                # Leer en chunks para archivos grandes
-                for chunk in iter(lambda: f.read(4096), b""):
+                # Leer en bloques grandes: menos llamadas al sistema y a update()
+                for chunk in iter(lambda: f.read(TAMAÑO_BLOQUE), b""):
                     md5_hash.update(chunk)
             return md5_hash.hexdigest()
         except IOError as e:
             print(f"⚠️ ADVERTENCIA: Error al calcular hash de {archivo_path}: {e}")
             return ""
 
-    def mover_pdf(self, origen: str, destino: str) -> bool:
+    def _nuevos_resumenes(self) -> Dict:
+        """Objetos hash a calcular para el índice: {"hash_md5": md5, "hash_<alg>": ...}."""
+        resumenes = {"hash_md5": hashlib.md5()}
+        if self.hash_adicional:
+            resumenes[f"hash_{self.hash_adicional}"] = hashlib.new(self.hash_adicional)
+        return resumenes
+
+    def mover_pdf(self, origen: str, destino: str, resumenes: Sequence = ()) -> bool:
         """
         Mueve un archivo PDF de origen a destino.
         Si el destino ya existe, agrega un sufijo numérico.
@@ -312,6 +708,8 @@ class PDFOrganizer:
         Args:
             origen: Ruta del archivo origen
             destino: Ruta del archivo destino
+            resumenes: Objetos hash (hashlib) a alimentar con el contenido del archivo
+                       durante el movimiento, para no tener que volver a leerlo
 
         Returns:
             True si se movió correctamente, False si hubo error
@@ -334,12 +732,55 @@ class PDFOrganizer:
                     contador += 1
 
             # Mover archivo
-            shutil.move(origen, str(destino_path))
+            if resumenes:
+                self._mover_calculando_hash(origen, str(destino_path), resumenes)
+            else:
+                shutil.move(origen, str(destino_path))
             return True
         except Exception as e:
             print(f"❌ ERROR: No se pudo mover {origen} a {destino}: {e}")
             return False
 
+    def _mover_calculando_hash(self, origen: str, destino: str, resumenes: Sequence):
+        """
+        Mueve un archivo leyéndolo una sola vez para calcular sus hashes.
+
+        En el mismo disco basta con renombrar (no se copia nada) y se lee el
+        destino una vez. Entre discos distintos se copia por bloques grandes
+        y cada bloque se pasa a los hashes antes de escribirlo.
+        """
+        buffer = bytearray(TAMAÑO_BLOQUE)
+        vista = memoryview(buffer)
+
+        try:
+            os.rename(origen, destino)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        else:
+            with open(destino, 'rb') as f:
+                while (leidos := f.readinto(buffer)):
+                    for resumen in resumenes:
+                        resumen.update(vista[:leidos])
+            return
+
+        try:
+            with open(origen, 'rb') as f_origen, open(destino, 'wb') as f_destino:
+                while (leidos := f_origen.readinto(buffer)):
+                    bloque = vista[:leidos]
+                    for resumen in resumenes:
+                        resumen.update(bloque)
+                    f_destino.write(bloque)
+            shutil.copystat(origen, destino)
+        except BaseException:
+            # No dejar una copia a medias en destino
+            try:
+                os.unlink(destino)
+            except OSError:
+                pass
+            raise
+        os.unlink(origen)
+
     def registrar_operacion(self, tipo: str, nombre_archivo: str,
                           origen: str, destino: str, detalles: str = ""):
         """
@@ -352,6 +793,13 @@ class PDFOrganizer:
             destino: Directorio de destino
             detalles: Información adicional sobre la operación
         """
+        if self.registro_operaciones == "no":
+            return
+        if self._registro_jsonl is not None:
+            self._registro_jsonl.registrar(tipo, archivo=nombre_archivo, origen=origen,
+                                           destino=destino, detalles=detalles)
+            return
+
         fecha_hora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         archivo_log = self.directorio_logs / f"file_operations_{datetime.now().strftime('%Y%m%d')}.log"
 
@@ -366,14 +814,17 @@ class PDFOrganizer:
         except IOError as e:
             print(f"⚠️ ADVERTENCIA: No se pudo escribir en log: {e}")
 
-    def organizar_pdf(self, pdf_path: str, resultado_extraccion: Optional[Dict] = None) -> str:
+    def organizar_pdf(self, pdf_path: str, resultado_extraccion: Optional[Union[RegistroFactura, Dict]] = None,
+                      documento: Optional[DocumentoPDF] = None) -> str:
         """
         Organiza un PDF según el resultado de su procesamiento.
 
         Args:
             pdf_path: Ruta al archivo PDF original
-            resultado_extraccion: Diccionario con los datos extraídos de la factura
+            resultado_extraccion: Datos extraídos de la factura (RegistroFactura o diccionario)
                                  o None si hubo error en la extracción
+            documento: Documento ya abierto durante la extracción (opcional). Si se pasa,
+                       el hash y el análisis de contenido reutilizan lo ya leído.
 
         Returns:
             Ruta final donde se movió el archivo
@@ -383,13 +834,49 @@ class PDFOrganizer:
 
         # Caso 1: Extracción exitosa
         if resultado_extraccion and not resultado_extraccion.get('_Error'):
-            return self._organizar_factura_exitosa(pdf_path, resultado_extraccion)
+            return self._organizar_factura_exitosa(pdf_path, resultado_extraccion, documento)
 
         # Caso 2: Error de extracción
         else:
-            return self._organizar_pdf_error(pdf_path, resultado_extraccion)
+            return self._organizar_pdf_error(pdf_path, resultado_extraccion, documento)
 
-    def _organizar_factura_exitosa(self, pdf_path: Path, resultado: Dict) -> str:
+    def organizar_duplicado_exacto(self, pdf_path: str, existente: Dict,
+                                   documento: Optional[DocumentoPDF] = None) -> str:
+        """
+        Mueve a duplicados un PDF idéntico byte a byte a una factura ya indexada,
+        sin analizar su contenido.
+
+        Args:
+            pdf_path: Ruta al archivo PDF
+            existente: Entrada del índice con el mismo hash (ver buscar_por_hash)
+            documento: Documento abierto del PDF, se libera antes de moverlo
+
+        Returns:
+            Ruta final donde se movió el archivo
+        """
+        pdf_path = Path(pdf_path)
+        nombre_archivo = pdf_path.name
+
+        # Mismo trimestre que la factura original
+        trimestre, año = self.calcular_trimestre_real_para_indices(existente.get("fecha_factura", ""))
+        destino_dir = self.directorio_duplicados / año / trimestre if trimestre else self.directorio_duplicados
+        destino = destino_dir / nombre_archivo
+
+        if documento is not None:
+            documento.cerrar()
+
+        if self.mover_pdf(str(pdf_path), str(destino)):
+            detalles = (f"Copia exacta de {existente.get('nombre_archivo', '')}, "
+                        f"CIF: {existente.get('cif_proveedor', '')}, NumFactura: {existente.get('num_factura', '')}")
+            self.registrar_operacion("DUPLICADO", nombre_archivo,
+                                     str(pdf_path.parent), str(destino_dir), detalles)
+            print(f"  📋 Copia exacta detectada: {nombre_archivo} → {destino_dir}")
+            return str(destino)
+
+        return str(pdf_path)
+
+    def _organizar_factura_exitosa(self, pdf_path: Path, resultado: Union[RegistroFactura, Dict],
+                                   documento: Optional[DocumentoPDF] = None) -> str:
         """
         Organiza una factura procesada exitosamente.
         Verifica duplicados y organiza por fecha (mes) y proveedor.
@@ -402,9 +889,14 @@ class PDFOrganizer:
         num_factura = resultado.get('NumFactura', '')
         nombre_proveedor = resultado.get('_Proveedor_Nombre', resultado.get('_NombreProveedor', 'Desconocido'))
 
+        # La fecha se normaliza una sola vez para trimestre, duplicados e índice. Se usa
+        # _normalizar_fecha también con RegistroFactura: las claves de los índices ya
+        # guardados se generaron así y deben seguir coincidiendo
+        fecha_normalizada = self._normalizar_fecha(fecha_factura)
+
         # IMPORTANTE: Para los índices, calcular trimestre y año REALES basándose SOLO en la fecha de factura
         # (sin aplicar la lógica de negocio que se usa para el Excel)
-        trimestre_indice, año_indice = self.calcular_trimestre_real_para_indices(fecha_factura)
+        trimestre_indice, año_indice = self.calcular_trimestre_real_para_indices(fecha_normalizada)
 
         # Si no se pudo calcular, usar valores del resultado como fallback
         if not trimestre_indice or not año_indice:
@@ -420,8 +912,16 @@ class PDFOrganizer:
         except ValueError:
             año_indice_int = 0
 
-        duplicado = self.es_duplicado(cif_proveedor, fecha_factura, num_factura,
+        duplicado = self.es_duplicado(cif_proveedor, fecha_normalizada, num_factura,
                                      año_indice_int, trimestre_indice)
+        if not duplicado and self.indice_sqlite is not None:
+            # La clave es única en todo el índice SQLite: una factura con la misma clave
+            # indexada en otro trimestre (p.ej. con la fecha sin reconocer) también es duplicado
+            duplicado = self.indice_sqlite.buscar_clave(cif_proveedor, fecha_normalizada, num_factura)
+        if not duplicado and self.duplicados_entre_trimestres:
+            duplicado = self.es_duplicado_global(cif_proveedor, fecha_normalizada, num_factura,
+                                                 año_indice_int, trimestre_indice,
+                                                 ruta_pdf=str(pdf_path), documento=documento)
 
         if duplicado:
             # Es un duplicado real - mover a carpeta de duplicados
@@ -429,8 +929,14 @@ class PDFOrganizer:
             destino_dir = self.directorio_duplicados / str(año_indice) / trimestre_indice
             destino = destino_dir / nombre_archivo
 
+            # Liberar el archivo antes de moverlo
+            if documento is not None:
+                documento.cerrar()
+
             if self.mover_pdf(str(pdf_path), str(destino)):
                 detalles = f"CIF: {cif_proveedor}, Fecha: {fecha_factura}, NumFactura: {num_factura}"
+                if duplicado.get("fecha_factura") != fecha_normalizada:
+                    detalles += f", Indexada con fecha: {duplicado.get('fecha_factura')}"
                 self.registrar_operacion("DUPLICADO", nombre_archivo,
                                        str(pdf_path.parent), str(destino_dir), detalles)
                 print(f"  📋 Duplicado detectado: {nombre_archivo} → {destino_dir}")
@@ -439,26 +945,47 @@ class PDFOrganizer:
         else:
             # Factura nueva - organizar por fecha (mes) y proveedor
             # Extraer mes de la fecha
-            mes = self._extraer_mes_de_fecha(fecha_factura)
+            mes = self._extraer_mes_de_fecha(fecha_normalizada)
 
             # Usar año del índice para la organización de archivos
             destino_dir = self.directorio_procesadas / str(año_indice) / mes / nombre_proveedor_carpeta
             destino = destino_dir / nombre_archivo
 
-            if self.mover_pdf(str(pdf_path), str(destino)):
+            # Con documento compartido, los hashes salen de los bytes ya leídos y se libera
+            # el archivo; si no, se calculan en la misma pasada que lo mueve
+            resumenes = {}
+            hashes = None
+            if documento is None:
+                resumenes = self._nuevos_resumenes()
+            else:
+                hashes = {"hash_md5": documento.hash_md5}
+                if self.hash_adicional:
+                    hashes[f"hash_{self.hash_adicional}"] = hashlib.new(self.hash_adicional,
+                                                                        documento.contenido).hexdigest()
+                documento.cerrar()
+
+            if self.mover_pdf(str(pdf_path), str(destino), resumenes=list(resumenes.values())):
+                if hashes is None:
+                    hashes = {clave: resumen.hexdigest() for clave, resumen in resumenes.items()}
+
                 # Agregar al índice usando trimestre/año calculados desde fecha (sin lógica de negocio)
                 info_factura = {
                     "cif_proveedor": cif_proveedor,
-                    "fecha_factura": self._normalizar_fecha(fecha_factura),
+                    "fecha_factura": fecha_normalizada,
                     "num_factura": num_factura,
                     "nombre_archivo": nombre_archivo,
                     "ruta_completa": str(destino),
                     "fecha_procesamiento": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "hash_md5": self.calcular_hash_md5(str(destino))
+                    **hashes
                 }
-                self.agregar_al_indice(año_indice_int, trimestre_indice, info_factura)
-
                 detalles = f"Proveedor: {nombre_proveedor}, CIF: {cif_proveedor}"
+                if not self.agregar_al_indice(año_indice_int, trimestre_indice, info_factura):
+                    # No debería ocurrir (la clave se comprueba antes de mover), pero si el
+                    # índice rechaza el alta el PDF queda sin entrada y hay que saberlo
+                    detalles += ", NO INDEXADA: ya existe una factura con la misma clave"
+                    print(f"⚠️ ADVERTENCIA: {nombre_archivo} no se ha añadido al índice: ya existe "
+                          f"una factura con CIF {cif_proveedor}, NumFactura {num_factura} y fecha {fecha_factura}")
+
                 self.registrar_operacion("EXITO", nombre_archivo,
                                        str(pdf_path.parent), str(destino_dir), detalles)
                 print(f"  ✓ Organizado: {nombre_archivo} → {destino_dir}")
@@ -466,7 +993,8 @@ class PDFOrganizer:
 
         return str(pdf_path)
 
-    def _organizar_pdf_error(self, pdf_path: Path, resultado: Optional[Dict]) -> str:
+    def _organizar_pdf_error(self, pdf_path: Path, resultado: Optional[Union[RegistroFactura, Dict]],
+                             documento: Optional[DocumentoPDF] = None) -> str:
         """
         Organiza un PDF que tuvo error en la extracción.
         Clasifica según si parece una factura o no.
@@ -474,7 +1002,7 @@ class PDFOrganizer:
         nombre_archivo = pdf_path.name
 
         # Analizar contenido para clasificar
-        es_probable_factura, num_palabras = self.analizar_contenido_pdf(str(pdf_path))
+        es_probable_factura, num_palabras = self.analizar_contenido_pdf(str(pdf_path), documento=documento)
 
         if es_probable_factura:
             # Parece una factura pero sin plantilla
@@ -491,6 +1019,10 @@ class PDFOrganizer:
             detalles = f"Solo {num_palabras} palabras clave encontradas"
             print(f"  ❌ Probablemente no es factura: {nombre_archivo} → {destino_dir}")
 
+        # Liberar el archivo antes de moverlo (el análisis ya está hecho)
+        if documento is not None:
+            documento.cerrar()
+
         if self.mover_pdf(str(pdf_path), str(destino)):
             self.registrar_operacion(tipo_log, nombre_archivo,
                                    str(pdf_path.parent), str(destino_dir), detalles)
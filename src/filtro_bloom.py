@@ -0,0 +1,111 @@
+"""
+Filtro de Bloom persistente para comprobar pertenencia con una sola consulta.
+
+Se usa como filtro global de facturas indexadas (clave CIF + NumFactura): si el
+filtro dice que una clave no está, seguro que no está; si dice que sí, puede ser
+un falso positivo y hay que confirmarlo en el índice completo.
+
+Formato del archivo: una línea JSON de cabecera (parámetros, número de
+elementos y firma del estado de los índices con que se construyó) seguida de
+los bits del filtro.
+"""
+
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+
+class FiltroBloom:
+    """
+    Conjunto probabilístico sin falsos negativos y con tasa de falsos positivos acotada.
+    """
+
+    VERSION = 1
+
+    def __init__(self, capacidad: int = 100_000, tasa_falsos_positivos: float = 0.001):
+        """
+        Args:
+            capacidad: Número de elementos para el que se dimensiona el filtro
+            tasa_falsos_positivos: Probabilidad de falso positivo con el filtro lleno
+        """
+        self.capacidad = max(1, capacidad)
+        self.tasa_falsos_positivos = tasa_falsos_positivos
+        self.num_bits = max(8, math.ceil(-self.capacidad * math.log(tasa_falsos_positivos) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.elementos = 0
+        self.firma = ""
+
+    def _posiciones(self, clave: str):
+        # Doble hash: k posiciones a partir de dos enteros de 64 bits
+        resumen = hashlib.blake2b(clave.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], 'little')
+        h2 = int.from_bytes(resumen[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def añadir(self, clave: str):
+        """Añade una clave al filtro."""
+        for posicion in self._posiciones(clave):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, clave: str) -> bool:
+        return all(self.bits[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(clave))
+
+    @property
+    def saturado(self) -> bool:
+        """True si tiene más elementos que su capacidad (la tasa de falsos positivos ya no se cumple)."""
+        return self.elementos > self.capacidad
+
+    def guardar(self, ruta_archivo: str):
+        """Escribe el filtro en disco (archivo temporal + renombrado)."""
+        ruta = Path(ruta_archivo)
+        cabecera = {
+            'version': self.VERSION,
+            'capacidad': self.capacidad,
+            'tasa_falsos_positivos': self.tasa_falsos_positivos,
+            'num_bits': self.num_bits,
+            'num_hashes': self.num_hashes,
+            'elementos': self.elementos,
+            'firma': self.firma,
+        }
+        temporal = ruta.with_suffix('.tmp')
+        try:
+            with open(temporal, 'wb') as f:
+                f.write(json.dumps(cabecera).encode('utf-8') + b"\n")
+                f.write(self.bits)
+            os.replace(temporal, ruta)
+        except IOError as e:
+            print(f"⚠️ ADVERTENCIA: No se pudo guardar el filtro {ruta}: {e}")
+
+    @classmethod
+    def cargar(cls, ruta_archivo: str) -> Optional['FiltroBloom']:
+        """
+        Lee un filtro guardado con guardar().
+
+        Returns:
+            Optional[FiltroBloom]: El filtro, o None si no existe o no es válido
+        """
+        try:
+            with open(ruta_archivo, 'rb') as f:
+                cabecera = json.loads(f.readline().decode('utf-8'))
+                bits = f.read()
+        except (IOError, ValueError):
+            return None
+
+        if cabecera.get('version') != cls.VERSION:
+            return None
+
+        filtro = cls(cabecera['capacidad'], cabecera['tasa_falsos_positivos'])
+        if (filtro.num_bits, filtro.num_hashes) != (cabecera['num_bits'], cabecera['num_hashes']) \
+                or len(bits) != len(filtro.bits):
+            return None
+
+        filtro.bits = bytearray(bits)
+        filtro.elementos = cabecera['elementos']
+        filtro.firma = cabecera.get('firma', "")
+        return filtro
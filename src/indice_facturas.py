@@ -0,0 +1,277 @@
+"""
+Índice de facturas procesadas en SQLite.
+
+Sustituye a los archivos indice_YYYY_XT.json como almacén de consulta: la
+detección de duplicados es una búsqueda por clave única (cif_proveedor,
+num_factura, fecha_factura) y las altas se confirman en lotes dentro de una
+transacción, en lugar de releer y reescribir el JSON del trimestre por factura.
+
+Estructura (documentos/procesados/indices/indices.db):
+- facturas: año, trimestre, cif_proveedor, fecha_factura (YYYY-MM-DD), num_factura,
+            hash_md5 y la entrada completa del índice en JSON (datos)
+- meta:     clave/valor (p.ej. si ya se migraron los índices JSON)
+
+La primera vez que se crea la base de datos se importan los índices JSON
+existentes. Los JSON se siguen generando (exportar_json) por compatibilidad.
+"""
+
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS facturas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    año INTEGER NOT NULL,
+    trimestre TEXT NOT NULL,
+    cif_proveedor TEXT NOT NULL,
+    fecha_factura TEXT NOT NULL,
+    num_factura TEXT NOT NULL,
+    hash_md5 TEXT,
+    datos TEXT NOT NULL,
+    UNIQUE (cif_proveedor, num_factura, fecha_factura)
+);
+CREATE INDEX IF NOT EXISTS idx_facturas_trimestre ON facturas (año, trimestre);
+CREATE INDEX IF NOT EXISTS idx_facturas_hash ON facturas (hash_md5);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+SQL_INSERTAR = ("INSERT OR IGNORE INTO facturas "
+                "(año, trimestre, cif_proveedor, fecha_factura, num_factura, hash_md5, datos) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+# Nombre de los índices JSON por trimestre: indice_2025_1T.json
+PATRON_INDICE_JSON = re.compile(r'^indice_(\d+)_([1-4]T)\.json$')
+
+
+class IndiceSQLite:
+    """
+    Índice de facturas por trimestre almacenado en SQLite.
+
+    Las altas se acumulan en una transacción abierta que se confirma cada
+    `tamaño_lote` facturas y al llamar a confirmar(); las consultas hechas con
+    la misma conexión ya ven las altas pendientes de confirmar.
+    """
+
+    TAMAÑO_LOTE = 100
+
+    def __init__(self, ruta_db: str, directorio_json: Optional[str] = None,
+                 normalizar_fecha: Callable[[str], str] = lambda fecha: fecha or "",
+                 tamaño_lote: int = TAMAÑO_LOTE):
+        """
+        Args:
+            ruta_db: Ruta del archivo SQLite
+            directorio_json: Carpeta de los índices JSON a migrar al crear la base de datos
+            normalizar_fecha: Convierte la fecha de una entrada al formato de la clave (YYYY-MM-DD)
+            tamaño_lote: Altas por transacción
+        """
+        self.ruta_db = Path(ruta_db)
+        self.directorio_json = Path(directorio_json) if directorio_json is not None else None
+        self.normalizar_fecha = normalizar_fecha
+        self.tamaño_lote = tamaño_lote
+        self.trimestres_modificados: Set[Tuple[int, str]] = set()
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._pendientes = 0
+
+    @property
+    def conexion(self) -> sqlite3.Connection:
+        """Conexión abierta la primera vez que se usa (con migración inicial si procede)."""
+        if self._conexion is None:
+            self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+            self._conexion = sqlite3.connect(str(self.ruta_db))
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.executescript(ESQUEMA)
+            self._migrar_si_procede()
+        return self._conexion
+
+    @staticmethod
+    def _fila_a_entrada(fila) -> Dict:
+        return json.loads(fila[0])
+
+    def buscar(self, cif_proveedor: str, fecha_factura: str, num_factura: str,
+               año: int, trimestre: str) -> Optional[Dict]:
+        """
+        Busca una factura por su clave dentro de un trimestre.
+
+        Args:
+            cif_proveedor: CIF del proveedor
+            fecha_factura: Fecha de la factura (se normaliza con normalizar_fecha)
+            num_factura: Número de factura
+            año: Año del trimestre
+            trimestre: Trimestre (1T, 2T, 3T, 4T)
+
+        Returns:
+            Optional[Dict]: Entrada del índice tal como se guardó, o None
+        """
+        fila = self.conexion.execute(
+            "SELECT datos FROM facturas WHERE cif_proveedor = ? AND num_factura = ? "
+            "AND fecha_factura = ? AND año = ? AND trimestre = ?",
+            (cif_proveedor or "", num_factura or "", self.normalizar_fecha(fecha_factura or "") or "",
+             año, trimestre)
+        ).fetchone()
+        return self._fila_a_entrada(fila) if fila else None
+
+    def buscar_clave(self, cif_proveedor: str, fecha_factura: str, num_factura: str) -> Optional[Dict]:
+        """
+        Busca una factura por su clave única en todos los trimestres.
+
+        Returns:
+            Optional[Dict]: Entrada del índice que ocupa la clave, o None
+        """
+        fila = self.conexion.execute(
+            "SELECT datos FROM facturas WHERE cif_proveedor = ? AND num_factura = ? AND fecha_factura = ?",
+            (cif_proveedor or "", num_factura or "", self.normalizar_fecha(fecha_factura or "") or "")
+        ).fetchone()
+        return self._fila_a_entrada(fila) if fila else None
+
+    def buscar_por_cif_num(self, cif_proveedor: str, num_factura: str) -> List[Tuple[int, str, Dict]]:
+        """
+        Busca una factura por CIF y número en todos los trimestres.
+
+        Returns:
+            List[Tuple[int, str, Dict]]: (año, trimestre, entrada) de cada coincidencia
+        """
+        filas = self.conexion.execute(
+            "SELECT año, trimestre, datos FROM facturas WHERE cif_proveedor = ? AND num_factura = ? "
+            "ORDER BY id",
+            (cif_proveedor or "", num_factura or "")
+        )
+        return [(año, trimestre, json.loads(datos)) for año, trimestre, datos in filas]
+
+    def buscar_por_hash(self, hash_md5: str) -> Optional[Dict]:
+        """
+        Busca la primera factura indexada con ese hash de contenido.
+
+        Returns:
+            Optional[Dict]: Entrada del índice tal como se guardó, o None
+        """
+        fila = self.conexion.execute(
+            "SELECT datos FROM facturas WHERE hash_md5 = ? ORDER BY id LIMIT 1", (hash_md5,)
+        ).fetchone()
+        return self._fila_a_entrada(fila) if fila else None
+
+    def agregar(self, año: int, trimestre: str, info_factura: Dict) -> bool:
+        """
+        Da de alta una factura (se confirma con el lote o al llamar a confirmar()).
+
+        Args:
+            año: Año del trimestre
+            trimestre: Trimestre (1T, 2T, 3T, 4T)
+            info_factura: Entrada del índice (cif_proveedor, fecha_factura, num_factura, hash_md5...)
+
+        Returns:
+            bool: False si ya existía una factura con la misma clave
+        """
+        cursor = self.conexion.execute(
+            SQL_INSERTAR, self._valores(año, trimestre, info_factura)
+        )
+        self.trimestres_modificados.add((año, trimestre))
+        self._pendientes += 1
+        if self._pendientes >= self.tamaño_lote:
+            self.confirmar()
+        return cursor.rowcount > 0
+
+    def _valores(self, año: int, trimestre: str, info_factura: Dict) -> tuple:
+        fecha_normalizada = self.normalizar_fecha(info_factura.get("fecha_factura") or "")
+        return (año, trimestre, info_factura.get("cif_proveedor") or "", fecha_normalizada or "",
+                info_factura.get("num_factura") or "", info_factura.get("hash_md5"),
+                json.dumps(info_factura, ensure_ascii=False))
+
+    def facturas_trimestre(self, año: int, trimestre: str) -> List[Dict]:
+        """
+        Devuelve las entradas de un trimestre en orden de alta.
+        """
+        filas = self.conexion.execute(
+            "SELECT datos FROM facturas WHERE año = ? AND trimestre = ? ORDER BY id",
+            (año, trimestre)
+        )
+        return [self._fila_a_entrada(fila) for fila in filas]
+
+    def reemplazar_trimestre(self, año: int, trimestre: str, entradas: List[Dict]):
+        """
+        Sustituye todas las entradas de un trimestre en una única transacción.
+
+        Args:
+            año: Año del trimestre
+            trimestre: Trimestre (1T, 2T, 3T, 4T)
+            entradas: Nuevas entradas del índice
+        """
+        with self.conexion:
+            self.conexion.execute("DELETE FROM facturas WHERE año = ? AND trimestre = ?", (año, trimestre))
+            self.conexion.executemany(
+                SQL_INSERTAR, [self._valores(año, trimestre, entrada) for entrada in entradas]
+            )
+        self._pendientes = 0
+        self.trimestres_modificados.add((año, trimestre))
+
+    def confirmar(self):
+        """Confirma las altas pendientes."""
+        if self._conexion is not None and self._pendientes:
+            self._conexion.commit()
+        self._pendientes = 0
+
+    def exportar_json(self, año: int, trimestre: str, ruta_archivo: str):
+        """
+        Escribe el índice de un trimestre en el formato JSON clásico (temporal + renombrado).
+
+        Args:
+            año: Año del trimestre
+            trimestre: Trimestre (1T, 2T, 3T, 4T)
+            ruta_archivo: Ruta del indice_YYYY_XT.json
+        """
+        datos = {"trimestre": trimestre, "año": año, "facturas": self.facturas_trimestre(año, trimestre)}
+        ruta = Path(ruta_archivo)
+        temporal = ruta.with_suffix('.tmp')
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, indent=2, ensure_ascii=False)
+            os.replace(temporal, ruta)
+        except IOError as e:
+            print(f"❌ ERROR: No se pudo exportar índice {ruta}: {e}")
+
+    def _migrar_si_procede(self):
+        """Importa los índices JSON existentes la primera vez que se crea la base de datos."""
+        conexion = self._conexion
+        if conexion.execute("SELECT 1 FROM meta WHERE clave = 'migracion_json'").fetchone():
+            return
+
+        total = 0
+        archivos = 0
+        if self.directorio_json is not None and self.directorio_json.exists():
+            for ruta in sorted(self.directorio_json.glob("indice_*.json")):
+                coincidencia = PATRON_INDICE_JSON.match(ruta.name)
+                if not coincidencia:
+                    continue
+                try:
+                    with open(ruta, 'r', encoding='utf-8') as f:
+                        indice = json.load(f)
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"⚠️ ADVERTENCIA: Índice no migrado {ruta.name}: {e}")
+                    continue
+
+                año, trimestre = int(coincidencia.group(1)), coincidencia.group(2)
+                filas = [self._valores(año, trimestre, entrada) for entrada in indice.get("facturas", [])]
+                conexion.executemany(SQL_INSERTAR, filas)
+                total += len(filas)
+                archivos += 1
+
+        conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('migracion_json', ?)",
+                         (str(archivos),))
+        conexion.commit()
+        if archivos:
+            print(f"OK Índices migrados a SQLite: {total} facturas de {archivos} archivo(s) JSON")
+
+    def cerrar(self):
+        """Confirma lo pendiente y cierra la conexión."""
+        if self._conexion is not None:
+            self.confirmar()
+            self._conexion.close()
+            self._conexion = None
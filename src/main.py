@@ -6,12 +6,20 @@ Proporciona una interfaz de línea de comandos para ejecutar todo el workflow.
 import os
 import sys
 import argparse
-from typing import Optional, List
+from datetime import datetime
+from typing import Iterable, Optional, List
 from src.pdf_extractor import PDFExtractor
 from src.excel_exporter import ExcelExporter
+from src.vigilante import VigilanteCarpeta
+from src.volcado_registros import VolcadoRegistros
+from src.almacen_trimestral import AlmacenTrimestral
 
 
 class FacturaExtractorApp:
+    # Un lote suelto sustituiría en el dataset Parquet lo ya exportado del trimestre
+    ERROR_PARQUET_SIN_ACUMULAR = ("ERROR: Parquet se exporta con el trimestre completo; "
+                                  "no se puede usar con --sin-acumular.")
+
     def __init__(self):
         """Inicializa la aplicación principal."""
         self.pdf_extractor = None
@@ -84,16 +92,24 @@ class FacturaExtractorApp:
         except Exception as e:
             print(f"Error ejecutando editor de plantillas: {e}")
 
-    def modo_procesamiento(self, auto_export: bool = True, formato_salida: str = "todos"):
+    def modo_procesamiento(self, auto_export: bool = True, formato_salida: str = "todos",
+                           workers: int = 1, acumular: bool = True, conservar_volcado: bool = False):
         """
         Ejecuta el modo de procesamiento completo.
 
         Args:
             auto_export (bool): Si exportar automáticamente después de procesar
-            formato_salida (str): Formato de salida (excel, csv, json, todos)
+            formato_salida (str): Formato de salida (excel, csv, json, parquet, todos)
+            workers (int): Procesos para extraer en paralelo (1 = secuencial)
+            acumular (bool): Exportar el trimestre completo acumulado (True) o solo este lote
+            conservar_volcado (bool): Conservar LOTE_*.jsonl después de exportar con éxito
         """
         print("\n=== MODO: PROCESAMIENTO DE FACTURAS ===")
 
+        if auto_export and formato_salida == "parquet" and not acumular:
+            print(self.ERROR_PARQUET_SIN_ACUMULAR)
+            return False
+
         # Solicitar información fiscal al usuario
         print("\nDatos fiscales para la exportación:")
         trimestre_input = input("Ingresa el trimestre (1, 2, 3 o 4): ").strip()
@@ -128,30 +144,163 @@ class FacturaExtractorApp:
             print("   Usa el modo 'coordenadas' para crear plantillas primero.")
             return False
 
-        # Procesar facturas
+        # Procesar facturas. Cada factura y error va directamente a documentos/reportes/YYYY/XT/LOTE_*.jsonl
+        # sin quedarse en memoria: si la ejecución se interrumpe, lo procesado queda en disco
         print("\nProcesando facturas...")
-        resultados = self.pdf_extractor.procesar_directorio_facturas()
+        volcado = VolcadoRegistros(os.path.join("documentos", "reportes", año, trimestre),
+                                   f"LOTE_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        with volcado:
+            totales = volcado.consumir(self.pdf_extractor.iter_facturas(workers=workers))
 
-        if not resultados:
+        if not totales['factura']:
             print("ERROR No se procesaron facturas. Verifica que haya archivos PDF en documentos/por_procesar/")
             return False
 
-        # Mostrar estadísticas
+        # Mostrar estadísticas (se calculan según se procesa cada factura)
         stats = self.pdf_extractor.obtener_estadisticas()
         self.mostrar_estadisticas(stats)
 
         # Mostrar errores si existen
-        if self.pdf_extractor.errores:
-            print(f"\n⚠️  ERRORES DE EXTRACCIÓN: {len(self.pdf_extractor.errores)}")
+        if totales['error']:
+            print(f"\n⚠️  ERRORES DE EXTRACCIÓN: {totales['error']}")
             print("   (Ver archivo ERRORES.xlsx para detalles)")
 
-        # Exportar si está habilitado
-        if auto_export:
-            # Pasar también los errores para generar el Excel de debug
-            return self.exportar_resultados(resultados, self.pdf_extractor.errores, formato_salida)
+        if not auto_export:
+            print(f"\nRegistros del lote en: {volcado.ruta_facturas}")
+            return True
+
+        # Los reportes se generan leyendo el volcado; una vez exportado, sobra
+        exito = self.exportar_volcado(volcado, formato_salida, acumular=acumular)
+        if exito and not conservar_volcado:
+            volcado.eliminar()
+        else:
+            print(f"   Registros del lote en: {volcado.ruta_facturas}")
+        return exito
+
+    def modo_vigilar(self, trimestre: Optional[str] = None, año: Optional[str] = None,
+                     espera_estable: float = 2.0, intervalo_sondeo: float = 2.0,
+                     usar_inotify: Optional[bool] = None) -> bool:
+        """
+        Vigila documentos/por_procesar y procesa cada PDF en cuanto termina de llegar.
+
+        El extractor se crea una sola vez con las plantillas cargadas (y se
+        recargan solo si cambian en disco). Los PDFs se organizan y se registran
+        en los índices trimestrales igual que en el modo procesar, y sus registros
+        se añaden al almacén del trimestre (REGISTROS_YYYY_XT.db), de modo que el
+        siguiente 'procesar' los incluye en el informe. Se detiene con Ctrl+C.
+
+        Args:
+            trimestre (str, optional): Trimestre fijo (1-4). Si None, el trimestre en curso
+            año (str, optional): Año fijo. Si None, el año en curso
+            espera_estable (float): Segundos sin cambios para dar un PDF por completo
+            intervalo_sondeo (float): Segundos entre recorridos de la carpeta sin inotify
+            usar_inotify (bool, optional): Forzar o desactivar inotify (None = automático)
+
+        Returns:
+            bool: False si no se pudo arrancar, True al detenerse
+        """
+        print("\n=== MODO: VIGILANCIA DE FACTURAS ===")
+
+        if trimestre is not None and trimestre not in ['1', '2', '3', '4']:
+            print(f"ERROR: Trimestre '{trimestre}' no válido. Debe ser 1, 2, 3 o 4.")
+            return False
+        if año is not None and (not año.isdigit() or len(año) != 4):
+            print(f"ERROR: Año '{año}' no válido. Debe ser un año de 4 dígitos (ej: 2025).")
+            return False
+
+        self.pdf_extractor = PDFExtractor()
+
+        print("\nCargando plantillas...")
+        firma_plantillas = self._firma_plantillas_en_disco()
+        if not self.pdf_extractor.cargar_plantillas():
+            print("ERROR: No se pudieron cargar plantillas.")
+            print("   Usa el modo 'coordenadas' para crear plantillas primero.")
+            return False
+
+        directorio = self.pdf_extractor.directorio_facturas
+        os.makedirs(directorio, exist_ok=True)
+
+        with VigilanteCarpeta(directorio, espera_estable=espera_estable,
+                              intervalo_sondeo=intervalo_sondeo,
+                              usar_inotify=usar_inotify) as vigilante:
+            print(f"\n👀 Vigilando {directorio}/ (modo: {vigilante.modo}). Ctrl+C para detener.")
+
+            try:
+                while True:
+                    rutas = vigilante.esperar_lote()
+
+                    # Plantillas editadas mientras el vigilante está en marcha
+                    firma_actual = self._firma_plantillas_en_disco()
+                    if firma_actual != firma_plantillas:
+                        print("\nPlantillas modificadas, recargando...")
+                        self.pdf_extractor.plantillas_cargadas = {}
+                        self.pdf_extractor.versiones_plantillas = {}
+                        self.pdf_extractor.cargar_plantillas()
+                        firma_plantillas = firma_actual
+
+                    self._procesar_lote_vigilado(rutas, trimestre, año)
+            except KeyboardInterrupt:
+                print("\nVigilancia detenida.")
 
         return True
 
+    def _procesar_lote_vigilado(self, rutas: List[str], trimestre: Optional[str], año: Optional[str]):
+        """
+        Procesa un lote de PDFs recién llegados con el extractor ya preparado.
+
+        Args:
+            rutas (List[str]): PDFs completos entregados por el vigilante
+            trimestre (str, optional): Trimestre fijo (1-4) o None para el trimestre en curso
+            año (str, optional): Año fijo o None para el año en curso
+        """
+        ahora = datetime.now()
+        trimestre_lote = f"{trimestre or (ahora.month - 1) // 3 + 1}T"
+        año_lote = año or str(ahora.year)
+        self.pdf_extractor.trimestre = trimestre_lote
+        self.pdf_extractor.año = año_lote
+
+        # Los PDFs del lote salen de por_procesar: sus registros se vuelcan a disco según
+        # se producen y después se añaden al almacén del trimestre, del que los toma el
+        # informe del siguiente 'procesar'
+        directorio_reportes = os.path.join("documentos", "reportes", año_lote, trimestre_lote)
+        volcado = VolcadoRegistros(directorio_reportes, f"VIGILAR_{ahora.strftime('%Y%m%d_%H%M%S')}")
+        with volcado:
+            totales = volcado.consumir(self.pdf_extractor.iter_facturas(rutas=rutas))
+
+        print(f"\n[{ahora.strftime('%H:%M:%S')}] Lote de {len(rutas)} PDF(s): "
+              f"{totales['factura']} factura(s), {totales['error']} error(es) "
+              f"({trimestre_lote} {año_lote})")
+
+        if not (totales['factura'] or totales['error']):
+            return
+
+        almacen = AlmacenTrimestral(os.path.join(directorio_reportes,
+                                                 AlmacenTrimestral.nombre_archivo(año_lote, trimestre_lote)))
+        try:
+            almacen.añadir(volcado.iter_facturas(), volcado.iter_errores())
+        except Exception as e:
+            # El volcado se conserva: el lote no se pierde aunque no llegue al almacén
+            print(f"❌ ERROR: No se pudo añadir el lote al almacén {almacen.ruta_db}: {e}")
+            print(f"   Registros del lote en: {volcado.ruta_facturas}")
+            return
+        finally:
+            almacen.cerrar()
+
+        volcado.eliminar()
+        print(f"OK Lote añadido al almacén del trimestre: {almacen.ruta_db}")
+
+    def _firma_plantillas_en_disco(self) -> tuple:
+        """Nombre, tamaño y fecha de modificación de cada plantilla JSON (detecta cambios)."""
+        directorio = self.pdf_extractor.directorio_plantillas
+        if not os.path.exists(directorio):
+            return ()
+        firma = []
+        for archivo in sorted(os.listdir(directorio)):
+            if archivo.endswith('.json'):
+                stat = os.stat(os.path.join(directorio, archivo))
+                firma.append((archivo, stat.st_size, stat.st_mtime_ns))
+        return tuple(firma)
+
     def mostrar_estadisticas(self, stats: dict):
         """Muestra las estadísticas del procesamiento."""
         print(f"\n=== RESUMEN DEL PROCESAMIENTO ===")
@@ -166,50 +315,119 @@ class FacturaExtractorApp:
             for proveedor, data in stats['proveedores'].items():
                 print(f"{proveedor}: {data['exitosos']}/{data['total']} exitosas")
 
-    def exportar_resultados(self, resultados: List[dict], errores: List[dict] = None, formato: str = "todos") -> bool:
+    def exportar_volcado(self, volcado: VolcadoRegistros, formato: str = "todos",
+                         acumular: bool = True) -> bool:
+        """
+        Exporta los registros de un volcado leyéndolos de su archivo.
+
+        - Acumulando en el almacén del trimestre, los registros pasan del archivo
+          al almacén uno a uno y los reportes se generan con el trimestre completo.
+        - Sin acumular, CSV y JSON se escriben en streaming desde el archivo
+          (ExcelExporter.exportar_streaming). Excel y Parquet necesitan el lote
+          completo y lo leen una sola vez.
+
+        Args:
+            volcado (VolcadoRegistros): Volcado de la ejecución
+            formato (str): Formato de exportación
+            acumular (bool): Si añadir al almacén del trimestre y exportar el trimestre completo
+
+        Returns:
+            bool: True si la exportación fue exitosa
+        """
+        trimestre = self.pdf_extractor.trimestre if self.pdf_extractor else ""
+        año = self.pdf_extractor.año if self.pdf_extractor else ""
+
+        if acumular and trimestre and año:
+            return self.exportar_resultados(volcado.iter_facturas(), volcado.iter_errores(), formato,
+                                            acumular=True)
+
+        if formato not in ("csv", "json"):
+            return self.exportar_resultados(volcado.facturas(), volcado.errores(), formato, acumular=False)
+
+        print(f"\n=== EXPORTANDO RESULTADOS ===")
+        try:
+            self.exporter = ExcelExporter([], trimestre=trimestre, año=año)
+            archivos_generados = self.exporter.exportar_streaming(volcado.registros(), formatos=(formato,))
+        except Exception as e:
+            print(f"ERROR durante la exportación: {e}")
+            return False
+
+        if formato not in archivos_generados:
+            return False
+        print("\nOK Exportación completada:")
+        for tipo, ruta in archivos_generados.items():
+            print(f"   {tipo}: {ruta}")
+        return True
+
+    def exportar_resultados(self, resultados: Iterable[dict], errores: Iterable[dict] = None,
+                            formato: str = "todos", acumular: bool = True) -> bool:
         """
         Exporta los resultados en el formato especificado.
 
+        Con trimestre y año, los resultados se añaden al almacén del trimestre y se
+        exporta el trimestre completo (salvo acumular=False). En ese caso resultados
+        y errores pueden ser iteradores (p.ej. los de un volcado): se recorren una
+        sola vez al añadirlos al almacén.
+
         Args:
-            resultados (List[dict]): Datos a exportar
-            errores (List[dict]): Errores de extracción
+            resultados (Iterable[dict]): Datos a exportar
+            errores (Iterable[dict]): Errores de extracción
             formato (str): Formato de exportación
+            acumular (bool): Si añadir al almacén del trimestre y exportar el trimestre completo
 
         Returns:
             bool: True si la exportación fue exitosa
         """
         print(f"\n=== EXPORTANDO RESULTADOS ===")
 
+        if formato == "parquet" and not acumular:
+            print(self.ERROR_PARQUET_SIN_ACUMULAR)
+            return False
+
         try:
             # Obtener trimestre y año del extractor
             trimestre = self.pdf_extractor.trimestre if self.pdf_extractor else ""
             año = self.pdf_extractor.año if self.pdf_extractor else ""
 
+            if not (acumular and trimestre and año):
+                resultados, errores = list(resultados), list(errores or [])
             self.exporter = ExcelExporter(resultados, errores or [],
                                          trimestre=trimestre, año=año)
+            if acumular and trimestre and año:
+                self.exporter.acumular_en_almacen()
 
-            archivos_generados = {}
-
+            # Los formatos se escriben a la vez; uno que falle no impide los demás
+            tareas = {}
             if formato == "excel" or formato == "todos":
                 # Excel principal: solo las 9 columnas requeridas
-                archivos_generados['excel'] = self.exporter.exportar_excel_formateado()
+                tareas['excel'] = ("exportar_excel_formateado", None)
                 # Excel completo: con todos los metadatos para debugging
-                archivos_generados['excel_debug'] = self.exporter.exportar_excel_completo()
+                tareas['excel_debug'] = ("exportar_excel_completo", None)
 
             if formato == "csv" or formato == "todos":
-                archivos_generados['csv'] = self.exporter.exportar_csv()
+                tareas['csv'] = ("exportar_csv", None)
 
             if formato == "json" or formato == "todos":
-                archivos_generados['json'] = self.exporter.exportar_json()
+                tareas['json'] = ("exportar_json", None)
 
             if formato == "todos":
-                archivos_generados['excel_basico'] = self.exporter.exportar_excel_basico()
+                tareas['excel_basico'] = ("exportar_excel_basico", None)
+
+            # Parquet solo a petición: requiere pyarrow, que es opcional
+            if formato == "parquet":
+                tareas['parquet'] = ("exportar_parquet", None)
 
-            print(f"\nOK Exportación completada:")
+            archivos_generados = self.exporter.exportar_formatos(tareas)
+            fallos = self.exporter.fallos_exportacion
+
+            print("\nOK Exportación completada:" if not fallos else "\nExportación parcial:")
             for tipo, ruta in archivos_generados.items():
                 print(f"   {tipo}: {ruta}")
 
-            return True
+            for tipo, error in fallos.items():
+                print(f"ERROR exportando {tipo}: {error}")
+
+            return not fallos
 
         except Exception as e:
             print(f"ERROR durante la exportación: {e}")
@@ -239,7 +457,13 @@ class FacturaExtractorApp:
         print("4. OPCIONES AVANZADAS:")
         print("   python main.py procesar --formato excel  # Solo Excel")
         print("   python main.py procesar --formato csv    # Solo CSV")
+        print("   python main.py procesar --formato parquet # Dataset Parquet (requiere pyarrow)")
         print("   python main.py procesar --no-auto-export # Sin exportar")
+        print("   python main.py procesar --workers 8      # Extraer con 8 procesos")
+        print("   python main.py procesar --sin-acumular   # Exportar solo este lote")
+        print("   python main.py procesar --conservar-volcado # Conservar LOTE_*.jsonl tras exportar")
+        print("   python main.py vigilar                   # Procesar PDFs según llegan")
+        print("   python main.py vigilar --trimestre 1 --año 2025")
         print()
         print("5. ESTRUCTURA DE ARCHIVOS (v2.0):")
         print("   documentos/")
@@ -268,10 +492,27 @@ class FacturaExtractorApp:
 
         # Comando procesar
         parser_proc = subparsers.add_parser('procesar', help='Procesar facturas')
-        parser_proc.add_argument('--formato', choices=['excel', 'csv', 'json', 'todos'],
+        parser_proc.add_argument('--formato', choices=['excel', 'csv', 'json', 'parquet', 'todos'],
                                 default='todos', help='Formato de salida')
         parser_proc.add_argument('--no-auto-export', action='store_true',
                                 help='No exportar automáticamente')
+        parser_proc.add_argument('--workers', type=int, default=1, metavar='N',
+                                help='Procesos para extraer en paralelo (default: 1)')
+        parser_proc.add_argument('--sin-acumular', action='store_true',
+                                help='Exportar solo las facturas de esta ejecución, no el trimestre acumulado')
+        parser_proc.add_argument('--conservar-volcado', action='store_true',
+                                help='Conservar LOTE_*.jsonl después de exportar')
+
+        # Comando vigilar
+        parser_vig = subparsers.add_parser('vigilar', help='Procesar facturas según llegan a por_procesar')
+        parser_vig.add_argument('--trimestre', choices=['1', '2', '3', '4'],
+                                help='Trimestre fijo (default: trimestre en curso)')
+        parser_vig.add_argument('--año', dest='anio', metavar='AÑO',
+                                help='Año fijo (default: año en curso)')
+        parser_vig.add_argument('--espera', type=float, default=2.0, metavar='SEG',
+                                help='Segundos sin cambios para dar un PDF por completo (default: 2)')
+        parser_vig.add_argument('--sondeo', action='store_true',
+                                help='Recorrer la carpeta periódicamente en lugar de usar inotify')
 
         # Comando ayuda
         parser_help = subparsers.add_parser('ayuda', help='Mostrar guía de uso')
@@ -301,7 +542,13 @@ class FacturaExtractorApp:
 
         elif args.comando == 'procesar':
             auto_export = not args.no_auto_export
-            self.modo_procesamiento(auto_export, args.formato)
+            self.modo_procesamiento(auto_export, args.formato, workers=args.workers,
+                                    acumular=not args.sin_acumular,
+                                    conservar_volcado=args.conservar_volcado)
+
+        elif args.comando == 'vigilar':
+            self.modo_vigilar(args.trimestre, args.anio, espera_estable=args.espera,
+                              usar_inotify=False if args.sondeo else None)
 
         elif args.comando == 'ayuda':
             self.modo_ayuda()
@@ -4,14 +4,24 @@ Implementa la lógica de extracción de datos según coordenadas predefinidas.
 """
 
 import pdfplumber
+from pdfplumber.page import Page
 import json
 import pandas as pd
 import os
 import re
+import hashlib
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from src.utils.data_cleaners import DataCleaner
 from src.utils.cif import CIF
+from src.utils.indice_espacial import (extraer_texto_region, indice_de_pagina,
+                                       agrupar_regiones_solapadas)
+from src.documento_pdf import DocumentoPDF, abrir_documento
+from src.cache_huellas import CacheHuellas, calcular_huella_layout
+from src.cache_extraccion import CacheExtraccion
+from src.volcado_registros import VolcadoRegistros
+from src.estadisticas import EstadisticasExtraccion
+from src.registro_factura import RegistroFactura
 
 
 class PDFExtractor:
@@ -36,6 +46,17 @@ class PDFExtractor:
     # CIF corporativo para validar facturas del cliente
     CIF_CORPORATIVO = "E98530876"
 
+    # Tokens con forma de CIF/NIF en el texto de la página (admite separadores
+    # habituales: "B-12345678", "B 12.345.678", "12345678-Z")
+    PATRON_TOKEN_CIF = re.compile(
+        r'(?<![A-Za-z0-9])(?:[A-Z][\s.\-]?\d{2}[.\-]?\d{3}[.\-]?\d{3}'
+        r'|\d{2}[.\-]?\d{3}[.\-]?\d{3}[\s.\-]?[A-Z])(?![A-Za-z0-9])'
+    )
+
+    # Extracciones en vuelo como máximo por proceso en modo paralelo: limita la
+    # memoria ocupada por resultados pendientes de incorporar
+    EXTRACCIONES_EN_VUELO_POR_PROCESO = 4
+
     @staticmethod
     def calcular_trimestre_desde_fecha(fecha: datetime) -> int:
         """
@@ -135,7 +156,8 @@ class PDFExtractor:
 
     def __init__(self, directorio_facturas: str = "documentos/por_procesar",
                  directorio_plantillas: str = "plantillas",
-                 trimestre: str = "", año: str = "", organizar_archivos: bool = True):
+                 trimestre: str = "", año: str = "", organizar_archivos: bool = True,
+                 detectar_copias_exactas: bool = True, registro_operaciones: str = "jsonl"):
         """
         Inicializa el extractor de PDF.
 
@@ -151,15 +173,28 @@ class PDFExtractor:
             trimestre (str): Trimestre fiscal (1T, 2T, 3T, 4T)
             año (str): Año fiscal
             organizar_archivos (bool): Si True, organiza PDFs automáticamente después de procesar
+            detectar_copias_exactas (bool): Si True (y se organizan archivos), un PDF idéntico byte
+                                            a byte a una factura ya indexada va directo a duplicados
+                                            sin abrirlo ni generar registros
+            registro_operaciones (str): Formato del log de operaciones del organizador
+                                        ("jsonl", "texto" o "no", ver PDFOrganizer)
         """
         self.directorio_facturas = directorio_facturas
         self.directorio_plantillas = directorio_plantillas
         self.plantillas_cargadas = {}
+        self.plan_identificacion = None  # Regiones de identificación agrupadas (ver cargar_plantillas)
+        self.versiones_plantillas = {}  # proveedor_id -> hash MD5 del JSON de la plantilla
+        self.extracciones_desde_cache = 0
+        self.copias_exactas = 0
         self.resultados = []
         self.errores = []  # Lista separada para registrar errores de extracción
+        # Estadísticas de la última ejecución, actualizadas según se produce cada factura
+        self.estadisticas = EstadisticasExtraccion()
+        self._resultados_contados: Optional[List[Dict[str, Any]]] = None
         self.trimestre = trimestre
         self.año = año
         self.organizar_archivos = organizar_archivos
+        self.detectar_copias_exactas = detectar_copias_exactas
 
         # Inicializar organizador de archivos si está habilitado
         if self.organizar_archivos:
@@ -168,9 +203,16 @@ class PDFExtractor:
             # Ej: "documentos/por_procesar" → "documentos"
             from pathlib import Path
             directorio_base = Path(directorio_facturas).parent if "/" in directorio_facturas else "documentos"
-            self.organizador = PDFOrganizer(directorio_base=str(directorio_base))
+            self.organizador = PDFOrganizer(directorio_base=str(directorio_base), backend_indice="sqlite",
+                                            registro_operaciones=registro_operaciones)
+            # Caché de huellas de maquetación junto a los índices de facturas
+            self.cache_huellas = CacheHuellas(self.organizador.directorio_indices / "cache_huellas.json")
+            # Caché de resultados de extracción por contenido del PDF
+            self.cache_extraccion = CacheExtraccion(self.organizador.directorio_base / "procesados" / "cache_extraccion")
         else:
             self.organizador = None
+            self.cache_huellas = None
+            self.cache_extraccion = None
 
     def cargar_plantillas(self) -> bool:
         """
@@ -189,14 +231,17 @@ class PDFExtractor:
             if archivo.endswith('.json'):
                 ruta_plantilla = os.path.join(self.directorio_plantillas, archivo)
                 try:
-                    with open(ruta_plantilla, 'r', encoding='utf-8') as f:
-                        plantilla = json.load(f)
+                    with open(ruta_plantilla, 'rb') as f:
+                        contenido = f.read()
+                    plantilla = json.loads(contenido.decode('utf-8'))
 
                     # Validar estructura básica de la plantilla
                     if self.validar_plantilla(plantilla):
                         # Usar nombre de archivo sin extensión como identificador
                         proveedor_id = os.path.splitext(archivo)[0]
                         self.plantillas_cargadas[proveedor_id] = plantilla
+                        # La versión invalida las cachés si el JSON de la plantilla cambia
+                        self.versiones_plantillas[proveedor_id] = hashlib.md5(contenido).hexdigest()
                         plantillas_encontradas += 1
                         print(f"OK Plantilla cargada: {archivo} -> {plantilla.get('nombre_proveedor', proveedor_id)}")
                     else:
@@ -206,8 +251,161 @@ class PDFExtractor:
                     print(f"Error cargando plantilla {archivo}: {e}")
 
         print(f"\nTotal plantillas cargadas: {plantillas_encontradas}")
+
+        self.plan_identificacion = self._construir_plan_identificacion()
+        if plantillas_encontradas:
+            print(f"Regiones de identificación: {self.plan_identificacion['total_regiones']} únicas "
+                  f"en {len(self.plan_identificacion['grupos'])} grupo(s)")
+
         return plantillas_encontradas > 0
 
+    def _construir_plan_identificacion(self) -> Dict[str, Any]:
+        """
+        Construye el plan de identificación a partir de las plantillas cargadas.
+
+        Muchas plantillas comparten la misma región de cabecera (o regiones casi
+        iguales). El plan guarda cada región distinta una sola vez y agrupa las que
+        se solapan, para que identificar_proveedor extraiga cada región una vez por
+        página y evalúe después todas las plantillas contra los textos ya extraídos.
+
+        Returns:
+            Dict[str, Any]: Plan con:
+                - 'firma': plantillas a partir de las que se construyó
+                - 'plantillas': por plantilla, sus campos de identificación (nombre, bbox),
+                  CIF y nombre normalizados, en el orden de plantillas_cargadas
+                - 'grupos': (región envolvente, regiones) de las regiones que se solapan
+                - 'total_regiones': número de regiones distintas
+                - 'por_cif': CIF normalizado -> proveedor_id (None si varias plantillas lo comparten)
+        """
+        plantillas = []
+        regiones = []
+        vistas = set()
+        por_cif = {}
+
+        for proveedor_id, plantilla in self.plantillas_cargadas.items():
+            campos = []
+            for campo in plantilla.get('campos', []):
+                if not campo.get('es_identificacion', False):
+                    continue
+                bbox = tuple(campo.get('coordenadas') or ())
+                campos.append((campo['nombre'], bbox))
+                if bbox not in vistas:
+                    vistas.add(bbox)
+                    regiones.append(bbox)
+
+            cif_plantilla = CIF(plantilla.get('cif_proveedor', ''))
+            plantillas.append({
+                'proveedor_id': proveedor_id,
+                'campos': campos,
+                'cif': cif_plantilla.value,
+                'nombre': plantilla.get('nombre_proveedor', '').strip().lower()
+            })
+
+            # CIF compartido por varias plantillas: no sirve para elegir entre ellas
+            if cif_plantilla.is_valid():
+                por_cif[cif_plantilla.value] = None if cif_plantilla.value in por_cif else proveedor_id
+
+        # Solo se agrupan regiones bien formadas; el resto se extrae por separado
+        # (y falla igual que antes, con su mensaje de error)
+        validas = [r for r in regiones
+                   if len(r) == 4 and all(isinstance(v, (int, float)) for v in r)]
+        grupos = agrupar_regiones_solapadas(validas)
+        grupos += [(None, [r]) for r in regiones if r not in set(validas)]
+
+        return {
+            'firma': self._firma_plantillas(),
+            'plantillas': plantillas,
+            'grupos': grupos,
+            'total_regiones': len(regiones),
+            'por_cif': por_cif
+        }
+
+    def _firma_plantillas(self) -> tuple:
+        """Identifica el contenido actual de plantillas_cargadas para detectar cambios."""
+        return tuple((proveedor_id, id(plantilla)) for proveedor_id, plantilla in self.plantillas_cargadas.items())
+
+    def _obtener_plan_identificacion(self) -> Dict[str, Any]:
+        """Devuelve el plan de identificación, reconstruyéndolo si las plantillas han cambiado."""
+        if self.plan_identificacion is None or self.plan_identificacion['firma'] != self._firma_plantillas():
+            self.plan_identificacion = self._construir_plan_identificacion()
+        return self.plan_identificacion
+
+    def _buscar_proveedor_por_cif(self, texto: Optional[str], plan: Dict[str, Any]) -> Optional[str]:
+        """
+        Busca en el texto de la página CIFs de proveedor conocidos.
+
+        Solo devuelve un proveedor si en el texto aparece exactamente un CIF que
+        corresponda a una única plantilla. Si no aparece ninguno, o aparecen CIFs de
+        varias plantillas, devuelve None y la identificación sigue por coordenadas.
+
+        Args:
+            texto: Texto completo de la página
+            plan (Dict[str, Any]): Plan de identificación
+
+        Returns:
+            Optional[str]: ID del proveedor o None
+        """
+        if not isinstance(texto, str) or not plan['por_cif']:
+            return None
+
+        candidatos = set()
+        for token in self.PATRON_TOKEN_CIF.findall(texto):
+            cif = CIF(token)
+            if cif.is_valid() and cif.value in plan['por_cif']:
+                candidatos.add(plan['por_cif'][cif.value])
+
+        if len(candidatos) == 1:
+            return candidatos.pop()
+        return None
+
+    def _extractor_regiones_identificacion(self, pagina: Any, plan: Dict[str, Any]):
+        """
+        Devuelve una función que obtiene el texto de una región de identificación.
+
+        Cada grupo de regiones solapadas se resuelve la primera vez que se pide una
+        de sus regiones: se consulta la página una sola vez para la región envolvente
+        y todas las regiones del grupo se extraen de ese subconjunto de caracteres.
+        Los textos (o el error de extracción) quedan cacheados para el resto de plantillas.
+
+        Args:
+            pagina: Página de la que se extrae el texto
+            plan (Dict[str, Any]): Plan de identificación
+
+        Returns:
+            Callable: texto_region(bbox) -> str; relanza el error si la región falló
+        """
+        grupo_de_region = {}
+        for grupo in plan['grupos']:
+            for region in grupo[1]:
+                grupo_de_region[region] = grupo
+
+        textos = {}
+
+        def resolver_grupo(grupo):
+            envolvente, regiones_grupo = grupo
+            indice = None
+            if envolvente is not None and len(regiones_grupo) > 1 and isinstance(pagina, Page):
+                indice = indice_de_pagina(pagina).sub_indice(envolvente)
+
+            for region in regiones_grupo:
+                try:
+                    if indice is not None:
+                        textos[region] = indice.extraer_texto(region)
+                    else:
+                        textos[region] = extraer_texto_region(pagina, region)
+                except Exception as e:
+                    textos[region] = e
+
+        def texto_region(bbox):
+            if bbox not in textos:
+                resolver_grupo(grupo_de_region.get(bbox, (None, [bbox])))
+            texto = textos[bbox]
+            if isinstance(texto, Exception):
+                raise texto
+            return texto
+
+        return texto_region
+
     def validar_plantilla(self, plantilla: Dict) -> bool:
         """
         Valida que una plantilla tenga la estructura correcta.
@@ -249,83 +447,56 @@ class PDFExtractor:
 
         return True
 
-    def identificar_proveedor(self, ruta_pdf: str) -> Optional[str]:
+    def identificar_proveedor(self, ruta_pdf: str, documento: Optional[DocumentoPDF] = None) -> Optional[str]:
         """
         Identifica el proveedor de una factura PDF usando campos de identificación capturados.
 
         Estrategias:
-        1. Extrae CIF y Nombre de las coordenadas de identificación de cada plantilla
-        2. Compara con coincidencia del 85% para nombre (permite variaciones)
-        3. CIF debe coincidir exactamente si está presente
+        1. Consulta la caché de huellas de maquetación (documentos con layout ya visto) y
+           confirma los identificadores de la plantilla que propone
+        2. Busca en el texto de la página 1 un CIF de proveedor conocido (acceso directo)
+        3. Si no hay uno único, extrae CIF y Nombre de las coordenadas de identificación de cada plantilla
+        4. Compara con coincidencia del 85% para nombre (permite variaciones)
+        5. CIF debe coincidir exactamente si está presente
 
         Args:
             ruta_pdf (str): Ruta al archivo PDF
+            documento (DocumentoPDF, optional): Documento ya abierto a reutilizar
 
         Returns:
             Optional[str]: ID del proveedor identificado o None
         """
         try:
-            with pdfplumber.open(ruta_pdf) as pdf:
+            with abrir_documento(ruta_pdf, documento) as doc:
+                pdf = doc.pdf
                 if not pdf.pages:
                     print(f"⚠ PDF sin páginas: {os.path.basename(ruta_pdf)}")
                     return None
 
                 pagina = pdf.pages[0]
 
-                # Probar cada plantilla
-                for proveedor_id, plantilla in self.plantillas_cargadas.items():
-                    print(f"  Probando plantilla: {proveedor_id}")
-
-                    # Extraer campos de identificación de esta plantilla
-                    cif_extraido = None
-                    nombre_extraido = None
-
-                    for campo in plantilla.get('campos', []):
-                        if not campo.get('es_identificacion', False):
-                            continue
-
-                        nombre_campo = campo['nombre']
-                        coordenadas = campo['coordenadas']
-
-                        try:
-                            bbox = tuple(coordenadas)
-                            area_recortada = pagina.crop(bbox)
-                            texto = area_recortada.extract_text() or ""
-                            texto = texto.strip()
-
-                            if nombre_campo == 'CIF_Identificacion':
-                                # Sanear CIF usando el Value Object
-                                cif_obj = CIF(texto)
-                                cif_extraido = cif_obj.value
-                                print(f"    CIF extraído: {texto} -> normalizado: {cif_extraido}")
-                            elif nombre_campo == 'Nombre_Identificacion':
-                                nombre_extraido = texto.lower()
-                                print(f"    Nombre extraído: {nombre_extraido}")
-                        except Exception as e:
-                            print(f"    Error extrayendo {nombre_campo}: {e}")
-
-                    # Validar coincidencias - CUALQUIERA de las dos sirve
-                    # Sanear CIF de plantilla usando Value Object
-                    cif_plantilla_obj = CIF(plantilla.get('cif_proveedor', ''))
-                    cif_plantilla = cif_plantilla_obj.value
-                    nombre_plantilla = plantilla.get('nombre_proveedor', '').strip().lower()
-
-                    # Opción 1: Verificar CIF (debe coincidir exactamente)
-                    if cif_extraido and cif_plantilla:
-                        if cif_extraido == cif_plantilla:
-                            print(f"OK Proveedor identificado por CIF: {proveedor_id}")
+                # Documento con maquetación ya vista: solo se comprueba la plantilla de la caché.
+                # Sin huella (cabecera sin texto fijo suficiente) la caché no se consulta
+                huella = None
+                if self.cache_huellas is not None:
+                    huella = calcular_huella_layout(pagina)
+                if huella is not None:
+                    proveedor_id = self.cache_huellas.buscar(huella, self.versiones_plantillas)
+                    if proveedor_id in self.plantillas_cargadas:
+                        if self._confirmar_proveedor(doc, pagina, proveedor_id):
+                            print(f"OK Proveedor identificado por huella de maquetación: {proveedor_id}")
                             return proveedor_id
-                        else:
-                            print(f"    CIF no coincide: extraido='{cif_extraido}' vs plantilla='{cif_plantilla}'")
+                        print(f"WARN La huella de maquetación apunta a {proveedor_id} pero sus "
+                              f"identificadores no coinciden, se prueban todas las plantillas")
+                        self.cache_huellas.descartar(huella)
 
-                    # Opción 2: Verificar Nombre (85% de coincidencia)
-                    if nombre_extraido and nombre_plantilla:
-                        coincidencia = self._calcular_similitud(nombre_extraido, nombre_plantilla)
-                        print(f"    Similitud nombre: {coincidencia:.1f}%")
+                proveedor_id = self._identificar_por_plantillas(doc, pagina)
 
-                        if coincidencia >= 85.0:
-                            print(f"OK Proveedor identificado por nombre ({coincidencia:.1f}% coincidencia): {proveedor_id}")
-                            return proveedor_id
+                if proveedor_id:
+                    if self.cache_huellas is not None:
+                        self.cache_huellas.registrar(huella, proveedor_id,
+                                                     self.versiones_plantillas.get(proveedor_id))
+                    return proveedor_id
 
         except Exception as e:
             print(f"Error identificando proveedor: {e}")
@@ -333,6 +504,131 @@ class PDFExtractor:
         print(f"AVISO: No se pudo identificar proveedor para: {os.path.basename(ruta_pdf)}")
         return None
 
+    def _identificar_por_plantillas(self, doc: DocumentoPDF, pagina: Any) -> Optional[str]:
+        """
+        Identifica el proveedor probando las plantillas (CIF en la página y regiones de identificación).
+
+        Args:
+            doc (DocumentoPDF): Documento abierto
+            pagina: Primera página del PDF
+
+        Returns:
+            Optional[str]: ID del proveedor identificado o None
+        """
+        plan = self._obtener_plan_identificacion()
+
+        # Búsqueda directa: CIF de proveedor presente en el texto de la página 1
+        proveedor_id = self._buscar_proveedor_por_cif(doc.texto_pagina(0), plan)
+        if proveedor_id:
+            print(f"OK Proveedor identificado por CIF en la página: {proveedor_id}")
+            return proveedor_id
+
+        # Cada región de identificación se extrae una sola vez para todas las plantillas
+        texto_region = self._extractor_regiones_identificacion(pagina, plan)
+
+        # Probar cada plantilla
+        for entrada in plan['plantillas']:
+            print(f"  Probando plantilla: {entrada['proveedor_id']}")
+            if self._coincide_plantilla(entrada, texto_region):
+                return entrada['proveedor_id']
+
+        return None
+
+    def _confirmar_proveedor(self, doc: DocumentoPDF, pagina: Any, proveedor_id: str) -> bool:
+        """
+        Comprueba los identificadores de un proveedor propuesto por la caché de huellas.
+
+        Solo se extraen las regiones de identificación de ese proveedor, con el
+        índice espacial de la página: se acepta si coinciden (CIF exacto o nombre al
+        85%) o si su CIF es el único CIF de proveedor en esas regiones. No se extrae
+        el texto de la página completa ni se prueban las regiones de otras plantillas,
+        salvo para una plantilla sin regiones de identificación, que se confirma
+        buscando su CIF en el texto de la página 1.
+
+        Args:
+            doc (DocumentoPDF): Documento abierto
+            pagina: Primera página del PDF
+            proveedor_id (str): Proveedor asociado a la huella
+
+        Returns:
+            bool: True si la página corresponde a la plantilla del proveedor
+        """
+        plan = self._obtener_plan_identificacion()
+        entradas = [entrada for entrada in plan['plantillas'] if entrada['proveedor_id'] == proveedor_id]
+
+        if not any(entrada['campos'] for entrada in entradas):
+            return self._buscar_proveedor_por_cif(doc.texto_pagina(0), plan) == proveedor_id
+
+        textos = {}
+
+        def texto_region(bbox):
+            if bbox not in textos:
+                textos[bbox] = extraer_texto_region(pagina, bbox)
+            return textos[bbox]
+
+        if any(self._coincide_plantilla(entrada, texto_region) for entrada in entradas):
+            return True
+
+        texto_regiones = "\n".join(t for t in textos.values() if isinstance(t, str))
+        return self._buscar_proveedor_por_cif(texto_regiones, plan) == proveedor_id
+
+    def _coincide_plantilla(self, entrada: Dict[str, Any], texto_region) -> bool:
+        """
+        Compara las regiones de identificación de una plantilla con la página.
+
+        Args:
+            entrada (Dict[str, Any]): Plantilla del plan de identificación
+            texto_region: Función bbox -> texto (ver _extractor_regiones_identificacion)
+
+        Returns:
+            bool: True si coincide el CIF o el nombre del proveedor
+        """
+        proveedor_id = entrada['proveedor_id']
+
+        # Extraer campos de identificación de esta plantilla
+        cif_extraido = None
+        nombre_extraido = None
+
+        for nombre_campo, bbox in entrada['campos']:
+            try:
+                texto = texto_region(bbox) or ""
+                texto = texto.strip()
+
+                if nombre_campo == 'CIF_Identificacion':
+                    # Sanear CIF usando el Value Object
+                    cif_obj = CIF(texto)
+                    cif_extraido = cif_obj.value
+                    print(f"    CIF extraído: {texto} -> normalizado: {cif_extraido}")
+                elif nombre_campo == 'Nombre_Identificacion':
+                    nombre_extraido = texto.lower()
+                    print(f"    Nombre extraído: {nombre_extraido}")
+            except Exception as e:
+                print(f"    Error extrayendo {nombre_campo}: {e}")
+
+        # Validar coincidencias - CUALQUIERA de las dos sirve
+        # (CIF y nombre de plantilla ya normalizados en el plan)
+        cif_plantilla = entrada['cif']
+        nombre_plantilla = entrada['nombre']
+
+        # Opción 1: Verificar CIF (debe coincidir exactamente)
+        if cif_extraido and cif_plantilla:
+            if cif_extraido == cif_plantilla:
+                print(f"OK Proveedor identificado por CIF: {proveedor_id}")
+                return True
+            else:
+                print(f"    CIF no coincide: extraido='{cif_extraido}' vs plantilla='{cif_plantilla}'")
+
+        # Opción 2: Verificar Nombre (85% de coincidencia)
+        if nombre_extraido and nombre_plantilla:
+            coincidencia = self._calcular_similitud(nombre_extraido, nombre_plantilla)
+            print(f"    Similitud nombre: {coincidencia:.1f}%")
+
+            if coincidencia >= 85.0:
+                print(f"OK Proveedor identificado por nombre ({coincidencia:.1f}% coincidencia): {proveedor_id}")
+                return True
+
+        return False
+
     def _calcular_similitud(self, texto1: str, texto2: str) -> float:
         """
         Calcula el porcentaje de similitud entre dos textos.
@@ -406,8 +702,7 @@ class PDFExtractor:
                             continue
 
                         bbox = tuple(coordenadas)
-                        area_recortada = page.crop(bbox)
-                        texto = area_recortada.extract_text() or ""
+                        texto = extraer_texto_region(page, bbox) or ""
 
                         if texto:
                             # Sanear el CIF usando el Value Object
@@ -458,50 +753,54 @@ class PDFExtractor:
         Los campos auxiliares se usan para cálculos pero NO se exportan al Excel.
         Por ejemplo, "Portes" se suma a "Base" y luego se elimina.
 
+        El procesamiento de directorios trabaja con RegistroFactura y llama
+        directamente a aplicar_portes(); este método es el equivalente para un
+        diccionario suelto.
+
         Args:
             datos_extraidos (dict): Datos extraídos del PDF (pueden incluir campos auxiliares)
 
         Returns:
             dict: Datos procesados (sin campos auxiliares)
         """
-        # Si existe "Portes", sumarlo a "Base"
-        if "Portes" in datos_extraidos and datos_extraidos["Portes"]:
-            try:
-                # Convertir a float
-                base = float(datos_extraidos.get("Base", 0))
-                portes_str = str(datos_extraidos["Portes"]).strip()
+        registro = RegistroFactura(datos_extraidos, self._año_por_defecto())
+        registro.aplicar_portes()
+        return registro.como_diccionario()
 
-                # Si Portes está vacío, no hacer nada
-                if portes_str and portes_str != "":
-                    portes = float(portes_str)
+    def _año_por_defecto(self) -> Optional[int]:
+        """Año solicitado como entero (para las fechas sin año), o None si no hay."""
+        try:
+            return int(self.año)
+        except (TypeError, ValueError):
+            return None
 
-                    # Sumar solo si Portes > 0
-                    if portes > 0:
-                        nueva_base = base + portes
-                        datos_extraidos["Base"] = str(nueva_base)
-                        print(f"  ℹ️  Base ajustada: {base} + {portes} (Portes) = {nueva_base}")
-            except (ValueError, TypeError) as e:
-                print(f"  ⚠️  No se pudo sumar Portes a Base: {e}")
+    def _aplicar_reglas_asignacion_trimestre_excel(self, datos_factura: Dict[str, Any]) -> None:
+        """
+        Aplica las reglas de negocio para asignar trimestre/año en la exportación Excel.
 
-        # Eliminar campos auxiliares antes de exportar
-        if "Portes" in datos_extraidos:
-            del datos_extraidos["Portes"]
+        Versión para un diccionario de factura de _asignar_trimestre_excel.
+        Modifica el diccionario datos_factura in-place.
 
-        return datos_extraidos
+        Args:
+            datos_factura (Dict[str, Any]): Diccionario con los datos de la factura
+        """
+        registro = RegistroFactura(datos_factura, self._año_por_defecto())
+        self._asignar_trimestre_excel(registro)
+        datos_factura.update(registro.como_diccionario())
 
-    def _aplicar_reglas_asignacion_trimestre_excel(self, datos_factura: Dict[str, Any]) -> None:
+    def _asignar_trimestre_excel(self, registro: RegistroFactura) -> None:
         """
         Aplica las reglas de negocio para asignar trimestre/año en la exportación Excel.
 
         IMPORTANTE: Esta función modifica Trimestre y Año SOLO para el Excel según
         reglas de negocio complejas. NO afecta a índices ni organización de archivos.
 
-        Modifica el diccionario datos_factura in-place:
-        - Actualiza campos Trimestre y Año según la lógica de negocio para Excel
-        - Si la factura debe excluirse, añade campo _Error
+        Modifica el registro in-place:
+        - Actualiza trimestre y año según la lógica de negocio para Excel
+        - Si la factura debe excluirse, añade el metadato _Error
 
         Args:
-            datos_factura (Dict[str, Any]): Diccionario con los datos de la factura
+            registro (RegistroFactura): Factura con la fecha ya interpretada
         """
         try:
             # Parsear el trimestre del usuario (de "1T" a 1)
@@ -509,13 +808,13 @@ class PDFExtractor:
             año_usuario = int(self.año)
 
             # Obtener la fecha de factura
-            fecha_factura_str = datos_factura.get('FechaFactura', '')
-            if not fecha_factura_str or fecha_factura_str == "ERROR" or fecha_factura_str == "":
+            fecha_factura_str = registro.texto_fecha_factura
+            if not fecha_factura_str or fecha_factura_str == "ERROR":
                 print(f"  WARN: No se pudo determinar trimestre - FechaFactura no válida")
                 return
 
-            # Parsear la fecha de factura a datetime
-            fecha_factura = self._parsear_fecha_a_datetime(fecha_factura_str, año_usuario)
+            # La fecha se interpretó al crear el registro
+            fecha_factura = registro.fecha_factura
             if not fecha_factura:
                 print(f"  WARN: No se pudo parsear FechaFactura: {fecha_factura_str}")
                 return
@@ -526,73 +825,28 @@ class PDFExtractor:
             if resultado is None:
                 # La factura debe excluirse (año diferente y no cumple caso especial T1)
                 motivo = f"Factura de {fecha_factura.year} excluida - no corresponde al período solicitado ({self.trimestre} {self.año})"
-                datos_factura['_Error'] = motivo
-                datos_factura['_Motivo_Rechazo'] = motivo
+                registro.metadatos['_Error'] = motivo
+                registro.metadatos['_Motivo_Rechazo'] = motivo
                 print(f"  WARN: {motivo}")
             else:
                 # Actualizar trimestre y año según la lógica
                 trimestre_asignado, año_asignado = resultado
-                datos_factura['Trimestre'] = self.formatear_trimestre(trimestre_asignado)
-                datos_factura['Año'] = str(año_asignado)
-                print(f"  Trimestre asignado: {datos_factura['Trimestre']} {datos_factura['Año']}")
+                registro.trimestre = self.formatear_trimestre(trimestre_asignado)
+                registro.año = str(año_asignado)
+                print(f"  Trimestre asignado: {registro.trimestre} {registro.año}")
 
         except Exception as e:
             print(f"  Error aplicando lógica de trimestres: {e}")
 
-    def _parsear_fecha_a_datetime(self, fecha_str: str, año_default: int) -> Optional[datetime]:
-        """
-        Parsea una fecha en formato string a datetime.
-
-        Soporta formatos como: "15/01/2025", "15/01", "15-01-2025", etc.
-        Si no tiene año, usa el año_default.
-
-        Args:
-            fecha_str (str): Fecha en formato string
-            año_default (int): Año a usar si la fecha no lo tiene
-
-        Returns:
-            Optional[datetime]: Fecha parseada o None si hay error
-        """
-        if not fecha_str:
-            return None
-
-        # Limpiar la fecha
-        fecha_str = fecha_str.strip()
-
-        # Intentar varios formatos
-        formatos = [
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%d.%m.%Y',
-            '%d/%m/%y',
-            '%d-%m-%y',
-            '%d/%m',  # Sin año
-            '%d-%m',  # Sin año
-        ]
-
-        for formato in formatos:
-            try:
-                fecha = datetime.strptime(fecha_str, formato)
-                # Si el formato no incluye año, usar el año default
-                if formato in ['%d/%m', '%d-%m']:
-                    fecha = fecha.replace(year=año_default)
-                # Si el año es de 2 dígitos y es > 50, asumir 19xx, sino 20xx
-                elif formato in ['%d/%m/%y', '%d-%m-%y']:
-                    if fecha.year > 2050:
-                        fecha = fecha.replace(year=fecha.year - 100)
-                return fecha
-            except ValueError:
-                continue
-
-        return None
-
-    def extraer_datos_factura(self, ruta_pdf: str, proveedor_id: str) -> Dict[str, Any]:
+    def extraer_datos_factura(self, ruta_pdf: str, proveedor_id: str,
+                              documento: Optional[DocumentoPDF] = None) -> Dict[str, Any]:
         """
         Extrae datos de una factura usando su plantilla correspondiente.
 
         Args:
             ruta_pdf (str): Ruta al archivo PDF
             proveedor_id (str): ID del proveedor
+            documento (DocumentoPDF, optional): Documento ya abierto a reutilizar
 
         Returns:
             Dict[str, Any]: Datos extraídos de la factura
@@ -623,7 +877,8 @@ class PDFExtractor:
         datos_factura['_Fecha_Procesamiento'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         try:
-            with pdfplumber.open(ruta_pdf) as pdf:
+            with abrir_documento(ruta_pdf, documento) as doc:
+                pdf = doc.pdf
                 if not pdf.pages:
                     raise Exception("PDF sin páginas")
 
@@ -640,8 +895,7 @@ class PDFExtractor:
                     try:
                         # Extraer texto usando coordenadas (bbox)
                         bbox = tuple(coordenadas)  # (x1, y1, x2, y2)
-                        area_recortada = pagina.crop(bbox)
-                        texto_extraido = area_recortada.extract_text()
+                        texto_extraido = extraer_texto_region(pagina, bbox)
 
                         # Limpiar y procesar según tipo
                         valor_procesado = self.procesar_campo(texto_extraido, tipo_campo)
@@ -755,146 +1009,482 @@ class PDFExtractor:
         """Limpia y normaliza campos numéricos. Usa DataCleaner.clean_numeric()."""
         return DataCleaner.clean_numeric(texto)
 
-    def procesar_directorio_facturas(self) -> List[Dict[str, Any]]:
+    def procesar_directorio_facturas(self, workers: int = 1,
+                                     volcado: Optional[VolcadoRegistros] = None) -> List[Dict[str, Any]]:
         """
         Procesa todas las facturas PDF en el directorio.
 
+        Con workers > 1 la identificación y la extracción (trabajo CPU de pdfminer)
+        se reparten en un pool de procesos. El proceso principal incorpora los
+        resultados en el mismo orden que el modo secuencial, aplica la detección de
+        duplicados y organiza los PDFs, por lo que la salida es idéntica.
+
+        Acumula en memoria todas las facturas (self.resultados) y errores
+        (self.errores); para lotes muy grandes usar iter_facturas(). Con un
+        volcado, cada registro se añade además a su archivo en cuanto se produce,
+        de modo que una ejecución interrumpida conserva lo procesado.
+
+        Args:
+            workers (int): Número de procesos para extraer en paralelo (1 = secuencial)
+            volcado (VolcadoRegistros, optional): Volcado incremental de facturas y errores
+
         Returns:
             List[Dict[str, Any]]: Lista de datos extraídos de todas las facturas
         """
+        resultados = []
+
+        registros = self.iter_facturas(workers=workers)
+        if volcado is not None:
+            registros = volcado.volcar(registros)
+
+        for tipo, registro in registros:
+            if tipo == 'factura':
+                resultados.append(registro)
+            else:
+                self.errores.append(registro)
+
+        self.resultados = resultados
+        self._resultados_contados = resultados
+        return resultados
+
+    def iter_facturas(self, workers: int = 1,
+                      rutas: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Procesa el directorio de facturas entregando cada registro en cuanto se produce.
+
+        Genera tuplas ('factura', datos) y ('error', registro_error) archivo a
+        archivo, en el mismo orden que procesar_directorio_facturas. No acumula
+        nada en self.resultados ni en self.errores, por lo que la memoria no crece
+        con el número de PDFs (salvo las claves para detectar duplicados).
+
+        Dentro del extractor (duplicados, organizador) las facturas son
+        RegistroFactura; se entregan como diccionario (como_diccionario()).
+
+        Ejemplo:
+            exporter.exportar_csv_streaming(extractor.iter_facturas())
+
+        Args:
+            workers (int): Número de procesos para extraer en paralelo (1 = secuencial)
+            rutas (List[str], optional): PDFs concretos a procesar (por defecto, todos los
+                                         del directorio de facturas)
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: ('factura' | 'error', registro)
+        """
+        self.estadisticas = EstadisticasExtraccion()
+        rutas = self._listar_pdfs_pendientes() if rutas is None else sorted(rutas)
+        if not rutas:
+            return
+
+        print(f"\n=== PROCESANDO {len(rutas)} FACTURAS ===")
+
+        # Set para detectar duplicados: (CIF, NumFactura, FechaFactura)
+        facturas_procesadas = set()
+        self.extracciones_desde_cache = 0
+        self.copias_exactas = 0
+        total_facturas = 0
+        workers = min(max(1, workers or 1), len(rutas))
+
+        if workers > 1:
+            print(f"Modo paralelo: {workers} procesos")
+            extracciones = self._procesar_en_paralelo(rutas, workers)
+        else:
+            extracciones = self._procesar_en_secuencia(rutas)
+
+        try:
+            for documento, extraccion, errores in extracciones:
+                facturas = []
+                inicio = len(self.errores)
+                self._incorporar_extraccion(extraccion, documento, facturas, facturas_procesadas)
+
+                # Los errores se entregan al consumidor en lugar de quedarse en self.errores
+                errores.extend(self.errores[inicio:])
+                del self.errores[inicio:]
+
+                total_facturas += len(facturas)
+                for registro in facturas:
+                    datos = registro.como_diccionario()
+                    self.estadisticas.añadir(datos)
+                    yield 'factura', datos
+                for error_registro in errores:
+                    yield 'error', error_registro
+
+            print(f"\n=== PROCESAMIENTO COMPLETADO ===")
+            print(f"Total facturas procesadas: {total_facturas}")
+            if self.copias_exactas:
+                print(f"Copias exactas de facturas ya indexadas (sin analizar): {self.copias_exactas}")
+        finally:
+            # También si el consumidor abandona el generador a medias
+            extracciones.close()
+            self._finalizar_procesamiento(len(rutas))
+
+    def _listar_pdfs_pendientes(self) -> List[str]:
+        """
+        Lista los PDFs del directorio de facturas en orden estable.
+
+        Returns:
+            List[str]: Rutas completas ordenadas por nombre (vacía si no hay PDFs)
+        """
         if not os.path.exists(self.directorio_facturas):
             print(f"Error: Directorio de facturas no existe: {self.directorio_facturas}")
             return []
 
-        archivos_pdf = [f for f in os.listdir(self.directorio_facturas) if f.lower().endswith('.pdf')]
+        # Orden estable: el resultado no depende del orden que devuelva el sistema de archivos
+        archivos_pdf = sorted(f for f in os.listdir(self.directorio_facturas) if f.lower().endswith('.pdf'))
 
         if not archivos_pdf:
             print(f"No se encontraron archivos PDF en: {self.directorio_facturas}")
             return []
 
-        print(f"\n=== PROCESANDO {len(archivos_pdf)} FACTURAS ===")
+        return [os.path.join(self.directorio_facturas, archivo_pdf) for archivo_pdf in archivos_pdf]
 
-        resultados = []
-        # Set para detectar duplicados: (CIF, NumFactura, FechaFactura)
-        facturas_procesadas = set()
+    def _finalizar_procesamiento(self, total_pdfs: int):
+        """
+        Confirma los índices del organizador, persiste la caché de huellas y aplica
+        el límite de tamaño de la caché de extracción.
 
-        for archivo_pdf in archivos_pdf:
-            ruta_completa = os.path.join(self.directorio_facturas, archivo_pdf)
-            print(f"\nProcesando: {archivo_pdf}")
+        Args:
+            total_pdfs (int): Número de PDFs de la ejecución (para el resumen)
+        """
+        if self.organizador is not None:
+            self.organizador.finalizar()
 
-            # Identificar proveedor
-            proveedor_id = self.identificar_proveedor(ruta_completa)
+        if self.cache_huellas is not None:
+            self.cache_huellas.guardar()
+            print(f"Caché de huellas: {self.cache_huellas.aciertos} aciertos, "
+                  f"{self.cache_huellas.fallos} fallos (acumulado)")
 
-            if proveedor_id:
-                try:
-                    # Usar método multipágina que extrae de la última página de cada factura
-                    lista_datos = self.extraer_datos_factura_multipagina(ruta_completa, proveedor_id)
-
-                    # Procesar cada factura extraída del PDF
-                    for datos in lista_datos:
-                        # Procesar campos auxiliares (ej: sumar Portes a Base)
-                        datos = self._procesar_campos_auxiliares(datos)
-
-                        # Verificar duplicados usando CIF + NumFactura + FechaFactura
-                        clave_duplicado = (
-                            datos.get('CIF', ''),
-                            datos.get('NumFactura', ''),
-                            datos.get('FechaFactura', '')
-                        )
-
-                        if clave_duplicado in facturas_procesadas:
-                            print(f"WARN Factura duplicada detectada (CIF: {datos.get('CIF')}, Num: {datos.get('NumFactura')}, Fecha: {datos.get('FechaFactura')})")
-                            # Marcar como duplicado en metadatos
-                            datos['_Duplicado'] = True
-                            datos['_Motivo_Duplicado'] = f"Ya existe factura con mismo CIF, NumFactura y FechaFactura"
-                        else:
-                            facturas_procesadas.add(clave_duplicado)
-                            datos['_Duplicado'] = False
+        if self.cache_extraccion is not None:
+            eliminadas = self.cache_extraccion.aplicar_limite()
+            print(f"Caché de extracción: {self.extracciones_desde_cache}/{total_pdfs} PDFs recuperados"
+                  + (f", {eliminadas} entradas antiguas eliminadas" if eliminadas else ""))
 
-                        resultados.append(datos)
+    def _procesar_en_secuencia(self, rutas: List[str]):
+        """
+        Extrae los PDFs uno a uno en este proceso.
 
-                    print(f"OK Procesado exitosamente ({len(lista_datos)} factura(s))")
+        Args:
+            rutas (List[str]): Rutas de los PDFs en el orden de procesamiento
 
-                    # Organizar archivo PDF si está habilitado
-                    if self.organizador:
-                        # Usar los datos de la primera factura (en caso de múltiples facturas en un PDF)
-                        # Si hay error en alguna factura, usar None
-                        datos_para_organizar = lista_datos[0] if lista_datos else None
-                        self.organizador.organizar_pdf(ruta_completa, datos_para_organizar)
-                except Exception as e:
-                    print(f"ERROR procesando: {e}")
-                    # Registrar en log de errores, NO en resultados
-                    error_registro = {
-                        'Archivo': archivo_pdf,
-                        'Pagina': 'N/A',
-                        'Error': f'Error al procesar factura: {str(e)}',
-                        'Proveedor': proveedor_id,
-                        'Fecha_Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    self.errores.append(error_registro)
+        Yields:
+            tuple: (documento abierto, extracción, errores registrados durante la extracción)
+        """
+        for ruta_completa in rutas:
+            print(f"\nProcesando: {os.path.basename(ruta_completa)}")
+
+            # Un único documento por archivo: se lee y parsea una sola vez y se comparte
+            # entre identificación, extracción, clasificación de errores y hash
+            with DocumentoPDF(ruta_completa) as documento:
+                existente = self._buscar_copia_exacta(documento)
+                if existente is not None:
+                    yield documento, self._extraccion_copia_exacta(existente), []
+                    continue
+
+                inicio = len(self.errores)
+                extraccion = self._extraer_documento(documento)
+                errores = self.errores[inicio:]
+                del self.errores[inicio:]
+                yield documento, extraccion, errores
+
+    def _procesar_en_paralelo(self, rutas: List[str], workers: int):
+        """
+        Extrae los PDFs en un pool de procesos y los entrega en orden.
 
-                    # Organizar PDF con error si está habilitado
-                    if self.organizador:
-                        self.organizador.organizar_pdf(ruta_completa, None)
-            else:
-                print(f"ERROR Proveedor no identificado")
-                # Registrar en log de errores, NO en resultados
-                error_registro = {
-                    'Archivo': archivo_pdf,
-                    'Pagina': 'N/A',
-                    'Error': 'Proveedor no identificado - no hay plantilla que coincida',
-                    'Proveedor': 'NO_IDENTIFICADO',
-                    'Fecha_Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                self.errores.append(error_registro)
-
-                # Organizar PDF sin proveedor identificado si está habilitado
-                if self.organizador:
-                    self.organizador.organizar_pdf(ruta_completa, None)
+        Los procesos hijos solo identifican y extraen; los errores que registran y
+        los cambios en la caché de huellas se devuelven junto a la extracción.
+        Duplicados, organización de archivos, índices y cachés se gestionan en el
+        proceso principal, archivo a archivo.
 
-        self.resultados = resultados
-        print(f"\n=== PROCESAMIENTO COMPLETADO ===")
-        print(f"Total facturas procesadas: {len(resultados)}")
+        Solo hay unas pocas extracciones en vuelo por proceso: los resultados no
+        se acumulan aunque el consumidor sea más lento que el pool.
 
-        return resultados
+        Args:
+            rutas (List[str]): Rutas de los PDFs en el orden de procesamiento
+            workers (int): Número de procesos
+
+        Yields:
+            tuple: (documento abierto, extracción, errores registrados durante la extracción)
+        """
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Cada hijo lee la caché de huellas del disco y devuelve sus cambios archivo a archivo;
+        # las entradas de la caché de extracción son archivos independientes y las escribe el hijo
+        ruta_cache_huellas = str(self.cache_huellas.ruta_archivo) if self.cache_huellas is not None else None
+        cache_extraccion = ((str(self.cache_extraccion.directorio), self.cache_extraccion.max_bytes)
+                            if self.cache_extraccion is not None else None)
+
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_inicializar_worker,
+                                 initargs=(self.directorio_facturas, self.directorio_plantillas,
+                                           self.trimestre, self.año, self.plantillas_cargadas,
+                                           self.versiones_plantillas, ruta_cache_huellas,
+                                           cache_extraccion)) as pool:
+            pendientes_de_enviar = iter(rutas)
+            en_vuelo = deque()
+
+            def enviar_siguiente():
+                # Las copias exactas de facturas ya indexadas no llegan a enviarse al pool
+                for ruta in pendientes_de_enviar:
+                    documento = DocumentoPDF(ruta)
+                    existente = self._buscar_copia_exacta(documento)
+                    if existente is not None:
+                        en_vuelo.append((documento, None, existente))
+                        continue
+                    en_vuelo.append((documento, pool.submit(_extraer_en_worker, ruta), None))
+                    return
+
+            for _ in range(workers * self.EXTRACCIONES_EN_VUELO_POR_PROCESO):
+                enviar_siguiente()
+
+            # Se consume en orden de envío aunque los PDFs terminen desordenados
+            while en_vuelo:
+                documento, futuro, existente = en_vuelo.popleft()
+                if futuro is None:
+                    print(f"\nProcesando: {documento.nombre}")
+                    with documento:
+                        yield documento, self._extraccion_copia_exacta(existente), []
+                    continue
+
+                extraccion, errores, cambios_huellas = futuro.result()
+                enviar_siguiente()
+
+                print(f"\nProcesando: {documento.nombre}")
+                if self.cache_huellas is not None and cambios_huellas is not None:
+                    self.cache_huellas.incorporar_cambios(cambios_huellas)
+                documento.incorporar_textos(extraccion.pop('textos_pagina', {}),
+                                            extraccion.pop('num_paginas', None))
+
+                # Una copia de un PDF indexado mientras estaba en vuelo se trata igual que en secuencia
+                existente = self._buscar_copia_exacta(documento)
+                if existente is not None:
+                    extraccion, errores = self._extraccion_copia_exacta(existente), []
+
+                with documento:
+                    yield documento, extraccion, errores
+
+    def _buscar_copia_exacta(self, documento: DocumentoPDF) -> Optional[Dict[str, Any]]:
+        """
+        Busca en los índices una factura con el mismo contenido que el PDF.
+
+        Solo lee los bytes del archivo (para el hash), sin parsear el PDF. Los
+        archivos vacíos no se consideran copia de nada.
+
+        Args:
+            documento (DocumentoPDF): Documento del PDF pendiente
+
+        Returns:
+            Optional[Dict[str, Any]]: Entrada del índice con el mismo hash, o None
+        """
+        if self.organizador is None or not self.detectar_copias_exactas:
+            return None
+        try:
+            if not documento.contenido:
+                return None
+        except OSError:
+            return None
+        return self.organizador.buscar_por_hash(documento.hash_md5)
+
+    @staticmethod
+    def _extraccion_copia_exacta(existente: Dict[str, Any]) -> Dict[str, Any]:
+        """Extracción de un PDF que es copia exacta de una factura ya indexada (no se analiza)."""
+        return {'proveedor_id': None, 'facturas': [], 'error': None, 'desde_cache': False,
+                'copia_exacta_de': existente}
+
+    def _extraer_documento(self, documento: DocumentoPDF) -> Dict[str, Any]:
+        """
+        Identifica el proveedor y extrae las facturas de un PDF, sin efectos sobre el disco.
+
+        Es la parte CPU del procesamiento y puede ejecutarse en un proceso hijo.
+
+        Args:
+            documento (DocumentoPDF): Documento compartido del PDF a procesar
+
+        Si hay caché de extracción y el PDF (mismo contenido, misma versión de
+        plantilla y mismo trimestre/año) ya se extrajo, se devuelve el resultado
+        guardado sin abrir el PDF.
+
+        Returns:
+            Dict[str, Any]: {'proveedor_id', 'facturas', 'error', 'desde_cache'}; 'facturas'
+                            son RegistroFactura y 'error' contiene el mensaje de la
+                            excepción si la extracción falló (o si el PDF no se pudo
+                            leer, sin proveedor_id)
+        """
+        extraccion = {'proveedor_id': None, 'facturas': [], 'error': None, 'desde_cache': False}
+        contexto = f"{self.trimestre}|{self.año}"
+
+        # PDF ya extraído con la misma plantilla: no hace falta ni abrirlo.
+        # Un archivo vacío (copia a medias, adjunto roto) nunca se cachea
+        try:
+            usar_cache = self.cache_extraccion is not None and len(documento.contenido) > 0
+        except OSError as e:
+            # Archivo ilegible o desaparecido durante la ejecución: error de este PDF, no de todo el lote
+            print(f"ERROR No se pudo leer el PDF: {e}")
+            extraccion['error'] = f'No se pudo leer el PDF: {e}'
+            self.errores.append({
+                'Archivo': documento.nombre,
+                'Pagina': 'N/A',
+                'Error': extraccion['error'],
+                'Proveedor': 'N/A',
+                'Fecha_Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+            return extraccion
+
+        if usar_cache:
+            en_cache = self.cache_extraccion.obtener(documento.hash_md5, self.versiones_plantillas, contexto)
+            if en_cache is not None and en_cache['proveedor_id'] in self.plantillas_cargadas:
+                ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                registros = []
+                for datos in en_cache['facturas']:
+                    datos['_Archivo'] = documento.nombre
+                    datos['_Fecha_Procesamiento'] = ahora
+                    registros.append(RegistroFactura(datos, self._año_por_defecto()))
+                print(f"OK Resultado recuperado de caché: {en_cache['proveedor_id']}")
+                extraccion.update(proveedor_id=en_cache['proveedor_id'], facturas=registros,
+                                  desde_cache=True)
+                return extraccion
+
+        # Identificar proveedor
+        proveedor_id = self.identificar_proveedor(documento.ruta, documento=documento)
+        extraccion['proveedor_id'] = proveedor_id
+
+        if not proveedor_id:
+            return extraccion
+
+        errores_previos = len(self.errores)
+        try:
+            # Usar método multipágina que extrae de la última página de cada factura
+            # (los registros salen con los Portes ya sumados a Base)
+            extraccion['facturas'] = self._extraer_registros_multipagina(documento.ruta, proveedor_id,
+                                                                         documento=documento)
+        except Exception as e:
+            extraccion['error'] = str(e)
+
+        # Solo se cachean extracciones limpias: los errores deben volver a registrarse
+        if (usar_cache and extraccion['error'] is None and
+                extraccion['facturas'] and len(self.errores) == errores_previos):
+            self.cache_extraccion.guardar(documento.hash_md5, proveedor_id,
+                                          self.versiones_plantillas.get(proveedor_id),
+                                          contexto, [registro.como_diccionario()
+                                                     for registro in extraccion['facturas']])
+
+        return extraccion
+
+    def _incorporar_extraccion(self, extraccion: Dict[str, Any], documento: DocumentoPDF,
+                               resultados: List[Dict[str, Any]], facturas_procesadas: set):
+        """
+        Incorpora la extracción de un PDF: marca duplicados, registra errores y organiza el archivo.
+
+        Args:
+            extraccion (Dict[str, Any]): Resultado de _extraer_documento
+            documento (DocumentoPDF): Documento compartido del PDF procesado
+            resultados (List[RegistroFactura]): Lista donde se acumulan las facturas extraídas
+            facturas_procesadas (set): Claves (CIF, NumFactura, FechaFactura) ya vistas en esta ejecución
+        """
+        archivo_pdf = documento.nombre
+        ruta_completa = documento.ruta
+        proveedor_id = extraccion['proveedor_id']
+
+        if extraccion.get('desde_cache'):
+            self.extracciones_desde_cache += 1
+
+        existente = extraccion.get('copia_exacta_de')
+        if existente is not None:
+            # Reenvío idéntico de una factura ya procesada: no genera registros
+            print(f"WARN Copia exacta de {existente.get('nombre_archivo', '')} "
+                  f"(CIF: {existente.get('cif_proveedor')}, Num: {existente.get('num_factura')})")
+            self.copias_exactas += 1
+            self.organizador.organizar_duplicado_exacto(ruta_completa, existente, documento=documento)
+            return
+
+        if not proveedor_id and extraccion['error'] is not None:
+            # PDF ilegible: el error ya está registrado y el archivo se queda para reintentarlo
+            return
+
+        if not proveedor_id:
+            print(f"ERROR Proveedor no identificado")
+            # Registrar en log de errores, NO en resultados
+            error_registro = {
+                'Archivo': archivo_pdf,
+                'Pagina': 'N/A',
+                'Error': 'Proveedor no identificado - no hay plantilla que coincida',
+                'Proveedor': 'NO_IDENTIFICADO',
+                'Fecha_Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self.errores.append(error_registro)
+
+            # Organizar PDF sin proveedor identificado si está habilitado
+            if self.organizador:
+                self.organizador.organizar_pdf(ruta_completa, None, documento=documento)
+            return
+
+        try:
+            if extraccion['error'] is not None:
+                raise Exception(extraccion['error'])
+
+            # Los registros siguen como RegistroFactura: el diccionario solo se genera al escribirlos
+            lista_datos = []
+
+            # Procesar cada factura extraída del PDF
+            for registro in extraccion['facturas']:
+                # Verificar duplicados usando CIF + NumFactura + FechaFactura
+                clave_duplicado = registro.clave_duplicado
+
+                if clave_duplicado in facturas_procesadas:
+                    print(f"WARN Factura duplicada detectada (CIF: {registro.cif}, Num: {registro.num_factura}, Fecha: {registro.texto_fecha_factura})")
+                    # Marcar como duplicado en metadatos
+                    registro.metadatos['_Duplicado'] = True
+                    registro.metadatos['_Motivo_Duplicado'] = f"Ya existe factura con mismo CIF, NumFactura y FechaFactura"
+                else:
+                    facturas_procesadas.add(clave_duplicado)
+                    registro.metadatos['_Duplicado'] = False
+
+                lista_datos.append(registro)
+
+            resultados.extend(lista_datos)
+
+            print(f"OK Procesado exitosamente ({len(lista_datos)} factura(s))")
+
+            # Organizar archivo PDF si está habilitado
+            if self.organizador:
+                # Usar los datos de la primera factura (en caso de múltiples facturas en un PDF)
+                # Si hay error en alguna factura, usar None
+                datos_para_organizar = lista_datos[0] if lista_datos else None
+                self.organizador.organizar_pdf(ruta_completa, datos_para_organizar,
+                                               documento=documento)
+        except Exception as e:
+            print(f"ERROR procesando: {e}")
+            # Registrar en log de errores, NO en resultados
+            error_registro = {
+                'Archivo': archivo_pdf,
+                'Pagina': 'N/A',
+                'Error': f'Error al procesar factura: {str(e)}',
+                'Proveedor': proveedor_id,
+                'Fecha_Procesamiento': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self.errores.append(error_registro)
+
+            # Organizar PDF con error si está habilitado
+            if self.organizador:
+                self.organizador.organizar_pdf(ruta_completa, None, documento=documento)
 
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """
         Genera estadísticas del procesamiento.
 
+        Las de la última ejecución se llevan al día según se procesa cada factura
+        (también con iter_facturas); solo se recalculan si self.resultados se ha
+        asignado o modificado desde fuera.
+
         Returns:
             Dict[str, Any]: Estadísticas del procesamiento
         """
-        if not self.resultados:
-            return {}
+        if self.resultados and (self.resultados is not self._resultados_contados
+                                or self.estadisticas.total != len(self.resultados)):
+            self.estadisticas = EstadisticasExtraccion.desde_registros(self.resultados)
+            self._resultados_contados = self.resultados
 
-        total_facturas = len(self.resultados)
-        facturas_con_error = sum(1 for r in self.resultados if '_Error' in r)
-        facturas_duplicadas = sum(1 for r in self.resultados if r.get('_Duplicado', False))
-        facturas_exitosas = total_facturas - facturas_con_error - facturas_duplicadas
-
-        # Estadísticas por proveedor
-        proveedores = {}
-        for resultado in self.resultados:
-            proveedor = resultado.get('_Proveedor_ID', 'DESCONOCIDO')
-            if proveedor not in proveedores:
-                proveedores[proveedor] = {'total': 0, 'exitosos': 0, 'errores': 0}
-
-            proveedores[proveedor]['total'] += 1
-            if '_Error' in resultado:
-                proveedores[proveedor]['errores'] += 1
-            else:
-                proveedores[proveedor]['exitosos'] += 1
-
-        return {
-            'total_facturas': total_facturas,
-            'facturas_exitosas': facturas_exitosas,
-            'facturas_duplicadas': facturas_duplicadas,
-            'facturas_con_error': facturas_con_error,
-            'tasa_exito': round((facturas_exitosas / total_facturas) * 100, 2) if total_facturas > 0 else 0,
-            'proveedores': proveedores,
-            'plantillas_disponibles': len(self.plantillas_cargadas)
-        }
+        return self.estadisticas.como_diccionario(len(self.plantillas_cargadas))
 
     # ==================== MÉTODOS PARA SOPORTE MULTIPÁGINA ====================
 
@@ -920,8 +1510,7 @@ class PDFExtractor:
                 try:
                     coordenadas = campo['coordenadas']
                     bbox = tuple(coordenadas)
-                    area_recortada = pagina.crop(bbox)
-                    texto_extraido = area_recortada.extract_text()
+                    texto_extraido = extraer_texto_region(pagina, bbox)
 
                     if texto_extraido:
                         # Limpiar y procesar el número de factura
@@ -1024,7 +1613,8 @@ class PDFExtractor:
         # La última página es la que tiene el pagina_num más alto
         return paginas_grupo[-1]
 
-    def extraer_datos_factura_multipagina(self, ruta_pdf: str, proveedor_id: str) -> List[Dict[str, Any]]:
+    def extraer_datos_factura_multipagina(self, ruta_pdf: str, proveedor_id: str,
+                                          documento: Optional[DocumentoPDF] = None) -> List[Dict[str, Any]]:
         """
         Extrae datos de todas las facturas en un PDF que puede tener múltiples páginas.
 
@@ -1033,21 +1623,45 @@ class PDFExtractor:
         - Una factura en múltiples páginas → extrae de la última página
         - Múltiples facturas en un PDF → extrae cada una de su última página
 
+        Los campos auxiliares ya están aplicados (Portes sumado a Base).
+
         Args:
             ruta_pdf (str): Ruta al archivo PDF
             proveedor_id (str): ID del proveedor
+            documento (DocumentoPDF, optional): Documento ya abierto a reutilizar
 
         Returns:
             List[Dict[str, Any]]: Lista de datos extraídos (una entrada por factura)
         """
+        return [registro.como_diccionario()
+                for registro in self._extraer_registros_multipagina(ruta_pdf, proveedor_id, documento)]
+
+    def _extraer_registros_multipagina(self, ruta_pdf: str, proveedor_id: str,
+                                       documento: Optional[DocumentoPDF] = None) -> List[RegistroFactura]:
+        """
+        Extrae las facturas de un PDF como registros tipados (ver extraer_datos_factura_multipagina).
+
+        Cada registro interpreta su fecha e importes una vez; después se le
+        aplican las reglas de trimestre del Excel y los Portes.
+
+        Args:
+            ruta_pdf (str): Ruta al archivo PDF
+            proveedor_id (str): ID del proveedor
+            documento (DocumentoPDF, optional): Documento ya abierto a reutilizar
+
+        Returns:
+            List[RegistroFactura]: Una entrada por factura
+        """
         if proveedor_id not in self.plantillas_cargadas:
             raise ValueError(f"Plantilla no encontrada para proveedor: {proveedor_id}")
 
         plantilla = self.plantillas_cargadas[proveedor_id]
         facturas_extraidas = []
+        año_default = self._año_por_defecto()
 
         try:
-            with pdfplumber.open(ruta_pdf) as pdf:
+            with abrir_documento(ruta_pdf, documento) as doc:
+                pdf = doc.pdf
                 if not pdf.pages:
                     raise Exception("PDF sin páginas")
 
@@ -1124,8 +1738,7 @@ class PDFExtractor:
 
                         try:
                             bbox = tuple(coordenadas)
-                            area_recortada = pagina.crop(bbox)
-                            texto_extraido = area_recortada.extract_text()
+                            texto_extraido = extraer_texto_region(pagina, bbox)
 
                             # Limpiar y procesar según tipo
                             valor_procesado = self.procesar_campo(texto_extraido, tipo_campo)
@@ -1181,11 +1794,15 @@ class PDFExtractor:
                         print(f"    INFO: Plantilla sin campo CIF_Cliente - omitiendo validación")
                         datos_factura['_CIF_Valido'] = None
 
+                    registro = RegistroFactura(datos_factura, año_default)
+
                     # Aplicar reglas de asignación de trimestre para Excel
                     if self.trimestre and self.año:
-                        self._aplicar_reglas_asignacion_trimestre_excel(datos_factura)
+                        self._asignar_trimestre_excel(registro)
 
-                    facturas_extraidas.append(datos_factura)
+                    # Procesar campos auxiliares (ej: sumar Portes a Base)
+                    registro.aplicar_portes()
+                    facturas_extraidas.append(registro)
 
         except Exception as e:
             print(f"Error procesando PDF multipágina {ruta_pdf}: {e}")
@@ -1202,6 +1819,64 @@ class PDFExtractor:
         return facturas_extraidas
 
 
+# ==================== PROCESAMIENTO EN PARALELO ====================
+
+# Extractor propio de cada proceso hijo, creado una sola vez por _inicializar_worker
+_extractor_worker: Optional[PDFExtractor] = None
+
+
+def _inicializar_worker(directorio_facturas: str, directorio_plantillas: str,
+                        trimestre: str, año: str, plantillas_cargadas: Dict[str, Dict],
+                        versiones_plantillas: Dict[str, str], ruta_cache_huellas: Optional[str],
+                        cache_extraccion: Optional[tuple] = None):
+    """
+    Prepara el extractor de un proceso hijo con las plantillas ya cargadas en el padre.
+
+    El extractor del hijo no organiza archivos: mover PDFs y actualizar índices
+    es responsabilidad exclusiva del proceso principal.
+    """
+    global _extractor_worker
+    _extractor_worker = PDFExtractor(directorio_facturas=directorio_facturas,
+                                     directorio_plantillas=directorio_plantillas,
+                                     trimestre=trimestre, año=año,
+                                     organizar_archivos=False)
+    _extractor_worker.plantillas_cargadas = plantillas_cargadas
+    _extractor_worker.versiones_plantillas = versiones_plantillas
+    if ruta_cache_huellas is not None:
+        _extractor_worker.cache_huellas = CacheHuellas(ruta_cache_huellas)
+    if cache_extraccion is not None:
+        directorio_cache, max_bytes = cache_extraccion
+        _extractor_worker.cache_extraccion = CacheExtraccion(directorio_cache, max_bytes=max_bytes)
+
+
+def _extraer_en_worker(ruta_pdf: str):
+    """
+    Identifica y extrae un PDF dentro de un proceso hijo.
+
+    Returns:
+        tuple: (extracción, errores registrados durante la extracción de este PDF,
+                cambios en la caché de huellas o None si no hay caché)
+    """
+    from src.file_organizer import contar_palabras_factura
+
+    _extractor_worker.errores = []
+    with DocumentoPDF(ruta_pdf) as documento:
+        extraccion = _extractor_worker._extraer_documento(documento)
+        if not extraccion['facturas']:
+            # El proceso principal clasificará el PDF como error: se extraen aquí los textos
+            # que necesita esa clasificación y se le envían con el número de páginas
+            try:
+                contar_palabras_factura(documento)
+                extraccion['num_paginas'] = documento.num_paginas
+            except Exception:
+                pass  # PDF ilegible: el proceso principal lo intentará y registrará el error
+            extraccion['textos_pagina'] = documento.textos_extraidos()
+
+    cache = _extractor_worker.cache_huellas
+    cambios_huellas = cache.exportar_cambios() if cache is not None else None
+    return extraccion, _extractor_worker.errores, cambios_huellas
+
+
 def main():
     """Función principal para testing del extractor."""
     extractor = PDFExtractor()
@@ -0,0 +1,194 @@
+"""
+Registro tipado de una factura extraída.
+
+Durante la extracción cada factura se representaba con un diccionario de
+strings y cada paso volvía a interpretar los mismos valores: Base y Portes con
+float() al sumar los portes, FechaFactura al asignar el trimestre del Excel...
+RegistroFactura interpreta la fecha (datetime) y los importes (Decimal) una
+sola vez al construirse y el resto del procesamiento usa esos valores.
+
+Dentro del extractor (duplicados, organizador, caché) se trabaja con el
+registro. Lo que sale del extractor (procesar_directorio_facturas,
+iter_facturas) sigue siendo el diccionario de siempre: como_diccionario() lo
+genera con las mismas claves, en el mismo orden y con los textos originales.
+Para leer campos sueltos el registro admite registro['CIF'], registro.get('_Error')
+y '_Error' in registro, como el diccionario.
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Formatos de fecha admitidos; los dos últimos no tienen año
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y', '%d/%m', '%d-%m')
+FORMATOS_SIN_AÑO = ('%d/%m', '%d-%m')
+FORMATOS_AÑO_CORTO = ('%d/%m/%y', '%d-%m-%y')
+
+
+def parsear_fecha(texto: str, año_default: Optional[int] = None) -> Optional[datetime]:
+    """
+    Parsea una fecha en formato string a datetime.
+
+    Soporta formatos como: "15/01/2025", "15/01", "15-01-2025", etc.
+
+    Args:
+        texto: Fecha en formato string
+        año_default: Año a usar si la fecha no lo tiene (sin él, esas fechas no se parsean)
+
+    Returns:
+        Optional[datetime]: Fecha parseada o None si no se reconoce
+    """
+    if not texto:
+        return None
+
+    texto = texto.strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            fecha = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+
+        if formato in FORMATOS_SIN_AÑO:
+            if año_default is None:
+                return None
+            fecha = fecha.replace(year=año_default)
+        # strptime ya interpreta 69-99 como 19xx; por si acaso, nunca más allá de 2050
+        elif formato in FORMATOS_AÑO_CORTO and fecha.year > 2050:
+            fecha = fecha.replace(year=fecha.year - 100)
+        return fecha
+
+    return None
+
+
+def parsear_importe(texto: Any) -> Optional[Decimal]:
+    """
+    Convierte un importe ya limpio ("1250.75") a Decimal.
+
+    Args:
+        texto: Importe en texto (o None)
+
+    Returns:
+        Optional[Decimal]: Importe, o None si está vacío o no es un número
+    """
+    if texto is None:
+        return None
+    try:
+        importe = Decimal(str(texto).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return importe if importe.is_finite() else None
+
+
+class RegistroFactura:
+    """
+    Factura extraída con la fecha y los importes ya interpretados.
+
+    Los campos estándar son atributos (sin diccionario por instancia gracias a
+    __slots__); el resto de valores (metadatos internos como _Archivo, _Error o
+    _Duplicado) se guardan en `metadatos` en el orden en que se añadieron.
+
+    fecha_factura, base y portes son None si el texto extraído no se pudo
+    interpretar ("ERROR", vacío...); el texto original se conserva para el
+    diccionario de exportación.
+    """
+
+    __slots__ = ('cif', 'fecha_factura', 'texto_fecha_factura', 'trimestre', 'año', 'fecha_vto',
+                 'num_factura', 'fecha_pago', 'base', 'texto_base', 'com_paypal', 'portes',
+                 'metadatos')
+
+    # Campo estándar -> atributo con su texto
+    CAMPOS = {
+        'CIF': 'cif',
+        'FechaFactura': 'texto_fecha_factura',
+        'Trimestre': 'trimestre',
+        'Año': 'año',
+        'FechaVto': 'fecha_vto',
+        'NumFactura': 'num_factura',
+        'FechaPago': 'fecha_pago',
+        'Base': 'texto_base',
+        'ComPaypal': 'com_paypal',
+    }
+
+    # Campos auxiliares: se usan en los cálculos pero no se exportan
+    CAMPOS_AUXILIARES = ('Portes',)
+
+    def __init__(self, datos: Dict[str, Any], año_default: Optional[int] = None):
+        """
+        Args:
+            datos: Diccionario de la factura (campos estándar, Portes y metadatos con prefijo _)
+            año_default: Año para las fechas sin año (el del trimestre solicitado)
+        """
+        for campo, atributo in self.CAMPOS.items():
+            setattr(self, atributo, datos.get(campo, ''))
+        self.fecha_factura = parsear_fecha(self.texto_fecha_factura, año_default)
+        self.base = parsear_importe(self.texto_base)
+        self.portes = parsear_importe(datos.get('Portes'))
+        self.metadatos = {clave: valor for clave, valor in datos.items()
+                          if clave not in self.CAMPOS and clave not in self.CAMPOS_AUXILIARES}
+
+    def __repr__(self) -> str:
+        return f"RegistroFactura({self.cif!r}, {self.num_factura!r}, {self.texto_fecha_factura!r})"
+
+    def __getitem__(self, campo: str) -> Any:
+        """Valor de un campo estándar (texto) o de un metadato, como en como_diccionario()."""
+        atributo = self.CAMPOS.get(campo)
+        if atributo is not None:
+            return getattr(self, atributo)
+        return self.metadatos[campo]
+
+    def __contains__(self, campo: str) -> bool:
+        return campo in self.CAMPOS or campo in self.metadatos
+
+    def get(self, campo: str, defecto: Any = None) -> Any:
+        """Como dict.get() sobre como_diccionario(), sin construir el diccionario."""
+        try:
+            return self[campo]
+        except KeyError:
+            return defecto
+
+    @property
+    def clave_duplicado(self) -> Tuple[str, str, str]:
+        """Clave (CIF, NumFactura, FechaFactura) para detectar duplicados en una ejecución."""
+        return self.cif, self.num_factura, self.texto_fecha_factura
+
+    def aplicar_portes(self):
+        """
+        Suma los Portes (si son > 0) a la Base; después ya no quedan portes que sumar.
+        """
+        portes, self.portes = self.portes, None
+        if portes is None or portes <= 0:
+            return
+        if self.base is None:
+            print(f"  ⚠️  No se pudo sumar Portes a Base: Base no numérica ({self.texto_base!r})")
+            return
+
+        nueva_base = self.base + portes
+        print(f"  ℹ️  Base ajustada: {self.base} + {portes} (Portes) = {nueva_base}")
+        self.base = nueva_base
+        self.texto_base = str(nueva_base)
+
+    def como_diccionario(self) -> Dict[str, Any]:
+        """
+        Diccionario de exportación: campos estándar (texto) y metadatos, sin campos auxiliares.
+
+        Returns:
+            Dict[str, Any]: Registro en el formato que escriben exportador, volcado, caché y almacén
+        """
+        datos = {campo: getattr(self, atributo) for campo, atributo in self.CAMPOS.items()}
+        datos.update(self.metadatos)
+        return datos
+
+
+def a_diccionario(registro: Union[RegistroFactura, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Diccionario de exportación de un registro (los diccionarios se devuelven tal cual).
+
+    Args:
+        registro: RegistroFactura o diccionario de factura
+
+    Returns:
+        Dict[str, Any]: Registro en el formato que escriben volcado, almacén y exportador
+    """
+    if isinstance(registro, RegistroFactura):
+        return registro.como_diccionario()
+    return registro
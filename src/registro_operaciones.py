@@ -0,0 +1,183 @@
+"""
+Registro de operaciones en JSON Lines con escritura en segundo plano.
+
+Cada operación (PDF movido, duplicado, error...) es una línea JSON en
+<directorio_logs>/file_operations_YYYYMMDD.jsonl. registrar() solo encola el
+registro: un hilo escritor mantiene el archivo abierto, escribe por lotes lo que
+haya en la cola y hace fsync como mucho cada `intervalo_fsync` segundos, de modo que
+registrar una operación no cuesta una apertura, escritura y cierre de archivo.
+
+La cola es acotada: si el disco no da abasto, registrar() espera en lugar de
+descartar operaciones.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+
+class RegistroOperaciones:
+    """
+    Escritor de JSON Lines con cola acotada e hilo en segundo plano.
+    """
+
+    TAMAÑO_COLA = 10_000
+    INTERVALO_FSYNC = 1.0
+
+    def __init__(self, directorio_logs: str, prefijo: str = "file_operations",
+                 tamaño_cola: int = TAMAÑO_COLA, intervalo_fsync: float = INTERVALO_FSYNC):
+        """
+        Args:
+            directorio_logs: Carpeta de los logs
+            prefijo: Nombre base del archivo (se añade _YYYYMMDD.jsonl)
+            tamaño_cola: Registros pendientes como máximo antes de que registrar() espere
+            intervalo_fsync: Segundos máximos entre fsync del archivo
+        """
+        self.directorio_logs = Path(directorio_logs)
+        self.prefijo = prefijo
+        self.intervalo_fsync = intervalo_fsync
+        self._cola: queue.Queue = queue.Queue(maxsize=tamaño_cola)
+        self._hilo: Optional[threading.Thread] = None
+        self._bloqueo = threading.Lock()
+        self.errores_escritura = 0
+
+    def _arrancar(self):
+        """Crea el hilo escritor la primera vez que se registra algo."""
+        with self._bloqueo:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escribir, name="registro-operaciones", daemon=True)
+                self._hilo.start()
+                # Lo que quede en la cola al salir del programa se escribe igualmente
+                atexit.register(self.cerrar)
+
+    def registrar(self, tipo: str, **campos: Any):
+        """
+        Encola una operación.
+
+        Args:
+            tipo: Tipo de operación (EXITO, DUPLICADO, ERROR_POSIBLE_FACTURA, etc.)
+            **campos: Resto de campos de la línea JSON
+        """
+        if self._hilo is None:
+            self._arrancar()
+        registro = {"fecha_hora": datetime.now().isoformat(timespec='seconds'), "tipo": tipo}
+        registro.update(campos)
+        self._cola.put(registro)
+
+    def vaciar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que todo lo encolado esté escrito y sincronizado en disco.
+
+        Returns:
+            bool: False si venció el timeout
+        """
+        if self._hilo is None:
+            return True
+        hecho = threading.Event()
+        self._cola.put(hecho)
+        return hecho.wait(timeout)
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        with self._bloqueo:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is None:
+            return
+        self._cola.put(None)
+        hilo.join()
+        atexit.unregister(self.cerrar)
+
+    def _ruta_del_dia(self, fecha_hora: str) -> Path:
+        return self.directorio_logs / f"{self.prefijo}_{fecha_hora[:10].replace('-', '')}.jsonl"
+
+    def _escribir(self):
+        """Bucle del hilo escritor."""
+        archivo = None
+        ruta_actual = None
+        ultimo_fsync = time.monotonic()
+        sin_sincronizar = False
+
+        def sincronizar():
+            nonlocal ultimo_fsync, sin_sincronizar
+            if archivo is not None and sin_sincronizar:
+                try:
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+                except OSError:
+                    self.errores_escritura += 1
+            ultimo_fsync = time.monotonic()
+            sin_sincronizar = False
+
+        try:
+            while True:
+                # Sin nada pendiente de sincronizar se puede esperar indefinidamente
+                espera = None
+                if sin_sincronizar:
+                    espera = max(0.0, self.intervalo_fsync - (time.monotonic() - ultimo_fsync))
+                try:
+                    elementos = [self._cola.get(timeout=espera)]
+                except queue.Empty:
+                    sincronizar()
+                    continue
+
+                # Lote: todo lo que ya esté en la cola
+                while True:
+                    try:
+                        elementos.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+
+                terminar = False
+                avisos = []
+                for elemento in elementos:
+                    if elemento is None:
+                        terminar = True
+                    elif isinstance(elemento, threading.Event):
+                        avisos.append(elemento)
+                    else:
+                        ruta = self._ruta_del_dia(elemento["fecha_hora"])
+                        try:
+                            if ruta != ruta_actual:
+                                if archivo is not None:
+                                    sincronizar()
+                                    archivo.close()
+                                    archivo = None
+                                self.directorio_logs.mkdir(parents=True, exist_ok=True)
+                                archivo = open(ruta, 'a', encoding='utf-8')
+                                ruta_actual = ruta
+                            archivo.write(json.dumps(elemento, ensure_ascii=False) + "\n")
+                            sin_sincronizar = True
+                        except OSError as e:
+                            self.errores_escritura += 1
+                            if self.errores_escritura == 1:
+                                print(f"⚠️ ADVERTENCIA: No se pudo escribir en log: {e}")
+                            # Se reabrirá el archivo con el siguiente registro
+                            if archivo is not None:
+                                try:
+                                    archivo.close()
+                                except OSError:
+                                    pass
+                            archivo = None
+                            ruta_actual = None
+
+                if archivo is not None:
+                    try:
+                        archivo.flush()
+                    except OSError:
+                        self.errores_escritura += 1
+                if avisos or terminar or time.monotonic() - ultimo_fsync >= self.intervalo_fsync:
+                    sincronizar()
+                for aviso in avisos:
+                    aviso.set()
+                if terminar:
+                    return
+        finally:
+            if archivo is not None:
+                archivo.close()
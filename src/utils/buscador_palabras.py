@@ -0,0 +1,50 @@
+"""
+Búsqueda de varias palabras clave en un texto, con salida anticipada.
+
+Cada palabra se busca con el operador `in` (implementado en C, mucho más rápido
+que recorrer el texto carácter a carácter en Python). Lo que se gana es dejar
+de buscar en cuanto se han encontrado las palabras necesarias. Las
+coincidencias son de subcadena, igual que con `in`.
+"""
+
+from typing import Iterable, List, Optional
+
+
+class BuscadorPalabras:
+    """
+    Conjunto fijo de palabras a buscar en textos.
+
+    Examples:
+        >>> buscador = BuscadorPalabras(['total', 'subtotal', 'iva'])
+        >>> buscador.contar('subtotal con iva')
+        3
+    """
+
+    def __init__(self, palabras: Iterable[str]):
+        """
+        Args:
+            palabras: Palabras a buscar (se comparan tal cual; normalizar antes mayúsculas)
+        """
+        self.palabras: List[str] = list(dict.fromkeys(palabra for palabra in palabras if palabra))
+
+    def contar(self, texto: str, limite: Optional[int] = None) -> int:
+        """
+        Cuenta cuántas palabras distintas aparecen en el texto.
+
+        Args:
+            texto: Texto donde buscar
+            limite: Dejar de buscar en cuanto se hayan encontrado tantas palabras
+
+        Returns:
+            int: Número de palabras distintas encontradas (como mucho `limite`)
+        """
+        if limite is not None and limite <= 0:
+            return 0
+
+        encontradas = 0
+        for palabra in self.palabras:
+            if palabra in texto:
+                encontradas += 1
+                if encontradas == limite:
+                    break
+        return encontradas
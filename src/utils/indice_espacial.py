@@ -0,0 +1,207 @@
+"""
+Índice espacial de caracteres por página para extraer texto de regiones (bbox).
+
+pagina.crop(bbox).extract_text() recorre todos los objetos de la página en cada
+llamada. Con muchas plantillas y campos por página eso se repite cientos de
+veces sobre las mismas líneas de detalle. Este índice reparte los caracteres de
+la página en una rejilla uniforme una sola vez y responde cada consulta mirando
+solo las celdas que toca la región, con el mismo texto que devuelve pdfplumber.
+"""
+
+import math
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from pdfplumber.page import Page, test_proposed_bbox
+from pdfplumber.utils import chars_to_textmap, clip_obj, get_bbox_overlap, obj_to_bbox
+
+
+class IndiceChars:
+    """
+    Rejilla uniforme con los caracteres de una página de pdfplumber.
+
+    Cada celda guarda los índices (en el orden original de page.chars) de los
+    caracteres cuyo rectángulo la toca. Una consulta reúne los candidatos de las
+    celdas de la región, restaura el orden original y recorta los caracteres igual
+    que CroppedPage, de modo que el texto resultante es idéntico.
+
+    Examples:
+        >>> indice = IndiceChars(pagina)
+        >>> indice.extraer_texto((10, 50, 200, 70))
+        'F-2025-001'
+    """
+
+    # Tamaño de celda en puntos PDF (≈ una línea de texto de alto, varias palabras de ancho)
+    TAMAÑO_CELDA = 40.0
+
+    def __init__(self, pagina: Page, tamaño_celda: float = TAMAÑO_CELDA,
+                 chars: Optional[List[Dict[str, Any]]] = None):
+        """
+        Construye el índice recorriendo page.chars una sola vez.
+
+        Args:
+            pagina: Página de pdfplumber
+            tamaño_celda: Lado de cada celda de la rejilla en puntos
+            chars: Subconjunto de caracteres a indexar (por defecto, todos los de la página)
+        """
+        self.pagina = pagina
+        self.tamaño_celda = tamaño_celda
+        self.chars: List[Dict[str, Any]] = pagina.chars if chars is None else chars
+        self.celdas: Dict[Tuple[int, int], List[int]] = {}
+
+        for i, char in enumerate(self.chars):
+            for celda in self._celdas_de(char['x0'], char['top'], char['x1'], char['bottom']):
+                self.celdas.setdefault(celda, []).append(i)
+
+    def _candidatos(self, bbox) -> List[int]:
+        """Índices (ordenados) de los caracteres de las celdas que toca la región."""
+        candidatos = set()
+        for celda in self._celdas_de(*bbox):
+            candidatos.update(self.celdas.get(celda, ()))
+        return sorted(candidatos)
+
+    def _celdas_de(self, x0: float, top: float, x1: float, bottom: float):
+        """Celdas de la rejilla que toca un rectángulo (bordes incluidos)."""
+        lado = self.tamaño_celda
+        for cx in range(math.floor(x0 / lado), math.floor(x1 / lado) + 1):
+            for cy in range(math.floor(top / lado), math.floor(bottom / lado) + 1):
+                yield (cx, cy)
+
+    def chars_en_region(self, bbox: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """
+        Devuelve los caracteres recortados a la región, en el orden original de la página.
+
+        Args:
+            bbox: Región (x0, top, x1, bottom)
+
+        Returns:
+            List[Dict[str, Any]]: Mismos caracteres que CroppedPage(bbox).chars
+        """
+        recortados = []
+        for i in self._candidatos(bbox):
+            char = clip_obj(self.chars[i], bbox)
+            if char is not None:
+                recortados.append(char)
+        return recortados
+
+    def sub_indice(self, bbox: Tuple[float, float, float, float]) -> "IndiceChars":
+        """
+        Índice reducido con los caracteres (sin recortar) que tocan una región.
+
+        Sirve para resolver varias regiones solapadas con una sola consulta a la
+        página completa: cada región se extrae después sobre el sub-índice con el
+        mismo resultado que sobre la página.
+
+        Args:
+            bbox: Región que engloba las consultas posteriores
+
+        Returns:
+            IndiceChars: Índice con los caracteres de la región, en el orden original
+        """
+        chars = [self.chars[i] for i in self._candidatos(bbox)
+                 if get_bbox_overlap(obj_to_bbox(self.chars[i]), bbox) is not None]
+        return IndiceChars(self.pagina, self.tamaño_celda, chars=chars)
+
+    def extraer_texto(self, bbox: Tuple[float, float, float, float]) -> str:
+        """
+        Extrae el texto de una región, equivalente a pagina.crop(bbox).extract_text().
+
+        Args:
+            bbox: Región (x0, top, x1, bottom)
+
+        Returns:
+            str: Texto de la región
+
+        Raises:
+            ValueError: Si la región no está dentro de la página (como pagina.crop)
+        """
+        bbox = tuple(bbox)
+        test_proposed_bbox(bbox, self.pagina.bbox)
+
+        textmap = chars_to_textmap(self.chars_en_region(bbox),
+                                   layout_bbox=bbox,
+                                   layout_width=bbox[2] - bbox[0],
+                                   layout_height=bbox[3] - bbox[1])
+        return textmap.as_string
+
+
+# Un índice por página viva; se libera junto con la página al cerrar el PDF
+_indices: "weakref.WeakKeyDictionary[Page, IndiceChars]" = weakref.WeakKeyDictionary()
+
+
+def indice_de_pagina(pagina: Page) -> IndiceChars:
+    """
+    Devuelve el índice de la página, construyéndolo la primera vez.
+
+    Args:
+        pagina: Página de pdfplumber
+
+    Returns:
+        IndiceChars: Índice compartido por todas las consultas sobre la página
+    """
+    indice = _indices.get(pagina)
+    if indice is None:
+        indice = IndiceChars(pagina)
+        _indices[pagina] = indice
+    return indice
+
+
+def agrupar_regiones_solapadas(regiones: List[Tuple[float, float, float, float]]
+                               ) -> List[Tuple[Tuple[float, float, float, float], List[Tuple]]]:
+    """
+    Agrupa regiones que se solapan (o se tocan) en bloques con su región envolvente.
+
+    Args:
+        regiones: Regiones (x0, top, x1, bottom) sin repetir
+
+    Returns:
+        List[Tuple]: (región envolvente, regiones del grupo) en orden de primera aparición
+    """
+    grupos: List[Tuple[List[float], List[Tuple]]] = []
+
+    for region in regiones:
+        envolvente = list(region)
+        miembros = [region]
+
+        # Absorber los grupos que toca la región; como la envolvente crece y puede
+        # alcanzar grupos que antes no tocaba, se repite hasta que no cambie
+        fusionado = True
+        while fusionado:
+            fusionado = False
+            restantes = []
+            for envolvente_grupo, miembros_grupo in grupos:
+                if get_bbox_overlap(tuple(envolvente_grupo), tuple(envolvente)) is not None:
+                    envolvente = [min(envolvente[0], envolvente_grupo[0]), min(envolvente[1], envolvente_grupo[1]),
+                                  max(envolvente[2], envolvente_grupo[2]), max(envolvente[3], envolvente_grupo[3])]
+                    miembros = miembros_grupo + miembros
+                    fusionado = True
+                else:
+                    restantes.append((envolvente_grupo, miembros_grupo))
+            grupos = restantes
+        grupos.append((envolvente, miembros))
+
+    orden = {region: i for i, region in enumerate(regiones)}
+    resultado = [(tuple(envolvente), sorted(miembros, key=orden.get)) for envolvente, miembros in grupos]
+    resultado.sort(key=lambda grupo: orden[grupo[1][0]])
+    return resultado
+
+
+def extraer_texto_region(pagina: Any, bbox) -> Optional[str]:
+    """
+    Extrae el texto de una región de la página usando su índice espacial.
+
+    El índice se construye la primera vez que se consulta la página y se reutiliza
+    en todas las consultas siguientes (identificación, extracción, CIF cliente...).
+    Para objetos que no son páginas de pdfplumber se usa crop().extract_text().
+
+    Args:
+        pagina: Página de pdfplumber
+        bbox: Región (x0, top, x1, bottom)
+
+    Returns:
+        Optional[str]: Texto de la región
+    """
+    if not isinstance(pagina, Page):
+        return pagina.crop(tuple(bbox)).extract_text()
+
+    return indice_de_pagina(pagina).extraer_texto(bbox)
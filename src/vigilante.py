@@ -0,0 +1,225 @@
+"""
+Vigilancia de la carpeta de PDFs pendientes (modo `vigilar`).
+
+Detecta los PDFs que llegan a documentos/por_procesar y los entrega en lotes
+cuando han terminado de escribirse. En Linux usa inotify (a través de la libc,
+sin dependencias adicionales); en el resto de sistemas, o si inotify no está
+disponible, recorre la carpeta periódicamente.
+
+Un archivo se considera completo cuando su tamaño y fecha de modificación no
+cambian durante `espera_estable` segundos: así no se procesan PDFs que todavía
+se están copiando (escáneres, clientes de correo, carpetas compartidas).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Eventos de inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+EVENTOS_VIGILADOS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# Cabecera de cada evento: wd, mask, cookie, len
+CABECERA_EVENTO = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Descriptor de inotify sobre un único directorio."""
+
+    def __init__(self, directorio: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directorio), EVENTOS_VIGILADOS)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch falló en {directorio}")
+
+    def leer(self, timeout: Optional[float]) -> Tuple[List[str], bool]:
+        """
+        Espera eventos durante como máximo `timeout` segundos.
+
+        Returns:
+            Tuple[List[str], bool]: (nombres de archivo afectados, si la cola de eventos se desbordó)
+        """
+        listos, _, _ = select.select([self.fd], [], [], timeout)
+        if not listos:
+            return [], False
+
+        try:
+            datos = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        nombres = []
+        desbordado = False
+        posicion = 0
+        while posicion + CABECERA_EVENTO.size <= len(datos):
+            _, mascara, _, longitud = CABECERA_EVENTO.unpack_from(datos, posicion)
+            posicion += CABECERA_EVENTO.size
+            nombre = datos[posicion:posicion + longitud].rstrip(b'\0')
+            posicion += longitud
+            if mascara & IN_Q_OVERFLOW:
+                desbordado = True
+            elif nombre:
+                nombres.append(os.fsdecode(nombre))
+        return nombres, desbordado
+
+    def cerrar(self):
+        os.close(self.fd)
+
+
+class VigilanteCarpeta:
+    """
+    Entrega en lotes los PDFs nuevos de una carpeta una vez terminados de escribir.
+
+    Un PDF ya entregado no se vuelve a entregar mientras no cambie (si el
+    procesamiento no lo saca de la carpeta, no se reprocesa en bucle).
+    """
+
+    def __init__(self, directorio: str, espera_estable: float = 2.0,
+                 intervalo_sondeo: float = 2.0, usar_inotify: Optional[bool] = None):
+        """
+        Args:
+            directorio: Carpeta a vigilar
+            espera_estable: Segundos sin cambios para dar un archivo por completo
+            intervalo_sondeo: Segundos entre recorridos de la carpeta sin inotify
+            usar_inotify: Forzar (True) o desactivar (False) inotify; None = solo en Linux
+        """
+        self.directorio = directorio
+        self.espera_estable = espera_estable
+        self.intervalo_sondeo = intervalo_sondeo
+
+        # nombre -> (tamaño, mtime, instante en que se vio esa firma por primera vez)
+        self._candidatos: Dict[str, Tuple[int, float, float]] = {}
+        # nombre -> (tamaño, mtime) con que se entregó
+        self._entregados: Dict[str, Tuple[int, float]] = {}
+
+        self._inotify: Optional[_Inotify] = None
+        if usar_inotify is None:
+            usar_inotify = sys.platform.startswith('linux')
+        if usar_inotify:
+            try:
+                self._inotify = _Inotify(directorio)
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ ADVERTENCIA: inotify no disponible ({e}), se usará sondeo periódico")
+
+        # Los PDFs que ya estaban en la carpeta también se procesan
+        self._recorrer_carpeta()
+
+    @property
+    def modo(self) -> str:
+        """'inotify' o 'sondeo'."""
+        return 'inotify' if self._inotify is not None else 'sondeo'
+
+    def _recorrer_carpeta(self):
+        """Añade como candidatos todos los PDFs presentes y olvida los que ya no están."""
+        try:
+            nombres = {entrada.name for entrada in os.scandir(self.directorio)
+                       if entrada.is_file() and entrada.name.lower().endswith('.pdf')}
+        except OSError as e:
+            print(f"⚠️ ADVERTENCIA: No se pudo leer {self.directorio}: {e}")
+            return
+
+        for nombre in list(self._entregados):
+            if nombre not in nombres:
+                del self._entregados[nombre]
+        for nombre in nombres:
+            self._candidatos.setdefault(nombre, (-1, -1.0, 0.0))
+
+    def _comprobar_candidatos(self, ahora: float) -> List[str]:
+        """
+        Actualiza la firma de los candidatos y devuelve los que llevan estables el tiempo requerido.
+        """
+        listos = []
+        for nombre, (tamaño, mtime, desde) in list(self._candidatos.items()):
+            try:
+                stat = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                # Movido o eliminado antes de terminar
+                del self._candidatos[nombre]
+                continue
+
+            firma = (stat.st_size, stat.st_mtime)
+            if firma != (tamaño, mtime):
+                self._candidatos[nombre] = (stat.st_size, stat.st_mtime, ahora)
+                continue
+
+            if ahora - desde >= self.espera_estable:
+                del self._candidatos[nombre]
+                if self._entregados.get(nombre) != firma:
+                    self._entregados[nombre] = firma
+                    listos.append(nombre)
+        return listos
+
+    def _olvidar_desaparecidos(self):
+        """Olvida los PDFs entregados que ya no están en la carpeta (movidos al procesarlos)."""
+        for nombre in list(self._entregados):
+            if not os.path.exists(os.path.join(self.directorio, nombre)):
+                del self._entregados[nombre]
+
+    def esperar_lote(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Espera hasta que haya PDFs completos o venza el timeout.
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            List[str]: Rutas de los PDFs listos para procesar, ordenadas (vacía si venció el timeout)
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            ahora = time.monotonic()
+            listos = self._comprobar_candidatos(ahora)
+            if listos:
+                self._olvidar_desaparecidos()
+                return [os.path.join(self.directorio, nombre) for nombre in sorted(listos)]
+
+            if limite is not None and ahora >= limite:
+                return []
+
+            # Sin candidatos y con inotify basta con bloquear hasta el siguiente evento
+            espera = self.espera_estable / 2 if self._candidatos else None
+            if self._inotify is None:
+                espera = self.intervalo_sondeo if espera is None else min(espera, self.intervalo_sondeo)
+            if limite is not None:
+                espera = max(0.0, limite - ahora) if espera is None else min(espera, max(0.0, limite - ahora))
+
+            if self._inotify is not None:
+                nombres, desbordado = self._inotify.leer(espera)
+                if desbordado:
+                    self._recorrer_carpeta()
+                for nombre in nombres:
+                    if nombre.lower().endswith('.pdf'):
+                        self._candidatos.setdefault(nombre, (-1, -1.0, 0.0))
+            else:
+                time.sleep(espera)
+                self._recorrer_carpeta()
+
+    def cerrar(self):
+        """Libera el descriptor de inotify."""
+        if self._inotify is not None:
+            self._inotify.cerrar()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cerrar()
+        return False
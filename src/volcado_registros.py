@@ -0,0 +1,199 @@
+"""
+Volcado incremental de los registros de una ejecución a JSON Lines.
+
+procesar_directorio_facturas acumula las facturas en memoria y los reportes se
+exportan al terminar: si el proceso se interrumpe en el PDF 9.000 de 10.000 no
+queda nada. Con un volcado, cada factura y cada error se añaden a un archivo
+.jsonl en cuanto se producen (se escriben y sincronizan con el disco por lotes)
+y los reportes se generan después leyendo ese archivo.
+
+Para no retener los registros, consumir() vuelca un iterador como el de
+PDFExtractor.iter_facturas() y iter_facturas()/iter_errores()/registros() los
+vuelven a leer del archivo de uno en uno (al almacén del trimestre o a
+ExcelExporter.exportar_streaming()).
+
+Se usa JSON Lines y no CSV porque los registros no tienen todos las mismas
+columnas (metadatos _Error, _Duplicado...) y el exportador los necesita tal cual.
+
+Archivos (en el directorio indicado):
+- {prefijo}.jsonl          registros de facturas (exitosas, duplicadas y con error)
+- {prefijo}_ERRORES.jsonl  entradas del log de errores de extracción
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from src.registro_factura import a_diccionario
+
+
+class VolcadoRegistros:
+    """
+    Escritor por lotes de registros ('factura' | 'error') a JSON Lines.
+
+    Los archivos se crean con el primer registro: un volcado sin registros no
+    deja archivos vacíos.
+    """
+
+    TAMAÑO_LOTE = 50
+
+    def __init__(self, directorio: str, prefijo: str, tamaño_lote: int = TAMAÑO_LOTE):
+        """
+        Args:
+            directorio: Carpeta de los archivos .jsonl
+            prefijo: Nombre base de los archivos
+            tamaño_lote: Registros pendientes como máximo antes de escribir y sincronizar
+        """
+        self.directorio = Path(directorio)
+        self.ruta_facturas = self.directorio / f"{prefijo}.jsonl"
+        self.ruta_errores = self.directorio / f"{prefijo}_ERRORES.jsonl"
+        self.tamaño_lote = max(1, tamaño_lote)
+        self._pendientes: Dict[str, List[str]] = {'factura': [], 'error': []}
+        self._archivos: Dict[str, Any] = {}
+        self.total = {'factura': 0, 'error': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cerrar()
+
+    def añadir(self, tipo: str, registro: Dict[str, Any]):
+        """
+        Añade un registro al volcado.
+
+        Args:
+            tipo: 'factura' o 'error'
+            registro: Registro tal como lo entrega el extractor (RegistroFactura o diccionario)
+        """
+        self._pendientes[tipo].append(json.dumps(a_diccionario(registro), ensure_ascii=False,
+                                                 default=str) + "\n")
+        self.total[tipo] += 1
+        if len(self._pendientes['factura']) + len(self._pendientes['error']) >= self.tamaño_lote:
+            self.vaciar()
+
+    def volcar(self, registros: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Añade al volcado cada registro de un iterador y lo deja pasar.
+
+        Ejemplo:
+            for tipo, registro in volcado.volcar(extractor.iter_facturas()):
+                ...
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: Los mismos (tipo, registro) recibidos
+        """
+        for tipo, registro in registros:
+            self.añadir(tipo, registro)
+            yield tipo, registro
+
+    def consumir(self, registros: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Vuelca todos los registros de un iterador sin retenerlos en memoria.
+
+        Returns:
+            Dict[str, int]: Registros volcados de cada tipo ('factura', 'error') hasta ahora
+        """
+        for tipo, registro in registros:
+            self.añadir(tipo, registro)
+        return dict(self.total)
+
+    def vaciar(self):
+        """Escribe lo pendiente y lo sincroniza con el disco."""
+        for tipo, lineas in self._pendientes.items():
+            if not lineas:
+                continue
+            archivo = self._archivos.get(tipo)
+            if archivo is None:
+                self.directorio.mkdir(parents=True, exist_ok=True)
+                ruta = self.ruta_facturas if tipo == 'factura' else self.ruta_errores
+                archivo = self._archivos[tipo] = open(ruta, 'a', encoding='utf-8')
+            archivo.writelines(lineas)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            lineas.clear()
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra los archivos."""
+        try:
+            self.vaciar()
+        finally:
+            for archivo in self._archivos.values():
+                archivo.close()
+            self._archivos = {}
+
+    def eliminar(self):
+        """Cierra el volcado y borra sus archivos (cuando sus registros ya están a salvo en otro sitio)."""
+        self.cerrar()
+        for ruta in (self.ruta_facturas, self.ruta_errores):
+            if ruta.exists():
+                ruta.unlink()
+
+    def facturas(self) -> List[Dict[str, Any]]:
+        """Registros de facturas volcados (incluye los pendientes de escribir)."""
+        return list(self.iter_facturas())
+
+    def errores(self) -> List[Dict[str, Any]]:
+        """Entradas del log de errores volcadas (incluye las pendientes de escribir)."""
+        return list(self.iter_errores())
+
+    def iter_facturas(self) -> Iterator[Dict[str, Any]]:
+        """Como facturas(), pero leyendo el archivo registro a registro."""
+        self.vaciar()
+        return self.iter_leer(self.ruta_facturas)
+
+    def iter_errores(self) -> Iterator[Dict[str, Any]]:
+        """Como errores(), pero leyendo el archivo registro a registro."""
+        self.vaciar()
+        return self.iter_leer(self.ruta_errores)
+
+    def registros(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Recorre lo volcado como ('factura' | 'error', registro), leyendo de disco.
+
+        Es el formato de PDFExtractor.iter_facturas(), para ExcelExporter.exportar_streaming().
+        """
+        for factura in self.iter_facturas():
+            yield 'factura', factura
+        for error in self.iter_errores():
+            yield 'error', error
+
+    @staticmethod
+    def leer(ruta: Path) -> List[Dict[str, Any]]:
+        """
+        Lee un archivo .jsonl de un volcado.
+
+        Una línea incompleta (p.ej. la última si el proceso se interrumpió
+        escribiéndola) se descarta con un aviso.
+
+        Args:
+            ruta: Archivo .jsonl
+
+        Returns:
+            List[Dict[str, Any]]: Registros en orden de escritura ([] si el archivo no existe)
+        """
+        return list(VolcadoRegistros.iter_leer(ruta))
+
+    @staticmethod
+    def iter_leer(ruta: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Como leer(), pero entrega los registros de uno en uno sin cargar el archivo.
+
+        Args:
+            ruta: Archivo .jsonl
+
+        Yields:
+            Dict[str, Any]: Registros en orden de escritura (ninguno si el archivo no existe)
+        """
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for num_linea, linea in enumerate(f, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    print(f"⚠️ ADVERTENCIA: Línea {num_linea} incompleta en {ruta}, se descarta")
+                    continue
+                yield registro
@@ -7,6 +7,17 @@ import json
 from pathlib import Path
 
 
+@pytest.fixture(autouse=True)
+def directorio_de_trabajo_temporal(tmp_path, monkeypatch):
+    """
+    Ejecuta cada test desde tmp_path.
+
+    Extractor y organizador usan rutas relativas por defecto (documentos/, logs,
+    plantillas/): así lo que creen los tests queda fuera del repositorio.
+    """
+    monkeypatch.chdir(tmp_path)
+
+
 @pytest.fixture
 def project_root():
     """Devuelve la ruta raíz del proyecto."""
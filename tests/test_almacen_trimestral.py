@@ -0,0 +1,108 @@
+"""
+Tests para el almacén acumulado del trimestre.
+
+Valida que:
+1. Las ejecuciones sucesivas se acumulan y el informe incluye el trimestre completo
+2. Una factura reprocesada sustituye a la anterior en lugar de repetirse
+3. Los errores de un PDF se descartan cuando se vuelve a procesar
+4. El almacén persiste entre instancias
+5. Las facturas rechazadas de un mismo PDF multipágina se conservan todas
+"""
+
+import pandas as pd
+import pytest
+from src.almacen_trimestral import AlmacenTrimestral
+from src.excel_exporter import ExcelExporter
+
+
+def factura(num, archivo=None, **extra):
+    """Helper: registro de una factura exitosa."""
+    registro = {'CIF': 'B12345678', 'NumFactura': num, 'FechaFactura': '15/01/2025',
+                '_Archivo': archivo or f"{num}.pdf", '_Duplicado': False}
+    registro.update(extra)
+    return registro
+
+
+def error_extraccion(archivo, mensaje="Proveedor no identificado"):
+    """Helper: entrada del log de errores."""
+    return {'Archivo': archivo, 'Pagina': 'N/A', 'Error': mensaje, 'Proveedor': 'NO_IDENTIFICADO'}
+
+
+class TestAlmacenTrimestral:
+    """Tests de AlmacenTrimestral."""
+
+    def test_acumula_entre_ejecuciones(self, tmp_path):
+        ruta = tmp_path / "REGISTROS_2025_1T.db"
+        almacen = AlmacenTrimestral(str(ruta))
+        almacen.añadir([factura("F-1"), factura("F-2")])
+        almacen.cerrar()
+
+        siguiente = AlmacenTrimestral(str(ruta))
+        siguiente.añadir([factura("F-3")])
+
+        assert [r['NumFactura'] for r in siguiente.registros()] == ["F-1", "F-2", "F-3"]
+
+    def test_factura_reprocesada_se_actualiza(self, tmp_path):
+        almacen = AlmacenTrimestral(str(tmp_path / "almacen.db"))
+        almacen.añadir([factura("F-1", Base="100"), factura("F-2")])
+        almacen.añadir([factura("F-1", Base="120")])
+
+        registros = almacen.registros()
+        assert [r['NumFactura'] for r in registros] == ["F-1", "F-2"]
+        assert registros[0]['Base'] == "120"
+
+    def test_duplicados_no_sustituyen_a_la_factura(self, tmp_path):
+        almacen = AlmacenTrimestral(str(tmp_path / "almacen.db"))
+        almacen.añadir([factura("F-1"), factura("F-1", archivo="copia.pdf", _Duplicado=True)])
+
+        assert [r['_Duplicado'] for r in almacen.registros()] == [False, True]
+
+    def test_errores_anteriores_de_un_pdf_reprocesado(self, tmp_path):
+        almacen = AlmacenTrimestral(str(tmp_path / "almacen.db"))
+        almacen.añadir([factura("", archivo="roto.pdf", _Error="Sin datos")],
+                       [error_extraccion("roto.pdf"), error_extraccion("otro.pdf")])
+
+        # El PDF se corrige y se vuelve a procesar con éxito
+        almacen.añadir([factura("F-9", archivo="roto.pdf")])
+
+        assert [r['NumFactura'] for r in almacen.registros()] == ["F-9"]
+        assert [e['Archivo'] for e in almacen.errores()] == ["otro.pdf"]
+
+    def test_varias_facturas_rechazadas_del_mismo_pdf(self, tmp_path):
+        almacen = AlmacenTrimestral(str(tmp_path / "almacen.db"))
+        rechazadas = [factura(f"F-{pagina}", archivo="multi.pdf", _Pagina=pagina, _Error="CIF cliente no coincide")
+                      for pagina in (1, 2, 3)]
+
+        nuevos = almacen.añadir(rechazadas + [factura("F-4", archivo="multi.pdf", _Pagina=4)])
+
+        assert nuevos == 4
+        assert [r['NumFactura'] for r in almacen.registros()] == ["F-1", "F-2", "F-3", "F-4"]
+
+        # Al reprocesar el PDF, las rechazadas anteriores se sustituyen, no se suman
+        almacen.añadir(rechazadas[:2])
+        assert [r['NumFactura'] for r in almacen.registros()] == ["F-4", "F-1", "F-2"]
+
+
+class TestExportarTrimestreAcumulado:
+    """Tests de ExcelExporter.acumular_en_almacen."""
+
+    def test_informe_con_el_trimestre_completo(self, tmp_path):
+        primera = ExcelExporter([factura("F-1")], directorio_salida=str(tmp_path), trimestre="1T", año="2025")
+        primera.acumular_en_almacen()
+        primera.exportar_excel_formateado()
+
+        segunda = ExcelExporter([factura("F-2")], [error_extraccion("roto.pdf")],
+                                directorio_salida=str(tmp_path), trimestre="1T", año="2025")
+        segunda.acumular_en_almacen()
+        archivo = segunda.exportar_excel_formateado()
+
+        df = pd.read_excel(archivo, sheet_name="Facturas_Exitosas")
+        assert list(df['NumFactura']) == ["F-1", "F-2"]
+        assert len(segunda.errores) == 1
+        assert (tmp_path / "REGISTROS_2025_1T.db").exists()
+
+    def test_sin_trimestre_no_se_puede_acumular(self, tmp_path):
+        exporter = ExcelExporter([factura("F-1")], directorio_salida=str(tmp_path))
+
+        with pytest.raises(ValueError):
+            exporter.acumular_en_almacen()
@@ -0,0 +1,90 @@
+"""
+Tests para la búsqueda de palabras clave.
+
+Valida que:
+1. Cuenta las mismas palabras que buscar cada una con `in`
+2. Se detiene al alcanzar el límite
+3. analizar_contenido_pdf reutiliza el texto ya extraído y no sigue tras alcanzar el umbral
+"""
+
+import random
+from unittest.mock import MagicMock, patch
+from src.documento_pdf import DocumentoPDF
+from src.file_organizer import PDFOrganizer, PALABRAS_FACTURA
+from src.utils.buscador_palabras import BuscadorPalabras
+
+
+def contar_con_in(palabras, texto):
+    """Helper: recuento de referencia, una búsqueda por palabra."""
+    return sum(1 for palabra in set(palabras) if palabra in texto)
+
+
+class TestBuscadorPalabras:
+    """Tests de BuscadorPalabras."""
+
+    def test_igual_que_buscar_con_in(self):
+        palabras = [p.lower() for p in PALABRAS_FACTURA]
+        buscador = BuscadorPalabras(palabras)
+        generador = random.Random(7)
+        trozos = palabras + ["sub", "tot", "al ", "fact", "x", " ", "ura", "número"]
+
+        for _ in range(300):
+            texto = "".join(generador.choice(trozos) for _ in range(generador.randint(0, 30)))
+            assert buscador.contar(texto) == contar_con_in(palabras, texto), texto
+
+    def test_palabras_contenidas_en_otras(self):
+        buscador = BuscadorPalabras(["total", "subtotal", "tal", "he", "she", "hers"])
+        assert buscador.contar("subtotal") == 3
+        assert buscador.contar("ushers") == 3
+
+    def test_limite(self):
+        buscador = BuscadorPalabras(["factura", "cif", "iva", "total"])
+        assert buscador.contar("factura cif iva total", limite=2) == 2
+        assert buscador.contar("factura", limite=0) == 0
+
+    def test_sin_palabras(self):
+        assert BuscadorPalabras([]).contar("factura") == 0
+
+
+class TestAnalizarContenido:
+    """Tests de analizar_contenido_pdf con el buscador."""
+
+    def test_reutiliza_texto_extraido_sin_abrir_el_pdf(self, tmp_path):
+        organizer = PDFOrganizer(directorio_base=str(tmp_path))
+        documento = DocumentoPDF(str(tmp_path / "adjunto.pdf"))
+        documento.incorporar_textos({0: "Factura con CIF, IVA y total"})
+
+        with patch('pdfplumber.open') as mock_open:
+            es_factura, num_palabras = organizer.analizar_contenido_pdf(documento.ruta, documento=documento)
+
+        mock_open.assert_not_called()
+        assert es_factura is True
+        # Se cuentan todas las palabras de la página (factura, cif, iva, total), como en el log
+        assert num_palabras == 4
+
+    def test_no_extrae_mas_paginas_al_llegar_al_umbral(self, tmp_path):
+        paginas = [MagicMock() for _ in range(5)]
+        paginas[0].extract_text.return_value = "Factura"
+        paginas[1].extract_text.return_value = "Base imponible, IVA"
+        mock_pdf = MagicMock()
+        mock_pdf.pages = paginas
+        mock_pdf.__enter__.return_value = mock_pdf
+
+        organizer = PDFOrganizer(directorio_base=str(tmp_path))
+        (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+        with patch('pdfplumber.open', return_value=mock_pdf):
+            es_factura, num_palabras = organizer.analizar_contenido_pdf(str(tmp_path / "a.pdf"))
+
+        assert (es_factura, num_palabras) == (True, 3)
+        assert not paginas[2].extract_text.called
+
+    def test_pdf_con_menos_paginas(self, tmp_path):
+        pagina = MagicMock()
+        pagina.extract_text.return_value = "Documento sin datos fiscales"
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [pagina]
+        mock_pdf.__enter__.return_value = mock_pdf
+
+        organizer = PDFOrganizer(directorio_base=str(tmp_path))
+        with patch('pdfplumber.open', return_value=mock_pdf):
+            assert organizer.analizar_contenido_pdf(str(tmp_path / "a.pdf")) == (False, 0)
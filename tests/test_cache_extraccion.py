@@ -0,0 +1,161 @@
+"""
+Tests para la caché de resultados de extracción por contenido del PDF.
+
+Valida que:
+1. Una entrada solo es válida con el mismo PDF, la misma versión de plantilla y el mismo trimestre/año
+2. El tamaño está acotado y se eliminan primero las entradas usadas hace más tiempo
+3. Reprocesar un PDF ya extraído no vuelve a abrirlo
+"""
+
+import json
+import os
+import shutil
+from unittest.mock import Mock, MagicMock, patch
+from src.cache_extraccion import CacheExtraccion
+from src.pdf_extractor import PDFExtractor
+
+
+FACTURAS = [{'CIF': 'B12345678', 'NumFactura': 'F-001', '_Archivo': 'a.pdf'}]
+
+
+class TestCacheExtraccion:
+    """Tests de la caché en disco."""
+
+    def test_guardar_y_obtener(self, tmp_path):
+        cache = CacheExtraccion(tmp_path)
+        cache.guardar("hash1", "alfa", "v1", "1T|2025", FACTURAS)
+
+        entrada = cache.obtener("hash1", {"alfa": "v1"}, "1T|2025")
+
+        assert entrada == {'proveedor_id': 'alfa', 'facturas': FACTURAS}
+
+    def test_plantilla_modificada_invalida(self, tmp_path):
+        cache = CacheExtraccion(tmp_path)
+        cache.guardar("hash1", "alfa", "v1", "1T|2025", FACTURAS)
+
+        assert cache.obtener("hash1", {"alfa": "v2"}, "1T|2025") is None
+        assert cache.obtener("hash1", {}, "1T|2025") is None
+
+    def test_otro_trimestre_invalida(self, tmp_path):
+        """La asignación de trimestre depende de la ejecución: no se reutiliza entre trimestres."""
+        cache = CacheExtraccion(tmp_path)
+        cache.guardar("hash1", "alfa", "v1", "1T|2025", FACTURAS)
+
+        assert cache.obtener("hash1", {"alfa": "v1"}, "2T|2025") is None
+
+    def test_limite_elimina_las_menos_usadas(self, tmp_path):
+        cache = CacheExtraccion(tmp_path)
+        for i, nombre in enumerate(["vieja", "usada", "nueva"]):
+            cache.guardar(nombre, "alfa", "v1", "", FACTURAS)
+            os.utime(tmp_path / f"{nombre}.json", (1000 + i, 1000 + i))
+
+        # Un acierto la convierte en la más reciente
+        cache.obtener("usada", {"alfa": "v1"}, "")
+        cache.max_bytes = 2 * (tmp_path / "nueva.json").stat().st_size
+
+        eliminadas = cache.aplicar_limite()
+
+        assert eliminadas == 1
+        assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["nueva", "usada"]
+
+
+class TestReprocesamiento:
+    """Integración con procesar_directorio_facturas."""
+
+    def preparar(self, tmp_path):
+        plantillas_dir = tmp_path / "plantillas"
+        plantillas_dir.mkdir()
+        facturas_dir = tmp_path / "por_procesar"
+        facturas_dir.mkdir()
+        plantilla = {
+            "nombre_proveedor": "Proveedor Test",
+            "cif_proveedor": "B12345678",
+            "campos": [
+                {"nombre": "Nombre_Identificacion", "coordenadas": [10, 10, 100, 30],
+                 "tipo": "texto", "es_identificacion": True},
+                {"nombre": "NumFactura", "coordenadas": [10, 50, 100, 70], "tipo": "texto"},
+                {"nombre": "FechaFactura", "coordenadas": [10, 80, 100, 100], "tipo": "fecha"},
+            ]
+        }
+        (plantillas_dir / "proveedor_test.json").write_text(json.dumps(plantilla), encoding="utf-8")
+        (facturas_dir / "factura.pdf").write_bytes(b"%PDF-1.4 contenido")
+        return facturas_dir, plantillas_dir
+
+    def mock_pdf(self):
+        def mock_crop(bbox):
+            resultado = MagicMock()
+            if bbox[1] < 35:
+                resultado.extract_text.return_value = "Proveedor Test"
+            elif bbox[1] < 75:
+                resultado.extract_text.return_value = "F-001"
+            else:
+                resultado.extract_text.return_value = "15/01/2025"
+            return resultado
+
+        mock_page = MagicMock()
+        mock_page.extract_text.return_value = "Factura"
+        mock_page.crop = mock_crop
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [mock_page]
+        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
+        mock_pdf.__exit__ = Mock(return_value=None)
+        return mock_pdf
+
+    def procesar(self, facturas_dir, plantillas_dir):
+        # Sin atajo de copias exactas: el reenvío tiene que pasar por la caché
+        extractor = PDFExtractor(directorio_facturas=str(facturas_dir),
+                                 directorio_plantillas=str(plantillas_dir),
+                                 trimestre="1T", año="2025", detectar_copias_exactas=False)
+        extractor.cargar_plantillas()
+        return extractor, extractor.procesar_directorio_facturas()
+
+    @patch('pdfplumber.open')
+    def test_pdf_reenviado_no_se_vuelve_a_abrir(self, mock_pdf_open, tmp_path):
+        """El mismo PDF con otro nombre se recupera de caché sin abrirlo."""
+        facturas_dir, plantillas_dir = self.preparar(tmp_path)
+        mock_pdf_open.return_value = self.mock_pdf()
+        _, primera = self.procesar(facturas_dir, plantillas_dir)
+
+        organizado = next((tmp_path / "procesados" / "facturas").rglob("factura.pdf"))
+        shutil.copy(organizado, facturas_dir / "reenviado.pdf")
+        mock_pdf_open.reset_mock()
+
+        extractor, segunda = self.procesar(facturas_dir, plantillas_dir)
+
+        mock_pdf_open.assert_not_called()
+        assert extractor.extracciones_desde_cache == 1
+        assert segunda[0]['NumFactura'] == primera[0]['NumFactura']
+        assert segunda[0]['_Archivo'] == "reenviado.pdf"
+
+    @patch('pdfplumber.open')
+    def test_cambio_de_plantilla_vuelve_a_extraer(self, mock_pdf_open, tmp_path):
+        facturas_dir, plantillas_dir = self.preparar(tmp_path)
+        mock_pdf_open.return_value = self.mock_pdf()
+        self.procesar(facturas_dir, plantillas_dir)
+
+        organizado = next((tmp_path / "procesados" / "facturas").rglob("factura.pdf"))
+        shutil.copy(organizado, facturas_dir / "reenviado.pdf")
+        ruta_plantilla = plantillas_dir / "proveedor_test.json"
+        plantilla = json.loads(ruta_plantilla.read_text(encoding="utf-8"))
+        plantilla["campos"][1]["coordenadas"] = [10, 50, 120, 70]
+        ruta_plantilla.write_text(json.dumps(plantilla), encoding="utf-8")
+        mock_pdf_open.reset_mock()
+
+        extractor, _ = self.procesar(facturas_dir, plantillas_dir)
+
+        assert mock_pdf_open.called
+        assert extractor.extracciones_desde_cache == 0
+
+    @patch('pdfplumber.open')
+    def test_pdf_ilegible_es_un_error_del_archivo(self, mock_pdf_open, tmp_path):
+        """Un PDF que no se puede leer se registra como error sin detener el lote."""
+        facturas_dir, plantillas_dir = self.preparar(tmp_path)
+        mock_pdf_open.return_value = self.mock_pdf()
+        (facturas_dir / "ilegible.pdf").mkdir()
+
+        extractor, resultados = self.procesar(facturas_dir, plantillas_dir)
+
+        assert [r['_Archivo'] for r in resultados] == ["factura.pdf"]
+        assert [e['Archivo'] for e in extractor.errores] == ["ilegible.pdf"]
+        assert "No se pudo leer" in extractor.errores[0]['Error']
+        assert (facturas_dir / "ilegible.pdf").exists()
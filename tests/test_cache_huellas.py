@@ -0,0 +1,224 @@
+"""
+Tests para la caché persistente de huellas de maquetación.
+
+Valida que:
+1. Facturas con la misma maquetación y distintos datos tienen la misma huella
+2. La caché asocia huella → proveedor y cuenta aciertos y fallos
+3. Las entradas se invalidan cuando cambia el JSON de la plantilla
+4. identificar_proveedor no prueba plantillas cuando la huella ya es conocida
+5. Un acierto se confirma con las regiones del proveedor, sin extraer la página completa
+6. Una huella que apunta a otro proveedor no se da por buena
+"""
+
+import json
+import pytest
+import pdfplumber
+from unittest.mock import patch
+from pdfplumber.page import Page
+from src.cache_huellas import CacheHuellas, calcular_huella_layout
+from src.documento_pdf import DocumentoPDF
+from src.pdf_extractor import PDFExtractor
+
+
+def crear_factura(ruta, proveedor, cif, num_factura, fecha):
+    """Helper: PDF real con cabecera fija de proveedor y datos variables."""
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    c = canvas.Canvas(str(ruta))
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, 800, proveedor)
+    c.setFont("Helvetica", 9)
+    c.drawString(50, 785, f"CIF: {cif}")
+    c.drawString(400, 800, "FACTURA")
+    c.drawString(400, 785, f"Número: {num_factura}")
+    c.drawString(400, 770, f"Fecha: {fecha}")
+    c.save()
+    return str(ruta)
+
+
+def huella_de(ruta):
+    with pdfplumber.open(ruta) as pdf:
+        return calcular_huella_layout(pdf.pages[0])
+
+
+class TestHuellaLayout:
+    """Tests del cálculo de la huella."""
+
+    def test_misma_maquetacion_misma_huella(self, tmp_path):
+        """Números y fechas distintos no cambian la huella."""
+        a = crear_factura(tmp_path / "a.pdf", "Proveedor Alfa", "B12345678", "F-001", "15/01/2025")
+        b = crear_factura(tmp_path / "b.pdf", "Proveedor Alfa", "B12345678", "F-999", "30/06/2025")
+
+        assert huella_de(a) == huella_de(b)
+
+    def test_proveedor_distinto_huella_distinta(self, tmp_path):
+        """El nombre del proveedor en la cabecera forma parte de la huella."""
+        a = crear_factura(tmp_path / "a.pdf", "Proveedor Alfa", "B12345678", "F-001", "15/01/2025")
+        b = crear_factura(tmp_path / "b.pdf", "Proveedor Beta", "B87654321", "F-001", "15/01/2025")
+
+        assert huella_de(a) != huella_de(b)
+
+    def test_cabecera_sin_texto_fijo_sin_huella(self, tmp_path):
+        """Una cabecera solo con números no basta para distinguir proveedores."""
+        canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+        ruta = tmp_path / "numeros.pdf"
+        c = canvas.Canvas(str(ruta))
+        c.drawString(50, 800, "2025-001")
+        c.drawString(400, 800, "15/01/2025")
+        c.save()
+
+        assert huella_de(str(ruta)) is None
+
+    def test_pagina_no_pdfplumber_sin_huella(self):
+        """Sin página real no hay huella (y no se usa la caché)."""
+        assert calcular_huella_layout(object()) is None
+
+
+class TestCacheHuellas:
+    """Tests de la caché en disco."""
+
+    def test_registrar_y_buscar(self, tmp_path):
+        """Una huella registrada se encuentra mientras la plantilla no cambie."""
+        cache = CacheHuellas(tmp_path / "cache.json")
+        cache.registrar("h1", "alfa", "v1")
+
+        assert cache.buscar("h1", {"alfa": "v1"}) == "alfa"
+        assert cache.buscar("h2", {"alfa": "v1"}) is None
+        assert (cache.aciertos, cache.fallos) == (1, 1)
+
+    def test_plantilla_modificada_invalida_entrada(self, tmp_path):
+        """Si la versión de la plantilla cambia, la huella se descarta."""
+        cache = CacheHuellas(tmp_path / "cache.json")
+        cache.registrar("h1", "alfa", "v1")
+
+        assert cache.buscar("h1", {"alfa": "v2"}) is None
+        assert "h1" not in cache.datos['huellas']
+
+    def test_persistencia(self, tmp_path):
+        """guardar() escribe la caché y una nueva instancia la recupera."""
+        ruta = tmp_path / "indices" / "cache.json"
+        cache = CacheHuellas(ruta)
+        cache.registrar("h1", "alfa", "v1")
+        cache.buscar("h1", {"alfa": "v1"})
+        cache.guardar()
+
+        recargada = CacheHuellas(ruta)
+        assert recargada.buscar("h1", {"alfa": "v1"}) == "alfa"
+        assert recargada.datos['huellas']["h1"]['aciertos'] == 2
+
+    def test_incorporar_cambios_de_otra_copia(self, tmp_path):
+        """Los cambios de un proceso hijo se aplican sobre la caché principal."""
+        principal = CacheHuellas(tmp_path / "cache.json")
+        copia = CacheHuellas(tmp_path / "cache.json")
+        copia.registrar("h1", "alfa", "v1")
+        copia.buscar("h1", {"alfa": "v1"})
+        copia.buscar("h2", {"alfa": "v1"})
+
+        principal.incorporar_cambios(copia.exportar_cambios())
+
+        assert principal.datos['huellas']["h1"]['proveedor_id'] == "alfa"
+        assert (principal.aciertos, principal.fallos) == (1, 1)
+
+
+class TestIdentificacionConHuella:
+    """Integración con identificar_proveedor."""
+
+    def preparar(self, tmp_path):
+        plantillas_dir = tmp_path / "plantillas"
+        plantillas_dir.mkdir()
+        facturas_dir = tmp_path / "documentos" / "por_procesar"
+        facturas_dir.mkdir(parents=True)
+        plantilla = {
+            "nombre_proveedor": "Proveedor Alfa",
+            "cif_proveedor": "B12345678",
+            "campos": [
+                {"nombre": "Nombre_Identificacion", "coordenadas": [40, 30, 300, 50],
+                 "tipo": "texto", "es_identificacion": True},
+            ]
+        }
+        ruta_plantilla = plantillas_dir / "alfa.json"
+        ruta_plantilla.write_text(json.dumps(plantilla), encoding="utf-8")
+        a = crear_factura(facturas_dir / "a.pdf", "Proveedor Alfa", "B12345678", "F-001", "15/01/2025")
+        b = crear_factura(facturas_dir / "b.pdf", "Proveedor Alfa", "B12345678", "F-002", "16/01/2025")
+        return ruta_plantilla, facturas_dir, plantillas_dir, a, b
+
+    def nuevo_extractor(self, facturas_dir, plantillas_dir):
+        extractor = PDFExtractor(directorio_facturas=str(facturas_dir),
+                                 directorio_plantillas=str(plantillas_dir))
+        extractor.cargar_plantillas()
+        return extractor
+
+    def test_segunda_factura_no_prueba_plantillas(self, tmp_path):
+        """Tras identificar una maquetación, las siguientes se resuelven por huella."""
+        _, facturas_dir, plantillas_dir, a, b = self.preparar(tmp_path)
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+
+        assert extractor.identificar_proveedor(a) == "alfa"
+        with patch.object(PDFExtractor, '_identificar_por_plantillas') as mock_plantillas:
+            assert extractor.identificar_proveedor(b) == "alfa"
+
+        mock_plantillas.assert_not_called()
+        assert extractor.cache_huellas.aciertos == 1
+
+    def test_acierto_no_extrae_la_pagina_completa(self, tmp_path):
+        """La huella y la confirmación solo leen la cabecera y las regiones del proveedor."""
+        _, facturas_dir, plantillas_dir, a, b = self.preparar(tmp_path)
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+        extractor.identificar_proveedor(a)
+
+        with patch.object(DocumentoPDF, 'texto_pagina') as mock_texto, \
+                patch.object(Page, 'extract_text') as mock_extract_text, \
+                patch.object(Page, 'extract_words') as mock_extract_words:
+            assert extractor.identificar_proveedor(b) == "alfa"
+
+        mock_texto.assert_not_called()
+        mock_extract_text.assert_not_called()
+        mock_extract_words.assert_not_called()
+        assert extractor.cache_huellas.aciertos == 1
+
+    def test_cambio_de_plantilla_vuelve_a_probar(self, tmp_path):
+        """Una plantilla modificada en disco invalida la huella guardada."""
+        ruta_plantilla, facturas_dir, plantillas_dir, a, b = self.preparar(tmp_path)
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+        extractor.identificar_proveedor(a)
+        extractor.cache_huellas.guardar()
+
+        plantilla = json.loads(ruta_plantilla.read_text(encoding="utf-8"))
+        plantilla["nombre_proveedor"] = "Proveedor Alfa S.L."
+        ruta_plantilla.write_text(json.dumps(plantilla), encoding="utf-8")
+
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+        with patch.object(PDFExtractor, '_identificar_por_plantillas', return_value="alfa") as mock_plantillas:
+            assert extractor.identificar_proveedor(b) == "alfa"
+
+        mock_plantillas.assert_called_once()
+
+    def test_cache_se_guarda_junto_a_los_indices(self, tmp_path):
+        """procesar_directorio_facturas persiste la caché en procesados/indices."""
+        _, facturas_dir, plantillas_dir, _, _ = self.preparar(tmp_path)
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+
+        extractor.procesar_directorio_facturas()
+
+        ruta_cache = tmp_path / "documentos" / "procesados" / "indices" / "cache_huellas.json"
+        datos = json.loads(ruta_cache.read_text(encoding="utf-8"))
+        assert len(datos['huellas']) == 1
+        assert datos['estadisticas'] == {'aciertos': 1, 'fallos': 1}
+
+    def test_huella_de_otro_proveedor_no_se_acepta(self, tmp_path):
+        """Si la plantilla de la caché no coincide con la página, se prueban todas."""
+        _, facturas_dir, plantillas_dir, a, b = self.preparar(tmp_path)
+        beta = {
+            "nombre_proveedor": "Proveedor Beta",
+            "cif_proveedor": "B87654321",
+            "campos": [
+                {"nombre": "Nombre_Identificacion", "coordenadas": [40, 30, 300, 50],
+                 "tipo": "texto", "es_identificacion": True},
+            ]
+        }
+        (plantillas_dir / "beta.json").write_text(json.dumps(beta), encoding="utf-8")
+        extractor = self.nuevo_extractor(facturas_dir, plantillas_dir)
+        huella = huella_de(b)
+        extractor.cache_huellas.registrar(huella, "beta", extractor.versiones_plantillas["beta"])
+
+        assert extractor.identificar_proveedor(b) == "alfa"
+        assert extractor.cache_huellas.datos['huellas'][huella]['proveedor_id'] == "alfa"
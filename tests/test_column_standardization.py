@@ -17,6 +17,13 @@ from src.pdf_extractor import PDFExtractor
 from src.excel_exporter import ExcelExporter
 
 
+def crear_pdf(directorio):
+    """Helper: PDF de prueba en disco (su contenido lo simula pdfplumber.open)."""
+    ruta = directorio / "test.pdf"
+    ruta.write_bytes(b"%PDF-1.4")
+    return str(ruta)
+
+
 class TestColumnStandardization:
     """Tests para la estandarización de nombres de columnas."""
 
@@ -96,7 +103,7 @@ class TestColumnStandardization:
             mock_pdf.return_value.__enter__.return_value.pages = [mock_page]
 
             # Extraer datos - usar nombre del archivo JSON como key (sin .json)
-            datos = extractor.extraer_datos_factura("test.pdf", "test")
+            datos = extractor.extraer_datos_factura(crear_pdf(tmp_path), "test")
 
             # Verificar que tiene todas las columnas estándar
             columnas_esperadas = [
@@ -147,7 +154,7 @@ class TestColumnStandardization:
             mock_pdf.return_value.__enter__.return_value.pages = [mock_page]
 
             # La key ahora es el nombre del archivo JSON (sin .json)
-            datos = extractor.extraer_datos_factura("test.pdf", "test")
+            datos = extractor.extraer_datos_factura(crear_pdf(tmp_path), "test")
 
             # Campos que no están en la plantilla deben estar vacíos
             assert datos['FechaVto'] == ''
@@ -182,7 +189,7 @@ class TestColumnStandardization:
             mock_pdf.return_value.__enter__.return_value.pages = [mock_page]
 
             # La key ahora es el nombre del archivo JSON (sin .json)
-            datos = extractor.extraer_datos_factura("test.pdf", "test")
+            datos = extractor.extraer_datos_factura(crear_pdf(tmp_path), "test")
 
             # Verificar que los metadatos tienen prefijo _
             assert '_Archivo' in datos
@@ -451,7 +458,7 @@ class TestIntegrationColumnStandardization:
             mock_pdf.return_value.__enter__.return_value.pages = [mock_page]
 
             # Extraer datos - el nombre del archivo es test_provider.json, así que key es "test_provider"
-            datos = extractor.extraer_datos_factura("test.pdf", "test_provider")
+            datos = extractor.extraer_datos_factura(crear_pdf(tmp_path), "test_provider")
 
             # Crear exportador
             exporter = ExcelExporter([datos], directorio_salida=str(output_dir))
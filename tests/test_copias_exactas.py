@@ -0,0 +1,128 @@
+"""
+Tests para el atajo de copias exactas (reenvíos idénticos byte a byte).
+
+Valida que:
+1. Un PDF idéntico a una factura ya indexada va a duplicados sin abrirlo con pdfplumber
+2. La copia no genera registros de factura
+3. Funciona igual en modo secuencial y paralelo
+4. Los archivos vacíos no se consideran copia de nada
+"""
+
+import hashlib
+import shutil
+from unittest.mock import patch
+from src.documento_pdf import DocumentoPDF
+from src.file_organizer import PDFOrganizer
+from src.pdf_extractor import PDFExtractor
+from tests.test_procesamiento_paralelo import crear_mock_pdf_open, preparar_entorno, requiere_fork
+
+
+NUMEROS = {
+    "a.pdf": "F-001",
+    "b.pdf": "F-002",
+}
+
+
+def procesar(facturas_dir, plantillas_dir, workers=1):
+    extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir)
+    extractor.cargar_plantillas()
+    return extractor, extractor.procesar_directorio_facturas(workers=workers)
+
+
+def reenviar(tmp_path, nombre_original, nombre_nuevo):
+    """Helper: copia a por_procesar un PDF ya organizado."""
+    organizado = next((tmp_path / "procesados" / "facturas").rglob(nombre_original))
+    shutil.copy(organizado, tmp_path / "por_procesar" / nombre_nuevo)
+
+
+class TestCopiasExactas:
+    """Tests del atajo por hash antes de analizar el PDF."""
+
+    def test_reenvio_identico_no_se_abre(self, tmp_path):
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, NUMEROS)
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS)):
+            procesar(facturas_dir, plantillas_dir)
+        reenviar(tmp_path, "a.pdf", "reenviado.pdf")
+
+        with patch('pdfplumber.open') as mock_open:
+            extractor, resultados = procesar(facturas_dir, plantillas_dir)
+
+        mock_open.assert_not_called()
+        assert resultados == []
+        assert extractor.copias_exactas == 1
+        assert (tmp_path / "procesados" / "duplicados" / "2025" / "1T" / "reenviado.pdf").exists()
+        assert not list((tmp_path / "por_procesar").glob("*.pdf"))
+
+    def test_copia_dentro_de_la_misma_ejecucion(self, tmp_path):
+        numeros = dict(NUMEROS, **{"c.pdf": "F-001"})
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, numeros)
+        shutil.copy(tmp_path / "por_procesar" / "a.pdf", tmp_path / "por_procesar" / "c.pdf")
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)):
+            extractor, resultados = procesar(facturas_dir, plantillas_dir)
+
+        assert [r['_Archivo'] for r in resultados] == ["a.pdf", "b.pdf"]
+        assert extractor.copias_exactas == 1
+
+    def test_desactivado_procesa_el_reenvio(self, tmp_path):
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, NUMEROS)
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS)):
+            procesar(facturas_dir, plantillas_dir)
+        reenviar(tmp_path, "a.pdf", "a.pdf")
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS)):
+            extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir,
+                                     detectar_copias_exactas=False)
+            extractor.cargar_plantillas()
+            resultados = extractor.procesar_directorio_facturas()
+
+        assert [r['NumFactura'] for r in resultados] == ["F-001"]
+        assert extractor.copias_exactas == 0
+
+    def test_archivo_vacio_no_es_copia(self, tmp_path):
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, {})
+        extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir)
+        extractor.organizador.agregar_al_indice(2025, "1T", {
+            "cif_proveedor": "B1", "fecha_factura": "2025-01-15", "num_factura": "F-1",
+            "hash_md5": hashlib.md5(b"").hexdigest()
+        })
+        vacio = tmp_path / "por_procesar" / "vacio.pdf"
+        vacio.write_bytes(b"")
+
+        assert extractor._buscar_copia_exacta(DocumentoPDF(str(vacio))) is None
+
+    @requiere_fork
+    def test_modo_paralelo(self, tmp_path):
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, NUMEROS)
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS)):
+            procesar(facturas_dir, plantillas_dir)
+        reenviar(tmp_path, "a.pdf", "reenviado_a.pdf")
+        reenviar(tmp_path, "b.pdf", "reenviado_b.pdf")
+        numeros = {"c.pdf": "F-003"}
+        (tmp_path / "por_procesar" / "c.pdf").write_bytes(b"%PDF c.pdf")
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)):
+            extractor, resultados = procesar(facturas_dir, plantillas_dir, workers=2)
+
+        assert [r['_Archivo'] for r in resultados] == ["c.pdf"]
+        assert extractor.copias_exactas == 2
+        assert len(list((tmp_path / "procesados" / "duplicados").rglob("reenviado_*.pdf"))) == 2
+
+
+class TestBuscarPorHash:
+    """Tests de PDFOrganizer.buscar_por_hash."""
+
+    def test_json_ve_disco_y_altas_de_la_ejecucion(self, tmp_path):
+        anterior = PDFOrganizer(directorio_base=str(tmp_path))
+        anterior.agregar_al_indice(2024, "4T", {"cif_proveedor": "B1", "fecha_factura": "2024-12-01",
+                                                "num_factura": "F-1", "hash_md5": "h1"})
+        anterior.finalizar()
+
+        organizador = PDFOrganizer(directorio_base=str(tmp_path))
+        assert organizador.buscar_por_hash("h1")["num_factura"] == "F-1"
+        assert organizador.buscar_por_hash("h2") is None
+
+        organizador.agregar_al_indice(2025, "1T", {"cif_proveedor": "B1", "fecha_factura": "2025-01-01",
+                                                   "num_factura": "F-2", "hash_md5": "h2"})
+        assert organizador.buscar_por_hash("h2")["num_factura"] == "F-2"
+        assert organizador.buscar_por_hash("") is None
@@ -0,0 +1,223 @@
+"""
+Tests para DocumentoPDF: cada PDF se abre y parsea una sola vez por ejecución.
+
+Valida que:
+1. El documento abre el PDF de forma perezosa y una única vez, desde los bytes ya leídos
+2. Hash y texto de página se cachean y sobreviven al cierre
+3. abrir_documento solo cierra los documentos que crea
+4. procesar_directorio_facturas comparte el documento entre todas las fases
+"""
+
+import json
+import hashlib
+import pytest
+from unittest.mock import Mock, MagicMock, patch
+from src.documento_pdf import DocumentoPDF, abrir_documento
+from src.pdf_extractor import PDFExtractor
+
+
+def crear_mock_pdf(texto_pagina="Factura CIF IVA Total", crop_texto=""):
+    """Helper: PDF simulado con una página."""
+    mock_page = MagicMock()
+    mock_page.extract_text.return_value = texto_pagina
+    mock_page.crop.return_value.extract_text.return_value = crop_texto
+    mock_pdf = MagicMock()
+    mock_pdf.pages = [mock_page]
+    mock_pdf.__enter__ = Mock(return_value=mock_pdf)
+    mock_pdf.__exit__ = Mock(return_value=None)
+    return mock_pdf
+
+
+@pytest.fixture
+def factura_pdf(tmp_path):
+    """Ruta a un PDF de prueba en disco (pdfplumber se simula)."""
+    ruta = tmp_path / "factura.pdf"
+    ruta.write_bytes(b"%PDF-1.4 contenido")
+    return str(ruta)
+
+
+class TestDocumentoPDF:
+    """Tests del contexto de documento."""
+
+    @patch('pdfplumber.open')
+    def test_no_abre_pdf_hasta_que_se_necesita(self, mock_pdf_open):
+        """Crear el documento no lee ni parsea nada."""
+        DocumentoPDF("no_existe.pdf")
+
+        mock_pdf_open.assert_not_called()
+
+    @patch('pdfplumber.open')
+    def test_abre_pdf_una_sola_vez(self, mock_pdf_open, factura_pdf):
+        """Accesos repetidos a pdf/paginas reutilizan el mismo objeto."""
+        mock_pdf_open.return_value = crear_mock_pdf()
+
+        documento = DocumentoPDF(factura_pdf)
+        paginas_1 = documento.paginas
+        paginas_2 = documento.paginas
+
+        assert paginas_1 is paginas_2
+        mock_pdf_open.assert_called_once()
+        flujo = mock_pdf_open.call_args.args[0]
+        assert flujo.getvalue() == b"%PDF-1.4 contenido"
+        assert flujo.name == factura_pdf
+
+    @patch('pdfplumber.open')
+    def test_archivo_se_lee_una_sola_vez(self, mock_pdf_open, factura_pdf):
+        """Hash y parseo comparten la misma lectura de disco."""
+        mock_pdf_open.return_value = crear_mock_pdf()
+
+        with patch('builtins.open', wraps=open) as mock_open:
+            documento = DocumentoPDF(factura_pdf)
+            documento.hash_md5
+            documento.paginas
+            documento.contenido
+
+        assert [c.args[0] for c in mock_open.call_args_list] == [factura_pdf]
+
+    @patch('pdfplumber.open')
+    def test_texto_pagina_se_cachea(self, mock_pdf_open, factura_pdf):
+        """El texto de cada página se extrae solo la primera vez."""
+        mock_pdf = crear_mock_pdf(texto_pagina="Factura 001")
+        mock_pdf_open.return_value = mock_pdf
+
+        documento = DocumentoPDF(factura_pdf)
+
+        assert documento.texto_pagina(0) == "Factura 001"
+        assert documento.texto_pagina(0) == "Factura 001"
+        assert mock_pdf.pages[0].extract_text.call_count == 1
+
+    def test_hash_md5_del_contenido(self, tmp_path):
+        """El hash se calcula sobre los bytes del archivo."""
+        ruta = tmp_path / "factura.pdf"
+        ruta.write_bytes(b"contenido de prueba")
+
+        documento = DocumentoPDF(str(ruta))
+
+        assert documento.hash_md5 == hashlib.md5(b"contenido de prueba").hexdigest()
+
+    def test_hash_disponible_tras_mover_archivo(self, tmp_path):
+        """Una vez calculado, el hash no necesita volver a leer el archivo."""
+        ruta = tmp_path / "factura.pdf"
+        ruta.write_bytes(b"abc")
+
+        documento = DocumentoPDF(str(ruta))
+        hash_inicial = documento.hash_md5
+        ruta.rename(tmp_path / "movida.pdf")
+
+        assert documento.hash_md5 == hash_inicial
+
+    @patch('pdfplumber.open')
+    def test_cerrar_libera_pdf_y_conserva_cache(self, mock_pdf_open, factura_pdf):
+        """cerrar() cierra el PDF pero mantiene el texto ya extraído."""
+        mock_pdf = crear_mock_pdf(texto_pagina="Texto")
+        mock_pdf_open.return_value = mock_pdf
+
+        documento = DocumentoPDF(factura_pdf)
+        documento.texto_pagina(0)
+        documento.cerrar()
+
+        mock_pdf.__exit__.assert_called_once()
+        assert documento.texto_pagina(0) == "Texto"
+        assert mock_pdf_open.call_count == 1
+
+    @patch('pdfplumber.open')
+    def test_abrir_documento_reutiliza_y_no_cierra_compartido(self, mock_pdf_open, factura_pdf):
+        """Un documento recibido se reutiliza y sigue abierto al salir."""
+        mock_pdf = crear_mock_pdf()
+        mock_pdf_open.return_value = mock_pdf
+        compartido = DocumentoPDF(factura_pdf)
+
+        with abrir_documento(factura_pdf, compartido) as doc:
+            assert doc is compartido
+            doc.paginas
+
+        mock_pdf.__exit__.assert_not_called()
+
+    @patch('pdfplumber.open')
+    def test_abrir_documento_cierra_documento_propio(self, mock_pdf_open, factura_pdf):
+        """Sin documento, se crea uno propio que se cierra al salir."""
+        mock_pdf = crear_mock_pdf()
+        mock_pdf_open.return_value = mock_pdf
+
+        with abrir_documento(factura_pdf) as doc:
+            doc.paginas
+
+        mock_pdf.__exit__.assert_called_once()
+
+
+class TestProcesamientoUnaAperturaPorArchivo:
+    """El flujo completo abre cada PDF una sola vez."""
+
+    def crear_plantilla(self, plantillas_dir):
+        """Helper: plantilla que identifica por nombre."""
+        plantilla = {
+            "nombre_proveedor": "Proveedor Test",
+            "cif_proveedor": "B12345678",
+            "campos": [
+                {"nombre": "Nombre_Identificacion", "coordenadas": [10, 10, 100, 30],
+                 "tipo": "texto", "es_identificacion": True},
+                {"nombre": "NumFactura", "coordenadas": [10, 50, 100, 70], "tipo": "texto"},
+                {"nombre": "FechaFactura", "coordenadas": [10, 80, 100, 100], "tipo": "fecha"},
+            ]
+        }
+        with open(plantillas_dir / "proveedor_test.json", "w", encoding="utf-8") as f:
+            json.dump(plantilla, f)
+
+    @patch('pdfplumber.open')
+    def test_factura_exitosa_abre_pdf_una_vez(self, mock_pdf_open, tmp_path):
+        """Identificación, extracción y organización comparten una sola apertura."""
+        plantillas_dir = tmp_path / "plantillas"
+        plantillas_dir.mkdir()
+        facturas_dir = tmp_path / "por_procesar"
+        facturas_dir.mkdir()
+        self.crear_plantilla(plantillas_dir)
+        (facturas_dir / "factura.pdf").write_bytes(b"%PDF-simulado")
+
+        def mock_crop(bbox):
+            resultado = MagicMock()
+            if bbox[1] < 35:
+                resultado.extract_text.return_value = "Proveedor Test"
+            elif bbox[1] < 75:
+                resultado.extract_text.return_value = "F-001"
+            else:
+                resultado.extract_text.return_value = "15/01/2025"
+            return resultado
+
+        mock_pdf = crear_mock_pdf()
+        mock_pdf.pages[0].crop = mock_crop
+        mock_pdf_open.return_value = mock_pdf
+
+        extractor = PDFExtractor(directorio_facturas=str(facturas_dir),
+                                 directorio_plantillas=str(plantillas_dir))
+        extractor.cargar_plantillas()
+        resultados = extractor.procesar_directorio_facturas()
+
+        assert len(resultados) == 1
+        assert mock_pdf_open.call_count == 1
+
+        # El hash del índice sale de los bytes leídos antes de mover
+        with open(tmp_path / "procesados" / "indices" / "indice_2025_1T.json", encoding="utf-8") as f:
+            indice = json.load(f)
+        assert indice["facturas"][0]["hash_md5"] == hashlib.md5(b"%PDF-simulado").hexdigest()
+
+    @patch('pdfplumber.open')
+    def test_pdf_sin_proveedor_abre_pdf_una_vez(self, mock_pdf_open, tmp_path):
+        """La clasificación de errores reutiliza el PDF abierto en la identificación."""
+        plantillas_dir = tmp_path / "plantillas"
+        plantillas_dir.mkdir()
+        facturas_dir = tmp_path / "por_procesar"
+        facturas_dir.mkdir()
+        self.crear_plantilla(plantillas_dir)
+        (facturas_dir / "desconocido.pdf").write_bytes(b"%PDF")
+
+        mock_pdf_open.return_value = crear_mock_pdf(texto_pagina="Factura CIF IVA Total",
+                                                    crop_texto="Otra Empresa")
+
+        extractor = PDFExtractor(directorio_facturas=str(facturas_dir),
+                                 directorio_plantillas=str(plantillas_dir))
+        extractor.cargar_plantillas()
+        extractor.procesar_directorio_facturas()
+
+        assert mock_pdf_open.call_count == 1
+        destino = tmp_path / "procesados" / "errores" / "sin_plantilla_posible_factura" / "desconocido.pdf"
+        assert destino.exists()
@@ -328,7 +328,8 @@ class TestDuplicateDetection:
         current_pdf = [None]
 
         def mock_pdf_open_func(path):
-            current_pdf[0] = path
+            # DocumentoPDF pasa los bytes en un flujo que conserva la ruta en .name
+            current_pdf[0] = getattr(path, 'name', path)
 
             def mock_crop(bbox):
                 mock_result = MagicMock()
@@ -499,7 +499,8 @@ class TestCompleteWorkflow:
 
         def mock_pdf_open_func(filepath):
             # Guardar el nombre del archivo actual
-            current_file['name'] = os.path.basename(filepath)
+            # (DocumentoPDF pasa los bytes en un flujo que conserva la ruta en .name)
+            current_file['name'] = os.path.basename(getattr(filepath, 'name', filepath))
 
             def mock_crop(bbox):
                 mock_result = MagicMock()
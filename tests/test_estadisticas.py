@@ -0,0 +1,102 @@
+"""
+Tests para el módulo de estadísticas.
+
+Valida que:
+1. Resumen, estadísticas por proveedor y por campo se calculan correctamente con pandas
+2. Las estadísticas del extractor se actualizan según llega cada factura
+3. obtener_estadisticas solo recalcula si los resultados cambian desde fuera
+"""
+
+from unittest.mock import patch
+import pandas as pd
+from src.estadisticas import (EstadisticasExtraccion, estadisticas_campos, estadisticas_proveedores,
+                              resumen_registros)
+from src.pdf_extractor import PDFExtractor
+from tests.test_procesamiento_paralelo import crear_mock_pdf_open, preparar_entorno
+
+
+def registros():
+    """Helper: registros de dos proveedores con un error y un duplicado."""
+    return [
+        {'CIF': 'B1', 'Base': '10', '_Proveedor_ID': 'P1', '_Proveedor_Nombre': 'Uno', '_Duplicado': False},
+        {'CIF': 'B1', 'Base': 'ERROR: ilegible', '_Proveedor_ID': 'P1', '_Proveedor_Nombre': 'Uno',
+         '_Duplicado': False},
+        {'CIF': 'B1', 'Base': '10', '_Proveedor_ID': 'P1', '_Proveedor_Nombre': 'Uno', '_Duplicado': True},
+        {'CIF': '', 'Base': None, '_Proveedor_ID': 'P2', '_Proveedor_Nombre': 'Dos', '_Error': 'Sin datos'},
+    ]
+
+
+class TestEstadisticasReportes:
+    """Tests de las estadísticas calculadas sobre DataFrames."""
+
+    def test_resumen(self):
+        assert resumen_registros(pd.DataFrame(registros())) == {
+            'total': 4, 'exitosas': 2, 'duplicadas': 1, 'con_errores': 1
+        }
+
+    def test_resumen_sin_metadatos(self):
+        assert resumen_registros(pd.DataFrame([{'CIF': 'B1'}])) == {
+            'total': 1, 'exitosas': 1, 'duplicadas': 0, 'con_errores': 0
+        }
+
+    def test_proveedores(self):
+        stats = estadisticas_proveedores(pd.DataFrame(registros()))
+
+        assert stats == [
+            {'proveedor_id': 'P1', 'nombre_proveedor': 'Uno', 'total': 3, 'exitosas': 3, 'errores': 0,
+             'porcentaje': "100.0%"},
+            {'proveedor_id': 'P2', 'nombre_proveedor': 'Dos', 'total': 1, 'exitosas': 0, 'errores': 1,
+             'porcentaje': "0.0%"},
+        ]
+
+    def test_proveedores_sin_id(self):
+        assert estadisticas_proveedores(pd.DataFrame([{'CIF': 'B1'}])) == []
+
+    def test_campos(self):
+        df = pd.DataFrame([{k: v for k, v in r.items() if not k.startswith('_')} for r in registros()])
+
+        stats = estadisticas_campos(df)
+
+        assert list(stats) == ['CIF', 'Base']
+        assert stats['CIF'] == {'total': 4, 'exitosos': 4, 'porcentaje': 100.0}
+        assert stats['Base'] == {'total': 4, 'exitosos': 2, 'porcentaje': 50.0}
+
+
+class TestEstadisticasExtraccion:
+    """Tests de las estadísticas incrementales del extractor."""
+
+    def test_incremental_igual_que_lista_completa(self):
+        incrementales = EstadisticasExtraccion()
+        for registro in registros():
+            incrementales.añadir(registro)
+
+        esperado = EstadisticasExtraccion.desde_registros(registros()).como_diccionario(2)
+        assert incrementales.como_diccionario(2) == esperado
+        assert esperado['facturas_exitosas'] == 2
+        assert esperado['proveedores']['P1'] == {'total': 3, 'exitosos': 3, 'errores': 0}
+
+    def test_sin_registros(self):
+        assert EstadisticasExtraccion().como_diccionario(1) == {}
+
+    def test_procesar_no_vuelve_a_recorrer_los_resultados(self, tmp_path):
+        numeros = {"a.pdf": "F-001", "b.pdf": "F-002"}
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, numeros)
+        extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir)
+        extractor.cargar_plantillas()
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)):
+            extractor.procesar_directorio_facturas()
+
+        with patch.object(EstadisticasExtraccion, "desde_registros") as mock_recalcular:
+            stats = extractor.obtener_estadisticas()
+
+        mock_recalcular.assert_not_called()
+        assert stats['total_facturas'] == 2
+        assert stats['facturas_exitosas'] == 2
+
+    def test_resultados_modificados_se_recalculan(self):
+        extractor = PDFExtractor()
+        extractor.resultados = registros()
+        assert extractor.obtener_estadisticas()['total_facturas'] == 4
+
+        extractor.resultados.append({'_Proveedor_ID': 'P2'})
+        assert extractor.obtener_estadisticas()['total_facturas'] == 5
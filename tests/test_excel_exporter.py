@@ -0,0 +1,234 @@
+"""
+Tests para ExcelExporter.
+
+Valida que:
+1. El libro tiene las hojas Resumen, Facturas_Exitosas y Estadísticas en ese orden
+2. Encabezados y celdas usan estilos con nombre compartidos
+3. Los valores de error se resaltan y los vacíos quedan como celdas vacías
+4. Los anchos de columna se calculan a partir de los datos
+5. Los DataFrames se construyen una vez y los comparten todos los formatos
+6. Varios formatos se exportan a la vez y un fallo no impide los demás; a los
+   procesos solo se envían los datos de cada libro y su ruta
+7. Parquet: columnas tipadas y una partición por año/trimestre
+"""
+
+import os
+import pickle
+import sys
+from concurrent.futures import Future
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+import pandas as pd
+from openpyxl import load_workbook
+from src.excel_exporter import ExcelExporter
+
+
+def datos_prueba():
+    """Helper: dos facturas exitosas, una con error y una duplicada."""
+    return [
+        {'CIF': 'B12345678', 'NumFactura': 'FAC-001', 'Importe': 'ERROR: no legible',
+         '_NombreProveedor': 'Proveedor con un nombre bastante largo S.L.', '_Duplicado': False},
+        {'CIF': 'B12345678', 'NumFactura': 'FAC-002', 'Importe': None,
+         '_NombreProveedor': 'Proveedor con un nombre bastante largo S.L.', '_Duplicado': False},
+        {'CIF': '', 'NumFactura': '', '_Error': 'Proveedor no identificado', '_Archivo': 'roto.pdf',
+         '_Duplicado': False},
+        {'CIF': 'B12345678', 'NumFactura': 'FAC-001', '_Duplicado': True},
+    ]
+
+
+def exportar(tmp_path):
+    exporter = ExcelExporter(datos_prueba(), directorio_salida=str(tmp_path))
+    return load_workbook(exporter.exportar_excel_formateado("formateado.xlsx"))
+
+
+class TestExcelFormateado:
+    """Tests de exportar_excel_formateado."""
+
+    def test_hojas_en_orden(self, tmp_path):
+        wb = exportar(tmp_path)
+
+        assert wb.sheetnames == ["Resumen", "Facturas_Exitosas", "Estadísticas"]
+
+    def test_estilos_con_nombre(self, tmp_path):
+        ws = exportar(tmp_path)["Facturas_Exitosas"]
+        cabeceras = {celda.value: celda for celda in ws[1]}
+
+        assert cabeceras['NumFactura'].style == "encabezado"
+        assert cabeceras['NumFactura'].font.bold
+        assert cabeceras['NumFactura'].fill.start_color.rgb.endswith("366092")
+
+        columna_importe = cabeceras['Importe'].column
+        error = ws.cell(row=2, column=columna_importe)
+        vacio = ws.cell(row=3, column=columna_importe)
+        assert (error.value, error.style) == ('ERROR: no legible', "celda_error")
+        assert error.fill.start_color.rgb.endswith("FFCCCC")
+        assert (vacio.value, vacio.style) == (None, "celda")
+
+    def test_anchos_calculados_de_los_datos(self, tmp_path):
+        ws = exportar(tmp_path)["Facturas_Exitosas"]
+        letras = {celda.value: celda.column_letter for celda in ws[1]}
+
+        assert ws.column_dimensions[letras['CIF']].width == 12
+        assert ws.column_dimensions[letras['Importe']].width == len('ERROR: no legible') + 2
+
+    def test_resumen(self, tmp_path):
+        ws = exportar(tmp_path)["Resumen"]
+
+        assert ws['A1'].value == "RESUMEN DE EXTRACCIÓN DE FACTURAS"
+        assert ws['A1'].style == "titulo"
+        assert "A1:E1" in {str(rango) for rango in ws.merged_cells.ranges}
+        assert ws['A4'].value == "Total de facturas procesadas:"
+        assert ws['B4'].value == 4
+        assert ws['A11'].value == "ESTADÍSTICAS POR PROVEEDOR"
+        assert ws.column_dimensions['A'].width == len("RESUMEN DE EXTRACCIÓN DE FACTURAS") + 2
+
+
+class TestDataFramesCompartidos:
+    """Tests de las vistas de datos calculadas una sola vez."""
+
+    def test_todos_los_formatos_filtran_una_vez(self, tmp_path):
+        exporter = ExcelExporter(datos_prueba(), directorio_salida=str(tmp_path))
+
+        with patch.object(exporter, "_filtrar_columnas_estandar",
+                          wraps=exporter._filtrar_columnas_estandar) as mock_filtrar:
+            exporter.exportar_excel_formateado("a.xlsx")
+            exporter.exportar_excel_basico("b.xlsx")
+            exporter.exportar_csv("c.csv")
+            exporter.exportar_json("d.json")
+
+        assert mock_filtrar.call_count == 1
+
+    def test_vistas_cacheadas(self, tmp_path):
+        exporter = ExcelExporter(datos_prueba(), directorio_salida=str(tmp_path))
+
+        assert exporter.df_completo is exporter.df_completo
+        assert exporter.df_estandar is exporter.df_estandar
+        assert len(exporter.df_completo) == 4
+        assert list(exporter.df_estandar['NumFactura']) == ['FAC-001', 'FAC-002']
+        assert not any(col.startswith('_') for col in exporter.df_estandar.columns)
+
+
+class TestExportarFormatos:
+    """Tests de la exportación concurrente."""
+
+    @pytest.mark.parametrize("concurrente", [True, False])
+    def test_exportar_todo(self, tmp_path, concurrente):
+        exporter = ExcelExporter(datos_prueba(), errores=[{'archivo': 'roto.pdf', 'error': 'ilegible'}],
+                                 directorio_salida=str(tmp_path))
+
+        rutas = exporter.exportar_todo("lote", concurrente=concurrente)
+
+        assert list(rutas) == ['excel_basico', 'excel_formateado', 'csv', 'json', 'excel_errores']
+        assert all(os.path.exists(ruta) for ruta in rutas.values())
+        assert exporter.fallos_exportacion == {}
+        assert load_workbook(rutas['excel_formateado']).sheetnames[0] == "Resumen"
+
+    def test_fallo_de_un_formato_no_interrumpe_los_demas(self, tmp_path, capsys):
+        exporter = ExcelExporter(datos_prueba(), directorio_salida=str(tmp_path))
+
+        rutas = exporter.exportar_formatos({
+            'csv': ("exportar_csv", "ok.csv"),
+            'json': ("exportar_json", os.path.join("no_existe", "fallo.json")),
+            'excel': ("exportar_excel_formateado", "ok.xlsx"),
+        })
+
+        assert list(rutas) == ['csv', 'excel']
+        assert list(exporter.fallos_exportacion) == ['json']
+        assert "No se pudo exportar json" in capsys.readouterr().out
+
+    def test_procesos_reciben_solo_los_datos_del_libro(self, tmp_path):
+        exporter = ExcelExporter(datos_prueba(), errores=[{'archivo': 'roto.pdf', 'error': 'ilegible'}],
+                                 directorio_salida=str(tmp_path))
+        enviados = []
+
+        class PoolEnElMismoProceso:
+            """ProcessPoolExecutor que anota lo que se enviaría a cada proceso y lo ejecuta aquí."""
+            def __init__(self, max_workers=None):
+                pass
+
+            def submit(self, funcion, *argumentos):
+                pickle.dumps((funcion, argumentos))  # Debe poder enviarse a otro proceso
+                enviados.append(argumentos)
+                futuro = Future()
+                futuro.set_result(funcion(*argumentos))
+                return futuro
+
+            def shutdown(self):
+                pass
+
+        with patch('src.excel_exporter.ProcessPoolExecutor', PoolEnElMismoProceso):
+            rutas = exporter.exportar_todo("lote")
+
+        assert len(enviados) == 3  # basico, formateado y errores
+        assert all(os.path.exists(ruta) for ruta in rutas.values())
+        for argumentos in enviados:
+            assert not any(isinstance(argumento, ExcelExporter) for argumento in argumentos)
+            assert argumentos[-1] in rutas.values()
+        assert enviados[0][0] is exporter.df_estandar
+
+
+def datos_parquet():
+    """Helper: facturas de un trimestre con importes y fechas en el formato del extractor."""
+    return [
+        {'CIF': 'B12345678', 'FechaFactura': '15/01/2025', 'Trimestre': '1T', 'Año': '2025',
+         'NumFactura': 'FAC-001', 'Base': '1234.567', 'ComPaypal': '', '_Duplicado': False},
+        {'CIF': 'B12345678', 'FechaFactura': 'ERROR: no legible', 'Trimestre': '1T', 'Año': '2025',
+         'NumFactura': 'FAC-002', 'Base': 'ERROR: no legible', 'ComPaypal': '0.35', '_Duplicado': False},
+    ]
+
+
+class TestExportarParquet:
+    """Tests de df_tipado y exportar_parquet."""
+
+    def test_columnas_tipadas(self, tmp_path):
+        exporter = ExcelExporter(datos_parquet(), directorio_salida=str(tmp_path), trimestre="1T", año="2025")
+
+        df = exporter.df_tipado()
+
+        assert str(df['FechaFactura'].dtype).startswith('datetime64')
+        assert df['FechaFactura'].iloc[0].date() == date(2025, 1, 15)
+        assert df['FechaFactura'].isna().iloc[1]
+        assert list(df['Base']) == [Decimal('1234.57'), None]
+        assert list(df['ComPaypal']) == [None, Decimal('0.35')]
+        assert list(df['Año']) == [2025, 2025]
+
+    def test_sin_pyarrow(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+        exporter = ExcelExporter(datos_parquet(), directorio_salida=str(tmp_path))
+
+        with pytest.raises(ImportError, match="pyarrow"):
+            exporter.exportar_parquet()
+
+    def test_particion_por_trimestre(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        ExcelExporter(datos_parquet(), directorio_salida=str(tmp_path)).exportar_parquet()
+        ExcelExporter([{'CIF': 'B1', 'NumFactura': 'FAC-100', 'Base': '10'}], directorio_salida=str(tmp_path),
+                      trimestre="2T", año="2025").exportar_parquet()
+
+        # Volver a exportar el 1T sustituye su partición
+        ExcelExporter(datos_parquet()[:1], directorio_salida=str(tmp_path)).exportar_parquet()
+
+        raiz = tmp_path / "parquet"
+        assert (raiz / "Año=2025" / "Trimestre=1T").is_dir()
+        assert (raiz / "Año=2025" / "Trimestre=2T").is_dir()
+        df = pd.read_parquet(raiz).sort_values('NumFactura')
+        assert list(df['NumFactura']) == ['FAC-001', 'FAC-100']
+        assert list(df['Base']) == [Decimal('1234.57'), Decimal('10.00')]
+
+    def test_exportar_un_trimestre_no_borra_otro(self, tmp_path):
+        """Una factura asignada al 2T desde el 1T no sustituye la partición del 2T."""
+        pytest.importorskip("pyarrow")
+        ExcelExporter([{'CIF': 'B1', 'NumFactura': 'FAC-200', 'Trimestre': '2T', 'Año': '2025'}],
+                      directorio_salida=str(tmp_path), trimestre="2T", año="2025").exportar_parquet()
+        datos_1t = datos_parquet() + [{'CIF': 'B1', 'NumFactura': 'FAC-201', 'Trimestre': '2T', 'Año': '2025'}]
+        ExcelExporter(datos_1t, directorio_salida=str(tmp_path), trimestre="1T", año="2025").exportar_parquet()
+
+        # Volver a exportar el 1T sustituye solo lo exportado desde el 1T
+        ExcelExporter(datos_1t[:1] + datos_1t[2:], directorio_salida=str(tmp_path),
+                      trimestre="1T", año="2025").exportar_parquet()
+
+        df = pd.read_parquet(tmp_path / "parquet").sort_values('NumFactura')
+        assert list(df['NumFactura']) == ['FAC-001', 'FAC-200', 'FAC-201']
+        assert list(df['Trimestre'].astype(str)) == ['1T', '2T', '2T']
@@ -5,6 +5,8 @@ Siguiendo TDD, estos tests se escriben ANTES de implementar la funcionalidad.
 """
 
 import pytest
+import errno
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -26,7 +28,7 @@ def test_pdforganizer_inicializacion_default():
     assert organizer.directorio_indices == Path("documentos/procesados/indices")
     assert organizer.directorio_duplicados == Path("documentos/procesados/duplicados")
     assert organizer.directorio_errores == Path("documentos/procesados/errores")
-    assert organizer.directorio_logs == Path("logs")
+    assert organizer.directorio_logs == Path("documentos/logs")
 
 
 def test_pdforganizer_inicializacion_custom():
@@ -150,6 +152,39 @@ def test_es_duplicado_existe():
         assert resultado["num_factura"] == "F-001"
 
 
+def test_es_duplicado_no_recorre_el_indice(tmp_path):
+    """
+    Test: es_duplicado() no normaliza las fechas guardadas en cada consulta.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    for i in range(200):
+        organizer.agregar_al_indice(2025, "1T", {"cif_proveedor": "B12345678",
+                                                 "fecha_factura": "15/01/2025", "num_factura": f"F-{i}"})
+    organizer.es_duplicado("B12345678", "2025-01-15", "F-0", 2025, "1T")
+
+    with patch.object(organizer, '_normalizar_fecha', wraps=organizer._normalizar_fecha) as mock_normalizar:
+        resultado = organizer.es_duplicado("B12345678", "2025-01-15", "F-150", 2025, "1T")
+
+    assert resultado["num_factura"] == "F-150"
+    assert mock_normalizar.call_count == 1
+
+
+def test_es_duplicado_devuelve_la_primera_entrada_y_ve_las_altas(tmp_path):
+    """
+    Test: con claves repetidas se devuelve la primera entrada; las altas nuevas se encuentran.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    primera = {"cif_proveedor": "B1", "fecha_factura": "2025-01-15", "num_factura": "F-1", "orden": 1}
+    segunda = dict(primera, orden=2)
+    organizer.guardar_indice(2025, "1T", {"trimestre": "1T", "año": 2025, "facturas": [primera, segunda]})
+
+    assert organizer.es_duplicado("B1", "15/01/2025", "F-1", 2025, "1T") is primera
+    assert organizer.es_duplicado("B1", "15/01/2025", "F-2", 2025, "1T") is None
+
+    organizer.agregar_al_indice(2025, "1T", dict(primera, num_factura="F-2"))
+    assert organizer.es_duplicado("B1", "15/01/2025", "F-2", 2025, "1T")["num_factura"] == "F-2"
+
+
 def test_normalizar_fecha_formato_dd_mm_yyyy():
     """
     Test: _normalizar_fecha() convierte DD/MM/YYYY a YYYY-MM-DD.
@@ -172,11 +207,11 @@ def test_normalizar_fecha_formato_yyyy_mm_dd():
     assert fecha_normalizada == "2025-01-15"
 
 
-def test_agregar_al_indice():
+def test_agregar_al_indice(tmp_path):
     """
     Test: agregar_al_indice() añade una factura nueva al índice.
     """
-    organizer = PDFOrganizer()
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
 
     info_factura = {
         "cif_proveedor": "B12345678",
@@ -188,6 +223,10 @@ def test_agregar_al_indice():
         with patch.object(organizer, 'guardar_indice') as mock_guardar:
             organizer.agregar_al_indice(2025, "1T", info_factura)
 
+            # El índice se modifica en memoria y no se escribe hasta el volcado
+            mock_guardar.assert_not_called()
+            organizer.finalizar()
+
             # Verificar que se llamó a guardar_indice con factura añadida
             mock_guardar.assert_called_once()
             datos_guardados = mock_guardar.call_args[0][2]
@@ -195,10 +234,52 @@ def test_agregar_al_indice():
             assert datos_guardados["facturas"][0]["cif_proveedor"] == "B12345678"
 
 
+def test_indice_se_lee_una_vez_por_ejecucion(tmp_path):
+    """
+    Test: consultas y altas sucesivas del mismo trimestre no vuelven a leer el JSON.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+
+    with patch.object(organizer, '_leer_indice_json', wraps=organizer._leer_indice_json) as mock_leer:
+        for i in range(5):
+            num = f"F-{i:03d}"
+            assert organizer.es_duplicado("B12345678", "15/01/2025", num, 2025, "1T") is None
+            organizer.agregar_al_indice(2025, "1T", {"cif_proveedor": "B12345678",
+                                                     "fecha_factura": "2025-01-15", "num_factura": num})
+
+    assert mock_leer.call_count == 1
+    assert organizer.es_duplicado("B12345678", "15/01/2025", "F-004", 2025, "1T") is not None
+
+
+def test_indices_se_vuelcan_cada_n_altas_y_al_finalizar(tmp_path):
+    """
+    Test: los trimestres modificados se escriben cada `volcado_cada` altas y en finalizar().
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path), volcado_cada=2)
+    archivo = organizer.directorio_indices / "indice_2025_1T.json"
+
+    def facturas_en_disco():
+        with open(archivo, encoding='utf-8') as f:
+            return len(json.load(f)["facturas"])
+
+    organizer.agregar_al_indice(2025, "1T", {"num_factura": "F-001"})
+    assert not archivo.exists()
+
+    organizer.agregar_al_indice(2025, "1T", {"num_factura": "F-002"})
+    assert facturas_en_disco() == 2
+
+    organizer.agregar_al_indice(2025, "1T", {"num_factura": "F-003"})
+    assert facturas_en_disco() == 2
+
+    organizer.finalizar()
+    assert facturas_en_disco() == 3
+    assert not list(organizer.directorio_indices.glob("*.tmp"))
+
+
 # ==================== TESTS DE ANÁLISIS HEURÍSTICO ====================
 
 @patch('pdfplumber.open')
-def test_analizar_contenido_pdf_es_factura(mock_pdfplumber):
+def test_analizar_contenido_pdf_es_factura(mock_pdfplumber, tmp_path):
     """
     Test: analizar_contenido_pdf() detecta PDF como posible factura si ≥3 palabras clave.
     """
@@ -211,8 +292,10 @@ def test_analizar_contenido_pdf_es_factura(mock_pdfplumber):
     mock_pdf.__exit__ = Mock(return_value=False)
     mock_pdfplumber.return_value = mock_pdf
 
-    organizer = PDFOrganizer()
-    es_factura, num_palabras = organizer.analizar_contenido_pdf("test.pdf")
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    pdf = tmp_path / "test.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    es_factura, num_palabras = organizer.analizar_contenido_pdf(str(pdf))
 
     assert es_factura is True
     assert num_palabras >= UMBRAL_PALABRAS_FACTURA
@@ -288,6 +371,77 @@ def test_mover_pdf_archivo_existe_renombrar(mock_mkdir, mock_exists, mock_move):
     assert "_2" in str(call_args[1]) or mock_move.called
 
 
+def test_mover_pdf_calcula_hash_en_la_misma_pasada(tmp_path):
+    """
+    Test: mover_pdf() con resúmenes devuelve el hash del contenido movido.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    origen = tmp_path / "factura.pdf"
+    origen.write_bytes(b"%PDF contenido" * 100000)
+    resumen = hashlib.md5()
+
+    assert organizer.mover_pdf(str(origen), str(tmp_path / "destino" / "factura.pdf"), resumenes=[resumen])
+
+    assert not origen.exists()
+    assert resumen.hexdigest() == hashlib.md5(b"%PDF contenido" * 100000).hexdigest()
+
+
+def test_mover_pdf_entre_discos_copia_y_calcula_hash(tmp_path):
+    """
+    Test: si renombrar falla por estar en otro disco, se copia calculando el hash.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    contenido = os.urandom(3 * 1024 * 1024 + 17)
+    origen = tmp_path / "factura.pdf"
+    origen.write_bytes(contenido)
+    destino = tmp_path / "destino" / "factura.pdf"
+    resumenes = [hashlib.md5(), hashlib.blake2b()]
+
+    with patch('os.rename', side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+        assert organizer.mover_pdf(str(origen), str(destino), resumenes=resumenes)
+
+    assert not origen.exists()
+    assert destino.read_bytes() == contenido
+    assert resumenes[0].hexdigest() == hashlib.md5(contenido).hexdigest()
+    assert resumenes[1].hexdigest() == hashlib.blake2b(contenido).hexdigest()
+
+
+def test_mover_pdf_entre_discos_fallido_no_deja_copia(tmp_path):
+    """
+    Test: si la copia falla, el origen se conserva y no queda un destino a medias.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path))
+    origen = tmp_path / "factura.pdf"
+    origen.write_bytes(b"%PDF contenido")
+    destino = tmp_path / "destino" / "factura.pdf"
+    resumen = Mock(update=Mock(side_effect=IOError("disco lleno")))
+
+    with patch('os.rename', side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+        assert organizer.mover_pdf(str(origen), str(destino), resumenes=[resumen]) is False
+
+    assert origen.exists()
+    assert not destino.exists()
+
+
+def test_organizar_sin_documento_lee_el_pdf_una_vez(tmp_path):
+    """
+    Test: sin documento compartido, los hashes del índice salen del propio movimiento.
+    """
+    organizer = PDFOrganizer(directorio_base=str(tmp_path), hash_adicional="blake2b")
+    pdf = tmp_path / "factura.pdf"
+    pdf.write_bytes(b"%PDF factura")
+
+    with patch.object(organizer, 'calcular_hash_md5') as mock_hash, \
+            patch.object(organizer, 'registrar_operacion'):
+        organizer.organizar_pdf(str(pdf), {"CIF": "B12345678", "FechaFactura": "15/01/2025",
+                                           "NumFactura": "F-001", "_NombreProveedor": "Proveedor"})
+
+    mock_hash.assert_not_called()
+    entrada = organizer.cargar_indice(2025, "1T")["facturas"][0]
+    assert entrada["hash_md5"] == hashlib.md5(b"%PDF factura").hexdigest()
+    assert entrada["hash_blake2b"] == hashlib.blake2b(b"%PDF factura").hexdigest()
+
+
 # ==================== TESTS DE LOGGING ====================
 
 @patch('builtins.open', new_callable=mock_open)
@@ -0,0 +1,146 @@
+"""
+Tests para el filtro global de duplicados entre trimestres.
+
+Valida que:
+1. El filtro de Bloom no tiene falsos negativos y se guarda/carga de disco
+2. Una factura ya indexada en otro trimestre (p.ej. con la fecha mal leída) se detecta
+3. El filtro evita leer los índices cuando la clave no está
+4. El filtro se reconstruye si los índices cambian fuera del organizador
+"""
+
+from unittest.mock import patch
+import pytest
+from src.file_organizer import PDFOrganizer
+from src.filtro_bloom import FiltroBloom
+
+
+def entrada(cif="B12345678", fecha="2025-03-12", num="F-001", hash_md5="hash1"):
+    """Helper: entrada del índice."""
+    return {"cif_proveedor": cif, "fecha_factura": fecha, "num_factura": num,
+            "nombre_archivo": f"{num}.pdf", "hash_md5": hash_md5}
+
+
+class TestFiltroBloom:
+    """Tests del filtro de Bloom."""
+
+    def test_sin_falsos_negativos_y_pocos_falsos_positivos(self):
+        filtro = FiltroBloom(capacidad=1000, tasa_falsos_positivos=0.01)
+        for i in range(1000):
+            filtro.añadir(f"B1|F-{i}")
+
+        assert all(f"B1|F-{i}" in filtro for i in range(1000))
+        falsos_positivos = sum(f"B2|F-{i}" in filtro for i in range(10000))
+        assert falsos_positivos < 300
+
+    def test_guardar_y_cargar(self, tmp_path):
+        filtro = FiltroBloom(capacidad=100)
+        filtro.añadir("B1|F-1")
+        filtro.firma = "firma"
+        filtro.guardar(tmp_path / "filtro.bin")
+
+        cargado = FiltroBloom.cargar(tmp_path / "filtro.bin")
+
+        assert "B1|F-1" in cargado
+        assert "B1|F-2" not in cargado
+        assert (cargado.elementos, cargado.firma) == (1, "firma")
+
+    def test_cargar_archivo_inexistente_o_dañado(self, tmp_path):
+        assert FiltroBloom.cargar(tmp_path / "no_existe.bin") is None
+        (tmp_path / "dañado.bin").write_bytes(b"no es un filtro")
+        assert FiltroBloom.cargar(tmp_path / "dañado.bin") is None
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+class TestDuplicadosEntreTrimestres:
+    """Tests de PDFOrganizer.es_duplicado_global con ambos backends."""
+
+    def test_misma_factura_con_fecha_mal_leida_en_otro_trimestre(self, tmp_path, backend):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        organizador.agregar_al_indice(2025, "1T", entrada(fecha="2025-03-12"))
+
+        # 12/03 leída como 03/12: cae en 4T, donde es_duplicado no la encuentra
+        assert organizador.es_duplicado("B12345678", "2025-12-03", "F-001", 2025, "4T") is None
+        duplicado = organizador.es_duplicado_global("B12345678", "2025-12-03", "F-001", 2025, "4T")
+
+        assert duplicado["fecha_factura"] == "2025-03-12"
+
+    def test_numeracion_reiniciada_otro_año_no_es_duplicado(self, tmp_path, backend, monkeypatch):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        organizador.agregar_al_indice(2024, "1T", entrada(fecha="2024-01-10", hash_md5="hash_2024"))
+        monkeypatch.setattr(organizador, "calcular_hash_md5", lambda ruta: "hash_2025")
+
+        assert organizador.es_duplicado_global("B12345678", "2025-01-10", "F-001", 2025, "1T",
+                                               ruta_pdf="f.pdf") is None
+
+    def test_mismo_pdf_otro_año_es_duplicado(self, tmp_path, backend, monkeypatch):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        organizador.agregar_al_indice(2024, "1T", entrada(fecha="2024-01-10", hash_md5="hash_igual"))
+        monkeypatch.setattr(organizador, "calcular_hash_md5", lambda ruta: "hash_igual")
+
+        assert organizador.es_duplicado_global("B12345678", "2025-01-10", "F-001", 2025, "1T",
+                                               ruta_pdf="f.pdf") is not None
+
+    def test_clave_ausente_no_lee_los_indices(self, tmp_path, backend):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        organizador.agregar_al_indice(2025, "1T", entrada())
+
+        with patch.object(organizador, "_iterar_facturas_indexadas") as mock_iterar:
+            assert organizador.es_duplicado_global("B12345678", "2025-06-01", "F-999", 2025, "2T") is None
+        mock_iterar.assert_not_called()
+
+    def test_filtro_persistido_entre_ejecuciones(self, tmp_path, backend):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        organizador.agregar_al_indice(2025, "1T", entrada())
+        organizador.finalizar()
+        assert (tmp_path / "procesados" / "indices" / "filtro_duplicados.bin").exists()
+
+        siguiente = PDFOrganizer(directorio_base=str(tmp_path), backend_indice=backend)
+        with patch.object(siguiente, "_reconstruir_filtro_global") as mock_reconstruir:
+            assert siguiente.es_duplicado_global("B12345678", "2025-12-03", "F-001", 2025, "4T")
+        mock_reconstruir.assert_not_called()
+
+    def test_filtro_se_reconstruye_si_cambian_los_indices(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path))
+        organizador.agregar_al_indice(2025, "1T", entrada())
+        organizador.finalizar()
+
+        # Otro proceso (u otra versión) escribe un índice sin actualizar el filtro
+        externo = PDFOrganizer(directorio_base=str(tmp_path), duplicados_entre_trimestres=False)
+        externo.agregar_al_indice(2025, "2T", entrada(fecha="2025-05-05", num="F-002"))
+        externo.finalizar()
+
+        siguiente = PDFOrganizer(directorio_base=str(tmp_path))
+        assert siguiente.es_duplicado_global("B12345678", "2025-08-05", "F-002", 2025, "3T") is not None
+
+    def test_organizar_mueve_a_duplicados(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path))
+        organizador.agregar_al_indice(2025, "1T", entrada(fecha="2025-03-12"))
+        pdf = tmp_path / "reenviada.pdf"
+        pdf.write_bytes(b"%PDF reenviada")
+
+        with patch.object(organizador, "registrar_operacion"):
+            destino = organizador.organizar_pdf(str(pdf), {
+                "CIF": "B12345678", "FechaFactura": "03/12/2025", "NumFactura": "F-001",
+                "_NombreProveedor": "Proveedor"
+            })
+
+        assert "duplicados" in destino
+        assert organizador.cargar_indice(2025, "4T")["facturas"] == []
+
+    def test_desactivado(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), duplicados_entre_trimestres=False)
+        organizador.agregar_al_indice(2025, "1T", entrada(fecha="2025-03-12"))
+        pdf = tmp_path / "reenviada.pdf"
+        pdf.write_bytes(b"%PDF reenviada")
+
+        with patch.object(organizador, "registrar_operacion"):
+            destino = organizador.organizar_pdf(str(pdf), {
+                "CIF": "B12345678", "FechaFactura": "03/12/2025", "NumFactura": "F-001",
+                "_NombreProveedor": "Proveedor"
+            })
+
+        assert "duplicados" not in destino
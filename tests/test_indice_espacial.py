@@ -0,0 +1,114 @@
+"""
+Tests para el índice espacial de caracteres por página.
+
+Valida que:
+1. El texto de cualquier región es idéntico al de pagina.crop(bbox).extract_text()
+2. El índice se construye una sola vez por página
+3. Las regiones fuera de la página fallan igual que crop()
+4. Los objetos que no son páginas de pdfplumber usan crop() directamente
+"""
+
+import random
+import pytest
+import pdfplumber
+from unittest.mock import MagicMock, patch
+from src.utils import indice_espacial
+from src.utils.indice_espacial import IndiceChars, extraer_texto_region, agrupar_regiones_solapadas
+
+
+@pytest.fixture
+def pdf_con_lineas(tmp_path):
+    """PDF real con cabecera y muchas líneas de detalle en varias columnas."""
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    ruta = tmp_path / "detalle.pdf"
+    c = canvas.Canvas(str(ruta))
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, 800, "Proveedor Test S.L.")
+    c.setFont("Helvetica", 9)
+    c.drawString(400, 800, "CIF: B12345678")
+    c.drawString(400, 785, "Factura: F-2025-001")
+    for i in range(60):
+        y = 750 - i * 11
+        c.drawString(50, y, f"Articulo {i:03d}")
+        c.drawString(250, y, f"{i * 3} uds")
+        c.drawRightString(540, y, f"{i * 12.5:.2f} EUR")
+    c.save()
+    return str(ruta)
+
+
+class TestIndiceChars:
+    """Equivalencia con pdfplumber."""
+
+    def test_texto_identico_a_crop(self, pdf_con_lineas):
+        """Regiones aleatorias (incluidas las que cortan caracteres) dan el mismo texto."""
+        generador = random.Random(42)
+        with pdfplumber.open(pdf_con_lineas) as pdf:
+            pagina = pdf.pages[0]
+            indice = IndiceChars(pagina)
+
+            for _ in range(300):
+                x0 = generador.uniform(0, pagina.width - 1)
+                top = generador.uniform(0, pagina.height - 1)
+                x1 = generador.uniform(x0 + 0.5, pagina.width)
+                bottom = generador.uniform(top + 0.5, pagina.height)
+                bbox = (x0, top, x1, bottom)
+
+                assert indice.extraer_texto(bbox) == pagina.crop(bbox).extract_text()
+
+    def test_sub_indice_da_el_mismo_texto(self, pdf_con_lineas):
+        """Regiones resueltas sobre un sub-índice envolvente coinciden con crop()."""
+        with pdfplumber.open(pdf_con_lineas) as pdf:
+            pagina = pdf.pages[0]
+            regiones = [(40, 30, 300, 60), (200, 35, 560, 62), (380, 40, 560, 70)]
+            grupos = agrupar_regiones_solapadas(regiones)
+
+            assert len(grupos) == 1
+            envolvente, miembros = grupos[0]
+            sub = IndiceChars(pagina).sub_indice(envolvente)
+            for region in miembros:
+                assert sub.extraer_texto(region) == pagina.crop(region).extract_text()
+
+    def test_region_de_cabecera(self, pdf_con_lineas):
+        """Una región típica de identificación devuelve el texto esperado."""
+        with pdfplumber.open(pdf_con_lineas) as pdf:
+            pagina = pdf.pages[0]
+            bbox = (390, 30, 560, 62)
+
+            texto = extraer_texto_region(pagina, bbox)
+
+            assert texto == pagina.crop(bbox).extract_text()
+            assert "F-2025-001" in texto
+
+    def test_region_fuera_de_pagina_falla_como_crop(self, pdf_con_lineas):
+        """Las coordenadas inválidas lanzan ValueError, igual que crop()."""
+        with pdfplumber.open(pdf_con_lineas) as pdf:
+            pagina = pdf.pages[0]
+
+            with pytest.raises(ValueError):
+                extraer_texto_region(pagina, (0, 0, pagina.width + 50, 100))
+
+    def test_indice_se_construye_una_vez_por_pagina(self, pdf_con_lineas):
+        """Consultas sucesivas sobre la misma página reutilizan el índice."""
+        with pdfplumber.open(pdf_con_lineas) as pdf:
+            pagina = pdf.pages[0]
+
+            with patch.object(indice_espacial, 'IndiceChars', wraps=IndiceChars) as mock_indice:
+                extraer_texto_region(pagina, (50, 30, 300, 60))
+                extraer_texto_region(pagina, (390, 30, 560, 62))
+                extraer_texto_region(pagina, (50, 100, 560, 400))
+
+            assert mock_indice.call_count == 1
+
+
+class TestPaginaNoPdfplumber:
+    """Compatibilidad con páginas simuladas."""
+
+    def test_usa_crop_si_no_es_pagina_pdfplumber(self):
+        """Objetos que no son Page se consultan con crop().extract_text()."""
+        pagina = MagicMock()
+        pagina.crop.return_value.extract_text.return_value = "Texto simulado"
+
+        texto = extraer_texto_region(pagina, [10, 20, 30, 40])
+
+        pagina.crop.assert_called_once_with((10, 20, 30, 40))
+        assert texto == "Texto simulado"
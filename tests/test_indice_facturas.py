@@ -0,0 +1,124 @@
+"""
+Tests para el índice de facturas en SQLite.
+
+Valida que:
+1. La búsqueda por (CIF, NumFactura, FechaFactura) devuelve la entrada guardada
+2. Las altas se confirman por lotes en una transacción
+3. Los índices JSON existentes se migran una sola vez
+4. PDFOrganizer con backend SQLite sigue generando los JSON por trimestre
+5. Una clave ya indexada en otro trimestre se trata como duplicado
+"""
+
+import json
+import sqlite3
+from src.file_organizer import PDFOrganizer
+from src.indice_facturas import IndiceSQLite
+
+
+ENTRADA = {
+    "cif_proveedor": "B12345678",
+    "fecha_factura": "2025-01-15",
+    "num_factura": "F-001",
+    "nombre_archivo": "factura.pdf",
+    "hash_md5": "abc123"
+}
+
+
+def normalizar(fecha):
+    """Helper: misma normalización de fechas que usa PDFOrganizer."""
+    return "-".join(reversed(fecha.split("/"))) if "/" in fecha else fecha
+
+
+class TestIndiceSQLite:
+    """Tests del almacén SQLite."""
+
+    def test_buscar_devuelve_la_entrada(self, tmp_path):
+        indice = IndiceSQLite(tmp_path / "indices.db", normalizar_fecha=normalizar)
+        indice.agregar(2025, "1T", ENTRADA)
+
+        assert indice.buscar("B12345678", "15/01/2025", "F-001", 2025, "1T") == ENTRADA
+        assert indice.buscar("B12345678", "15/01/2025", "F-002", 2025, "1T") is None
+        assert indice.buscar("B12345678", "15/01/2025", "F-001", 2025, "2T") is None
+
+    def test_clave_unica(self, tmp_path):
+        indice = IndiceSQLite(tmp_path / "indices.db", normalizar_fecha=normalizar)
+
+        assert indice.agregar(2025, "1T", ENTRADA) is True
+        assert indice.agregar(2025, "1T", dict(ENTRADA, fecha_factura="15/01/2025")) is False
+        assert len(indice.facturas_trimestre(2025, "1T")) == 1
+
+    def test_altas_confirmadas_por_lotes(self, tmp_path):
+        ruta = tmp_path / "indices.db"
+        indice = IndiceSQLite(ruta, tamaño_lote=2)
+
+        def confirmadas():
+            with sqlite3.connect(str(ruta)) as otra:
+                return otra.execute("SELECT COUNT(*) FROM facturas").fetchone()[0]
+
+        indice.agregar(2025, "1T", dict(ENTRADA, num_factura="F-001"))
+        assert confirmadas() == 0
+        indice.agregar(2025, "1T", dict(ENTRADA, num_factura="F-002"))
+        assert confirmadas() == 2
+        indice.agregar(2025, "1T", dict(ENTRADA, num_factura="F-003"))
+        indice.confirmar()
+        assert confirmadas() == 3
+
+    def test_migracion_desde_json_una_sola_vez(self, tmp_path):
+        antigua = dict(ENTRADA, fecha_factura="15/01/2025")
+        (tmp_path / "indice_2025_1T.json").write_text(
+            json.dumps({"trimestre": "1T", "año": 2025, "facturas": [antigua]}), encoding="utf-8")
+
+        indice = IndiceSQLite(tmp_path / "indices.db", directorio_json=tmp_path, normalizar_fecha=normalizar)
+        assert indice.buscar("B12345678", "2025-01-15", "F-001", 2025, "1T") == antigua
+        indice.cerrar()
+
+        # Un JSON nuevo tras la migración ya no se importa
+        (tmp_path / "indice_2025_2T.json").write_text(
+            json.dumps({"trimestre": "2T", "año": 2025, "facturas": [dict(ENTRADA, num_factura="F-9")]}),
+            encoding="utf-8")
+        reabierto = IndiceSQLite(tmp_path / "indices.db", directorio_json=tmp_path, normalizar_fecha=normalizar)
+        assert reabierto.facturas_trimestre(2025, "2T") == []
+        assert len(reabierto.facturas_trimestre(2025, "1T")) == 1
+
+
+class TestOrganizadorConSQLite:
+    """PDFOrganizer con backend_indice="sqlite"."""
+
+    def test_duplicados_y_exportacion_json(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice="sqlite")
+        organizador.agregar_al_indice(2025, "1T", ENTRADA)
+
+        assert organizador.es_duplicado("B12345678", "15/01/2025", "F-001", 2025, "1T") == ENTRADA
+        ruta_json = organizador.directorio_indices / "indice_2025_1T.json"
+        assert not ruta_json.exists()
+
+        organizador.finalizar()
+
+        compatible = PDFOrganizer(directorio_base=str(tmp_path))
+        assert compatible.cargar_indice(2025, "1T") == {"trimestre": "1T", "año": 2025, "facturas": [ENTRADA]}
+
+    def test_guardar_indice_reemplaza_trimestre(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice="sqlite")
+        organizador.agregar_al_indice(2025, "1T", ENTRADA)
+
+        nueva = dict(ENTRADA, num_factura="F-002")
+        organizador.guardar_indice(2025, "1T", {"trimestre": "1T", "año": 2025, "facturas": [nueva]})
+
+        assert organizador.cargar_indice(2025, "1T")["facturas"] == [nueva]
+
+    def test_clave_indexada_en_otro_trimestre_es_duplicado(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), backend_indice="sqlite")
+        # Misma clave indexada en otro trimestre (p.ej. cuando la fecha no se reconoció)
+        assert organizador.agregar_al_indice(2025, "2T", ENTRADA) is True
+        assert organizador.agregar_al_indice(2025, "1T", ENTRADA) is False
+
+        pdf = tmp_path / "factura_repetida.pdf"
+        pdf.write_bytes(b"%PDF-1.4 contenido")
+        resultado = {"CIF": "B12345678", "FechaFactura": "15/01/2025", "NumFactura": "F-001",
+                     "Trimestre": "1T", "Año": "2025", "_Proveedor_Nombre": "Proveedor Test"}
+
+        destino = organizador.organizar_pdf(str(pdf), resultado)
+
+        assert destino == str(organizador.directorio_duplicados / "2025" / "1T" / "factura_repetida.pdf")
+        assert organizador.indice_sqlite.facturas_trimestre(2025, "1T") == []
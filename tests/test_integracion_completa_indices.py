@@ -275,7 +275,8 @@ class TestIntegracionCompletaIndicesYOrganizacion:
 
         # Configurar mock basado en nombre de archivo
         def mock_pdf_factory(pdf_path):
-            path_str = str(pdf_path)
+            # DocumentoPDF pasa los bytes en un flujo que conserva la ruta en .name
+            path_str = str(getattr(pdf_path, 'name', pdf_path))
 
             if "enero" in path_str:
                 return self.configurar_mock_extraccion(
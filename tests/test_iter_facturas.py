@@ -0,0 +1,127 @@
+"""
+Tests para el procesamiento en streaming (iter_facturas) y la exportación desde un iterador.
+
+Valida que:
+1. iter_facturas entrega las mismas facturas que procesar_directorio_facturas, en el mismo orden
+2. Los errores se entregan como registros y no se acumulan en el extractor
+3. exportar_streaming escribe CSV, JSON y errores sin necesitar la lista completa
+"""
+
+import csv
+import json
+from unittest.mock import patch
+from src.pdf_extractor import PDFExtractor
+from src.excel_exporter import ExcelExporter
+from tests.test_procesamiento_paralelo import (crear_mock_pdf_open, preparar_entorno,
+                                               sin_metadatos_de_ejecucion)
+
+
+NUMEROS = {
+    "a.pdf": "F-001",
+    "b.pdf": "F-002",
+    "c.pdf": "F-001",          # Duplicado de a.pdf dentro de la ejecución
+    "d.pdf": None,             # Proveedor no identificado
+}
+
+
+def nuevo_extractor(base):
+    facturas_dir, plantillas_dir = preparar_entorno(base, NUMEROS)
+    extractor = PDFExtractor(directorio_facturas=facturas_dir,
+                             directorio_plantillas=plantillas_dir,
+                             organizar_archivos=False)
+    extractor.cargar_plantillas()
+    return extractor
+
+
+class TestIterFacturas:
+    """Tests del generador."""
+
+    @patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS))
+    def test_mismas_facturas_que_procesar(self, mock_open, tmp_path):
+        lista = nuevo_extractor(tmp_path / "lista").procesar_directorio_facturas()
+
+        extractor = nuevo_extractor(tmp_path / "stream")
+        registros = list(extractor.iter_facturas())
+        facturas = [datos for tipo, datos in registros if tipo == 'factura']
+
+        assert sin_metadatos_de_ejecucion(facturas) == sin_metadatos_de_ejecucion(lista)
+        assert [f['_Duplicado'] for f in facturas] == [False, False, True]
+        # La API pública entrega diccionarios (RegistroFactura solo se usa dentro del extractor)
+        assert all(type(f) is dict for f in lista + facturas)
+
+    @patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS))
+    def test_errores_se_entregan_sin_acumular(self, mock_open, tmp_path):
+        extractor = nuevo_extractor(tmp_path)
+
+        errores = [datos for tipo, datos in extractor.iter_facturas() if tipo == 'error']
+
+        assert [e['Archivo'] for e in errores] == ["d.pdf"]
+        assert extractor.errores == []
+        assert extractor.resultados == []
+
+    @patch('pdfplumber.open', side_effect=crear_mock_pdf_open(NUMEROS))
+    def test_entrega_perezosa(self, mock_open, tmp_path):
+        """La primera factura llega antes de abrir el resto de PDFs."""
+        extractor = nuevo_extractor(tmp_path)
+        generador = extractor.iter_facturas()
+
+        tipo, datos = next(generador)
+        abiertos = mock_open.call_count
+        generador.close()
+
+        assert (tipo, datos['NumFactura']) == ('factura', "F-001")
+        assert abiertos == 1
+
+    def test_directorio_vacio(self, tmp_path):
+        extractor = PDFExtractor(directorio_facturas=str(tmp_path), organizar_archivos=False)
+
+        assert list(extractor.iter_facturas()) == []
+
+
+class TestExportarStreaming:
+    """Tests de la exportación desde un iterador."""
+
+    def registros(self):
+        yield 'factura', {'CIF': 'B1', 'NumFactura': 'F-001', 'Base': '10.0', '_Archivo': 'a.pdf'}
+        yield 'error', {'Archivo': 'x.pdf', 'Error': 'Proveedor no identificado'}
+        yield 'factura', {'CIF': 'B1', 'NumFactura': 'F-001', 'Base': '10.0', '_Duplicado': True}
+        yield 'factura', {'CIF': 'B2', 'NumFactura': 'F-002', 'Base': '20.0', '_Archivo': 'b.pdf'}
+
+    def test_csv_json_y_errores(self, tmp_path):
+        exporter = ExcelExporter([], directorio_salida=str(tmp_path))
+
+        rutas = exporter.exportar_streaming(self.registros(), prefijo="lote")
+
+        with open(rutas['csv'], encoding='utf-8-sig', newline='') as f:
+            filas = list(csv.DictReader(f, delimiter=';'))
+        assert [fila['NumFactura'] for fila in filas] == ["F-001", "F-002"]
+        assert list(filas[0].keys()) == ['CIF', 'NumFactura', 'Base']
+
+        with open(rutas['json'], encoding='utf-8') as f:
+            exportacion = json.load(f)
+        assert exportacion['metadata']['total_facturas'] == 2
+        assert exportacion['facturas'][1] == {'CIF': 'B2', 'NumFactura': 'F-002', 'Base': '20.0'}
+
+        with open(rutas['errores'], encoding='utf-8-sig', newline='') as f:
+            assert [fila['Archivo'] for fila in csv.DictReader(f, delimiter=';')] == ["x.pdf"]
+
+    def test_mismo_json_que_exportar_json(self, tmp_path):
+        datos = [datos for tipo, datos in self.registros() if tipo == 'factura']
+        exporter = ExcelExporter(datos, directorio_salida=str(tmp_path))
+
+        ruta_lista = exporter.exportar_json("lista.json")
+        ruta_stream = exporter.exportar_streaming(self.registros(), formatos=("json",), prefijo="stream")['json']
+
+        with open(ruta_lista, encoding='utf-8') as f:
+            lista = json.load(f)
+        with open(ruta_stream, encoding='utf-8') as f:
+            stream = json.load(f)
+        assert stream['facturas'] == lista['facturas']
+
+    def test_sin_facturas_no_deja_archivos(self, tmp_path):
+        exporter = ExcelExporter([], directorio_salida=str(tmp_path))
+
+        rutas = exporter.exportar_streaming(iter([('error', {'Archivo': 'x.pdf'})]), prefijo="lote")
+
+        assert set(rutas) == {'errores'}
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["lote_ERRORES.csv"]
@@ -22,6 +22,18 @@ from io import StringIO
 from src.main import FacturaExtractorApp, main
 
 
+def crear_mock_exporter(fallos=None):
+    """Helper: ExcelExporter simulado cuya exportación devuelve una ruta por formato."""
+    rutas = {'excel': "test.xlsx", 'excel_debug': "test_debug.xlsx", 'csv': "test.csv",
+             'json': "test.json", 'excel_basico': "test_basico.xlsx", 'parquet': "parquet"}
+    mock_exporter = MagicMock()
+    mock_exporter.fallos_exportacion = fallos or {}
+    mock_exporter.exportar_formatos.side_effect = lambda tareas: {
+        clave: rutas[clave] for clave in tareas if clave not in mock_exporter.fallos_exportacion
+    }
+    return mock_exporter
+
+
 class TestFacturaExtractorAppInit:
     """Tests para inicialización de la aplicación."""
 
@@ -161,7 +173,7 @@ class TestModoProcesamiento:
         # Configurar mocks
         mock_extractor = MagicMock()
         mock_extractor.cargar_plantillas.return_value = True
-        mock_extractor.procesar_directorio_facturas.return_value = [{'CIF': 'test'}]
+        mock_extractor.iter_facturas.return_value = iter([('factura', {'CIF': 'test'})])
         mock_extractor.obtener_estadisticas.return_value = {
             'total_facturas': 1,
             'facturas_exitosas': 1,
@@ -232,7 +244,7 @@ class TestModoProcesamiento:
         """Test cuando no hay facturas para procesar."""
         mock_extractor = MagicMock()
         mock_extractor.cargar_plantillas.return_value = True
-        mock_extractor.procesar_directorio_facturas.return_value = []
+        mock_extractor.iter_facturas.return_value = iter([])
         mock_extractor_class.return_value = mock_extractor
 
         app = FacturaExtractorApp()
@@ -250,7 +262,7 @@ class TestModoProcesamiento:
         # Configurar mock extractor
         mock_extractor = MagicMock()
         mock_extractor.cargar_plantillas.return_value = True
-        mock_extractor.procesar_directorio_facturas.return_value = [{'CIF': 'test'}]
+        mock_extractor.iter_facturas.return_value = iter([('factura', {'CIF': 'test'})])
         mock_extractor.obtener_estadisticas.return_value = {
             'total_facturas': 1,
             'facturas_exitosas': 1,
@@ -263,12 +275,7 @@ class TestModoProcesamiento:
         mock_extractor_class.return_value = mock_extractor
 
         # Configurar mock exporter
-        mock_exporter = MagicMock()
-        mock_exporter.exportar_excel_formateado.return_value = "test.xlsx"
-        mock_exporter.exportar_excel_completo.return_value = "test_debug.xlsx"
-        mock_exporter.exportar_csv.return_value = "test.csv"
-        mock_exporter.exportar_json.return_value = "test.json"
-        mock_exporter.exportar_excel_basico.return_value = "test_basico.xlsx"
+        mock_exporter = crear_mock_exporter()
         mock_exporter_class.return_value = mock_exporter
 
         app = FacturaExtractorApp()
@@ -279,6 +286,100 @@ class TestModoProcesamiento:
         assert "EXPORTANDO RESULTADOS" in captured.out
         assert "OK Exportación completada" in captured.out
 
+    @pytest.mark.parametrize("conservar_volcado, quedan_archivos", [(False, 0), (True, 1)])
+    @patch('builtins.input', side_effect=['4', '2025'])
+    @patch('src.main.PDFExtractor')
+    def test_volcado_se_elimina_tras_exportar(self, mock_extractor_class, mock_input,
+                                              conservar_volcado, quedan_archivos, tmp_path):
+        """Test que LOTE_*.jsonl se borra tras exportar, salvo con conservar_volcado."""
+        mock_extractor = MagicMock()
+        mock_extractor.cargar_plantillas.return_value = True
+        mock_extractor.trimestre, mock_extractor.año = "4T", "2025"
+        mock_extractor.iter_facturas.return_value = iter([('factura', {'CIF': 'test', 'NumFactura': '1'})])
+        mock_extractor.obtener_estadisticas.return_value = {
+            'total_facturas': 1, 'facturas_exitosas': 1, 'tasa_exito': 100, 'facturas_duplicadas': 0,
+            'facturas_con_error': 0, 'plantillas_disponibles': 1, 'proveedores': {}
+        }
+        mock_extractor_class.return_value = mock_extractor
+
+        app = FacturaExtractorApp()
+        resultado = app.modo_procesamiento(auto_export=True, formato_salida="csv", acumular=False,
+                                           conservar_volcado=conservar_volcado)
+
+        assert resultado is True
+        directorio = tmp_path / "documentos" / "reportes" / "2025" / "4T"
+        assert len(list(directorio.glob("LOTE_*.jsonl"))) == quedan_archivos
+        assert len(list(directorio.glob("*.csv"))) == 1
+
+
+class TestModoVigilar:
+    """Tests para el modo de vigilancia de por_procesar."""
+
+    def preparar_extractor(self, mock_extractor_class, tmp_path):
+        mock_extractor = MagicMock()
+        mock_extractor.cargar_plantillas.return_value = True
+        mock_extractor.directorio_facturas = str(tmp_path / "por_procesar")
+        mock_extractor.directorio_plantillas = str(tmp_path / "plantillas")
+        mock_extractor.iter_facturas.return_value = iter([('factura', {'CIF': 'test'})])
+        mock_extractor_class.return_value = mock_extractor
+        return mock_extractor
+
+    @patch('src.main.VigilanteCarpeta')
+    @patch('src.main.PDFExtractor')
+    def test_procesa_lotes_con_extractor_preparado(self, mock_extractor_class, mock_vigilante_class,
+                                                  tmp_path, monkeypatch, capsys):
+        """Las plantillas se cargan una vez y cada lote se procesa con el mismo extractor."""
+        monkeypatch.chdir(tmp_path)
+        mock_extractor = self.preparar_extractor(mock_extractor_class, tmp_path)
+        vigilante = mock_vigilante_class.return_value.__enter__.return_value
+        vigilante.modo = 'sondeo'
+        vigilante.esperar_lote.side_effect = [["por_procesar/a.pdf"], KeyboardInterrupt]
+
+        app = FacturaExtractorApp()
+        resultado = app.modo_vigilar(trimestre='2', año='2025')
+
+        assert resultado is True
+        mock_extractor_class.assert_called_once()
+        mock_extractor.cargar_plantillas.assert_called_once()
+        mock_extractor.iter_facturas.assert_called_once_with(rutas=["por_procesar/a.pdf"])
+        assert (mock_extractor.trimestre, mock_extractor.año) == ("2T", "2025")
+        captured = capsys.readouterr()
+        assert "1 factura(s), 0 error(es)" in captured.out
+        assert "Vigilancia detenida" in captured.out
+
+    @patch('src.main.VigilanteCarpeta')
+    @patch('src.main.PDFExtractor')
+    def test_registros_del_lote_se_guardan_en_el_almacen(self, mock_extractor_class, mock_vigilante_class,
+                                                         tmp_path, monkeypatch):
+        """Las facturas y errores de cada lote llegan al almacén del trimestre."""
+        from src.almacen_trimestral import AlmacenTrimestral
+        monkeypatch.chdir(tmp_path)
+        mock_extractor = self.preparar_extractor(mock_extractor_class, tmp_path)
+        mock_extractor.iter_facturas.side_effect = [
+            iter([('factura', {'CIF': 'B1', 'NumFactura': 'F-1', '_Archivo': 'a.pdf'})]),
+            iter([('factura', {'CIF': 'B1', 'NumFactura': 'F-2', '_Archivo': 'b.pdf'}),
+                  ('error', {'Archivo': 'c.pdf', 'Pagina': 'N/A', 'Error': 'Proveedor no identificado'})]),
+        ]
+        vigilante = mock_vigilante_class.return_value.__enter__.return_value
+        vigilante.esperar_lote.side_effect = [["a.pdf"], ["b.pdf", "c.pdf"], KeyboardInterrupt]
+
+        FacturaExtractorApp().modo_vigilar(trimestre='2', año='2025')
+
+        directorio = tmp_path / "documentos" / "reportes" / "2025" / "2T"
+        almacen = AlmacenTrimestral(str(directorio / "REGISTROS_2025_2T.db"))
+        assert [r['NumFactura'] for r in almacen.registros()] == ["F-1", "F-2"]
+        assert [e['Archivo'] for e in almacen.errores()] == ["c.pdf"]
+        almacen.cerrar()
+        # Una vez en el almacén, los volcados del lote sobran
+        assert not list(directorio.glob("VIGILAR_*.jsonl"))
+
+    @patch('src.main.PDFExtractor')
+    def test_rechaza_trimestre_invalido(self, mock_extractor_class, capsys):
+        app = FacturaExtractorApp()
+
+        assert app.modo_vigilar(trimestre='5') is False
+        mock_extractor_class.assert_not_called()
+
 
 class TestMostrarEstadisticas:
     """Tests para mostrar estadísticas."""
@@ -335,68 +436,95 @@ class TestExportarResultados:
     @patch('src.main.ExcelExporter')
     def test_exportar_resultados_formato_excel(self, mock_exporter_class, capsys):
         """Test exportación solo formato Excel."""
-        mock_exporter = MagicMock()
-        mock_exporter.exportar_excel_formateado.return_value = "test.xlsx"
-        mock_exporter.exportar_excel_completo.return_value = "test_debug.xlsx"
+        mock_exporter = crear_mock_exporter()
         mock_exporter_class.return_value = mock_exporter
 
         app = FacturaExtractorApp()
         resultado = app.exportar_resultados([{'CIF': 'test'}], formato="excel")
 
         assert resultado is True
-        mock_exporter.exportar_excel_formateado.assert_called_once()
-        mock_exporter.exportar_excel_completo.assert_called_once()
-        mock_exporter.exportar_csv.assert_not_called()
-        mock_exporter.exportar_json.assert_not_called()
+        tareas = mock_exporter.exportar_formatos.call_args[0][0]
+        assert [metodo for metodo, _ in tareas.values()] == ["exportar_excel_formateado",
+                                                              "exportar_excel_completo"]
 
     @patch('src.main.ExcelExporter')
     def test_exportar_resultados_formato_csv(self, mock_exporter_class, capsys):
         """Test exportación solo formato CSV."""
-        mock_exporter = MagicMock()
-        mock_exporter.exportar_csv.return_value = "test.csv"
+        mock_exporter = crear_mock_exporter()
         mock_exporter_class.return_value = mock_exporter
 
         app = FacturaExtractorApp()
         resultado = app.exportar_resultados([{'CIF': 'test'}], formato="csv")
 
         assert resultado is True
-        mock_exporter.exportar_csv.assert_called_once()
-        mock_exporter.exportar_excel_formateado.assert_not_called()
+        tareas = mock_exporter.exportar_formatos.call_args[0][0]
+        assert tareas == {'csv': ("exportar_csv", None)}
 
     @patch('src.main.ExcelExporter')
     def test_exportar_resultados_formato_json(self, mock_exporter_class, capsys):
         """Test exportación solo formato JSON."""
-        mock_exporter = MagicMock()
-        mock_exporter.exportar_json.return_value = "test.json"
+        mock_exporter = crear_mock_exporter()
         mock_exporter_class.return_value = mock_exporter
 
         app = FacturaExtractorApp()
         resultado = app.exportar_resultados([{'CIF': 'test'}], formato="json")
 
         assert resultado is True
-        mock_exporter.exportar_json.assert_called_once()
-        mock_exporter.exportar_excel_formateado.assert_not_called()
+        tareas = mock_exporter.exportar_formatos.call_args[0][0]
+        assert tareas == {'json': ("exportar_json", None)}
 
     @patch('src.main.ExcelExporter')
     def test_exportar_resultados_formato_todos(self, mock_exporter_class, capsys):
         """Test exportación todos los formatos."""
-        mock_exporter = MagicMock()
-        mock_exporter.exportar_excel_formateado.return_value = "test.xlsx"
-        mock_exporter.exportar_excel_completo.return_value = "test_debug.xlsx"
-        mock_exporter.exportar_csv.return_value = "test.csv"
-        mock_exporter.exportar_json.return_value = "test.json"
-        mock_exporter.exportar_excel_basico.return_value = "test_basico.xlsx"
+        mock_exporter = crear_mock_exporter()
         mock_exporter_class.return_value = mock_exporter
 
         app = FacturaExtractorApp()
         resultado = app.exportar_resultados([{'CIF': 'test'}], formato="todos")
 
         assert resultado is True
-        mock_exporter.exportar_excel_formateado.assert_called_once()
-        mock_exporter.exportar_excel_completo.assert_called_once()
-        mock_exporter.exportar_csv.assert_called_once()
-        mock_exporter.exportar_json.assert_called_once()
-        mock_exporter.exportar_excel_basico.assert_called_once()
+        mock_exporter.exportar_formatos.assert_called_once()
+        tareas = mock_exporter.exportar_formatos.call_args[0][0]
+        assert sorted(metodo for metodo, _ in tareas.values()) == [
+            "exportar_csv", "exportar_excel_basico", "exportar_excel_completo",
+            "exportar_excel_formateado", "exportar_json"]
+
+    @patch('src.main.ExcelExporter')
+    def test_exportar_resultados_formato_parquet(self, mock_exporter_class, capsys):
+        """Test exportación solo formato Parquet (no incluido en 'todos')."""
+        mock_exporter = crear_mock_exporter()
+        mock_exporter_class.return_value = mock_exporter
+
+        app = FacturaExtractorApp()
+        resultado = app.exportar_resultados([{'CIF': 'test'}], formato="parquet")
+
+        assert resultado is True
+        tareas = mock_exporter.exportar_formatos.call_args[0][0]
+        assert tareas == {'parquet': ("exportar_parquet", None)}
+
+    @patch('src.main.ExcelExporter')
+    def test_exportar_resultados_parquet_sin_acumular(self, mock_exporter_class, capsys):
+        """Test que Parquet no se exporta con un lote suelto (sustituiría el trimestre)."""
+        app = FacturaExtractorApp()
+        resultado = app.exportar_resultados([{'CIF': 'test'}], formato="parquet", acumular=False)
+
+        assert resultado is False
+        mock_exporter_class.assert_not_called()
+        assert "--sin-acumular" in capsys.readouterr().out
+
+    @patch('src.main.ExcelExporter')
+    def test_exportar_resultados_informa_fallo_por_formato(self, mock_exporter_class, capsys):
+        """Test que un formato que falla se informa sin perder los demás."""
+        mock_exporter = crear_mock_exporter(fallos={'excel_debug': "disco lleno"})
+        mock_exporter_class.return_value = mock_exporter
+
+        app = FacturaExtractorApp()
+        resultado = app.exportar_resultados([{'CIF': 'test'}], formato="todos")
+
+        assert resultado is False
+        captured = capsys.readouterr()
+        assert "csv: test.csv" in captured.out
+        assert "ERROR exportando excel_debug: disco lleno" in captured.out
 
     @patch('src.main.ExcelExporter', side_effect=Exception("Export error"))
     def test_exportar_resultados_maneja_errores(self, mock_exporter_class, capsys):
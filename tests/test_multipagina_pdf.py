@@ -301,7 +301,7 @@ class TestMultipaginaPDF:
     # ==================== Tests de Integración ====================
 
     @patch('pdfplumber.open')
-    def test_integracion_extraer_multiples_facturas_multipagina(self, mock_pdfplumber):
+    def test_integracion_extraer_multiples_facturas_multipagina(self, mock_pdfplumber, tmp_path):
         """
         Test de integración: PDF con múltiples facturas, algunas con múltiples páginas.
 
@@ -365,7 +365,9 @@ class TestMultipaginaPDF:
         mock_pdfplumber.return_value.__enter__.return_value = mock_pdf
 
         # CUANDO: Extraer datos del PDF multipágina
-        resultados = extractor.extraer_datos_factura_multipagina('test.pdf', 'test')
+        pdf = tmp_path / 'test.pdf'
+        pdf.write_bytes(b'%PDF-1.4')
+        resultados = extractor.extraer_datos_factura_multipagina(str(pdf), 'test')
 
         # ENTONCES: Debe devolver 3 facturas
         assert len(resultados) == 3
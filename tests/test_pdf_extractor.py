@@ -9,6 +9,7 @@ from pathlib import Path
 from datetime import datetime
 from unittest.mock import Mock, patch, mock_open, MagicMock
 from src.pdf_extractor import PDFExtractor
+from src.registro_factura import RegistroFactura
 
 
 @pytest.mark.unit
@@ -473,8 +474,10 @@ class TestExtraerDatosFactura:
         assert 'FechaFactura' in resultado
 
     @patch('pdfplumber.open')
-    def test_extraer_datos_factura_error_en_campo(self, mock_pdf_open, plantilla_valida):
+    def test_extraer_datos_factura_error_en_campo(self, mock_pdf_open, plantilla_valida, tmp_path, monkeypatch):
         """Test cuando hay error extrayendo un campo específico."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "test.pdf").write_bytes(b"%PDF-1.4")
         extractor = PDFExtractor()
         extractor.plantillas_cargadas = {plantilla_valida['proveedor_id']: plantilla_valida}
 
@@ -528,7 +531,7 @@ class TestProcesarDirectorioFacturas:
         assert resultado == []
 
     @patch('src.pdf_extractor.PDFExtractor.identificar_proveedor')
-    @patch('src.pdf_extractor.PDFExtractor.extraer_datos_factura_multipagina')
+    @patch('src.pdf_extractor.PDFExtractor._extraer_registros_multipagina')
     def test_procesar_directorio_con_pdfs_exitosos(
         self, mock_extraer, mock_identificar, temp_facturas_dir, plantilla_valida
     ):
@@ -542,12 +545,12 @@ class TestProcesarDirectorioFacturas:
 
         # Mocks - ahora retorna lista de facturas (multipágina)
         mock_identificar.return_value = plantilla_valida['proveedor_id']
-        mock_extraer.return_value = [{
+        mock_extraer.return_value = [RegistroFactura({
             'Archivo': 'factura.pdf',
             'Proveedor_ID': plantilla_valida['proveedor_id'],
             'Numero_Factura': '12345',
             '_Duplicado': False
-        }]
+        })]
 
         resultado = extractor.procesar_directorio_facturas()
 
@@ -578,7 +581,7 @@ class TestProcesarDirectorioFacturas:
         assert 'Proveedor no identificado' in error['Error']
 
     @patch('src.pdf_extractor.PDFExtractor.identificar_proveedor')
-    @patch('src.pdf_extractor.PDFExtractor.extraer_datos_factura_multipagina')
+    @patch('src.pdf_extractor.PDFExtractor._extraer_registros_multipagina')
     def test_procesar_directorio_error_en_extraccion(
         self, mock_extraer, mock_identificar, temp_facturas_dir, plantilla_valida
     ):
@@ -0,0 +1,182 @@
+"""
+Tests para el modo multiproceso de procesar_directorio_facturas (--workers N).
+
+Valida que:
+1. Con varios procesos se obtienen los mismos resultados y en el mismo orden
+2. Los duplicados dentro de la ejecución se detectan igual que en modo secuencial
+3. Los PDFs se organizan desde el proceso principal
+4. El proceso principal clasifica los PDFs sin proveedor con el texto extraído en el hijo
+"""
+
+import json
+import multiprocessing
+import pytest
+from unittest.mock import Mock, MagicMock, patch
+from src.documento_pdf import DocumentoPDF
+from src.file_organizer import PDFOrganizer
+from src.pdf_extractor import PDFExtractor, _extraer_en_worker, _inicializar_worker
+
+
+# Los mocks de pdfplumber solo llegan a los procesos hijos si se crean por fork
+requiere_fork = pytest.mark.skipif(
+    multiprocessing.get_start_method(allow_none=False) != 'fork',
+    reason="Los mocks de pdfplumber requieren procesos creados con fork"
+)
+
+
+def crear_plantilla(plantillas_dir):
+    """Helper: plantilla que identifica por nombre."""
+    plantilla = {
+        "nombre_proveedor": "Proveedor Test",
+        "cif_proveedor": "B12345678",
+        "campos": [
+            {"nombre": "Nombre_Identificacion", "coordenadas": [10, 10, 100, 30],
+             "tipo": "texto", "es_identificacion": True},
+            {"nombre": "NumFactura", "coordenadas": [10, 50, 100, 70], "tipo": "texto"},
+            {"nombre": "FechaFactura", "coordenadas": [10, 80, 100, 100], "tipo": "fecha"},
+        ]
+    }
+    with open(plantillas_dir / "proveedor_test.json", "w", encoding="utf-8") as f:
+        json.dump(plantilla, f)
+
+
+def crear_mock_pdf_open(numeros_por_archivo):
+    """Helper: pdfplumber.open simulado que devuelve un NumFactura distinto por archivo."""
+    def mock_pdf_open(ruta):
+        # DocumentoPDF pasa los bytes en un flujo que conserva la ruta en .name
+        nombre = str(getattr(ruta, "name", ruta)).replace("\\", "/").split("/")[-1]
+        num_factura = numeros_por_archivo.get(nombre)
+
+        def mock_crop(bbox):
+            resultado = MagicMock()
+            if bbox[1] < 35:
+                resultado.extract_text.return_value = "Proveedor Test" if num_factura else "Otra Empresa"
+            elif bbox[1] < 75:
+                resultado.extract_text.return_value = num_factura or ""
+            else:
+                resultado.extract_text.return_value = "15/01/2025"
+            return resultado
+
+        mock_page = MagicMock()
+        mock_page.extract_text.return_value = "Factura CIF IVA Total"
+        mock_page.crop = mock_crop
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [mock_page]
+        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
+        mock_pdf.__exit__ = Mock(return_value=None)
+        return mock_pdf
+
+    return mock_pdf_open
+
+
+def preparar_entorno(base, numeros_por_archivo):
+    """Helper: crea plantillas y PDFs pendientes bajo un directorio base."""
+    plantillas_dir = base / "plantillas"
+    plantillas_dir.mkdir(parents=True)
+    facturas_dir = base / "por_procesar"
+    facturas_dir.mkdir()
+    crear_plantilla(plantillas_dir)
+    for nombre in numeros_por_archivo:
+        (facturas_dir / nombre).write_bytes(f"%PDF {nombre}".encode())
+    return str(facturas_dir), str(plantillas_dir)
+
+
+def sin_metadatos_de_ejecucion(resultados):
+    """Helper: elimina campos que dependen del momento de ejecución."""
+    return [{k: v for k, v in r.items() if k != '_Fecha_Procesamiento'} for r in resultados]
+
+
+@requiere_fork
+class TestProcesamientoParalelo:
+    """Tests del modo --workers N."""
+
+    NUMEROS = {
+        "a.pdf": "F-001",
+        "b.pdf": "F-002",
+        "c.pdf": "F-001",          # Duplicado de a.pdf dentro de la ejecución
+        "d.pdf": None,             # Proveedor no identificado
+        "e.pdf": "F-003",
+    }
+
+    def procesar(self, base, workers):
+        facturas_dir, plantillas_dir = preparar_entorno(base, self.NUMEROS)
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(self.NUMEROS)):
+            extractor = PDFExtractor(directorio_facturas=facturas_dir,
+                                     directorio_plantillas=plantillas_dir)
+            extractor.cargar_plantillas()
+            resultados = extractor.procesar_directorio_facturas(workers=workers)
+        return extractor, resultados
+
+    def test_mismos_resultados_que_secuencial(self, tmp_path):
+        """El modo paralelo produce los mismos registros en el mismo orden."""
+        _, secuencial = self.procesar(tmp_path / "secuencial", workers=1)
+        _, paralelo = self.procesar(tmp_path / "paralelo", workers=3)
+
+        assert sin_metadatos_de_ejecucion(paralelo) == sin_metadatos_de_ejecucion(secuencial)
+        assert [r['_Archivo'] for r in paralelo] == ["a.pdf", "b.pdf", "c.pdf", "e.pdf"]
+
+    def test_detecta_duplicados_entre_procesos(self, tmp_path):
+        """Un duplicado extraído en otro proceso se marca igualmente."""
+        _, resultados = self.procesar(tmp_path, workers=3)
+
+        duplicados = [r['_Archivo'] for r in resultados if r['_Duplicado']]
+        assert duplicados == ["c.pdf"]
+
+    def test_errores_y_organizacion_en_proceso_principal(self, tmp_path):
+        """Errores registrados y PDFs movidos igual que en modo secuencial."""
+        extractor, _ = self.procesar(tmp_path, workers=2)
+
+        assert [e['Archivo'] for e in extractor.errores] == ["d.pdf"]
+        procesados = tmp_path / "procesados"
+        assert len(list((procesados / "facturas").rglob("*.pdf"))) == 3
+        assert len(list((procesados / "duplicados").rglob("*.pdf"))) == 1
+        assert len(list((procesados / "errores").rglob("*.pdf"))) == 1
+        assert not list((tmp_path / "por_procesar").glob("*.pdf"))
+
+
+class TestSeleccionDeModo:
+    """Tests de la selección entre modo secuencial y paralelo."""
+
+    def test_un_solo_archivo_no_crea_pool(self, tmp_path):
+        """Con menos archivos que procesos no se crean procesos de sobra."""
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, {"a.pdf": "F-001"})
+        extractor = PDFExtractor(directorio_facturas=facturas_dir,
+                                 directorio_plantillas=plantillas_dir,
+                                 organizar_archivos=False)
+        extractor.cargar_plantillas()
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open({"a.pdf": "F-001"})), \
+             patch.object(PDFExtractor, '_procesar_en_paralelo') as mock_paralelo:
+            resultados = extractor.procesar_directorio_facturas(workers=8)
+
+        mock_paralelo.assert_not_called()
+        assert len(resultados) == 1
+
+
+class TestClasificacionDeErroresEnParalelo:
+    """Tests de los textos que el proceso hijo envía para clasificar un PDF sin proveedor."""
+
+    def test_clasificacion_sin_volver_a_parsear(self, tmp_path):
+        numeros = {"d.pdf": None}
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, numeros)
+        extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir,
+                                 organizar_archivos=False)
+        extractor.cargar_plantillas()
+        ruta = str(tmp_path / "por_procesar" / "d.pdf")
+
+        # El hijo se ejecuta en este mismo proceso
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)):
+            _inicializar_worker(facturas_dir, plantillas_dir, "", "", extractor.plantillas_cargadas,
+                                extractor.versiones_plantillas, None)
+            extraccion, _, _ = _extraer_en_worker(ruta)
+
+        assert extraccion['num_paginas'] == 1
+        assert extraccion['textos_pagina'] == {0: "Factura CIF IVA Total"}
+
+        documento = DocumentoPDF(ruta)
+        documento.incorporar_textos(extraccion['textos_pagina'], extraccion['num_paginas'])
+        with patch('pdfplumber.open') as mock_open:
+            resultado = PDFOrganizer(directorio_base=str(tmp_path)).analizar_contenido_pdf(ruta, documento)
+
+        mock_open.assert_not_called()
+        assert resultado == (True, 4)
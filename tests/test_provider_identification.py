@@ -15,6 +15,13 @@ from unittest.mock import Mock, patch, MagicMock
 from src.pdf_extractor import PDFExtractor
 
 
+def crear_pdf(directorio):
+    """Helper: PDF de prueba en disco (su contenido lo simula pdfplumber.open)."""
+    ruta = directorio / "test.pdf"
+    ruta.write_bytes(b"%PDF-1.4")
+    return str(ruta)
+
+
 class TestProviderIdentification:
     """Tests para identificación de proveedores."""
 
@@ -107,7 +114,7 @@ class TestProviderIdentification:
         mock_pdf_open.return_value = mock_pdf
 
         # Identificar proveedor
-        resultado = extractor.identificar_proveedor("test.pdf")
+        resultado = extractor.identificar_proveedor(crear_pdf(tmp_path))
 
         assert resultado == "homebed_spain_s.l."
 
@@ -160,7 +167,7 @@ class TestProviderIdentification:
         mock_pdf.__exit__ = Mock(return_value=None)
         mock_pdf_open.return_value = mock_pdf
 
-        resultado = extractor.identificar_proveedor("test.pdf")
+        resultado = extractor.identificar_proveedor(crear_pdf(tmp_path))
 
         assert resultado == "homebed_spain_s.l."
 
@@ -203,7 +210,7 @@ class TestProviderIdentification:
         mock_pdf.__exit__ = Mock(return_value=None)
         mock_pdf_open.return_value = mock_pdf
 
-        resultado = extractor.identificar_proveedor("test.pdf")
+        resultado = extractor.identificar_proveedor(crear_pdf(tmp_path))
 
         assert resultado is None
 
@@ -240,7 +247,7 @@ class TestProviderIdentification:
         mock_pdf_open.return_value = mock_pdf
 
         # Sin campos de identificación, no debería poder identificar
-        resultado = extractor.identificar_proveedor("test.pdf")
+        resultado = extractor.identificar_proveedor(crear_pdf(tmp_path))
 
         assert resultado is None
 
@@ -292,7 +299,7 @@ class TestProviderIdentification:
         mock_pdf.__exit__ = Mock(return_value=None)
         mock_pdf_open.return_value = mock_pdf
 
-        resultado = extractor.identificar_proveedor("test.pdf")
+        resultado = extractor.identificar_proveedor(crear_pdf(tmp_path))
 
         # Debería identificar solo con CIF
         assert resultado == "homebed_spain_s.l."
@@ -352,7 +359,7 @@ class TestProviderIdentification:
         mock_pdf.__exit__ = Mock(return_value=None)
         mock_pdf_open.return_value = mock_pdf
 
-        datos = extractor.extraer_datos_factura("test.pdf", "test_provider")
+        datos = extractor.extraer_datos_factura(crear_pdf(tmp_path), "test_provider")
 
         # Campos de identificación NO deben estar en las columnas estándar
         assert "CIF_Identificacion" not in datos
@@ -427,3 +434,142 @@ class TestProviderIdentification:
         assert error['Archivo'] == 'factura_desconocida.pdf'
         assert 'Proveedor no identificado' in error['Error']
         assert error['Proveedor'] == 'NO_IDENTIFICADO'
+
+
+class TestPlanIdentificacion:
+    """Tests del plan de identificación con regiones deduplicadas entre plantillas."""
+
+    def crear_plantillas(self, plantillas_dir, regiones):
+        """Helper: una plantilla por región de nombre, todas con nombres distintos."""
+        for i, region in enumerate(regiones):
+            plantilla = {
+                "nombre_proveedor": f"Proveedor {chr(65 + i) * 6}",
+                "cif_proveedor": "",
+                "campos": [
+                    {"nombre": "Nombre_Identificacion", "coordenadas": region,
+                     "tipo": "texto", "es_identificacion": True},
+                    {"nombre": "NumFactura", "coordenadas": [10, 50, 100, 70], "tipo": "texto"},
+                ]
+            }
+            with open(plantillas_dir / f"proveedor_{i:02d}.json", "w", encoding="utf-8") as f:
+                json.dump(plantilla, f)
+
+    def test_plan_agrupa_regiones_repetidas_y_solapadas(self, tmp_path):
+        """Regiones idénticas se guardan una vez y las solapadas comparten grupo."""
+        self.crear_plantillas(tmp_path, [
+            [10, 10, 100, 30],
+            [10, 10, 100, 30],      # Idéntica a la anterior
+            [90, 10, 200, 30],      # Solapa con la primera
+            [300, 300, 400, 320],   # Independiente
+        ])
+        extractor = PDFExtractor(directorio_plantillas=str(tmp_path))
+        extractor.cargar_plantillas()
+
+        plan = extractor.plan_identificacion
+        assert plan['total_regiones'] == 3
+        assert [grupo[1] for grupo in plan['grupos']] == [
+            [(10, 10, 100, 30), (90, 10, 200, 30)],
+            [(300, 300, 400, 320)],
+        ]
+        assert plan['grupos'][0][0] == (10, 10, 200, 30)
+
+    @patch('pdfplumber.open')
+    def test_cada_region_se_extrae_una_vez(self, mock_pdf_open, tmp_path):
+        """Con muchas plantillas en la misma región, se recorta una sola vez por página."""
+        self.crear_plantillas(tmp_path, [[10, 10, 100, 30]] * 20)
+
+        mock_page = MagicMock()
+        mock_page.crop.return_value.extract_text.return_value = "Proveedor TTTTTT"
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [mock_page]
+        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
+        mock_pdf.__exit__ = Mock(return_value=None)
+        mock_pdf_open.return_value = mock_pdf
+
+        extractor = PDFExtractor(directorio_plantillas=str(tmp_path))
+        extractor.cargar_plantillas()
+        proveedor_id = extractor.identificar_proveedor(crear_pdf(tmp_path))
+
+        assert proveedor_id == "proveedor_19"
+        assert mock_page.crop.call_count == 1
+
+    def test_plan_se_reconstruye_si_cambian_las_plantillas(self):
+        """Plantillas asignadas directamente también se tienen en cuenta."""
+        extractor = PDFExtractor()
+        extractor.plantillas_cargadas = {'prov_a': {
+            'nombre_proveedor': 'A',
+            'campos': [{'nombre': 'Nombre_Identificacion', 'coordenadas': [0, 0, 10, 10],
+                        'tipo': 'texto', 'es_identificacion': True}]
+        }}
+
+        plan = extractor._obtener_plan_identificacion()
+
+        assert [p['proveedor_id'] for p in plan['plantillas']] == ['prov_a']
+
+
+class TestIdentificacionDirectaPorCIF:
+    """Tests de la búsqueda directa del CIF del proveedor en el texto de la página 1."""
+
+    def crear_plantilla(self, plantillas_dir, proveedor_id, nombre, cif):
+        """Helper: plantilla con región de nombre que no coincidirá nunca."""
+        plantilla = {
+            "nombre_proveedor": nombre,
+            "cif_proveedor": cif,
+            "campos": [
+                {"nombre": "Nombre_Identificacion", "coordenadas": [10, 10, 100, 30],
+                 "tipo": "texto", "es_identificacion": True},
+            ]
+        }
+        with open(plantillas_dir / f"{proveedor_id}.json", "w", encoding="utf-8") as f:
+            json.dump(plantilla, f)
+
+    def crear_mock_pdf(self, texto_pagina):
+        mock_page = MagicMock()
+        mock_page.extract_text.return_value = texto_pagina
+        mock_page.crop.return_value.extract_text.return_value = "Texto sin relación"
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [mock_page]
+        mock_pdf.__enter__ = Mock(return_value=mock_pdf)
+        mock_pdf.__exit__ = Mock(return_value=None)
+        return mock_pdf
+
+    @patch('pdfplumber.open')
+    def test_identifica_por_cif_sin_recortar_regiones(self, mock_pdf_open, tmp_path):
+        """Un CIF conocido en la página identifica al proveedor sin el recorrido por plantillas."""
+        self.crear_plantilla(tmp_path, "alfa", "Alfa S.L.", "A11111111")
+        self.crear_plantilla(tmp_path, "beta", "Beta S.L.", "B-22.222.222")
+        mock_pdf = self.crear_mock_pdf("FACTURA\nCliente: E98530876\nEmisor CIF: B 22.222.222")
+        mock_pdf_open.return_value = mock_pdf
+
+        extractor = PDFExtractor(directorio_plantillas=str(tmp_path))
+        extractor.cargar_plantillas()
+
+        assert extractor.identificar_proveedor(crear_pdf(tmp_path)) == "beta"
+        mock_pdf.pages[0].crop.assert_not_called()
+
+    @patch('pdfplumber.open')
+    def test_varios_cifs_de_proveedor_recurre_a_coordenadas(self, mock_pdf_open, tmp_path):
+        """Si aparecen CIFs de varias plantillas no se decide por texto."""
+        self.crear_plantilla(tmp_path, "alfa", "Alfa S.L.", "A11111111")
+        self.crear_plantilla(tmp_path, "beta", "Beta S.L.", "B22222222")
+        mock_pdf = self.crear_mock_pdf("A11111111 y B22222222")
+        mock_pdf_open.return_value = mock_pdf
+
+        extractor = PDFExtractor(directorio_plantillas=str(tmp_path))
+        extractor.cargar_plantillas()
+
+        assert extractor.identificar_proveedor(crear_pdf(tmp_path)) is None
+        assert mock_pdf.pages[0].crop.called
+
+    @patch('pdfplumber.open')
+    def test_cif_compartido_por_plantillas_no_es_concluyente(self, mock_pdf_open, tmp_path):
+        """Dos plantillas del mismo proveedor (mismo CIF) se resuelven por coordenadas."""
+        self.crear_plantilla(tmp_path, "alfa_v1", "Alfa S.L.", "A11111111")
+        self.crear_plantilla(tmp_path, "alfa_v2", "Alfa S.L.", "A11111111")
+        mock_pdf_open.return_value = self.crear_mock_pdf("CIF A11111111")
+
+        extractor = PDFExtractor(directorio_plantillas=str(tmp_path))
+        extractor.cargar_plantillas()
+
+        assert extractor.plan_identificacion['por_cif'] == {'A11111111': None}
+        assert extractor.identificar_proveedor(crear_pdf(tmp_path)) is None
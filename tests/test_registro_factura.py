@@ -0,0 +1,155 @@
+"""
+Tests para el registro tipado de facturas.
+
+Valida que:
+1. La fecha y los importes se interpretan una sola vez al crear el registro
+2. Los Portes se suman a la Base con Decimal
+3. El diccionario de exportación es el mismo que el del extractor (claves, orden y textos)
+4. Las reglas de trimestre del Excel usan la fecha ya interpretada
+5. El organizador genera las mismas claves de índice con un registro que con un diccionario
+"""
+
+import pickle
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from src.file_organizer import PDFOrganizer
+from src.pdf_extractor import PDFExtractor
+from src.registro_factura import RegistroFactura, a_diccionario, parsear_fecha, parsear_importe
+
+
+def datos_factura(**extra):
+    """Helper: diccionario de factura tal como lo construye el extractor."""
+    datos = {
+        'CIF': 'B12345678', 'FechaFactura': '15/01/2025', 'Trimestre': '1T', 'Año': '2025',
+        'FechaVto': '', 'NumFactura': 'F-001', 'FechaPago': '', 'Base': '100.00', 'ComPaypal': '',
+        'Portes': '', '_Archivo': 'f.pdf', '_Proveedor_Nombre': 'Proveedor Test',
+    }
+    datos.update(extra)
+    return datos
+
+
+class TestParseo:
+    """Tests de parsear_fecha y parsear_importe."""
+
+    def test_formatos_de_fecha(self):
+        assert parsear_fecha("15/01/2025") == datetime(2025, 1, 15)
+        assert parsear_fecha("15-01-2025") == datetime(2025, 1, 15)
+        assert parsear_fecha("15/01/25") == datetime(2025, 1, 15)
+        assert parsear_fecha("ERROR") is None
+        assert parsear_fecha("") is None
+
+    def test_fecha_sin_año_solo_con_año_por_defecto(self):
+        assert parsear_fecha("15/01", 2024) == datetime(2024, 1, 15)
+        assert parsear_fecha("15/01") is None
+
+    def test_importes(self):
+        assert parsear_importe("1250.75") == Decimal("1250.75")
+        assert parsear_importe("") is None
+        assert parsear_importe("ERROR") is None
+        assert parsear_importe("NaN") is None
+
+
+class TestRegistroFactura:
+    """Tests de RegistroFactura."""
+
+    def test_valores_interpretados(self):
+        registro = RegistroFactura(datos_factura(Portes='5.25'))
+
+        assert registro.fecha_factura == datetime(2025, 1, 15)
+        assert registro.base == Decimal("100.00")
+        assert registro.portes == Decimal("5.25")
+        assert registro.clave_duplicado == ('B12345678', 'F-001', '15/01/2025')
+        assert not hasattr(registro, '__dict__')
+
+    def test_diccionario_igual_al_del_extractor_sin_portes(self):
+        datos = datos_factura(_Error="Sin datos")
+
+        esperado = {clave: valor for clave, valor in datos.items() if clave != 'Portes'}
+        resultado = RegistroFactura(datos).como_diccionario()
+        assert resultado == esperado
+        assert list(resultado) == list(esperado)
+
+    def test_portes_se_suman_con_decimal(self):
+        registro = RegistroFactura(datos_factura(Base='0.10', Portes='0.20'))
+
+        registro.aplicar_portes()
+        registro.aplicar_portes()
+
+        assert registro.base == Decimal("0.30")
+        assert registro.como_diccionario()['Base'] == "0.30"
+
+    def test_texto_de_base_con_portes(self):
+        """El texto de Base conserva la escala de Decimal ("110.50", no "110.5" como con float)."""
+        registro = RegistroFactura(datos_factura(Base='110.00', Portes='0.50'))
+
+        registro.aplicar_portes()
+
+        assert registro.como_diccionario()['Base'] == "110.50"
+
+    def test_base_no_numerica_no_cambia(self):
+        registro = RegistroFactura(datos_factura(Base='ERROR', Portes='5'))
+
+        registro.aplicar_portes()
+
+        assert registro.como_diccionario()['Base'] == 'ERROR'
+
+    def test_lectura_como_diccionario(self):
+        registro = RegistroFactura(datos_factura(Portes='5'))
+
+        assert registro['CIF'] == 'B12345678'
+        assert registro.get('_Archivo') == 'f.pdf'
+        assert registro.get('_Error') is None and '_Error' not in registro
+        assert 'Portes' not in registro
+        assert a_diccionario(registro) == registro.como_diccionario()
+
+    def test_se_puede_enviar_entre_procesos(self):
+        registro = pickle.loads(pickle.dumps(RegistroFactura(datos_factura())))
+
+        assert registro.como_diccionario()['NumFactura'] == 'F-001'
+        assert registro.fecha_factura == datetime(2025, 1, 15)
+
+
+class TestReglasTrimestreExcel:
+    """Tests de PDFExtractor._asignar_trimestre_excel con registros."""
+
+    def test_fecha_interpretada_una_vez(self):
+        extractor = PDFExtractor(trimestre="2T", año="2025")
+        with patch('src.registro_factura.parsear_fecha', wraps=parsear_fecha) as mock_parsear:
+            registro = RegistroFactura(datos_factura(FechaFactura='20/03/2025'), 2025)
+            extractor._asignar_trimestre_excel(registro)
+            registro.aplicar_portes()
+            registro.como_diccionario()
+
+        assert mock_parsear.call_count == 1
+        assert (registro.trimestre, registro.año) == ('2T', '2025')
+
+    def test_factura_de_otro_año_excluida(self):
+        extractor = PDFExtractor(trimestre="2T", año="2025")
+        datos = datos_factura(FechaFactura='15/05/2023')
+
+        extractor._aplicar_reglas_asignacion_trimestre_excel(datos)
+
+        assert 'excluida' in datos['_Error']
+        assert datos['_Motivo_Rechazo'] == datos['_Error']
+
+
+class TestOrganizadorConRegistro:
+    """Tests de PDFOrganizer.organizar_pdf con RegistroFactura."""
+
+    @pytest.mark.parametrize("fecha", ['15/02/2025', '15-02-2025', '15/02/25'])
+    def test_misma_clave_de_indice_que_con_diccionario(self, tmp_path, fecha):
+        """Las claves del índice no dependen del tipo de registro (ni cambian las ya guardadas)."""
+        claves = []
+        for nombre, resultado in (("registro", RegistroFactura(datos_factura(FechaFactura=fecha), 2025)),
+                                  ("diccionario", datos_factura(FechaFactura=fecha))):
+            organizer = PDFOrganizer(directorio_base=str(tmp_path / nombre))
+            pdf = tmp_path / f"{nombre}.pdf"
+            pdf.write_bytes(b"%PDF factura")
+            with patch.object(organizer, 'registrar_operacion'), \
+                    patch.object(organizer, 'agregar_al_indice', return_value=True) as mock_agregar:
+                organizer.organizar_pdf(str(pdf), resultado)
+            claves.append(mock_agregar.call_args.args[2]['fecha_factura'])
+
+        assert claves[0] == claves[1] == PDFOrganizer._normalizar_fecha(None, fecha)
@@ -0,0 +1,104 @@
+"""
+Tests para el registro de operaciones en JSON Lines.
+
+Valida que:
+1. Cada operación es una línea JSON en logs/file_operations_YYYYMMDD.jsonl
+2. vaciar() y cerrar() dejan todo escrito y sincronizado
+3. El fsync se hace por lotes, no por operación
+4. PDFOrganizer permite elegir texto, jsonl o ningún registro
+5. Los logs van a <directorio_base>/logs salvo que se indique otra carpeta
+"""
+
+import json
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from src.file_organizer import PDFOrganizer
+from src.registro_operaciones import RegistroOperaciones
+
+
+def leer_lineas(directorio):
+    """Helper: registros JSON de todos los logs del directorio."""
+    lineas = []
+    for ruta in sorted(directorio.glob("*.jsonl")):
+        lineas.extend(json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines())
+    return lineas
+
+
+class TestRegistroOperaciones:
+    """Tests del escritor en segundo plano."""
+
+    def test_escribe_jsonl_del_dia(self, tmp_path):
+        registro = RegistroOperaciones(tmp_path)
+        registro.registrar("EXITO", archivo="a.pdf", destino="facturas/2025")
+        registro.registrar("DUPLICADO", archivo="b.pdf", detalles="CIF: B1")
+        registro.cerrar()
+
+        ruta = tmp_path / f"file_operations_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        lineas = leer_lineas(tmp_path)
+        assert ruta.exists()
+        assert [(l["tipo"], l["archivo"]) for l in lineas] == [("EXITO", "a.pdf"), ("DUPLICADO", "b.pdf")]
+        assert lineas[1]["detalles"] == "CIF: B1"
+        assert "fecha_hora" in lineas[0]
+
+    def test_vaciar_espera_a_que_este_escrito(self, tmp_path):
+        registro = RegistroOperaciones(tmp_path)
+        for i in range(500):
+            registro.registrar("EXITO", archivo=f"{i}.pdf")
+
+        assert registro.vaciar(timeout=5)
+        assert len(leer_lineas(tmp_path)) == 500
+        registro.cerrar()
+
+    def test_fsync_por_lotes(self, tmp_path):
+        registro = RegistroOperaciones(tmp_path, intervalo_fsync=60)
+        with patch('src.registro_operaciones.os.fsync') as mock_fsync:
+            for i in range(200):
+                registro.registrar("EXITO", archivo=f"{i}.pdf")
+            registro.cerrar()
+
+        assert 1 <= mock_fsync.call_count < 10
+
+    def test_se_reanuda_tras_cerrar(self, tmp_path):
+        registro = RegistroOperaciones(tmp_path)
+        registro.registrar("EXITO", archivo="a.pdf")
+        registro.cerrar()
+        registro.registrar("EXITO", archivo="b.pdf")
+        registro.cerrar()
+
+        assert [l["archivo"] for l in leer_lineas(tmp_path)] == ["a.pdf", "b.pdf"]
+
+
+class TestRegistroEnOrganizador:
+    """Tests de PDFOrganizer(registro_operaciones=...)."""
+
+    def test_jsonl(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), registro_operaciones="jsonl")
+
+        organizador.registrar_operacion("EXITO", "a.pdf", "por_procesar", "facturas", "CIF: B1")
+        organizador.finalizar()
+
+        linea, = leer_lineas(tmp_path / "logs")
+        del linea["fecha_hora"]
+        assert linea == {"tipo": "EXITO", "archivo": "a.pdf", "origen": "por_procesar",
+                         "destino": "facturas", "detalles": "CIF: B1"}
+
+    def test_directorio_logs_configurable(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path / "documentos"), registro_operaciones="jsonl",
+                                   directorio_logs=str(tmp_path / "otros_logs"))
+
+        organizador.registrar_operacion("EXITO", "a.pdf", "por_procesar", "facturas")
+        organizador.finalizar()
+
+        assert len(leer_lineas(tmp_path / "otros_logs")) == 1
+        assert not (tmp_path / "documentos" / "logs").exists()
+
+    def test_sin_registro(self, tmp_path):
+        organizador = PDFOrganizer(directorio_base=str(tmp_path), registro_operaciones="no")
+        with patch('builtins.open') as mock_open:
+            organizador.registrar_operacion("EXITO", "a.pdf", "por_procesar", "facturas")
+        mock_open.assert_not_called()
+
+    def test_formato_no_valido(self, tmp_path):
+        with pytest.raises(ValueError):
+            PDFOrganizer(directorio_base=str(tmp_path), registro_operaciones="xml")
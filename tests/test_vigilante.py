@@ -0,0 +1,81 @@
+"""
+Tests para la vigilancia de la carpeta de PDFs pendientes.
+
+Valida que:
+1. Los PDFs se entregan solo cuando dejan de cambiar (archivos a medio copiar)
+2. Un PDF entregado no se vuelve a entregar salvo que cambie
+3. inotify detecta los PDFs nuevos en Linux y el sondeo funciona como alternativa
+"""
+
+import sys
+import threading
+import time
+import pytest
+from src.vigilante import VigilanteCarpeta
+
+
+solo_linux = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="inotify solo existe en Linux")
+
+
+@pytest.fixture(params=[False, pytest.param(True, marks=solo_linux)], ids=["sondeo", "inotify"])
+def usar_inotify(request):
+    return request.param
+
+
+class TestVigilanteCarpeta:
+    """Tests del vigilante en ambos modos."""
+
+    def test_pdfs_existentes_se_entregan(self, tmp_path, usar_inotify):
+        (tmp_path / "b.pdf").write_bytes(b"%PDF b")
+        (tmp_path / "a.pdf").write_bytes(b"%PDF a")
+        (tmp_path / "notas.txt").write_text("no es un PDF")
+
+        with VigilanteCarpeta(str(tmp_path), espera_estable=0.1, intervalo_sondeo=0.05,
+                              usar_inotify=usar_inotify) as vigilante:
+            lote = vigilante.esperar_lote(timeout=2)
+
+        assert lote == [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+
+    def test_pdf_nuevo_se_detecta(self, tmp_path, usar_inotify):
+        with VigilanteCarpeta(str(tmp_path), espera_estable=0.1, intervalo_sondeo=0.05,
+                              usar_inotify=usar_inotify) as vigilante:
+            assert vigilante.modo == ('inotify' if usar_inotify else 'sondeo')
+            threading.Timer(0.1, (tmp_path / "nueva.pdf").write_bytes, args=(b"%PDF nueva",)).start()
+
+            lote = vigilante.esperar_lote(timeout=3)
+
+        assert lote == [str(tmp_path / "nueva.pdf")]
+
+    def test_archivo_a_medio_escribir_espera(self, tmp_path, usar_inotify):
+        """Mientras el archivo sigue creciendo no se entrega."""
+        ruta = tmp_path / "grande.pdf"
+        ruta.write_bytes(b"%PDF parte 1")
+
+        with VigilanteCarpeta(str(tmp_path), espera_estable=0.4, intervalo_sondeo=0.05,
+                              usar_inotify=usar_inotify) as vigilante:
+            for i in range(4):
+                assert vigilante.esperar_lote(timeout=0.1) == []
+                with open(ruta, 'ab') as f:
+                    f.write(f" parte {i + 2}".encode())
+
+            inicio = time.monotonic()
+            lote = vigilante.esperar_lote(timeout=3)
+
+        assert lote == [str(ruta)]
+        assert time.monotonic() - inicio >= 0.3
+
+    def test_no_se_entrega_dos_veces_salvo_cambio(self, tmp_path, usar_inotify):
+        ruta = tmp_path / "a.pdf"
+        ruta.write_bytes(b"%PDF a")
+
+        with VigilanteCarpeta(str(tmp_path), espera_estable=0.1, intervalo_sondeo=0.05,
+                              usar_inotify=usar_inotify) as vigilante:
+            assert vigilante.esperar_lote(timeout=2) == [str(ruta)]
+            assert vigilante.esperar_lote(timeout=0.3) == []
+
+            ruta.write_bytes(b"%PDF a corregido")
+            assert vigilante.esperar_lote(timeout=2) == [str(ruta)]
+
+    def test_sin_inotify_usa_sondeo(self, tmp_path):
+        with VigilanteCarpeta(str(tmp_path), usar_inotify=False) as vigilante:
+            assert vigilante.modo == 'sondeo'
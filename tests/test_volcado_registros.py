@@ -0,0 +1,120 @@
+"""
+Tests para el volcado incremental de registros a JSON Lines.
+
+Valida que:
+1. Los registros se escriben en disco por lotes y al cerrar
+2. Sin registros no se crean archivos
+3. Una línea incompleta (ejecución interrumpida) se descarta al leer
+4. procesar_directorio_facturas vuelca cada registro en cuanto se produce
+5. consumir() no retiene los registros y la lectura es registro a registro
+"""
+
+import json
+from unittest.mock import patch
+import pytest
+from src.pdf_extractor import PDFExtractor
+from src.volcado_registros import VolcadoRegistros
+from tests.test_procesamiento_paralelo import crear_mock_pdf_open, preparar_entorno
+
+
+def lineas(ruta):
+    """Helper: líneas escritas en disco."""
+    return ruta.read_text(encoding='utf-8').splitlines() if ruta.exists() else []
+
+
+class TestVolcadoRegistros:
+    """Tests de VolcadoRegistros."""
+
+    def test_escritura_por_lotes(self, tmp_path):
+        volcado = VolcadoRegistros(str(tmp_path), "lote", tamaño_lote=3)
+
+        volcado.añadir('factura', {'NumFactura': 'F-1'})
+        volcado.añadir('error', {'Archivo': 'roto.pdf'})
+        assert lineas(volcado.ruta_facturas) == []
+
+        volcado.añadir('factura', {'NumFactura': 'F-2'})
+        assert len(lineas(volcado.ruta_facturas)) == 2
+        assert len(lineas(volcado.ruta_errores)) == 1
+
+        volcado.añadir('factura', {'NumFactura': 'F-3'})
+        volcado.cerrar()
+        assert [r['NumFactura'] for r in volcado.facturas()] == ['F-1', 'F-2', 'F-3']
+        assert volcado.total == {'factura': 3, 'error': 1}
+
+    def test_sin_registros_no_crea_archivos(self, tmp_path):
+        with VolcadoRegistros(str(tmp_path / "reportes"), "lote") as volcado:
+            pass
+
+        assert not (tmp_path / "reportes").exists()
+        assert volcado.facturas() == []
+
+    def test_eliminar_borra_los_archivos(self, tmp_path):
+        volcado = VolcadoRegistros(str(tmp_path), "lote")
+        volcado.añadir('factura', {'NumFactura': 'F-1'})
+        volcado.añadir('error', {'Archivo': 'roto.pdf'})
+
+        volcado.eliminar()
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_linea_incompleta_se_descarta(self, tmp_path, capsys):
+        ruta = tmp_path / "lote.jsonl"
+        ruta.write_text(json.dumps({'NumFactura': 'F-1'}) + "\n" + '{"NumFactura": "F-', encoding='utf-8')
+
+        assert VolcadoRegistros.leer(ruta) == [{'NumFactura': 'F-1'}]
+        assert "incompleta" in capsys.readouterr().out
+
+
+    def test_consumir_y_leer_registro_a_registro(self, tmp_path):
+        def generador():
+            yield 'factura', {'NumFactura': 'F-1'}
+            yield 'error', {'Archivo': 'roto.pdf'}
+            yield 'factura', {'NumFactura': 'F-2'}
+
+        with VolcadoRegistros(str(tmp_path), "lote") as volcado:
+            totales = volcado.consumir(generador())
+
+        assert totales == {'factura': 2, 'error': 1}
+        facturas = volcado.iter_facturas()
+        assert next(facturas) == {'NumFactura': 'F-1'}
+        assert [tipo for tipo, _ in volcado.registros()] == ['factura', 'factura', 'error']
+
+
+class TestVolcadoDuranteElProcesamiento:
+    """Tests de procesar_directorio_facturas con volcado."""
+
+    def test_registros_en_disco_aunque_se_interrumpa(self, tmp_path):
+        numeros = {"a.pdf": "F-001", "b.pdf": "F-002", "c.pdf": "F-003"}
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, numeros)
+        extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir)
+        extractor.cargar_plantillas()
+        volcado = VolcadoRegistros(str(tmp_path / "reportes"), "lote", tamaño_lote=1)
+
+        incorporar = extractor._incorporar_extraccion
+        llamadas = []
+
+        def fallar_en_el_tercero(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 3:
+                raise KeyboardInterrupt
+            return incorporar(*args, **kwargs)
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)), \
+                patch.object(extractor, "_incorporar_extraccion", side_effect=fallar_en_el_tercero):
+            with pytest.raises(KeyboardInterrupt):
+                extractor.procesar_directorio_facturas(volcado=volcado)
+
+        assert [r['NumFactura'] for r in VolcadoRegistros.leer(volcado.ruta_facturas)] == ["F-001", "F-002"]
+
+    def test_volcado_igual_a_los_resultados(self, tmp_path):
+        numeros = {"a.pdf": "F-001", "b.pdf": None}
+        facturas_dir, plantillas_dir = preparar_entorno(tmp_path, numeros)
+        extractor = PDFExtractor(directorio_facturas=facturas_dir, directorio_plantillas=plantillas_dir)
+        extractor.cargar_plantillas()
+
+        with patch('pdfplumber.open', side_effect=crear_mock_pdf_open(numeros)), \
+                VolcadoRegistros(str(tmp_path / "reportes"), "lote") as volcado:
+            resultados = extractor.procesar_directorio_facturas(volcado=volcado)
+
+        assert volcado.facturas() == json.loads(json.dumps(resultados))
+        assert [e['Archivo'] for e in volcado.errores()] == ["b.pdf"]